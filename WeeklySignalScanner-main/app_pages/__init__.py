@@ -0,0 +1,29 @@
+"""
+app_streamlit.py のページ群
+
+各ページは `render(...)` を持つモジュールで、選択されたときにだけ import する。
+重いライブラリ（yfinance / plotly / スキャナ類）は各ページ・ボタン処理の中で import する。
+
+- viewer: 結果 CSV のチャート表示（メイン画面）
+- fetch_admin: データ取得
+- monthly_scans: 週足/月足スキャン
+- momentum: 短期_初動スクリーナー
+- file_management: outputs/results の削除
+- launcher: 予想ページ起動
+- jobs_panel: バックグラウンドジョブ一覧
+"""
+import importlib
+
+# 管理パネルのメニュー名 -> モジュール名
+ADMIN_PAGES = {
+    'データ取得': 'fetch_admin',
+    '週足/月足スキャン': 'monthly_scans',
+    '短期_初動スクリーナー': 'momentum',
+    'ファイル管理': 'file_management',
+    '予想ページ起動': 'launcher',
+}
+
+
+def load_page(name):
+    """ページモジュールを遅延 import して返す。"""
+    return importlib.import_module(f'app_pages.{name}')
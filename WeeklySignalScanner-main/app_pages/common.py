@@ -0,0 +1,131 @@
+"""
+app_pages 共通: パス定義とセッションをまたいで共有するリソース/キャッシュ
+
+重いライブラリ（yfinance / plotly / スキャナ類）はここでは import しない。
+"""
+import os
+from pathlib import Path
+
+import pandas as pd
+import streamlit as st
+
+import dir_state
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+REPO_ROOT = BASE_DIR.parent
+RESULTS_DIR = BASE_DIR / 'outputs' / 'results'
+DATA_DIR = REPO_ROOT / 'data'
+
+
+# ディレクトリ状態（最終更新・ファイル一覧）は dir_state のマニフェストから読む。
+# 再実行ごとの glob/stat を避けるため、ディレクトリとマニフェストの mtime をキーにキャッシュし、
+# アプリ側で削除などを行った場合は load_dir_state.clear() で明示的に無効化する。
+@st.cache_data(show_spinner=False)
+def load_dir_state(path_str, suffix, track_files, token):
+    return dir_state.read_state(path_str, suffix=suffix, track_files=track_files)
+
+
+def _mtime_token(*paths):
+    token = []
+    for p in paths:
+        try:
+            token.append(os.stat(str(p)).st_mtime_ns)
+        except OSError:
+            token.append(None)
+    return tuple(token)
+
+
+def get_dir_state(path, suffix=None, track_files=False):
+    token = _mtime_token(path, os.path.join(str(path), dir_state.MANIFEST_NAME))
+    return load_dir_state(str(path), suffix, track_files, token)
+
+
+# 結果ファイルの一覧・読み込みは results_catalog（書き込み時に登録されたメタデータ）に問い合わせる。
+# カタログファイルと結果ディレクトリの mtime をキーにキャッシュする。
+@st.cache_data(show_spinner=False)
+def load_catalog_entries(results_dir_str, token):
+    import results_catalog
+    return results_catalog.list_results(results_dir=results_dir_str, auto_sync=False)
+
+
+# カタログ外の追加・削除・上書きの取り込み（sync）は、結果ディレクトリと dir_state のマニフェストの
+# mtime が変わったときだけ行う（再実行ごとにディレクトリを走査しない）。
+@st.cache_data(show_spinner=False)
+def sync_catalog(results_dir_str, token):
+    import results_catalog
+    return results_catalog.sync(results_dir_str)
+
+
+def list_result_entries(results_dir=RESULTS_DIR):
+    import results_catalog
+    sync_catalog(str(results_dir), _mtime_token(results_dir, os.path.join(str(results_dir), dir_state.MANIFEST_NAME)))
+    return load_catalog_entries(str(results_dir), results_catalog.catalog_token(results_dir))
+
+
+def list_result_files(results_dir=RESULTS_DIR):
+    """outputs/results の結果を作成日時の新しい順に返す（Path のリスト）と state。
+
+    state は {'files': {name: 作成時刻}, 'entries': {name: entry}, 'dir_mtime_ns': カタログのトークン}。
+    """
+    import results_catalog
+    entries = list_result_entries(results_dir)
+    state = {
+        'files': {e['name']: e['created_ts'] for e in entries},
+        'entries': {e['name']: e for e in entries},
+        'dir_mtime_ns': results_catalog.catalog_token(results_dir),
+    }
+    return [Path(results_dir) / e['name'] for e in entries], state
+
+
+# データ読み込み（先頭に retrieved_at メタ行がある場合はスキップ）
+def read_maybe_timestampped_csv(path):
+    import results_catalog
+    try:
+        return results_catalog.read_csv(path)
+    except Exception:
+        return pd.read_csv(path)
+
+
+@st.cache_data(show_spinner=False)
+def load_result_csv(path_str, mtime):
+    """結果を読み込む（カタログの parquet を優先。パスと作成時刻をキーにキャッシュ）。"""
+    import results_catalog
+    return results_catalog.load(path_str, results_dir=str(Path(path_str).parent))
+
+
+@st.cache_data(show_spinner=False)
+def load_price_map(paths, token):
+    """価格列（current_price / price）を持つ最新の結果から ticker -> 価格 のマップを作る。
+
+    どのファイルに価格列があるかはカタログの列情報で判定する（CSV を順に開かない）。
+    """
+    import results_catalog
+    names = {Path(p).name for p in paths}
+    results_dir = str(Path(paths[0]).parent) if paths else str(RESULTS_DIR)
+    for col in ('current_price', 'price'):
+        for entry in results_catalog.list_results(has_column=col, results_dir=results_dir, auto_sync=False):
+            if entry['name'] not in names:
+                continue
+            try:
+                pf = results_catalog.load(entry)
+            except Exception:
+                continue
+            path = str(Path(results_dir) / entry['name'])
+            if 'ticker' in pf.columns:
+                return pd.Series(pf[col].values, index=pf['ticker'].astype(str)).to_dict(), path
+            return {}, path
+    return {}, None
+
+
+# チャートデータ/メトリクス: セッション間で共有するページキャッシュ（メモリ上限付き）
+@st.cache_resource
+def get_page_cache():
+    from page_cache import PageCache
+    max_mb = float(os.environ.get('PAGE_CACHE_MAX_MB', '256'))
+    return PageCache(max_bytes=int(max_mb * 1024 * 1024), ttl=3600, max_workers=4)
+
+
+@st.cache_resource
+def get_job_store():
+    import jobs
+    return jobs.JobStore()
@@ -0,0 +1,51 @@
+"""
+管理ページ: データ取得（data/*.parquet のダウンロード）
+
+取得処理はバックグラウンドジョブ（jobs.py / scan_tasks.fetch_task）で実行する。
+"""
+import os
+
+import streamlit as st
+
+
+def render():
+    fetch_period = st.text_input('fetch period (yfinance)', value='1y')
+    fetch_interval = st.text_input('fetch interval', value='1d')
+    fetch_batch = st.number_input('batch size', min_value=1, value=200)
+    fetch_sleep = st.number_input('sleep between batches (s)', min_value=0.0, value=1.0, step=0.1)
+    fetch_start = st.number_input('start code (4-digit)', min_value=0, value=1300)
+    fetch_end = st.number_input('end code (4-digit)', min_value=0, value=9999)
+
+    # 手動ティッカー入力（カンマ区切り）
+    manual_tickers = st.text_input('手動ティッカー (カンマ区切り、例: 7201,7202 または 7201.T,7202.T)', value='')
+
+    # 除外リストを無視して取得するか
+    allow_excluded = st.checkbox('除外リストを無視して取得 (EXCLUDED を含める)', value=False)
+
+    # ダウンロード動作: data/ の既存銘柄のみ、差分、または範囲内全件を選択
+    fetch_mode = st.selectbox('ダウンロード対象', [
+        'data に存在する銘柄のみ取得（既存銘柄を再取得）',
+        '今日の日付が無いものだけ取得（差分更新）',
+        'すべての銘柄を取得（範囲内全件）'
+    ])
+
+    # 取得後に、新しい足が入った銘柄だけを再評価する差分スキャン（incremental_scan）
+    from incremental_scan import SCAN_LABELS
+    post_scans = st.multiselect('取得後に差分スキャンを実行', list(SCAN_LABELS.keys()),
+                                default=['weekly_ma52_engulfing'], format_func=lambda k: SCAN_LABELS[k])
+    if st.button('データをダウンロード'):
+        import jobs
+        job = jobs.submit('fetch', {
+            'fetch_mode': fetch_mode,
+            'start': int(fetch_start),
+            'end': int(fetch_end),
+            'manual_tickers': manual_tickers,
+            'allow_excluded': bool(allow_excluded),
+            'data_dir': os.path.abspath('data'),
+            'batch_size': int(fetch_batch),
+            'period': fetch_period,
+            'interval': fetch_interval,
+            'sleep': float(fetch_sleep),
+            'post_scans': post_scans,
+        })
+        st.success(f"データ取得ジョブを登録しました: {job['id']}（進捗は「バックグラウンドジョブ」で確認できます）")
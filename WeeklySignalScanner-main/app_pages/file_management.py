@@ -0,0 +1,38 @@
+"""
+管理ページ: outputs/results のファイル削除
+
+削除はその場で行い（results_catalog から CSV・parquet・カタログ行をまとめて消す）、
+Git への反映（git rm + commit + push）は results_publisher のキューに積んで別プロセスでまとめて行う。
+"""
+import streamlit as st
+
+from app_pages.common import RESULTS_DIR, load_catalog_entries, load_dir_state
+
+
+def render(all_files):
+    try:
+        file_names = [p.name for p in all_files]
+        to_delete = st.multiselect('削除するファイルを選択', file_names)
+        if to_delete:
+            if st.button('選択ファイルを削除'):
+                import results_catalog
+                import results_publisher
+                removed = []
+                try:
+                    deleted = results_catalog.remove(to_delete, results_dir=RESULTS_DIR)
+                    # Git で管理しているのは CSV だけ
+                    removed = [p for p in deleted if p.suffix == '.csv']
+                except Exception as e:
+                    st.sidebar.error(f'ファイル削除中に例外: {e}')
+
+                if removed:
+                    load_dir_state.clear()
+                    load_catalog_entries.clear()
+                    try:
+                        results_publisher.enqueue(removed=removed, message=f"chore(clean): remove results {','.join(p.name for p in removed)}")
+                        st.sidebar.success(f'{len(removed)} 件を削除しました（Git への反映はバックグラウンドで行います）')
+                    except Exception as e:
+                        st.sidebar.error(f'Git 公開キューへの登録に失敗しました: {e}')
+                    st.rerun()
+    except Exception:
+        st.error('ファイル一覧の取得に失敗しました')
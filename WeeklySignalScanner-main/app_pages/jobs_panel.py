@@ -0,0 +1,75 @@
+"""
+サイドバー: バックグラウンドジョブの状態・進捗一覧
+"""
+import pandas as pd
+import streamlit as st
+
+from app_pages.common import DATA_DIR, get_job_store
+
+
+def render_jobs_panel():
+    """バックグラウンドジョブの状態・進捗一覧（キャンセル / 結果表示）。"""
+    import jobs
+    from scan_tasks import TASK_LABELS
+    from app_pages.momentum import render_daily_charts
+
+    store = get_job_store()
+    job_list = store.list_jobs(limit=10)
+    active = [j for j in job_list if j['status'] not in jobs.FINISHED_STATES]
+    st.caption(f"実行中/待機中: {len(active)} 件  ワーカー: {len(store.alive_workers())}")
+    render_publish_status()
+    if not job_list:
+        st.write('ジョブはまだありません')
+    for job in job_list:
+        label = TASK_LABELS.get(job['kind'], job['kind'])
+        prog = job.get('progress') or {}
+        st.markdown(f"**{label}** `{job['id']}` — {job['status']}")
+        if job['status'] == 'running':
+            total = prog.get('total') or 0
+            frac = (prog.get('done', 0) / total) if total else 0.0
+            st.progress(min(max(frac, 0.0), 1.0), text=prog.get('message') or '')
+        elif prog.get('message'):
+            st.caption(prog['message'])
+        if job['status'] in ('queued', 'running'):
+            if job.get('cancel_requested'):
+                st.caption('キャンセル要求済み')
+            elif st.button('キャンセル', key=f"cancel_{job['id']}"):
+                store.request_cancel(job['id'])
+                st.rerun()
+        if job['status'] == 'failed' and job.get('error'):
+            with st.expander('エラー詳細', expanded=False):
+                st.code(job['error'])
+        result = job.get('result') or {}
+        if job['status'] == 'done':
+            for path in result.get('saved_paths') or []:
+                st.caption(f'保存: {path}')
+            if result.get('message'):
+                st.caption(result['message'])
+            if job['kind'] == 'momentum' and result.get('saved_paths'):
+                if st.checkbox('結果と日足チャートを表示', key=f"show_{job['id']}"):
+                    try:
+                        df_res = pd.read_csv(result['saved_paths'][0], encoding='utf-8-sig')
+                        st.dataframe(df_res)
+                        prices = dict(zip(df_res['コード'], df_res['本日終値']))
+                        render_daily_charts(list(df_res['コード']), (job.get('params') or {}).get('data_dir', DATA_DIR), prices)
+                    except Exception as e:
+                        st.warning(f'結果の読み込みに失敗しました: {e}')
+
+
+def render_publish_status():
+    """結果ファイルの Git 公開キュー（results_publisher）の状態。"""
+    import results_publisher
+    try:
+        status = results_publisher.read_status()
+    except Exception as e:
+        st.caption(f'公開状態を取得できません: {e}')
+        return
+    state = '公開中' if status.get('running') else '待機'
+    st.caption(f"Git 公開: {state}  未公開: {status.get('pending', 0)} 件")
+    last = status.get('last_result') or {}
+    if status.get('last_published_at'):
+        pushed = 'push 済み' if last.get('pushed') else '未 push'
+        st.caption(f"最終公開: {status['last_published_at']}  {last.get('commit') or '-'}（{pushed}）")
+    if last.get('error'):
+        retry = '（未公開分は次の公開で再試行します）' if status.get('state') == 'failed' else ''
+        st.caption(f"エラー: {last['error']}{retry}")
@@ -0,0 +1,32 @@
+"""
+管理ページ: 予想ページ起動（外部 Streamlit を別ポートで起動）
+"""
+import streamlit as st
+
+from app_pages.common import BASE_DIR
+
+
+def render():
+    st.write('予想ページ起動（外部Streamlitを別ポートで起動）')
+    app_options = {
+        '既存: app_predict.py': 'app_predict.py',
+        '新規: 血統予想 app (streamlit_horse_app.py)': 'streamlit_horse_app.py',
+        'シグナル履歴 (app_signal_history.py)': 'app_signal_history.py',
+    }
+    chosen_label = st.selectbox('起動するアプリを選択', list(app_options.keys()))
+    chosen_app = app_options[chosen_label]
+    chosen_port = st.number_input('起動ポート', min_value=1024, max_value=65535, value=8502)
+    if st.button('選択アプリを起動'):
+        import subprocess, os
+        out_log = str(BASE_DIR / 'outputs' / f'streamlit_{chosen_port}.log')
+        os.makedirs(str(BASE_DIR / 'outputs'), exist_ok=True)
+        streamlit_bin = os.path.abspath('/workspaces/WeeklySignalScanner-main/.venv/bin/streamlit')
+        app_path = os.path.abspath(BASE_DIR / chosen_app)
+        cmd = f"nohup env STREAMLIT_BROWSER_GUESSING=false STREAMLIT_DISABLE_TELEMETRY=1 {streamlit_bin} run {app_path} --server.port {chosen_port} --server.headless true > {out_log} 2>&1 &"
+        try:
+            subprocess.Popen(cmd, shell=True, cwd=os.getcwd())
+            st.info(f'起動コマンドを送信しました: {chosen_app} -> http://localhost:{chosen_port}')
+            st.write('Local URL:', f'http://localhost:{chosen_port}')
+            st.write(f'ログ: {out_log}')
+        except Exception as e:
+            st.error(f'予想ページ起動に失敗しました: {e}')
@@ -0,0 +1,60 @@
+"""
+管理ページ: 短期急騰・本物の初動スクリーナー（日足表示）
+"""
+import streamlit as st
+
+from app_pages.common import DATA_DIR, RESULTS_DIR
+
+
+def render():
+    # --- 新機能: 短期急騰・本物の初動スクリーナー（日足表示） ---
+    st.markdown('### 短期急騰: 本物の初動スクリーナー（日足表示）')
+    momentum_cache_only = st.checkbox('キャッシュ優先で判定（data/*.parquet を優先）', value=True)
+    momentum_sample = st.text_input('手動ティッカー（カンマ区切り、例: 4179.T,8105.T）', value='')
+    if st.button('短期_初動スクリーニング実行'):
+        import jobs
+        from scan_tasks import parse_ticker_text
+        job = jobs.submit('momentum', {
+            'tickers': parse_ticker_text(momentum_sample),
+            'results_dir': str(RESULTS_DIR),
+            'data_dir': str(DATA_DIR),
+            'cache_only': bool(momentum_cache_only),
+        })
+        st.success(f"短期_初動 ジョブを登録しました: {job['id']}（完了後に結果と日足チャートを表示します）")
+
+
+def render_daily_charts(tickers, data_cache_dir, prices=None):
+    """短期_初動の抽出銘柄について日足ローソク足 + MA25 + 出来高を表示する。"""
+    import yfinance as yf
+    import plotly.graph_objects as go
+    from plotly.subplots import make_subplots
+    from data_fetcher import load_ticker_from_cache
+
+    prices = prices or {}
+    for t in tickers:
+        try:
+            d = None
+            try:
+                d = load_ticker_from_cache(t, cache_dir=str(data_cache_dir))
+                if d is not None and len(d) >= 60:
+                    d = d.tail(60)
+                else:
+                    d = yf.Ticker(t).history(period='90d', interval='1d')
+            except Exception:
+                d = yf.Ticker(t).history(period='90d', interval='1d')
+
+            if d is None or d.empty:
+                st.warning(f'{t}: 日足データ取得失敗')
+                continue
+            ma25 = d['Close'].rolling(window=25).mean()
+            fig = make_subplots(rows=2, cols=1, shared_xaxes=True, vertical_spacing=0.03, row_heights=[0.7, 0.3])
+            fig.add_trace(go.Candlestick(x=d.index, open=d['Open'], high=d['High'], low=d['Low'], close=d['Close'], name='価格'), row=1, col=1)
+            fig.add_trace(go.Scatter(x=d.index, y=ma25, name='MA25', line=dict(color='orange', width=1.5)), row=1, col=1)
+            colors = ['red' if d['Close'].iloc[i] >= d['Open'].iloc[i] else 'blue' for i in range(len(d))]
+            fig.add_trace(go.Bar(x=d.index, y=d['Volume'], marker_color=colors, showlegend=False), row=2, col=1)
+            fig.update_layout(height=400, xaxis_rangeslider_visible=False, template='plotly_white')
+            price = prices.get(t)
+            st.markdown(f"**{t}**  ¥{price:,}" if price is not None else f"**{t}**")
+            st.plotly_chart(fig, use_container_width=True)
+        except Exception:
+            continue
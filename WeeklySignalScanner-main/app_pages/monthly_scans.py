@@ -0,0 +1,102 @@
+"""
+管理ページ: 週足/月足スキャン（抽出ファイル作成）
+
+- 週足 MA52 + 陽線包み足（scan_all_jp_batch）
+- 月足 MA9/MA24 ゴールデンクロス
+- 月足 陽線包み足（n か月以内）
+- まとめてスキャン（batch_scan: 上記と MA52 以上・短期_初動 をデータ 1 回の読み込みで）
+
+いずれもバックグラウンドジョブとして登録する。
+"""
+import datetime
+
+import streamlit as st
+
+from app_pages.common import DATA_DIR, RESULTS_DIR
+
+
+def render():
+    # 包み足判定を緩和するか（チェック時のみ緩和） - スキャンボタン近くに配置
+    relax_engulfing = st.checkbox('包み足判定を緩和する（チェック時のみ有効）', value=False)
+    # MA条件を無視して抽出するか（チェック時は MA 条件を外す）
+    ignore_ma52 = st.checkbox('MA条件を無視して抽出する（MA52 条件を無視）', value=False)
+
+    # --- 新機能: 月足 MA9/MA24 ゴールデンクロス抽出（常時表示） ---
+    st.markdown('### 月足: MA9 / MA24 ゴールデンクロス抽出')
+    gc_within_months = st.number_input('何か月以内のゴールデンクロスを抽出するか（0=指定なし）', min_value=0, max_value=60, value=0, step=1)
+    gc_cache_only = st.checkbox('キャッシュのみで判定（data/*.parquet のみ）', value=True)
+    if st.button('月足: MA9/MA24 ゴールデンクロス抽出'):
+        import jobs
+        job = jobs.submit('monthly_gc', {
+            'within_months': int(gc_within_months),
+            'cache_only': bool(gc_cache_only),
+            'results_dir': str(RESULTS_DIR),
+            'data_dir': str(DATA_DIR),
+        })
+        st.success(f"月足GC ジョブを登録しました: {job['id']}")
+
+    # 抽出モード選択: 最新 / 単一日指定（as-of）
+    extract_mode = st.selectbox('抽出モード', ['最新版（最新キャッシュ）', '単一日指定'], index=0)
+    as_of_date = None
+    if extract_mode == '単一日指定':
+        today = datetime.date.today()
+        as_of_date = st.date_input('抽出対象日 (as-of)', value=today)
+
+    if st.button('抽出ファイルを作成（スキャン）'):
+        import jobs
+        job = jobs.submit('weekly_scan', {
+            'relaxed_engulfing': bool(relax_engulfing),
+            'end_date': str(as_of_date) if (extract_mode == '単一日指定' and as_of_date) else None,
+            'require_ma52': not ignore_ma52,
+            'results_dir': str(RESULTS_DIR),
+        })
+        st.success(f"スキャンジョブを登録しました: {job['id']}（完了後に結果を Git 公開キューへ積みます）")
+
+    # --- 新機能: 月足包み足を n か月以内に検出して抽出ファイルを作成 ---
+    st.markdown('### 月足抽出: 包み足が出ている銘柄を n か月以内に検出してファイル出力')
+    months_within = st.number_input('n (か月以内)', min_value=1, max_value=12, value=1, step=1)
+    scope_choice = st.selectbox('スキャン範囲', ['全銘柄（1000-9999）'])
+    # キャッシュのみスキャン: data/*.parquet が存在する場合はそれを使ってネット取得を最小化する
+    cache_only = st.checkbox('キャッシュのみでスキャン（data/*.parquet のみ）', value=True, help='有効にすると既にダウンロード済みのキャッシュのみをスキャンします。全件をネット取得したい場合はオフにしてください。')
+    # --- 新しいオプション: 包み足検出後の上昇率でフィルタ ---
+    rise_filter_enable = st.checkbox('包み足検出後の上昇率でフィルタする', value=False, help='有効にすると検出後の上昇率が指定範囲内の銘柄のみ抽出します')
+    min_allowed_rise_pct = st.number_input('最低上昇率（%、下限）', min_value=0.0, max_value=1000.0, value=0.0, step=0.1, help='検出後の最大上昇率がこの値以上の銘柄のみ抽出します')
+    max_allowed_rise_pct = st.number_input('最大上昇率（%、上限）', min_value=0.0, max_value=1000.0, value=50.0, step=0.1, help='検出後の最大上昇率がこの値以下の銘柄のみ抽出します')
+    lookahead_months = st.number_input('検出後の追跡月数（0=検出時のみ）', min_value=0, max_value=36, value=6, step=1, help='包み足検出後、何か月分を見て最大上昇率を算出するか')
+    if st.button('月足: 包み足が nか月以内に出ている抽出ファイルを作成'):
+        import jobs
+        job = jobs.submit('monthly_engulfing', {
+            'months_within': int(months_within),
+            'lookahead_months': int(lookahead_months),
+            'rise_filter_enable': bool(rise_filter_enable),
+            'min_rise_pct': float(min_allowed_rise_pct),
+            'max_rise_pct': float(max_allowed_rise_pct),
+            'cache_only': bool(cache_only),
+            'results_dir': str(RESULTS_DIR),
+            'data_dir': str(DATA_DIR),
+        })
+        st.success(f"月足包み足ジョブを登録しました: {job['id']}")
+
+    # --- まとめてスキャン: 選んだスキャンを価格パネル 1 回の読み込みで評価（上の設定をそのまま使う） ---
+    st.markdown('### まとめてスキャン（データを 1 回だけ読んで複数のスキャンを実行）')
+    from batch_scan import SCAN_LABELS as BATCH_LABELS
+    batch_scans = st.multiselect('実行するスキャン', list(BATCH_LABELS.keys()), default=list(BATCH_LABELS.keys()),
+                                 format_func=lambda k: BATCH_LABELS[k])
+    if st.button('まとめてスキャンを実行'):
+        import jobs
+        job = jobs.submit('batch_scan', {
+            'scans': batch_scans,
+            'scan_params': {
+                'weekly_ma52_engulfing': {'relaxed_engulfing': bool(relax_engulfing), 'require_ma52': not ignore_ma52},
+                'monthly_gc': {'within_months': int(gc_within_months)},
+                'monthly_engulfing': {
+                    'months_within': int(months_within), 'lookahead_months': int(lookahead_months),
+                    'rise_filter_enable': bool(rise_filter_enable),
+                    'min_rise_pct': float(min_allowed_rise_pct), 'max_rise_pct': float(max_allowed_rise_pct),
+                },
+            },
+            'as_of': str(as_of_date) if (extract_mode == '単一日指定' and as_of_date) else None,
+            'results_dir': str(RESULTS_DIR),
+            'data_dir': str(DATA_DIR),
+        })
+        st.success(f"まとめてスキャンのジョブを登録しました: {job['id']}")
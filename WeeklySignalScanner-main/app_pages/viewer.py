@@ -0,0 +1,540 @@
+"""
+ビューア: 結果 CSV の銘柄を週足/月足チャートで表示する（単一銘柄 / 10銘柄一覧）
+"""
+import datetime
+import math
+from pathlib import Path
+
+import pandas as pd
+import streamlit as st
+
+from app_pages.common import DATA_DIR, get_dir_state, get_page_cache, load_price_map, load_result_csv, read_maybe_timestampped_csv
+
+
+# データ取得: セッション間で共有するページキャッシュ（common.get_page_cache）経由で読む。
+# yfinance はキャッシュミス時にだけ必要なのでローダ内で import する。
+def _load_week_data(ticker):
+    try:
+        import yfinance as yf
+        data = yf.Ticker(ticker).history(period='2y', interval='1wk')
+        if data.empty:
+            return None
+        return data
+    except Exception as e:
+        return None
+
+
+def _load_month_data(ticker):
+    try:
+        import yfinance as yf
+        data = yf.Ticker(ticker).history(period='5y', interval='1mo')
+        if data.empty:
+            return None
+        return data
+    except Exception:
+        return None
+
+
+def _chart_loaders(ticker, kind):
+    """kind ('weekly' / 'monthly') のデータとメトリクスのローダを返す。"""
+    from page_cache import compute_metrics
+    page_cache = get_page_cache()
+    load = _load_month_data if kind == 'monthly' else _load_week_data
+    data_key = (kind, ticker)
+    return {
+        data_key: lambda: load(ticker),
+        ('metrics', kind, ticker): lambda: compute_metrics(page_cache.get(data_key, lambda: load(ticker))),
+    }
+
+
+def fetch_data(ticker):
+    return get_page_cache().get(('weekly', ticker), lambda: _load_week_data(ticker))
+
+
+# 月足データ取得（キャッシュ付き）
+def fetch_month_data(ticker):
+    return get_page_cache().get(('monthly', ticker), lambda: _load_month_data(ticker))
+
+
+def fetch_metrics(ticker, kind='weekly'):
+    key = ('metrics', kind, ticker)
+    return get_page_cache().get(key, _chart_loaders(ticker, kind)[key])
+
+
+def render(selected_file, all_files, results_state):
+    """選択中の結果ファイルを読み込み、サイドバーの表示設定とチャートを描画する。"""
+    try:
+        df = load_result_csv(str(selected_file), results_state['files'][Path(str(selected_file)).name])
+    except KeyError:
+        df = read_maybe_timestampped_csv(selected_file)
+
+    # 正規化: 読み込んだ CSV に `ticker` 列が無い場合、既知の代替列名を探して `ticker` を作成する
+    try:
+        if 'ticker' not in df.columns:
+            candidate = None
+            for col in df.columns:
+                name = str(col).strip()
+                low = name.lower()
+                # 日本語/英語の候補を含めて判定
+                if name == 'コード' or 'コード' in name or '銘柄' in name:
+                    candidate = col
+                    break
+                if low in ('ticker', 'symbol', 'code') or 'ticker' in low or 'symbol' in low or 'code' in low:
+                    candidate = col
+                    break
+            if candidate is not None:
+                try:
+                    df['ticker'] = df[candidate].astype(str)
+                except Exception:
+                    df['ticker'] = df[candidate].apply(lambda x: str(x))
+    except Exception:
+        pass
+
+    # 表示: 結果ファイルと data ディレクトリの最終更新時刻をサイドバーに表示
+    try:
+        sel_mtime = datetime.datetime.fromtimestamp(results_state['files'][Path(str(selected_file)).name])
+        sel_mtime_str = sel_mtime.strftime("%Y-%m-%d %H:%M:%S")
+    except Exception:
+        sel_mtime_str = "-"
+
+    data_dir_path = DATA_DIR
+    data_latest_str = "-"
+    data_state = get_dir_state(data_dir_path, suffix='.parquet')
+    if data_state.get('max_mtime'):
+        data_latest_str = datetime.datetime.fromtimestamp(data_state['max_mtime']).strftime("%Y-%m-%d %H:%M:%S")
+
+    st.sidebar.markdown(f"**データ情報**\n- 結果ファイル更新: {sel_mtime_str}\n- data 最終更新: {data_latest_str}（{data_state.get('file_count', 0)} 銘柄）")
+
+
+    # 追加: outputs/results の中から最新で価格列（'current_price' または 'price'）を持つCSVを自動検出して読み込み
+    # （一覧が変わらない限り再読込しないようキャッシュする）
+    price_map, price_file = load_price_map(tuple(str(p) for p in all_files), results_state.get('dir_mtime_ns'))
+
+    # 価格でソート（結果ファイルに price 列または別途作成した price_map がある場合）
+    # 月足出力では 'latest_price' または 'latest_close' を出力するためそれらを優先して昇順ソートする
+    if 'price' in df.columns:
+        df = df.sort_values('price').reset_index(drop=True)
+    elif 'latest_price' in df.columns:
+        df = df.sort_values('latest_price').reset_index(drop=True)
+    elif 'latest_close' in df.columns:
+        df = df.sort_values('latest_close').reset_index(drop=True)
+    elif price_map and 'ticker' in df.columns:
+        # マップに基づいて price 列を作りソート
+        df = df.copy()
+        df['price'] = df['ticker'].astype(str).map(price_map)
+        df = df.sort_values('price').reset_index(drop=True)
+    elif price_map:
+        # price_map は見つかったが DataFrame に 'ticker' 列がない場合はマッピングをスキップ
+        pass
+
+    st.sidebar.metric("検出銘柄数", len(df))
+
+    # 銘柄選択
+    if 'ticker' not in df.columns:
+        st.error("ticker列が見つかりません")
+        st.stop()
+
+    ticker_list = df['ticker'].tolist()
+
+    # 選択ファイルが月足ファイルかどうかを判定（ファイル名またはカラムで判定）
+    is_month_file = False
+    try:
+        sel_name = Path(str(selected_file)).name
+        # ファイル名に '月足' が含まれるか、CSV に 'cross_month' カラムがあれば月足系出力とみなす
+        if '月足' in sel_name or ('cross_month' in df.columns if isinstance(df, pd.DataFrame) else False):
+            is_month_file = True
+    except Exception:
+        is_month_file = False
+
+    # 表示モード選択
+    display_mode = st.sidebar.radio("表示モード", ["単一銘柄", "10銘柄一覧"])
+
+    if display_mode == "単一銘柄":
+        selected_ticker = st.sidebar.selectbox("銘柄を選択", ticker_list)
+        selected_tickers = [selected_ticker]
+    else:
+        # 10銘柄ずつページング
+        total_pages = math.ceil(len(ticker_list) / 10)
+        page = st.sidebar.number_input("ページ", min_value=1, max_value=total_pages, value=1, step=1)
+        start_idx = (page - 1) * 10
+        end_idx = min(start_idx + 10, len(ticker_list))
+        selected_tickers = ticker_list[start_idx:end_idx]
+        st.sidebar.info(f"ページ {page}/{total_pages} (銘柄 {start_idx+1}〜{end_idx})")
+
+        # 2列レイアウトで表示
+        cols_per_row = 2
+
+
+    # チャート描画は plotly を使うため、ここで初めて import する
+    import plotly.graph_objects as go
+    from plotly.subplots import make_subplots
+    page_cache = get_page_cache()
+
+    # 先読み: 表示中ページと前後ページのデータをバックグラウンドで温める
+    if display_mode == "10銘柄一覧":
+        warm_kinds = ['monthly'] if is_month_file else ['weekly']
+        warm_tickers = list(selected_tickers) + ticker_list[max(0, start_idx - 10):start_idx] + ticker_list[end_idx:end_idx + 10]
+    else:
+        warm_kinds = ['weekly', 'monthly'] if is_month_file else ['weekly']
+        warm_tickers = list(selected_tickers)
+    warm = {}
+    for t in warm_tickers:
+        for kind in warm_kinds:
+            warm.update(_chart_loaders(t, kind))
+    page_cache.prefetch(warm)
+
+    cache_stats = page_cache.stats()
+    st.sidebar.markdown(
+        f"**チャートキャッシュ**\n"
+        f"- ヒット率: {cache_stats['hit_rate'] * 100:.1f}% ({cache_stats['hits']}/{cache_stats['hits'] + cache_stats['misses']})\n"
+        f"- 件数: {cache_stats['entries']} · 先読み済: {cache_stats['prefetched']} · 取得中: {cache_stats['inflight']}\n"
+        f"- メモリ: {cache_stats['bytes'] / 1024 / 1024:.1f} / {cache_stats['max_bytes'] / 1024 / 1024:.0f} MB"
+    )
+
+    # 選択された銘柄に対してチャート表示
+    if display_mode == "10銘柄一覧":
+        # 2列グリッドレイアウト
+        for i in range(0, len(selected_tickers), cols_per_row):
+            cols = st.columns(cols_per_row)
+            for j, col in enumerate(cols):
+                idx = i + j
+                if idx >= len(selected_tickers):
+                    break
+                ticker = selected_tickers[idx]
+
+                with col:
+                        # グリッド表示: 選択ファイルが月足ファイルなら月足を表示（小さめ）、なければ週足を表示
+                        if is_month_file:
+                            month_data = fetch_month_data(ticker)
+                            if month_data is None:
+                                st.warning(f"{ticker}: 月足データ取得失敗")
+                                continue
+                            latest_close = price_map.get(str(ticker)) if price_map else None
+                            if latest_close is None:
+                                latest_close = month_data['Close'].iloc[-1]
+                            # try to prefer metrics from loaded results CSV
+                            change_pct_display = None
+                            volume_ratio_display = None
+                            try:
+                                if 'ticker' in df.columns:
+                                    matches = df[df['ticker'].astype(str) == str(ticker)]
+                                    if len(matches) > 0:
+                                        row = matches.iloc[-1]
+                                        for k in ('前日比(%)','前日比','price_change_pct','change_pct'):
+                                            if k in row.index:
+                                                try:
+                                                    change_pct_display = float(row[k])
+                                                    break
+                                                except Exception:
+                                                    pass
+                                        for k in ('出来高倍率','volume_ratio','出来高比','vol_ratio'):
+                                            if k in row.index:
+                                                try:
+                                                    volume_ratio_display = float(row[k])
+                                                    break
+                                                except Exception:
+                                                    pass
+                            except Exception:
+                                pass
+
+                            # fallback: キャッシュ済みの月足メトリクスから算出
+                            metrics = fetch_metrics(ticker, 'monthly') or {}
+                            if change_pct_display is None:
+                                try:
+                                    prev_close = float(metrics['prev_close'])
+                                    change_pct_display = (latest_close - prev_close) / prev_close * 100.0 if prev_close != 0 else 0.0
+                                except Exception:
+                                    change_pct_display = 0.0
+                            if volume_ratio_display is None:
+                                volume_ratio_display = metrics.get('volume_ratio') or 0.0
+
+                            st.markdown(f"**{ticker}**  ¥{latest_close:,.0f}  —  前日比: {change_pct_display:+.2f}% · 出来高倍率: {volume_ratio_display:.2f}x")
+                            mfig = make_subplots(rows=2, cols=1, shared_xaxes=True, vertical_spacing=0.05, row_heights=[0.75, 0.25])
+                            mfig.add_trace(go.Candlestick(x=month_data.index, open=month_data['Open'], high=month_data['High'], low=month_data['Low'], close=month_data['Close'], name='価格', increasing_line_color='red', decreasing_line_color='blue', showlegend=False), row=1, col=1)
+                            # 月足の移動平均表示: ファイル名に MA9/MA24 を含む出力なら MA9/MA24 を、そうでなければ MA12 を表示
+                            try:
+                                if 'MA9' in sel_name or 'MA9_MA24' in sel_name or 'GoldenCross' in sel_name:
+                                    ma9_mon = month_data['Close'].rolling(window=9).mean()
+                                    ma24_mon = month_data['Close'].rolling(window=24).mean()
+                                    mfig.add_trace(go.Scatter(x=month_data.index, y=ma9_mon, name='MA9(months)', line=dict(color='green', width=1.5), showlegend=True), row=1, col=1)
+                                    mfig.add_trace(go.Scatter(x=month_data.index, y=ma24_mon, name='MA24(months)', line=dict(color='purple', width=1.5), showlegend=True), row=1, col=1)
+                                else:
+                                    mfig.add_trace(go.Scatter(x=month_data.index, y=month_data['Close'].rolling(12).mean(), name='MA12', line=dict(color='orange', width=1), showlegend=False), row=1, col=1)
+                            except Exception:
+                                mfig.add_trace(go.Scatter(x=month_data.index, y=month_data['Close'].rolling(12).mean(), name='MA12', line=dict(color='orange', width=1), showlegend=False), row=1, col=1)
+                            mcolors = ['red' if month_data['Close'].iloc[k] >= month_data['Open'].iloc[k] else 'blue' for k in range(len(month_data))]
+                            mfig.add_trace(go.Bar(x=month_data.index, y=month_data['Volume'], marker_color=mcolors, showlegend=False), row=2, col=1)
+                            mfig.update_layout(height=300, margin=dict(l=30, r=10, t=20, b=20), xaxis_rangeslider_visible=False, hovermode='x unified', template='plotly_white', font=dict(size=8))
+                            mfig.update_yaxes(title_text="", row=1, col=1)
+                            mfig.update_yaxes(title_text="", row=2, col=1)
+                            mfig.update_xaxes(showticklabels=False, row=1, col=1)
+                            mfig.update_xaxes(showticklabels=False, row=2, col=1)
+                            st.plotly_chart(mfig, width='stretch', key=f"chart_grid_month_{ticker}")
+                        else:
+                            data = fetch_data(ticker)
+                            if data is None:
+                                st.warning(f"{ticker}: データ取得失敗")
+                                continue
+                            # 週足表示
+                            latest_close = price_map.get(str(ticker)) if price_map else None
+                            if latest_close is None:
+                                latest_close = data['Close'].iloc[-1]
+                            # try to prefer metrics from loaded results CSV
+                            change_pct_display = None
+                            volume_ratio_display = None
+                            try:
+                                if 'ticker' in df.columns:
+                                    matches = df[df['ticker'].astype(str) == str(ticker)]
+                                    if len(matches) > 0:
+                                        row = matches.iloc[-1]
+                                        for k in ('前日比(%)','前日比','price_change_pct','change_pct'):
+                                            if k in row.index:
+                                                try:
+                                                    change_pct_display = float(row[k])
+                                                    break
+                                                except Exception:
+                                                    pass
+                                        for k in ('出来高倍率','volume_ratio','出来高比','vol_ratio'):
+                                            if k in row.index:
+                                                try:
+                                                    volume_ratio_display = float(row[k])
+                                                    break
+                                                except Exception:
+                                                    pass
+                            except Exception:
+                                pass
+
+                            # fallback: キャッシュ済みの週足メトリクスから算出
+                            metrics = fetch_metrics(ticker, 'weekly') or {}
+                            if change_pct_display is None:
+                                try:
+                                    prev_close = float(metrics['prev_close'])
+                                    change_pct_display = (latest_close - prev_close) / prev_close * 100.0 if prev_close != 0 else 0.0
+                                except Exception:
+                                    change_pct_display = 0.0
+                            if volume_ratio_display is None:
+                                volume_ratio_display = metrics.get('volume_ratio') or 0.0
+
+                            st.markdown(f"**{ticker}**  ¥{latest_close:,.0f}  —  前日比: {change_pct_display:+.2f}% · 出来高倍率: {volume_ratio_display:.2f}x")
+                            fig = make_subplots(rows=2, cols=1, shared_xaxes=True, vertical_spacing=0.05, row_heights=[0.75, 0.25])
+                            fig.add_trace(go.Candlestick(x=data.index, open=data['Open'], high=data['High'], low=data['Low'], close=data['Close'], name='価格', increasing_line_color='red', decreasing_line_color='blue', showlegend=False), row=1, col=1)
+                            fig.add_trace(go.Scatter(x=data.index, y=data['Close'].rolling(52).mean(), name='MA52', line=dict(color='orange', width=1), showlegend=False), row=1, col=1)
+                            colors = ['red' if data['Close'].iloc[k] >= data['Open'].iloc[k] else 'blue' for k in range(len(data))]
+                            fig.add_trace(go.Bar(x=data.index, y=data['Volume'], marker_color=colors, showlegend=False), row=2, col=1)
+                            fig.update_layout(height=300, margin=dict(l=30, r=10, t=20, b=20), xaxis_rangeslider_visible=False, hovermode='x unified', template='plotly_white', font=dict(size=8))
+                            fig.update_yaxes(title_text="", row=1, col=1)
+                            fig.update_yaxes(title_text="", row=2, col=1)
+                            fig.update_xaxes(showticklabels=False, row=1, col=1)
+                            fig.update_xaxes(showticklabels=False, row=2, col=1)
+                            st.plotly_chart(fig, width='stretch', key=f"chart_grid_{ticker}")
+
+    else:
+        # 単一銘柄モード
+        for ticker in selected_tickers:
+            data = fetch_data(ticker)
+
+            if data is None:
+                st.warning(f"{ticker}: データを取得できませんでした")
+                continue
+
+            # 区切り線
+            st.markdown("---")
+
+            # メトリクス表示
+            col1, col2, col3, col4, col5 = st.columns(5)
+
+            # 単一銘柄モードでも price_map の値を優先する
+            latest_close = price_map.get(str(ticker)) if price_map else None
+            if latest_close is None:
+                latest_close = data['Close'].iloc[-1]
+            metrics = fetch_metrics(ticker, 'weekly') or {}
+            latest_volume = metrics.get('latest_volume', data['Volume'].iloc[-1])
+            ma52 = metrics.get('ma52')
+            if ma52 is None:
+                ma52 = float('nan')
+
+            # 優先: 選択中の結果ファイルに検出時のメトリクスが含まれている場合はそれを表示
+            row_from_df = None
+            try:
+                # df は読み込んだ結果ファイルの DataFrame
+                if 'ticker' in df.columns:
+                    matches = df[df['ticker'].astype(str) == str(ticker)]
+                    if len(matches) > 0:
+                        # 直近の行を優先
+                        row_from_df = matches.iloc[-1]
+            except Exception:
+                row_from_df = None
+
+            # 表示用の change_pct / volume_ratio を決定（ファイル優先、無ければライブ計算）
+            change_pct = None
+            volume_ratio = None
+            if row_from_df is not None:
+                # 多言語・多列名に対応して取得を試みる
+                for k in ('前日比(%)', '前日比', 'price_change_pct', 'change_pct'):
+                    if k in row_from_df.index:
+                        try:
+                            change_pct = float(row_from_df[k])
+                            break
+                        except Exception:
+                            pass
+                for k in ('出来高倍率', 'volume_ratio', '出来高比', 'vol_ratio'):
+                    if k in row_from_df.index:
+                        try:
+                            volume_ratio = float(row_from_df[k])
+                            break
+                        except Exception:
+                            pass
+                # 本日終値があれば表示用 price を上書き
+                for k in ('本日終値', 'latest_price', 'latest_close', 'price'):
+                    if k in row_from_df.index:
+                        try:
+                            latest_close = float(row_from_df[k])
+                            break
+                        except Exception:
+                            pass
+
+            # fallback: ライブデータから算出
+            if change_pct is None:
+                change_pct = ((latest_close - data['Close'].iloc[-2]) / data['Close'].iloc[-2] * 100) if len(data) > 1 else 0
+            if volume_ratio is None:
+                # 平均20本ボリューム（直近を除く）に対する倍率
+                volume_ratio = metrics.get('volume_ratio', 0.0)
+
+            with col1:
+                st.metric("銘柄", ticker)
+            with col2:
+                st.metric("株価", f"¥{latest_close:,.2f}", f"{change_pct:+.2f}%")
+            with col3:
+                st.metric("出来高", f"{latest_volume:,.0f}")
+            with col4:
+                st.metric("52週MA", f"¥{ma52:,.2f}")
+            with col5:
+                ma_diff_pct = ((latest_close - ma52) / ma52 * 100)
+                st.metric("MA52比", f"{ma_diff_pct:+.2f}%")
+            # キャッシュされたデータの最終日または更新時刻を表示
+            try:
+                cache_path = DATA_DIR / f"{ticker}.parquet"
+                cache_info = None
+                if cache_path.exists():
+                    try:
+                        cdf = pd.read_parquet(cache_path)
+                        # インデックスに日付がある場合は最終日を表示
+                        if hasattr(cdf.index, 'max'):
+                            idxmax = cdf.index.max()
+                            cache_info = f"キャッシュ最終日: {pd.to_datetime(idxmax).date()}"
+                    except Exception:
+                        cache_info = f"キャッシュ最終更新: {datetime.datetime.fromtimestamp(cache_path.stat().st_mtime).strftime('%Y-%m-%d %H:%M:%S')}"
+                if cache_info:
+                    st.caption(cache_info)
+            except Exception:
+                pass
+
+            # チャート作成
+            # 月足ファイルから来ているか判定（ファイル名または CSV に 'cross_month' カラムがあるかで判定）
+            is_month_file = False
+            try:
+                sel_name = Path(str(selected_file)).name
+                if '月足' in sel_name or ('cross_month' in df.columns if isinstance(df, pd.DataFrame) else False):
+                    is_month_file = True
+            except Exception:
+                is_month_file = False
+
+            title_main = f'{ticker} 月足チャート' if is_month_file else f'{ticker} 週足チャート'
+            fig = make_subplots(
+                rows=2, cols=1,
+                shared_xaxes=True,
+                vertical_spacing=0.03,
+                row_heights=[0.7, 0.3],
+                subplot_titles=(title_main, '出来高')
+            )
+
+            # ローソク足
+            fig.add_trace(
+                go.Candlestick(
+                    x=data.index,
+                    open=data['Open'],
+                    high=data['High'],
+                    low=data['Low'],
+                    close=data['Close'],
+                    name='価格',
+                    increasing_line_color='red',
+                    decreasing_line_color='blue'
+                ),
+                row=1, col=1
+            )
+
+            # MA52
+            fig.add_trace(
+                go.Scatter(
+                    x=data.index,
+                    y=data['Close'].rolling(52).mean(),
+                    name='MA52',
+                    line=dict(color='orange', width=2)
+                ),
+                row=1, col=1
+            )
+
+            # 出来高
+            colors = ['red' if data['Close'].iloc[i] >= data['Open'].iloc[i] else 'blue' 
+                      for i in range(len(data))]
+
+            fig.add_trace(
+                go.Bar(
+                    x=data.index,
+                    y=data['Volume'],
+                    name='出来高',
+                    marker_color=colors,
+                    showlegend=False
+                ),
+                row=2, col=1
+            )
+
+            # レイアウト調整
+            fig.update_layout(
+                height=600,
+                xaxis_rangeslider_visible=False,
+                hovermode='x unified',
+                template='plotly_white',
+                showlegend=True
+            )
+
+            fig.update_yaxes(title_text="株価 (¥)", row=1, col=1)
+            fig.update_yaxes(title_text="出来高", row=2, col=1)
+            fig.update_xaxes(title_text="日付", row=2, col=1)
+
+            if is_month_file:
+                # 月足表示も取得して横並び表示
+                month_data = fetch_month_data(ticker)
+                if month_data is None:
+                    # 月足データが無ければ通常の週足チャートを表示
+                    st.plotly_chart(fig, width='stretch', key=f"chart_{ticker}")
+                else:
+                    # 月足ファイル表示時は月足をメインに表示、週足は補助として右側に表示
+                    c1, c2 = st.columns([1, 1])
+                    # 月足チャート作成（メイン）
+                    mfig = make_subplots(rows=2, cols=1, shared_xaxes=True, vertical_spacing=0.03, row_heights=[0.7, 0.3], subplot_titles=(f'{ticker} 月足チャート', '出来高'))
+                    mfig.add_trace(go.Candlestick(x=month_data.index, open=month_data['Open'], high=month_data['High'], low=month_data['Low'], close=month_data['Close'], name='価格', increasing_line_color='red', decreasing_line_color='blue'), row=1, col=1)
+                    # 単一表示側の月足も同様に MA9/MA24 を優先表示
+                    try:
+                        if 'MA9' in sel_name or 'MA9_MA24' in sel_name or 'GoldenCross' in sel_name:
+                            ma9_mon = month_data['Close'].rolling(window=9).mean()
+                            ma24_mon = month_data['Close'].rolling(window=24).mean()
+                            mfig.add_trace(go.Scatter(x=month_data.index, y=ma9_mon, name='MA9(months)', line=dict(color='green', width=2)), row=1, col=1)
+                            mfig.add_trace(go.Scatter(x=month_data.index, y=ma24_mon, name='MA24(months)', line=dict(color='purple', width=2)), row=1, col=1)
+                        else:
+                            mfig.add_trace(go.Scatter(x=month_data.index, y=month_data['Close'].rolling(12).mean(), name='MA12(months)', line=dict(color='orange', width=2)), row=1, col=1)
+                    except Exception:
+                        mfig.add_trace(go.Scatter(x=month_data.index, y=month_data['Close'].rolling(12).mean(), name='MA12(months)', line=dict(color='orange', width=2)), row=1, col=1)
+                    mcolors = ['red' if month_data['Close'].iloc[i] >= month_data['Open'].iloc[i] else 'blue' for i in range(len(month_data))]
+                    mfig.add_trace(go.Bar(x=month_data.index, y=month_data['Volume'], name='出来高', marker_color=mcolors, showlegend=False), row=2, col=1)
+                    mfig.update_layout(height=600, xaxis_rangeslider_visible=False, hovermode='x unified', template='plotly_white', showlegend=True)
+                    mfig.update_yaxes(title_text="株価 (¥)", row=1, col=1)
+                    mfig.update_yaxes(title_text="出来高", row=2, col=1)
+                    mfig.update_xaxes(title_text="日付", row=2, col=1)
+                    with c1:
+                        st.plotly_chart(mfig, width='stretch', key=f"chart_month_{ticker}")
+                    # 右側に週足（補助）を表示
+                    with c2:
+                        st.plotly_chart(fig, width='stretch', key=f"chart_week_{ticker}")
+            else:
+                st.plotly_chart(fig, width='stretch', key=f"chart_{ticker}")
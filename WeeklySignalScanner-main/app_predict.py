@@ -5,6 +5,9 @@ import numpy as np
 import plotly.graph_objects as go
 from datetime import datetime
 
+from prediction_actuals import resolve_actuals, weekly_history
+from prediction_store import open_store
+
 st.set_page_config(page_title="株価予想ページ", layout="wide")
 
 
@@ -19,6 +22,19 @@ def fetch_history(ticker: str, period: str = "1y", interval: str = "1d"):
     return df
 
 
+@st.cache_data(ttl=3600)
+def fetch_weekly_charts(tickers: tuple):
+    # 履歴ページの週足チャートは表示中の銘柄をまとめて 1 回で取得する
+    return weekly_history(list(tickers))
+
+
+@st.cache_data(ttl=600)
+def fetch_actuals(keys: tuple):
+    # keys: ((ticker, target_date), ...)。当日分など未確定の行があっても 10 分は再取得しない
+    df = pd.DataFrame(list(keys), columns=['ticker', 'target_date'])
+    return resolve_actuals(df, pred_dir=PRED_DIR).tolist()
+
+
 # (Top explanatory/header removed per user request)
 
 
@@ -32,10 +48,13 @@ PRED_DIR = 'outputs/predictions'
 import os
 os.makedirs(PRED_DIR, exist_ok=True)
 
-def predictions_path(date=None):
-    if date is None:
-        date = datetime.now()
-    return os.path.join(PRED_DIR, f'predictions_{date.strftime("%Y-%m-%d")}.csv')
+@st.cache_resource
+def get_store(pred_dir: str):
+    # 初回だけ旧 predictions_*.csv を取り込む
+    return open_store(pred_dir)
+
+
+store = get_store(PRED_DIR)
 
 
 with st.expander('手動予想フォーム (開く)', expanded=True):
@@ -74,71 +93,14 @@ with st.expander('手動予想フォーム (開く)', expanded=True):
             # use created date as target_date (user requested no separate target input)
             target_date = datetime.now().strftime('%Y-%m-%d')
 
-            # save to CSV
-            out_path = predictions_path()
-            row = {
-                'created_at': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
-                'ticker': manual_ticker,
-                'target_date': target_date,
-                'pred_price': pred_price,
-                'note': note
-            }
-            # append
-            import csv
-            write_header = not os.path.exists(out_path)
-            with open(out_path, 'a', newline='', encoding='utf-8') as f:
-                writer = csv.DictWriter(f, fieldnames=list(row.keys()))
-                if write_header:
-                    writer.writeheader()
-                writer.writerow(row)
-
-            # Also update a master index of predicted tickers by prediction-date (created date)
-            index_path = os.path.join(PRED_DIR, 'predicted_tickers_index.csv')
-            idx_row = {'date': datetime.now().strftime('%Y-%m-%d'), 'ticker': manual_ticker}
-            write_idx_header = not os.path.exists(index_path)
-            # avoid duplicate entries for same date+ticker
-            existing = set()
-            if os.path.exists(index_path):
-                try:
-                    import csv as _csv
-                    with open(index_path, 'r', encoding='utf-8') as idxf:
-                        reader = _csv.DictReader(idxf)
-                        for r in reader:
-                            existing.add((r.get('date'), r.get('ticker')))
-                except Exception:
-                    existing = set()
-
-            if (idx_row['date'], idx_row['ticker']) not in existing:
-                with open(index_path, 'a', newline='', encoding='utf-8') as idf:
-                    writer = csv.DictWriter(idf, fieldnames=list(idx_row.keys()))
-                    if write_idx_header:
-                        writer.writeheader()
-                    writer.writerow(idx_row)
-
-            st.success(f'予想を保存しました: {out_path}')
+            store.add(manual_ticker, pred_price, target_date=target_date, note=note)
+            st.success(f'予想を保存しました: {manual_ticker}')
 
 
 st.markdown('---')
 st.header('🗂 予想履歴と実値比較')
 
-# list prediction files and load
-files = sorted([f for f in os.listdir(PRED_DIR) if f.endswith('.csv') and f.startswith('predictions_')], reverse=True)
-all_rows = []
-for fn in files:
-    p = os.path.join(PRED_DIR, fn)
-    try:
-        d = pd.read_csv(p)
-        if not d.empty:
-            # remember source file so we can delete individual rows later
-            d['source_file'] = fn
-            all_rows.append(d)
-    except Exception:
-        continue
-
-if all_rows:
-    preds_df = pd.concat(all_rows, ignore_index=True)
-else:
-    preds_df = pd.DataFrame()
+preds_df = store.query()
 
 if preds_df.empty:
     st.info('予想データがありません。まずフォームで予想を保存してください。')
@@ -164,6 +126,10 @@ else:
         preds_df['created_at'] = pd.NaT
     preds_df['created_date_key'] = pd.to_datetime(preds_df['created_at'], errors='coerce').dt.strftime('%Y-%m-%d')
 
+    # 実値は銘柄ごとにまとめて解決し、確定済みの分は settled_actuals.csv から読むだけ
+    preds_df['actual_price'] = fetch_actuals(tuple(zip(preds_df['ticker'].astype(str), preds_df['target_date'].astype(str))))
+    charts_by_ticker = fetch_weekly_charts(tuple(sorted(preds_df['ticker'].dropna().astype(str).unique())))
+
     st.write('表示: 全ての保存済み予想')
     # Provide optional grouping by created date, but default to show all
     # expand the most recent date group by default
@@ -173,37 +139,6 @@ else:
         expanded_default = (idx == 0)
         with st.expander(f"予想日: {date_key} ({len(group)}件)", expanded=expanded_default):
             grp = group.copy()
-            # fetch actuals for group's target_date entries
-            actuals = []
-            charts = []
-            for i, r in grp.iterrows():
-                tk = r['ticker']
-                td = r['target_date']
-                actual_price = np.nan
-                try:
-                    t = yf.Ticker(tk)
-                    # be tolerant of timezone/market-date mismatches: fetch a small window around the target date
-                    start = (pd.to_datetime(td) - pd.Timedelta(days=1)).strftime('%Y-%m-%d')
-                    end = (pd.to_datetime(td) + pd.Timedelta(days=1)).strftime('%Y-%m-%d')
-                    h = t.history(start=start, end=end)
-                    if not h.empty:
-                        h = h.reset_index()
-                        # match rows whose date equals target date (YYYY-MM-DD)
-                        target_str = pd.to_datetime(td).strftime('%Y-%m-%d')
-                        matched = h[h['Date'].dt.strftime('%Y-%m-%d') == target_str]
-                        if not matched.empty:
-                            actual_price = float(matched['Close'].iloc[0])
-                        else:
-                            # fallback: take first available close in the window
-                            actual_price = float(h['Close'].iloc[0])
-                    else:
-                        actual_price = np.nan
-                except Exception:
-                    actual_price = np.nan
-                actuals.append(actual_price)
-
-            grp['actual_price'] = actuals
-
             display_df = grp.sort_values(by='created_at', ascending=False).reset_index(drop=True).copy()
             # 日本語の列名で表示（不要な列は表示しない）
             col_map = {
@@ -258,44 +193,22 @@ else:
                         # fallback
                         st.table(df_row)
                     # deletion button
-                    src = row.get('source_file') if 'source_file' in row else None
-                    del_key = f"del-{i}-{src}-{tk}-{created}"
+                    pred_id = row.get('id')
+                    del_key = f"del-{pred_id}"
                     if st.button('削除', key=del_key):
-                        if not src:
-                            st.error('元ファイル情報が見つからないため削除できません')
-                        else:
-                            src_path = os.path.join(PRED_DIR, src)
-                            try:
-                                df_file = pd.read_csv(src_path)
-                                # attempt to match row by created_at, ticker and target_date
-                                mask = ~((df_file.get('created_at') == created) & (df_file.get('ticker') == tk) & (df_file.get('target_date') == pred_day))
-                                new_df = df_file[mask]
-                                if len(new_df) == len(df_file):
-                                    # no match found by exact created_at; try matching by ticker+target_date+pred_price
-                                    mask2 = ~((df_file.get('ticker') == tk) & (df_file.get('target_date') == pred_day) & (df_file.get('pred_price') == pred_price))
-                                    new_df = df_file[mask2]
-                                new_df.to_csv(src_path, index=False)
-                                # update index file as well
-                                index_path = os.path.join(PRED_DIR, 'predicted_tickers_index.csv')
-                                if os.path.exists(index_path):
-                                    try:
-                                        idx_df = pd.read_csv(index_path)
-                                        created_date = pd.to_datetime(created, errors='coerce')
-                                        if not pd.isna(created_date):
-                                            date_str = created_date.strftime('%Y-%m-%d')
-                                            idx_df = idx_df[~((idx_df.get('date') == date_str) & (idx_df.get('ticker') == tk))]
-                                            idx_df.to_csv(index_path, index=False)
-                                    except Exception:
-                                        pass
+                        try:
+                            if store.delete(int(pred_id)):
                                 st.success('予想を削除しました')
                                 st.experimental_rerun()
-                            except Exception as e:
-                                st.error(f'削除に失敗しました: {e}')
+                            else:
+                                st.error('対象の予想が見つかりませんでした')
+                        except Exception as e:
+                            st.error(f'削除に失敗しました: {e}')
                 with c4:
                     # show 1y weekly chart
                     try:
-                        hist = yf.Ticker(tk).history(period='1y', interval='1wk')
-                        if not hist.empty:
+                        hist = charts_by_ticker.get(str(tk))
+                        if hist is not None and not hist.empty:
                             fig = go.Figure()
                             fig.add_trace(go.Candlestick(x=hist.index, open=hist['Open'], high=hist['High'], low=hist['Low'], close=hist['Close'], name='価格'))
                             if len(hist) >= 52:
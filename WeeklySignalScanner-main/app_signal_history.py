@@ -0,0 +1,95 @@
+"""
+シグナル履歴ページ（signal_history の連続ヒット・繰り返しヒットの分析）
+
+    streamlit run app_signal_history.py
+"""
+import pandas as pd
+import streamlit as st
+
+import signal_history
+
+st.set_page_config(page_title="シグナル履歴", layout="wide")
+st.title("🧭 シグナル履歴 — 繰り返し・連続ヒット")
+
+
+# 履歴 DB が更新されたときだけ読み直す
+@st.cache_data(show_spinner=False)
+def load_runs(token):
+    return signal_history.runs()
+
+
+@st.cache_data(show_spinner=False)
+def load_repeat(scan_type, last, min_hits, params_hash, freq, token):
+    return signal_history.repeat_signals(scan_type, last, min_hits, params_hash, freq=freq)
+
+
+@st.cache_data(show_spinner=False)
+def load_streaks(scan_type, params_hash, freq, min_length, current_only, token):
+    return signal_history.streaks(scan_type, params_hash, freq=freq, min_length=min_length, current_only=current_only)
+
+
+@st.cache_data(show_spinner=False)
+def load_ticker_hits(ticker, token):
+    return signal_history.hits(ticker=ticker, with_metrics=True)
+
+
+token = signal_history.db_token()
+runs_df = load_runs(token)
+
+if runs_df.empty:
+    st.info('シグナル履歴がまだありません。スキャンを実行するか `python signal_history.py backfill` で既存の結果を取り込んでください。')
+    if st.button('既存の結果を取り込む（backfill）'):
+        n_runs, n_hits = signal_history.backfill()
+        st.success(f'{n_runs} 回分（{n_hits} 件）を取り込みました')
+        st.rerun()
+    st.stop()
+
+scan_types = sorted(runs_df['scan_type'].unique())
+scan_type = st.sidebar.selectbox('スキャン種別', scan_types)
+
+# 同じ種別でもパラメータが違う実行は別系列として選べるようにする
+type_runs = runs_df[runs_df['scan_type'] == scan_type]
+param_options = {'（すべて）': None}
+for phash, grp in type_runs.groupby('params_hash'):
+    param_options[f"{grp['params'].iloc[0]}  [{len(grp)} 回]"] = phash
+params_label = st.sidebar.selectbox('パラメータ', list(param_options.keys()))
+params_hash = param_options[params_label]
+
+freq = st.sidebar.radio('集計単位', list(signal_history.FREQ_LABELS.keys()),
+                        format_func=lambda f: signal_history.FREQ_LABELS[f], index=1)
+
+st.sidebar.caption(f"記録済み: {len(type_runs)} 回（{type_runs['as_of'].min()} 〜 {type_runs['as_of'].max()}）")
+
+col_repeat, col_streak = st.columns(2)
+with col_repeat:
+    st.subheader('繰り返しヒット')
+    c1, c2 = st.columns(2)
+    last = c1.number_input('直近の期間数', min_value=1, max_value=520, value=5, step=1)
+    min_hits = c2.number_input('最低ヒット数', min_value=1, max_value=520, value=min(3, int(last)), step=1)
+    repeat_df = load_repeat(scan_type, int(last), int(min_hits), params_hash, freq, token)
+    st.caption(f"直近 {int(last)} {signal_history.FREQ_LABELS[freq]}のうち {int(min_hits)} 回以上: {len(repeat_df)} 銘柄")
+    st.dataframe(repeat_df, use_container_width=True, hide_index=True)
+
+with col_streak:
+    st.subheader('連続ヒット')
+    c1, c2 = st.columns(2)
+    min_length = c1.number_input('最低連続数', min_value=1, max_value=520, value=2, step=1)
+    current_only = c2.checkbox('現在も継続中のみ', value=True)
+    streak_df = load_streaks(scan_type, params_hash, freq, int(min_length), bool(current_only), token)
+    st.caption(f"{len(streak_df)} 銘柄")
+    st.dataframe(streak_df, use_container_width=True, hide_index=True)
+
+st.markdown('---')
+st.subheader('銘柄ごとのヒット履歴')
+candidates = pd.concat([repeat_df.get('ticker', pd.Series(dtype=str)), streak_df.get('ticker', pd.Series(dtype=str))])
+ticker = st.selectbox('銘柄', [''] + list(dict.fromkeys(candidates.astype(str))))
+manual = st.text_input('またはティッカーを入力（例: 7203.T）', value='')
+ticker = manual.strip() or ticker
+if ticker:
+    ticker_df = load_ticker_hits(ticker, token)
+    if ticker_df.empty:
+        st.write('ヒットの記録がありません')
+    else:
+        pivot = ticker_df.assign(hit=1).pivot_table(index='as_of', columns='scan_type', values='hit', aggfunc='max', fill_value=0)
+        st.bar_chart(pivot.sort_index())
+        st.dataframe(ticker_df, use_container_width=True, hide_index=True)
@@ -1,14 +1,8 @@
 import streamlit as st
-import pandas as pd
-import plotly.graph_objects as go
-from plotly.subplots import make_subplots
-import glob
-import os
-import yfinance as yf
 from pathlib import Path
-import math
-import datetime
-import re
+
+# 重いライブラリ（yfinance / plotly / スキャナ類）は app_pages 以下の各ページ・ボタン処理で
+# 必要になったときに import する（初回表示と再実行を軽くするため）
 
 st.set_page_config(page_title="週足スクリーナー", layout="wide")
 
@@ -59,10 +53,12 @@ else:
         unsafe_allow_html=True,
     )
 
+from app_pages import ADMIN_PAGES, load_page
+from app_pages.common import list_result_files
+
 # 結果ファイルを選択（任意の CSV を選べるように変更）
-results_dir = base_dir / 'outputs' / 'results'
-# 最新の更新日時が上に来るように modification time (mtime) でソート
-all_files = sorted(results_dir.glob('*.csv'), key=lambda p: p.stat().st_mtime, reverse=True) if results_dir.exists() else []
+# 最新の結果が上に来るように作成日時でソート（results_catalog のカタログから取得）
+all_files, results_state = list_result_files()
 
 if not all_files:
     st.error("結果ファイルが見つかりません")
@@ -84,1444 +80,24 @@ selected_file = st.sidebar.selectbox(
 )
 
 # 管理パネル: データのダウンロード / 抽出ファイル作成 / 予想ページ起動
+# 選択したページだけを import・描画する（未選択のページのウィジェットは再実行時に評価しない）
 with st.sidebar.expander("管理: データ取得・スキャン・予想", expanded=False):
     st.write("データのダウンロードやスキャン、予想ページ起動ができます")
-
-    fetch_period = st.text_input('fetch period (yfinance)', value='1y')
-    fetch_interval = st.text_input('fetch interval', value='1d')
-    fetch_batch = st.number_input('batch size', min_value=1, value=200)
-    fetch_sleep = st.number_input('sleep between batches (s)', min_value=0.0, value=1.0, step=0.1)
-    fetch_start = st.number_input('start code (4-digit)', min_value=0, value=1300)
-    fetch_end = st.number_input('end code (4-digit)', min_value=0, value=9999)
-
-    # 手動ティッカー入力（カンマ区切り）
-    manual_tickers = st.text_input('手動ティッカー (カンマ区切り、例: 7201,7202 または 7201.T,7202.T)', value='')
-
-    # 除外リストを無視して取得するか
-    allow_excluded = st.checkbox('除外リストを無視して取得 (EXCLUDED を含める)', value=False)
-
-    # ダウンロード動作: data/ の既存銘柄のみ、差分、または範囲内全件を選択
-    fetch_mode = st.selectbox('ダウンロード対象', [
-        'data に存在する銘柄のみ取得（既存銘柄を再取得）',
-        '今日の日付が無いものだけ取得（差分更新）',
-        'すべての銘柄を取得（範囲内全件）'
-    ])
-    if st.button('データをダウンロード'):
-        import data_fetcher
-        from data_fetcher import load_ticker_from_cache, fetch_and_save_list
-        import pandas as _pd
-
-        # 範囲（start/end）は共通
-        start_code = int(fetch_start)
-        end_code = int(fetch_end)
-
-        # 候補の構築
-        candidates = []
-        data_dir = 'data'
-
-        # 優先: 手動ティッカーが入力されていればそれを使う
-        if manual_tickers and manual_tickers.strip():
-            parts = [p.strip() for p in re.split('[,\n;]+', manual_tickers) if p.strip()]
-            parsed = []
-            for p in parts:
-                token = p
-                # 数値のみなら 4 桁ゼロ埋めして .T を付与
-                if re.fullmatch(r"\d{1,4}", token):
-                    token = f"{int(token):04d}.T"
-                else:
-                    if not token.upper().endswith('.T'):
-                        token = token.upper()
-                parsed.append(token)
-            candidates = parsed
-        else:
-            if fetch_mode.startswith('すべての銘柄'):
-                # 範囲内の全銘柄を対象にする
-                candidates = [f"{i:04d}.T" for i in range(start_code, end_code + 1)]
-                if not allow_excluded:
-                    try:
-                        excluded = getattr(data_fetcher, 'EXCLUDED_TICKERS', set())
-                        candidates = [t for t in candidates if t not in excluded]
-                    except Exception:
-                        pass
-            else:
-                # data/ に存在する銘柄のみを候補とする
-                tickers_from_data = []
-                if os.path.isdir(data_dir):
-                    for fn in os.listdir(data_dir):
-                        if fn.endswith('.parquet'):
-                            ticker = os.path.splitext(fn)[0]
-                            try:
-                                code = int(ticker.replace('.T', ''))
-                            except Exception:
-                                continue
-                            tickers_from_data.append(ticker)
-                tickers_from_data = sorted(set(tickers_from_data))
-                candidates = [t for t in tickers_from_data if start_code <= int(t.replace('.T','')) <= end_code]
-
-        if not candidates:
-            st.info('取得対象の銘柄が見つかりません（範囲や data/ を確認してください）')
-            st.stop()
-
-        targets = []
-        today = _pd.Timestamp.today().normalize()
-        if fetch_mode.startswith('data に存在する'):
-            targets = candidates
-        elif fetch_mode.startswith('今日の日付が無い'):
-            for t in candidates:
-                df = load_ticker_from_cache(t, cache_dir='data')
-                if df is None:
-                    targets.append(t)
-                    continue
-                try:
-                    last = _pd.to_datetime(df.index.max()).normalize()
-                    if last < today:
-                        targets.append(t)
-                except Exception:
-                    targets.append(t)
-        else:
-            # すべての銘柄モード
-            targets = candidates
-
-        if not targets:
-            st.info('取得対象はありません（すでに最新）')
-        else:
-            with st.spinner(f'取得中... {len(targets)} 銘柄'):
-                try:
-                    # allow_excluded を fetch に渡す
-                    fetch_and_save_list(targets, batch_size=int(fetch_batch), period=fetch_period, interval=fetch_interval, out_dir='data', retry_count=1, sleep_between_batches=float(fetch_sleep), allow_excluded=allow_excluded, verbose=True)
-                    st.success('データダウンロード完了')
-                except Exception as e:
-                    st.error(f'ダウンロード中にエラー: {e}')
-
-    # 包み足判定を緩和するか（チェック時のみ緩和） - スキャンボタン近くに配置
-    relax_engulfing = st.checkbox('包み足判定を緩和する（チェック時のみ有効）', value=False)
-    # MA条件を無視して抽出するか（チェック時は MA 条件を外す）
-    ignore_ma52 = st.checkbox('MA条件を無視して抽出する（MA52 条件を無視）', value=False)
-
-    # --- 新機能: 月足 MA9/MA24 ゴールデンクロス抽出（常時表示） ---
-    st.markdown('### 月足: MA9 / MA24 ゴールデンクロス抽出')
-    gc_within_months = st.number_input('何か月以内のゴールデンクロスを抽出するか（0=指定なし）', min_value=0, max_value=60, value=0, step=1)
-    gc_cache_only = st.checkbox('キャッシュのみで判定（data/*.parquet のみ）', value=True)
-    if st.button('月足: MA9/MA24 ゴールデンクロス抽出'):
-        import config, datetime
-        from pathlib import Path
-        from data_fetcher import load_ticker_from_cache
-        import pandas as _pd
-
-        # Debug counters / logging
-        st.sidebar.info('月足GC: ボタン押下 — 実行開始')
-        processed = 0
-        found_count = 0
-        error_count = 0
-        failed_tickers = []
-        failed_details = []
-
-        data_cache_dir = base_dir.parent / 'data'
-        cached_files = sorted([p.stem for p in data_cache_dir.glob('*.parquet')]) if data_cache_dir.exists() else []
-        try:
-            if gc_cache_only and cached_files:
-                tickers = cached_files
-            else:
-                tickers = cached_files if cached_files else [f"{i:04d}.T" for i in range(1300, 10000)]
-        except Exception:
-            tickers = cached_files if cached_files else [f"{i:04d}.T" for i in range(1300, 10000)]
-
-        st.sidebar.info(f'GC: cache_count={len(cached_files)}  scan_target_count={len(tickers)}')
-
-        gc_results = []
-        with st.spinner(f'Monthly MA9/MA24 ゴールデンクロスをチェック中... {len(tickers)} 銘柄'):
-            diag_rows = []
-            for idx, t in enumerate(tickers):
-                # collect diagnostics for first 200 tickers
-                collect_diag = (idx < 200)
-                processed += 1
-                if processed % 200 == 0:
-                    st.sidebar.info(f'月足GC: 処理中 {processed}/{len(tickers)}')
-                try:
-                    df = None
-                    try:
-                        df = load_ticker_from_cache(t, cache_dir=str(data_cache_dir))
-                    except Exception:
-                        df = None
-
-                    fetched_ext = False
-                    if df is None:
-                        mdf = yf.Ticker(t).history(period='5y', interval='1mo')
-                    else:
-                        if not isinstance(df.index, _pd.DatetimeIndex):
-                            df.index = _pd.to_datetime(df.index)
-                        df = df.sort_index()
-                        mdf = df.resample('ME').agg({'Open': 'first', 'High': 'max', 'Low': 'min', 'Close': 'last', 'Volume': 'sum'})
-
-                    # If monthly series is too short for MA24, try fetching extended monthly history from yfinance
-                    try:
-                        if mdf is None or len(mdf) < 24:
-                            ext = yf.Ticker(t).history(period='10y', interval='1mo')
-                            if ext is not None and not ext.empty and len(ext) > (len(mdf) if mdf is not None else 0):
-                                mdf = ext
-                                fetched_ext = True
-                                if not isinstance(mdf.index, _pd.DatetimeIndex):
-                                    mdf.index = _pd.to_datetime(mdf.index)
-                                mdf = mdf.sort_index()
-                    except Exception:
-                        pass
-
-                    if mdf is None or mdf.empty or len(mdf) < 2:
-                        continue
-
-                    mdf = mdf.dropna(subset=['Close'])
-                    if mdf.empty or len(mdf) < 2:
-                        continue
-
-                    closes = mdf['Close'].astype(float)
-                    ma9 = closes.rolling(window=9).mean()
-                    ma24 = closes.rolling(window=24).mean()
-                    crosses = []
-                    for i in range(1, len(mdf)):
-                        if _pd.isna(ma9.iat[i-1]) or _pd.isna(ma24.iat[i-1]) or _pd.isna(ma9.iat[i]) or _pd.isna(ma24.iat[i]):
-                            continue
-                        prev9 = float(ma9.iat[i-1]); prev24 = float(ma24.iat[i-1])
-                        curr9 = float(ma9.iat[i]); curr24 = float(ma24.iat[i])
-                        if prev9 <= prev24 and curr9 > curr24:
-                            crosses.append(i)
-
-                    if not crosses:
-                        if collect_diag:
-                            diag_rows.append({'ticker': t, 'mdf_len': len(mdf), 'ma9_non_na': int(ma9.count()), 'ma24_non_na': int(ma24.count()), 'crosses': 0})
-                        continue
-
-                    last_idx = crosses[-1]
-                    last_cross_date = mdf.index[last_idx]
-                    if gc_within_months and gc_within_months > 0:
-                        last_ts = mdf.index.max()
-                        start_ts = last_ts - _pd.DateOffset(months=int(gc_within_months))
-                        if last_cross_date < start_ts:
-                            continue
-
-                    gc_results.append({
-                        'ticker': t,
-                        'cross_month': last_cross_date.strftime('%Y-%m'),
-                        'ma9': round(float(ma9.iat[last_idx]), 2) if not _pd.isna(ma9.iat[last_idx]) else None,
-                        'ma24': round(float(ma24.iat[last_idx]), 2) if not _pd.isna(ma24.iat[last_idx]) else None,
-                        'latest_close': round(float(closes.iat[-1]), 2),
-                    })
-                    found_count += 1
-                    if collect_diag:
-                        diag_rows.append({'ticker': t, 'mdf_len': len(mdf), 'ma9_non_na': int(ma9.count()), 'ma24_non_na': int(ma24.count()), 'crosses': len(crosses), 'last_cross': last_cross_date.strftime('%Y-%m')})
-                except Exception as e:
-                    import traceback
-                    error_count += 1
-                    failed_tickers.append(t)
-                    tb = traceback.format_exc()
-                    failed_details.append((t, str(e), tb))
-                    # show some error samples inline for fast diagnosis
-                    if len(failed_details) <= 10:
-                        st.sidebar.info(f'月足GC: {t} エラー: {e}')
-                    continue
-
-        os.makedirs(results_dir, exist_ok=True)
-        saved_paths = []
-        # summary
-        st.sidebar.info(f'月足GC: 処理終了 processed={processed} found={found_count} errors={error_count}')
-        if error_count:
-            st.sidebar.info(f'月足GC: エラー発生したティッカー例: {failed_tickers[:10]}')
-            # write detailed error log for inspection
-            try:
-                err_log = results_dir / f'monthly_gc_errors_{datetime.datetime.now(datetime.timezone.utc).strftime("%Y%m%d_%H%M%S")}.log'
-                with open(err_log, 'w', encoding='utf-8') as ef:
-                    for t, msg, tb in failed_details:
-                        ef.write(f'--- {t} ---\n')
-                        ef.write(msg + '\n')
-                        ef.write(tb + '\n')
-                st.sidebar.info(f'月足GC: 詳細エラーログを書きました: {err_log}')
-            except Exception:
-                pass
-
-        if gc_results:
-            # sort by latest_close ascending
-            try:
-                gc_results = sorted(gc_results, key=lambda r: (r.get('latest_close') is None, r.get('latest_close', 0)))
-            except Exception:
-                pass
-
-            base_name = Path(config.jp_filename('月足_MA9_MA24_GoldenCross')).name
-            stem = Path(base_name).stem
-            ext = Path(base_name).suffix or '.csv'
-            if gc_within_months and gc_within_months > 0:
-                stem = f"{stem}_within{int(gc_within_months)}m"
-            ts = datetime.datetime.now(datetime.timezone.utc).strftime('%Y%m%d_%H%M%S')
-            out_name = f"{stem}_{ts}{ext}"
-            out_path = results_dir / out_name
-            import csv
-            with open(out_path, 'w', newline='', encoding='utf-8') as f:
-                writer = csv.DictWriter(f, fieldnames=['ticker', 'cross_month', 'ma9', 'ma24', 'latest_close'])
-                writer.writeheader()
-                writer.writerows(gc_results)
-            saved_paths.append(str(out_path))
-            st.success(f'MA9/MA24 ゴールデンクロス検出結果を保存: {out_path} （件数: {len(gc_results)}）')
-
-        # write diagnostics CSV for inspection (put diagnostics into diagnostics/ to avoid confusion)
-        try:
-            if diag_rows:
-                import csv
-                diag_dir = results_dir / 'diagnostics'
-                diag_dir.mkdir(parents=True, exist_ok=True)
-                diag_path = diag_dir / f'monthly_gc_diag_{datetime.datetime.now(datetime.timezone.utc).strftime("%Y%m%d_%H%M%S")}.csv'
-                with open(diag_path, 'w', newline='', encoding='utf-8') as dfh:
-                    writer = csv.DictWriter(dfh, fieldnames=list(diag_rows[0].keys()))
-                    writer.writeheader()
-                    writer.writerows(diag_rows)
-                st.sidebar.info(f'月足GC: 診断CSVを書きました: {diag_path} （診断ファイルは results/diagnostics/ に移動しました）')
-        except Exception:
-            pass
-
-        # Always attempt to add/commit created result files so they survive a reboot
-        try:
-            import subprocess
-            repo_root = base_dir.parent
-            subprocess.run(['git', '-C', str(repo_root), 'config', 'user.email', 'streamlit@example.com'], check=False)
-            subprocess.run(['git', '-C', str(repo_root), 'config', 'user.name', 'StreamlitAutoCommit'], check=False)
-
-            added_any = False
-            for pstr in saved_paths:
-                try:
-                    p = Path(pstr)
-                    if p.is_file():
-                        relp = os.path.relpath(str(p), start=str(repo_root))
-                        add_proc = subprocess.run(['git', '-C', str(repo_root), 'add', '-f', relp], capture_output=True, text=True)
-                        st.sidebar.info(f'git add {relp} -> returncode={add_proc.returncode}')
-                        if add_proc.returncode == 0:
-                            added_any = True
-                except Exception:
-                    continue
-
-            if added_any:
-                try:
-                    bump_script = repo_root / 'scripts' / 'bump_version.py'
-                    if bump_script.exists():
-                        subprocess.run(['python3', str(bump_script)], check=False)
-                        subprocess.run(['git', '-C', str(repo_root), 'add', 'VERSION'], check=False)
-                except Exception:
-                    pass
-
-                version_str = ''
-                try:
-                    vpath = repo_root / 'VERSION'
-                    if vpath.exists():
-                        version_str = vpath.read_text(encoding='utf-8').strip()
-                except Exception:
-                    version_str = ''
-
-                commit_msg = f"chore(monthly_gc): add monthly MA9/MA24 GC{' within'+str(gc_within_months)+'m' if gc_within_months else ''}{' ver'+version_str if version_str else ''} {datetime.datetime.now(datetime.timezone.utc).isoformat()}"
-                commit_proc = subprocess.run(['git', '-C', str(repo_root), 'commit', '-m', commit_msg], capture_output=True, text=True)
-                st.sidebar.info(f'git commit returncode={commit_proc.returncode}\nstdout:{commit_proc.stdout}\nstderr:{commit_proc.stderr}')
-                if commit_proc.returncode == 0:
-                    try:
-                        token = os.environ.get('GITHUB_TOKEN')
-                        try:
-                            if not token:
-                                token = st.secrets.get('GITHUB_TOKEN') if hasattr(st, 'secrets') and 'GITHUB_TOKEN' in st.secrets else None
-                        except Exception:
-                            pass
-
-                        if token:
-                            rem = subprocess.run(['git', '-C', str(repo_root), 'remote', 'get-url', 'origin'], capture_output=True, text=True)
-                            origin_url = rem.stdout.strip()
-                            if origin_url.startswith('https://'):
-                                auth_url = origin_url.replace('https://', f'https://{token}@')
-                            else:
-                                auth_url = origin_url
-                            push_proc = subprocess.run(['git', '-C', str(repo_root), 'push', auth_url, 'main'], capture_output=True, text=True, timeout=120)
-                        else:
-                            push_proc = subprocess.run(['git', '-C', str(repo_root), 'push', 'origin', 'main'], capture_output=True, text=True, timeout=120)
-
-                        st.sidebar.info(f'git push returncode={push_proc.returncode}\nstdout:{push_proc.stdout}\nstderr:{push_proc.stderr}')
-                        if push_proc.returncode == 0:
-                            st.sidebar.success('月足 GC 結果を origin/main にコミット＆プッシュしました')
-                        else:
-                            st.sidebar.error('git push に失敗しました。認証情報を確認してください。')
-                    except Exception as e:
-                        st.sidebar.error(f'git push 実行中に例外: {e}')
-            else:
-                st.sidebar.info('outputs/results 内にステージ可能なファイルが見つかりませんでした（.gitignore を確認してください）')
-        except Exception as e:
-            st.sidebar.error(f'自動コミット中に例外が発生しました: {e}')
-
-    # --- 新機能: 短期急騰・本物の初動スクリーナー（日足表示） ---
-    st.markdown('### 短期急騰: 本物の初動スクリーナー（日足表示）')
-    momentum_cache_only = st.checkbox('キャッシュ優先で判定（data/*.parquet を優先）', value=True)
-    momentum_sample = st.text_input('手動ティッカー（カンマ区切り、例: 4179.T,8105.T）', value='')
-    if st.button('短期_初動スクリーニング実行'):
-        import csv, traceback
-        from data_fetcher import load_ticker_from_cache
-        import pandas as _pd
-
-        data_cache_dir = base_dir.parent / 'data'
-        cached_files = sorted([p.stem for p in data_cache_dir.glob('*.parquet')]) if data_cache_dir.exists() else []
-        # build target tickers
-        targets = []
-        if momentum_sample and momentum_sample.strip():
-            parts = [p.strip() for p in re.split('[,\n;]+', momentum_sample) if p.strip()]
-            parsed = []
-            for p in parts:
-                token = p
-                if re.fullmatch(r"\d{1,4}", token):
-                    token = f"{int(token):04d}.T"
-                else:
-                    if not token.upper().endswith('.T'):
-                        token = token.upper()
-                parsed.append(token)
-            targets = parsed
-        else:
-            targets = cached_files if (momentum_cache_only and cached_files) else cached_files if cached_files else []
-
-        if not targets:
-            st.info('対象銘柄が見つかりません。data/*.parquet がない場合は手動でティッカーを入力してください。')
-        else:
-            results = []
-            errors = []
-            with st.spinner(f'短期スクリーニング中... {len(targets)} 銘柄'):
-                for idx, t in enumerate(targets):
-                    try:
-                        # Try cache first
-                        df = None
-                        try:
-                            df = load_ticker_from_cache(t, cache_dir=str(data_cache_dir))
-                        except Exception:
-                            df = None
-
-                        if df is None or len(df) < 25:
-                            # fetch recent 40 trading days to be safe
-                            mdf = yf.Ticker(t).history(period='40d', interval='1d')
-                        else:
-                            # ensure datetime index and sort
-                            if not isinstance(df.index, _pd.DatetimeIndex):
-                                df.index = _pd.to_datetime(df.index)
-                            df = df.sort_index()
-                            # take last 40 rows of daily data if available
-                            mdf = df.tail(40)
-
-                        if mdf is None or mdf.empty or len(mdf) < 25:
-                            continue
-
-                        # Ensure numeric
-                        mdf = mdf.dropna(subset=['Close', 'Volume'])
-                        if mdf.empty or len(mdf) < 25:
-                            continue
-
-                        closes = mdf['Close'].astype(float)
-                        volumes = mdf['Volume'].astype(float)
-
-                        today_close = float(closes.iloc[-1])
-                        prev_close = float(closes.iloc[-2])
-                        price_change_pct = (today_close - prev_close) / prev_close * 100.0
-
-                        # past 20 trading days average volume excluding today
-                        if len(volumes) >= 22:
-                            avg_volume_20d = float(volumes.iloc[-22:-2].mean())
-                        else:
-                            avg_volume_20d = float(volumes.iloc[:-1].mean()) if len(volumes) > 1 else 0.0
-                        today_volume = float(volumes.iloc[-1])
-                        volume_ratio = (today_volume / avg_volume_20d) if avg_volume_20d > 0 else 0.0
-
-                        # MA25
-                        ma25 = closes.rolling(window=25).mean()
-                        ma25_now = float(ma25.iloc[-1]) if not _pd.isna(ma25.iloc[-1]) else None
-                        deviation_from_ma25 = ((today_close - ma25_now) / ma25_now * 100.0) if ma25_now and ma25_now != 0 else 9999.0
-
-                        condition_price = price_change_pct >= 5.0
-                        condition_volume = volume_ratio >= 3.0
-                        condition_first_move = deviation_from_ma25 < 20.0
-
-                        if condition_price and condition_volume and condition_first_move:
-                            results.append({
-                                'コード': t,
-                                '本日終値': round(today_close, 1),
-                                '前日比(%)': round(price_change_pct, 2),
-                                '出来高倍率': round(volume_ratio, 2),
-                                '25日線乖離率(%)': round(deviation_from_ma25, 2)
-                            })
-                    except Exception as e:
-                        errors.append((t, str(e), traceback.format_exc()))
-                        continue
-
-            # 保存と表示
-            os.makedirs(results_dir, exist_ok=True)
-            if results:
-                df_res = pd.DataFrame(results)
-                ts = datetime.datetime.now(datetime.timezone.utc).strftime('%Y%m%d_%H%M%S')
-                out_name = f"短期_初動_{ts}.csv"
-                out_path = results_dir / out_name
-                df_res.to_csv(out_path, index=False, encoding='utf-8-sig')
-                st.success(f'抽出結果を保存: {out_path}（{len(df_res)} 件）')
-                st.dataframe(df_res)
-
-                # 日足チャートを下に表示（各銘柄）
-                for r in results:
-                    t = r['コード']
-                    # try to get recent daily data for chart (60d)
-                    try:
-                        d = None
-                        try:
-                            d = load_ticker_from_cache(t, cache_dir=str(data_cache_dir))
-                            if d is not None and len(d) >= 60:
-                                d = d.tail(60)
-                            else:
-                                d = yf.Ticker(t).history(period='90d', interval='1d')
-                        except Exception:
-                            d = yf.Ticker(t).history(period='90d', interval='1d')
-
-                        if d is None or d.empty:
-                            st.warning(f'{t}: 日足データ取得失敗')
-                            continue
-                        # plot daily candlestick with MA25
-                        ma25 = d['Close'].rolling(window=25).mean()
-                        fig = make_subplots(rows=2, cols=1, shared_xaxes=True, vertical_spacing=0.03, row_heights=[0.7, 0.3])
-                        fig.add_trace(go.Candlestick(x=d.index, open=d['Open'], high=d['High'], low=d['Low'], close=d['Close'], name='価格'), row=1, col=1)
-                        fig.add_trace(go.Scatter(x=d.index, y=ma25, name='MA25', line=dict(color='orange', width=1.5)), row=1, col=1)
-                        colors = ['red' if d['Close'].iloc[i] >= d['Open'].iloc[i] else 'blue' for i in range(len(d))]
-                        fig.add_trace(go.Bar(x=d.index, y=d['Volume'], marker_color=colors, showlegend=False), row=2, col=1)
-                        fig.update_layout(height=400, xaxis_rangeslider_visible=False, template='plotly_white')
-                        st.markdown(f"**{t}**  ¥{r['本日終値']:,}")
-                        st.plotly_chart(fig, use_container_width=True)
-                    except Exception:
-                        continue
-            else:
-                st.info('本日の条件に合致する銘柄は見つかりませんでした。')
-
-    # 抽出モード選択: 最新 / 単一日指定（as-of）
-    extract_mode = st.selectbox('抽出モード', ['最新版（最新キャッシュ）', '単一日指定'], index=0)
-    as_of_date = None
-    if extract_mode == '単一日指定':
-        today = datetime.date.today()
-        as_of_date = st.date_input('抽出対象日 (as-of)', value=today)
-
-    if st.button('抽出ファイルを作成（スキャン）'):
-        # 実行には時間がかかるため実行中インジケータを表示
-        import scan_all_jp_batch
-        with st.spinner('スキャン中... data/ のキャッシュを使って処理します'):
-            try:
-                # call scan_all_jp_batch with as-of date if provided
-                if extract_mode == '単一日指定' and as_of_date:
-                    scan_all_jp_batch.main(relaxed_engulfing=relax_engulfing, end_date=str(as_of_date), require_ma52=(not ignore_ma52))
-                else:
-                    scan_all_jp_batch.main(relaxed_engulfing=relax_engulfing, require_ma52=(not ignore_ma52))
-                st.success('スキャン完了: outputs/results を確認してください')
-                # Streamlit Cloud 上でスキャン結果をリポジトリにコミットしてプッシュする処理
-                try:
-                    import subprocess, datetime
-
-                    st.sidebar.info('スキャン完了 — Git にコミットを試行します')
-
-                    repo_root = base_dir.parent
-                    # git のユーザー情報を設定（必要に応じて環境側で上書きしてください）
-                    subprocess.run(['git', '-C', str(repo_root), 'config', 'user.email', 'streamlit@example.com'], check=False)
-                    subprocess.run(['git', '-C', str(repo_root), 'config', 'user.name', 'StreamlitAutoCommit'], check=False)
-
-                    # スキャン結果ディレクトリをステージ（CSV 等すべて）
-                    try:
-                        # add each file under results with -f to override .gitignore if needed
-                        added_any = False
-                        for p in sorted(results_dir.rglob('*')):
-                            if p.is_file():
-                                relp = os.path.relpath(str(p), start=str(repo_root))
-                                add_proc = subprocess.run(['git', '-C', str(repo_root), 'add', '-f', relp], capture_output=True, text=True)
-                                st.sidebar.info(f'git add {relp} -> returncode={add_proc.returncode} stderr:{add_proc.stderr}')
-                                if add_proc.returncode == 0:
-                                    added_any = True
-                        if not added_any:
-                            st.sidebar.info('outputs/results 内にステージ可能なファイルが見つかりませんでした（.gitignore を確認してください）')
-                    except Exception as e:
-                        st.sidebar.error(f'git add 実行中に例外: {e}')
-
-                    # commit 前に VERSION を自動バンプしてステージする
-                    try:
-                        bump_script = repo_root / 'scripts' / 'bump_version.py'
-                        if bump_script.exists():
-                            subprocess.run(['python3', str(bump_script)], check=False)
-                            subprocess.run(['git', '-C', str(repo_root), 'add', 'VERSION'], check=False)
-                    except Exception:
-                        pass
-
-                    # バージョン情報取得（あれば）
-                    version_str = ''
-                    try:
-                        vpath = repo_root / 'VERSION'
-                        if vpath.exists():
-                            version_str = vpath.read_text(encoding='utf-8').strip()
-                    except Exception:
-                        version_str = ''
-
-                    commit_msg = f"chore(scan): add scan results{' ver'+version_str if version_str else ''} {datetime.datetime.now(datetime.timezone.utc).isoformat()}"
-                    commit_proc = subprocess.run(['git', '-C', str(repo_root), 'commit', '-m', commit_msg], capture_output=True, text=True)
-                    st.sidebar.info(f'git commit returncode={commit_proc.returncode}\nstdout:{commit_proc.stdout}\nstderr:{commit_proc.stderr}')
-                    if commit_proc.returncode != 0:
-                        # 変更が無ければコミットは失敗（何も to commit）することがあるので情報を出す
-                        if 'nothing to commit' in (commit_proc.stdout + commit_proc.stderr).lower():
-                            st.sidebar.info('コミットする変更はありませんでした（既に最新の可能性）')
-                        else:
-                            st.sidebar.error('git commit が失敗しました。サイドバーのログを確認してください。')
-                    else:
-                        # プッシュ
-                        try:
-                            # Try to use token from environment or Streamlit secrets if available
-                            token = os.environ.get('GITHUB_TOKEN')
-                            try:
-                                # Streamlit secrets (if deployed with secrets)
-                                if not token:
-                                    token = st.secrets.get('GITHUB_TOKEN') if hasattr(st, 'secrets') and 'GITHUB_TOKEN' in st.secrets else None
-                            except Exception:
-                                pass
-
-                            if token:
-                                # get origin URL and construct authenticated push URL without logging token
-                                rem = subprocess.run(['git', '-C', str(repo_root), 'remote', 'get-url', 'origin'], capture_output=True, text=True)
-                                origin_url = rem.stdout.strip()
-                                if origin_url.startswith('https://'):
-                                    auth_url = origin_url.replace('https://', f'https://{token}@')
-                                else:
-                                    auth_url = origin_url
-                                push_proc = subprocess.run(['git', '-C', str(repo_root), 'push', auth_url, 'main'], capture_output=True, text=True, timeout=120)
-                            else:
-                                push_proc = subprocess.run(['git', '-C', str(repo_root), 'push', 'origin', 'main'], capture_output=True, text=True, timeout=120)
-
-                            st.sidebar.info(f'git push returncode={push_proc.returncode}\nstdout:{push_proc.stdout}\nstderr:{push_proc.stderr}')
-                            if push_proc.returncode == 0:
-                                st.sidebar.success('スキャン結果を origin/main にコミット＆プッシュしました')
-                            else:
-                                st.sidebar.error(f'git push に失敗しました: {push_proc.stderr}\n認証情報が設定されているか確認してください。')
-                        except Exception as e:
-                            st.sidebar.error(f'git push 実行中に例外: {e}')
-                except Exception as e:
-                        st.sidebar.error(f'自動コミット中に例外が発生しました: {e}')
-
-                
-            except Exception as e:
-                st.error(f'スキャン中にエラー: {e}')
-
-    # --- 新機能: 月足包み足を n か月以内に検出して抽出ファイルを作成 ---
-    st.markdown('### 月足抽出: 包み足が出ている銘柄を n か月以内に検出してファイル出力')
-    months_within = st.number_input('n (か月以内)', min_value=1, max_value=12, value=1, step=1)
-    scope_choice = st.selectbox('スキャン範囲', ['全銘柄（1000-9999）'])
-    # キャッシュのみスキャン: data/*.parquet が存在する場合はそれを使ってネット取得を最小化する
-    cache_only = st.checkbox('キャッシュのみでスキャン（data/*.parquet のみ）', value=True, help='有効にすると既にダウンロード済みのキャッシュのみをスキャンします。全件をネット取得したい場合はオフにしてください。')
-    # --- 新しいオプション: 包み足検出後の上昇率でフィルタ ---
-    rise_filter_enable = st.checkbox('包み足検出後の上昇率でフィルタする', value=False, help='有効にすると検出後の上昇率が指定範囲内の銘柄のみ抽出します')
-    min_allowed_rise_pct = st.number_input('最低上昇率（%、下限）', min_value=0.0, max_value=1000.0, value=0.0, step=0.1, help='検出後の最大上昇率がこの値以上の銘柄のみ抽出します')
-    max_allowed_rise_pct = st.number_input('最大上昇率（%、上限）', min_value=0.0, max_value=1000.0, value=50.0, step=0.1, help='検出後の最大上昇率がこの値以下の銘柄のみ抽出します')
-    lookahead_months = st.number_input('検出後の追跡月数（0=検出時のみ）', min_value=0, max_value=36, value=6, step=1, help='包み足検出後、何か月分を見て最大上昇率を算出するか')
-    if st.button('月足: 包み足が nか月以内に出ている抽出ファイルを作成'):
-        import scan_monthly_engulfing_jp as sm
-        import config, datetime
-        from pathlib import Path
-
-        # 選択範囲: 全銘柄のみに変更。キャッシュ優先で存在すればキャッシュを使う。
-        data_cache_dir = base_dir.parent / 'data'
-        cached_files = sorted([p.stem for p in data_cache_dir.glob('*.parquet')]) if data_cache_dir.exists() else []
-        try:
-            if cache_only and cached_files:
-                tickers = cached_files
-            else:
-                # Prefer the actual download target list (`targets`) if available
-                if 'targets' in locals() and targets:
-                    tickers = list(targets)
-                elif 'candidates' in locals() and candidates:
-                    tickers = list(candidates)
-                else:
-                    tickers = sm.get_japanese_tickers(1000, 9999)
-        except Exception:
-            tickers = sm.get_japanese_tickers(1000, 9999)
-        # 表示用にキャッシュ状況を出す
-        st.sidebar.info(f'cache_count={len(cached_files)}  scan_target_count={len(tickers)}')
-
-        bullish_results = []
-
-        with st.spinner(f'月足スキャン中... {len(tickers)} 銘柄、{months_within}か月以内を確認'):
-            for i, t in enumerate(tickers):
-                try:
-                    # 月足を十分量取得（3年）
-                    dfm = yf.Ticker(t).history(period='3y', interval='1mo')
-                    if dfm is None or dfm.empty or len(dfm) < 2:
-                        continue
-                    L = len(dfm)
-                    # k=1 -> 当月（最新）と前月, k=2 -> 1か月前とその前, ...
-                    for k in range(1, months_within + 1):
-                        if L - (k + 1) < 0:
-                            break
-                        prev = dfm.iloc[-(k+1)]
-                        curr = dfm.iloc[-k]
-                        prev_open = float(prev['Open'])
-                        prev_close = float(prev['Close'])
-                        prev_high = float(prev['High']) if 'High' in prev else max(prev_open, prev_close)
-                        prev_low = float(prev['Low']) if 'Low' in prev else min(prev_open, prev_close)
-                        curr_open = float(curr['Open'])
-                        curr_close = float(curr['Close'])
-
-                        is_prev_bearish = prev_close < prev_open
-                        is_curr_bullish = curr_close > curr_open
-                        bullish_engulfs = (curr_open <= prev_close) and (curr_close >= prev_open)
-                        wick_engulf = (curr_open <= prev_low) and (curr_close >= prev_high)
-
-                        is_prev_bullish = prev_close > prev_open
-                        is_curr_bearish = curr_close < curr_open
-                        bearish_engulfs = (curr_open >= prev_close) and (curr_close <= prev_open)
-
-                        if is_prev_bearish and is_curr_bullish and (bullish_engulfs or wick_engulf):
-                            # signal index (0-based) for the current month in dfm
-                            signal_idx = L - k
-                            # lookahead window: include the signal month and following months up to lookahead_months
-                            end_idx = min(signal_idx + int(lookahead_months) + 1, L)
-                            try:
-                                closes = dfm['Close'].iloc[signal_idx:end_idx].astype(float)
-                                max_close = float(closes.max()) if not closes.empty else float(curr_close)
-                            except Exception:
-                                max_close = float(curr_close)
-                            # 最大上昇率（%）: signal の終値に対する最大上昇率
-                            try:
-                                max_rise_pct = round((max_close - float(curr_close)) / float(curr_close) * 100.0, 2)
-                            except Exception:
-                                max_rise_pct = 0.0
-
-                            # フィルタ判定: 有効なら最低/最高の範囲外は除外する
-                            if rise_filter_enable and ((max_rise_pct > float(max_allowed_rise_pct)) or (max_rise_pct < float(min_allowed_rise_pct))):
-                                # 条件に合わないのでスキップ
-                                pass
-                            else:
-                                bullish_results.append({
-                                    'ticker': t,
-                                    'pattern': 'bullish_engulfing',
-                                    'months_ago': k,
-                                    'prev_open': prev_open,
-                                    'prev_close': prev_close,
-                                    'curr_open': curr_open,
-                                    'curr_close': curr_close,
-                                    'latest_price': curr_close,
-                                    'max_rise_pct': max_rise_pct,
-                                })
-                                break
-                except Exception:
-                    continue
-
-        # CSV 保存
-        os.makedirs(results_dir, exist_ok=True)
-        saved_paths = []
-        if bullish_results:
-            # config.jp_filename は相対パス文字列を返すため、実行時のカレントディレクトリに依存してしまう。
-            # ここでは明示的に `results_dir` の下にファイル名を作成して保存する。
-            # ファイル名に抽出時刻（UTC）を付与して上書きを防ぐ
-            base_fname = Path(config.jp_filename(f'月足_陽線包み_within{months_within}m')).name
-            stem = Path(base_fname).stem
-            ext = Path(base_fname).suffix or '.csv'
-            ts = datetime.datetime.now(datetime.timezone.utc).strftime('%Y%m%d_%H%M%S')
-            new_name = f"{stem}_{ts}{ext}"
-            out_path = results_dir / new_name
-            import csv
-            out_path.parent.mkdir(parents=True, exist_ok=True)
-            with open(out_path, 'w', newline='', encoding='utf-8') as f:
-                writer = csv.DictWriter(f, fieldnames=['ticker', 'pattern', 'months_ago', 'latest_price', 'prev_open', 'prev_close', 'curr_open', 'curr_close', 'max_rise_pct'])
-                writer.writeheader()
-                writer.writerows(bullish_results)
-            saved_paths.append(str(out_path))
-            st.success(f'陽線包み検出結果を保存: {out_path}')
-
-        # 自動コミット（既存ロジックに合わせる）
-        try:
-            import subprocess
-            repo_root = base_dir.parent
-            subprocess.run(['git', '-C', str(repo_root), 'config', 'user.email', 'streamlit@example.com'], check=False)
-            subprocess.run(['git', '-C', str(repo_root), 'config', 'user.name', 'StreamlitAutoCommit'], check=False)
-
-            added_any = False
-            for p in sorted(Path(results_dir).rglob('*')):
-                if p.is_file():
-                    relp = os.path.relpath(str(p), start=str(repo_root))
-                    add_proc = subprocess.run(['git', '-C', str(repo_root), 'add', '-f', relp], capture_output=True, text=True)
-                    st.sidebar.info(f'git add {relp} -> returncode={add_proc.returncode}')
-                    if add_proc.returncode == 0:
-                        added_any = True
-
-            if added_any:
-                try:
-                    bump_script = repo_root / 'scripts' / 'bump_version.py'
-                    if bump_script.exists():
-                        subprocess.run(['python3', str(bump_script)], check=False)
-                        subprocess.run(['git', '-C', str(repo_root), 'add', 'VERSION'], check=False)
-                except Exception:
-                    pass
-
-                version_str = ''
-                try:
-                    vpath = repo_root / 'VERSION'
-                    if vpath.exists():
-                        version_str = vpath.read_text(encoding='utf-8').strip()
-                except Exception:
-                    version_str = ''
-
-                commit_msg = f"chore(monthly_scan): add monthly engulfing within {months_within}m{' ver'+version_str if version_str else ''} {datetime.datetime.now(datetime.timezone.utc).isoformat()}"
-                commit_proc = subprocess.run(['git', '-C', str(repo_root), 'commit', '-m', commit_msg], capture_output=True, text=True)
-                st.sidebar.info(f'git commit returncode={commit_proc.returncode}\nstdout:{commit_proc.stdout}\nstderr:{commit_proc.stderr}')
-                if commit_proc.returncode == 0:
-                    try:
-                        token = os.environ.get('GITHUB_TOKEN')
-                        try:
-                            if not token:
-                                token = st.secrets.get('GITHUB_TOKEN') if hasattr(st, 'secrets') and 'GITHUB_TOKEN' in st.secrets else None
-                        except Exception:
-                            pass
-
-                        if token:
-                            rem = subprocess.run(['git', '-C', str(repo_root), 'remote', 'get-url', 'origin'], capture_output=True, text=True)
-                            origin_url = rem.stdout.strip()
-                            if origin_url.startswith('https://'):
-                                auth_url = origin_url.replace('https://', f'https://{token}@')
-                            else:
-                                auth_url = origin_url
-                            push_proc = subprocess.run(['git', '-C', str(repo_root), 'push', auth_url, 'main'], capture_output=True, text=True, timeout=120)
-                        else:
-                            push_proc = subprocess.run(['git', '-C', str(repo_root), 'push', 'origin', 'main'], capture_output=True, text=True, timeout=120)
-
-                        st.sidebar.info(f'git push returncode={push_proc.returncode}\nstdout:{push_proc.stdout}\nstderr:{push_proc.stderr}')
-                        if push_proc.returncode == 0:
-                            st.sidebar.success('月足抽出結果を origin/main にコミット＆プッシュしました')
-                        else:
-                            st.sidebar.error('git push に失敗しました。認証情報が設定されているか確認してください。')
-                    except Exception as e:
-                        st.sidebar.error(f'git push 実行中に例外: {e}')
-                else:
-                    st.sidebar.info('コミットする変更はないか、コミットに失敗しました（サイドバーログを確認）')
-            else:
-                st.sidebar.info('outputs/results 内にステージ可能なファイルが見つかりませんでした（.gitignore を確認してください）')
-        except Exception as e:
-            st.sidebar.error(f'自動コミット中に例外が発生しました: {e}')
-
-    # ファイル削除 UI
-    with st.expander('ファイル管理: outputs/results の削除', expanded=False):
-        try:
-            repo_root = base_dir.parent
-            files = sorted(results_dir.glob('*.csv'), key=lambda p: p.stat().st_mtime, reverse=True) if results_dir.exists() else []
-            file_names = [p.name for p in files]
-            to_delete = st.multiselect('削除するファイルを選択', file_names)
-            if to_delete:
-                if st.button('選択ファイルを削除'):
-                    import subprocess, datetime
-                    st.sidebar.info('選択ファイルを削除します...')
-                    removed = []
-                    for name in to_delete:
-                        p = results_dir / name
-                        relp = os.path.relpath(str(p), start=str(repo_root))
-                        try:
-                            # Try git rm -f to stage deletion for tracked files
-                            rm_proc = subprocess.run(['git', '-C', str(repo_root), 'rm', '-f', relp], capture_output=True, text=True)
-                            st.sidebar.info(f'git rm {name} -> returncode={rm_proc.returncode} stderr:{rm_proc.stderr}')
-                            if rm_proc.returncode != 0:
-                                # fallback: remove file and stage
-                                if p.exists():
-                                    p.unlink()
-                                add_proc = subprocess.run(['git', '-C', str(repo_root), 'add', '-A'], capture_output=True, text=True)
-                                st.sidebar.info(f'git add -A -> returncode={add_proc.returncode} stderr:{add_proc.stderr}')
-                            removed.append(name)
-                        except Exception as e:
-                            st.sidebar.error(f'ファイル削除中に例外: {e}')
-
-                    if removed:
-                        # bump VERSION and stage it
-                        try:
-                            bump_script = repo_root / 'scripts' / 'bump_version.py'
-                            if bump_script.exists():
-                                subprocess.run(['python3', str(bump_script)], check=False)
-                                subprocess.run(['git', '-C', str(repo_root), 'add', 'VERSION'], check=False)
-                        except Exception:
-                            pass
-
-                        # Commit
-                        version_str = ''
-                        try:
-                            vpath = repo_root / 'VERSION'
-                            if vpath.exists():
-                                version_str = vpath.read_text(encoding='utf-8').strip()
-                        except Exception:
-                            version_str = ''
-
-                        commit_msg = f"chore(clean): remove results {','.join(removed)}{' ver'+version_str if version_str else ''} {datetime.datetime.now(datetime.timezone.utc).isoformat()}"
-                        commit_proc = subprocess.run(['git', '-C', str(repo_root), 'commit', '-m', commit_msg], capture_output=True, text=True)
-                        st.sidebar.info(f'git commit returncode={commit_proc.returncode}\nstdout:{commit_proc.stdout}\nstderr:{commit_proc.stderr}')
-                        # Push (use token if available)
-                        try:
-                            token = os.environ.get('GITHUB_TOKEN')
-                            try:
-                                if not token:
-                                    token = st.secrets.get('GITHUB_TOKEN') if hasattr(st, 'secrets') and 'GITHUB_TOKEN' in st.secrets else None
-                            except Exception:
-                                pass
-
-                            if token:
-                                rem = subprocess.run(['git', '-C', str(repo_root), 'remote', 'get-url', 'origin'], capture_output=True, text=True)
-                                origin_url = rem.stdout.strip()
-                                if origin_url.startswith('https://'):
-                                    auth_url = origin_url.replace('https://', f'https://{token}@')
-                                else:
-                                    auth_url = origin_url
-                                push_proc = subprocess.run(['git', '-C', str(repo_root), 'push', auth_url, 'main'], capture_output=True, text=True, timeout=120)
-                            else:
-                                push_proc = subprocess.run(['git', '-C', str(repo_root), 'push', 'origin', 'main'], capture_output=True, text=True, timeout=120)
-
-                            st.sidebar.info(f'git push returncode={push_proc.returncode}\nstdout:{push_proc.stdout}\nstderr:{push_proc.stderr}')
-                            if push_proc.returncode == 0:
-                                st.sidebar.success('選択ファイルの削除をコミット＆プッシュしました')
-                            else:
-                                st.sidebar.error('git push に失敗しました。認証情報を確認してください。')
-                        except Exception as e:
-                            st.sidebar.error(f'git push 実行中に例外: {e}')
-        except Exception:
-            st.error('ファイル一覧の取得に失敗しました')
-
-    st.write('---')
-    st.write('予想ページ起動（外部Streamlitを別ポートで起動）')
-    app_options = {
-        '既存: app_predict.py': 'app_predict.py',
-        '新規: 血統予想 app (streamlit_horse_app.py)': 'streamlit_horse_app.py'
-    }
-    chosen_label = st.selectbox('起動するアプリを選択', list(app_options.keys()))
-    chosen_app = app_options[chosen_label]
-    chosen_port = st.number_input('起動ポート', min_value=1024, max_value=65535, value=8502)
-    if st.button('選択アプリを起動'):
-        import subprocess, os
-        out_log = str(base_dir / 'outputs' / f'streamlit_{chosen_port}.log')
-        os.makedirs(str(base_dir / 'outputs'), exist_ok=True)
-        streamlit_bin = os.path.abspath('/workspaces/WeeklySignalScanner-main/.venv/bin/streamlit')
-        app_path = os.path.abspath(base_dir / chosen_app)
-        cmd = f"nohup env STREAMLIT_BROWSER_GUESSING=false STREAMLIT_DISABLE_TELEMETRY=1 {streamlit_bin} run {app_path} --server.port {chosen_port} --server.headless true > {out_log} 2>&1 &"
-        try:
-            subprocess.Popen(cmd, shell=True, cwd=os.getcwd())
-            st.info(f'起動コマンドを送信しました: {chosen_app} -> http://localhost:{chosen_port}')
-            st.write('Local URL:', f'http://localhost:{chosen_port}')
-            st.write(f'ログ: {out_log}')
-        except Exception as e:
-            st.error(f'予想ページ起動に失敗しました: {e}')
-
-# データ読み込み（先頭に retrieved_at メタ行がある場合はスキップ）
-def read_maybe_timestampped_csv(path):
-    try:
-        with open(path, 'r', encoding='utf-8') as fh:
-            first = fh.readline()
-        if first.startswith('retrieved_at,'):
-            return pd.read_csv(path, skiprows=1)
-        return pd.read_csv(path)
-    except Exception:
-        return pd.read_csv(path)
-
-df = read_maybe_timestampped_csv(selected_file)
-
-# 正規化: 読み込んだ CSV に `ticker` 列が無い場合、既知の代替列名を探して `ticker` を作成する
-try:
-    if 'ticker' not in df.columns:
-        candidate = None
-        for col in df.columns:
-            name = str(col).strip()
-            low = name.lower()
-            # 日本語/英語の候補を含めて判定
-            if name == 'コード' or 'コード' in name or '銘柄' in name:
-                candidate = col
-                break
-            if low in ('ticker', 'symbol', 'code') or 'ticker' in low or 'symbol' in low or 'code' in low:
-                candidate = col
-                break
-        if candidate is not None:
-            try:
-                df['ticker'] = df[candidate].astype(str)
-            except Exception:
-                df['ticker'] = df[candidate].apply(lambda x: str(x))
-except Exception:
-    pass
-
-# 表示: 結果ファイルと data ディレクトリの最終更新時刻をサイドバーに表示
-try:
-    sel_mtime = datetime.datetime.fromtimestamp(Path(str(selected_file)).stat().st_mtime)
-    sel_mtime_str = sel_mtime.strftime("%Y-%m-%d %H:%M:%S")
-except Exception:
-    sel_mtime_str = "-"
-
-data_dir_path = base_dir.parent / 'data'
-data_latest_str = "-"
-if data_dir_path.exists():
-    max_m = None
-    for p in data_dir_path.rglob('*'):
-        if p.is_file():
-            try:
-                m = p.stat().st_mtime
-            except Exception:
-                continue
-            if max_m is None or m > max_m:
-                max_m = m
-    if max_m:
-        data_latest_str = datetime.datetime.fromtimestamp(max_m).strftime("%Y-%m-%d %H:%M:%S")
-
-st.sidebar.markdown(f"**データ情報**\n- 結果ファイル更新: {sel_mtime_str}\n- data 最終更新: {data_latest_str}")
-
-# 追加: outputs/results の中から最新で価格列（'current_price' または 'price'）を持つCSVを自動検出して読み込み
-price_map = {}
-price_file = None
-candidates = sorted([str(p) for p in (results_dir.glob('*.csv'))], key=os.path.getmtime, reverse=True) if results_dir.exists() else []
-for p in candidates:
-    try:
-        # read first line to detect timestamp metadata
-        with open(p, 'r', encoding='utf-8') as fh:
-            first = fh.readline()
-        if first.startswith('retrieved_at,'):
-            pf = pd.read_csv(p, skiprows=1)
-        else:
-            pf = pd.read_csv(p)
-
-        if 'current_price' in pf.columns or 'price' in pf.columns:
-            price_file = p
-            # build price_map and stop at the first (newest) match
-            if 'current_price' in pf.columns and 'ticker' in pf.columns:
-                price_map = pd.Series(pf['current_price'].values, index=pf['ticker'].astype(str)).to_dict()
-            elif 'price' in pf.columns and 'ticker' in pf.columns:
-                price_map = pd.Series(pf['price'].values, index=pf['ticker'].astype(str)).to_dict()
-            break
-    except Exception:
-        continue
-
-# 価格でソート（結果ファイルに price 列または別途作成した price_map がある場合）
-# 月足出力では 'latest_price' または 'latest_close' を出力するためそれらを優先して昇順ソートする
-if 'price' in df.columns:
-    df = df.sort_values('price').reset_index(drop=True)
-elif 'latest_price' in df.columns:
-    df = df.sort_values('latest_price').reset_index(drop=True)
-elif 'latest_close' in df.columns:
-    df = df.sort_values('latest_close').reset_index(drop=True)
-elif price_map and 'ticker' in df.columns:
-    # マップに基づいて price 列を作りソート
-    df = df.copy()
-    df['price'] = df['ticker'].astype(str).map(price_map)
-    df = df.sort_values('price').reset_index(drop=True)
-elif price_map:
-    # price_map は見つかったが DataFrame に 'ticker' 列がない場合はマッピングをスキップ
-    pass
-
-st.sidebar.metric("検出銘柄数", len(df))
-
-# 銘柄選択
-if 'ticker' not in df.columns:
-    st.error("ticker列が見つかりません")
-    st.stop()
-
-ticker_list = df['ticker'].tolist()
-
-# 選択ファイルが月足ファイルかどうかを判定（ファイル名またはカラムで判定）
-is_month_file = False
-try:
-    sel_name = Path(str(selected_file)).name
-    # ファイル名に '月足' が含まれるか、CSV に 'cross_month' カラムがあれば月足系出力とみなす
-    if '月足' in sel_name or ('cross_month' in df.columns if isinstance(df, pd.DataFrame) else False):
-        is_month_file = True
-except Exception:
-    is_month_file = False
-
-# 表示モード選択
-display_mode = st.sidebar.radio("表示モード", ["単一銘柄", "10銘柄一覧"])
-
-if display_mode == "単一銘柄":
-    selected_ticker = st.sidebar.selectbox("銘柄を選択", ticker_list)
-    selected_tickers = [selected_ticker]
-else:
-    # 10銘柄ずつページング
-    total_pages = math.ceil(len(ticker_list) / 10)
-    page = st.sidebar.number_input("ページ", min_value=1, max_value=total_pages, value=1, step=1)
-    start_idx = (page - 1) * 10
-    end_idx = min(start_idx + 10, len(ticker_list))
-    selected_tickers = ticker_list[start_idx:end_idx]
-    st.sidebar.info(f"ページ {page}/{total_pages} (銘柄 {start_idx+1}〜{end_idx})")
-    
-    # 2列レイアウトで表示
-    cols_per_row = 2
-
-# データ取得
-@st.cache_data(ttl=3600)
-def fetch_data(ticker):
-    try:
-        data = yf.Ticker(ticker).history(period='2y', interval='1wk')
-        if data.empty:
-            return None
-        return data
-    except Exception as e:
-        return None
-
-
-# 月足データ取得（キャッシュ付き）
-@st.cache_data(ttl=3600)
-def fetch_month_data(ticker):
-    try:
-        data = yf.Ticker(ticker).history(period='5y', interval='1mo')
-        if data.empty:
-            return None
-        return data
-    except Exception:
-        return None
-
-# 選択された銘柄に対してチャート表示
-if display_mode == "10銘柄一覧":
-    # 2列グリッドレイアウト
-    for i in range(0, len(selected_tickers), cols_per_row):
-        cols = st.columns(cols_per_row)
-        for j, col in enumerate(cols):
-            idx = i + j
-            if idx >= len(selected_tickers):
-                break
-            ticker = selected_tickers[idx]
-            
-            with col:
-                    # グリッド表示: 選択ファイルが月足ファイルなら月足を表示（小さめ）、なければ週足を表示
-                    if is_month_file:
-                        month_data = fetch_month_data(ticker)
-                        if month_data is None:
-                            st.warning(f"{ticker}: 月足データ取得失敗")
-                            continue
-                        latest_close = price_map.get(str(ticker)) if price_map else None
-                        if latest_close is None:
-                            latest_close = month_data['Close'].iloc[-1]
-                        # try to prefer metrics from loaded results CSV
-                        change_pct_display = None
-                        volume_ratio_display = None
-                        try:
-                            if 'ticker' in df.columns:
-                                matches = df[df['ticker'].astype(str) == str(ticker)]
-                                if len(matches) > 0:
-                                    row = matches.iloc[-1]
-                                    for k in ('前日比(%)','前日比','price_change_pct','change_pct'):
-                                        if k in row.index:
-                                            try:
-                                                change_pct_display = float(row[k])
-                                                break
-                                            except Exception:
-                                                pass
-                                    for k in ('出来高倍率','volume_ratio','出来高比','vol_ratio'):
-                                        if k in row.index:
-                                            try:
-                                                volume_ratio_display = float(row[k])
-                                                break
-                                            except Exception:
-                                                pass
-                        except Exception:
-                            pass
-
-                        # fallback: compute from month_data
-                        if change_pct_display is None:
-                            try:
-                                prev_close = float(month_data['Close'].iloc[-2])
-                                change_pct_display = (latest_close - prev_close) / prev_close * 100.0 if prev_close != 0 else 0.0
-                            except Exception:
-                                change_pct_display = 0.0
-                        if volume_ratio_display is None:
-                            try:
-                                vols = month_data['Volume'].astype(float)
-                                if len(vols) >= 2:
-                                    avg_vol = float(vols.iloc[:-1].tail(20).mean()) if len(vols) > 1 else 0.0
-                                else:
-                                    avg_vol = 0.0
-                                volume_ratio_display = (float(month_data['Volume'].iloc[-1]) / avg_vol) if avg_vol > 0 else 0.0
-                            except Exception:
-                                volume_ratio_display = 0.0
-
-                        st.markdown(f"**{ticker}**  ¥{latest_close:,.0f}  —  前日比: {change_pct_display:+.2f}% · 出来高倍率: {volume_ratio_display:.2f}x")
-                        mfig = make_subplots(rows=2, cols=1, shared_xaxes=True, vertical_spacing=0.05, row_heights=[0.75, 0.25])
-                        mfig.add_trace(go.Candlestick(x=month_data.index, open=month_data['Open'], high=month_data['High'], low=month_data['Low'], close=month_data['Close'], name='価格', increasing_line_color='red', decreasing_line_color='blue', showlegend=False), row=1, col=1)
-                        # 月足の移動平均表示: ファイル名に MA9/MA24 を含む出力なら MA9/MA24 を、そうでなければ MA12 を表示
-                        try:
-                            if 'MA9' in sel_name or 'MA9_MA24' in sel_name or 'GoldenCross' in sel_name:
-                                ma9_mon = month_data['Close'].rolling(window=9).mean()
-                                ma24_mon = month_data['Close'].rolling(window=24).mean()
-                                mfig.add_trace(go.Scatter(x=month_data.index, y=ma9_mon, name='MA9(months)', line=dict(color='green', width=1.5), showlegend=True), row=1, col=1)
-                                mfig.add_trace(go.Scatter(x=month_data.index, y=ma24_mon, name='MA24(months)', line=dict(color='purple', width=1.5), showlegend=True), row=1, col=1)
-                            else:
-                                mfig.add_trace(go.Scatter(x=month_data.index, y=month_data['Close'].rolling(12).mean(), name='MA12', line=dict(color='orange', width=1), showlegend=False), row=1, col=1)
-                        except Exception:
-                            mfig.add_trace(go.Scatter(x=month_data.index, y=month_data['Close'].rolling(12).mean(), name='MA12', line=dict(color='orange', width=1), showlegend=False), row=1, col=1)
-                        mcolors = ['red' if month_data['Close'].iloc[k] >= month_data['Open'].iloc[k] else 'blue' for k in range(len(month_data))]
-                        mfig.add_trace(go.Bar(x=month_data.index, y=month_data['Volume'], marker_color=mcolors, showlegend=False), row=2, col=1)
-                        mfig.update_layout(height=300, margin=dict(l=30, r=10, t=20, b=20), xaxis_rangeslider_visible=False, hovermode='x unified', template='plotly_white', font=dict(size=8))
-                        mfig.update_yaxes(title_text="", row=1, col=1)
-                        mfig.update_yaxes(title_text="", row=2, col=1)
-                        mfig.update_xaxes(showticklabels=False, row=1, col=1)
-                        mfig.update_xaxes(showticklabels=False, row=2, col=1)
-                        st.plotly_chart(mfig, width='stretch', key=f"chart_grid_month_{ticker}")
-                    else:
-                        data = fetch_data(ticker)
-                        if data is None:
-                            st.warning(f"{ticker}: データ取得失敗")
-                            continue
-                        # 週足表示
-                        latest_close = price_map.get(str(ticker)) if price_map else None
-                        if latest_close is None:
-                            latest_close = data['Close'].iloc[-1]
-                        # try to prefer metrics from loaded results CSV
-                        change_pct_display = None
-                        volume_ratio_display = None
-                        try:
-                            if 'ticker' in df.columns:
-                                matches = df[df['ticker'].astype(str) == str(ticker)]
-                                if len(matches) > 0:
-                                    row = matches.iloc[-1]
-                                    for k in ('前日比(%)','前日比','price_change_pct','change_pct'):
-                                        if k in row.index:
-                                            try:
-                                                change_pct_display = float(row[k])
-                                                break
-                                            except Exception:
-                                                pass
-                                    for k in ('出来高倍率','volume_ratio','出来高比','vol_ratio'):
-                                        if k in row.index:
-                                            try:
-                                                volume_ratio_display = float(row[k])
-                                                break
-                                            except Exception:
-                                                pass
-                        except Exception:
-                            pass
-
-                        # fallback: compute from weekly data
-                        if change_pct_display is None:
-                            try:
-                                prev_close = float(data['Close'].iloc[-2])
-                                change_pct_display = (latest_close - prev_close) / prev_close * 100.0 if prev_close != 0 else 0.0
-                            except Exception:
-                                change_pct_display = 0.0
-                        if volume_ratio_display is None:
-                            try:
-                                vols = data['Volume'].astype(float)
-                                if len(vols) >= 2:
-                                    avg_vol = float(vols.iloc[:-1].tail(20).mean()) if len(vols) > 1 else 0.0
-                                else:
-                                    avg_vol = 0.0
-                                volume_ratio_display = (float(data['Volume'].iloc[-1]) / avg_vol) if avg_vol > 0 else 0.0
-                            except Exception:
-                                volume_ratio_display = 0.0
-
-                        st.markdown(f"**{ticker}**  ¥{latest_close:,.0f}  —  前日比: {change_pct_display:+.2f}% · 出来高倍率: {volume_ratio_display:.2f}x")
-                        fig = make_subplots(rows=2, cols=1, shared_xaxes=True, vertical_spacing=0.05, row_heights=[0.75, 0.25])
-                        fig.add_trace(go.Candlestick(x=data.index, open=data['Open'], high=data['High'], low=data['Low'], close=data['Close'], name='価格', increasing_line_color='red', decreasing_line_color='blue', showlegend=False), row=1, col=1)
-                        fig.add_trace(go.Scatter(x=data.index, y=data['Close'].rolling(52).mean(), name='MA52', line=dict(color='orange', width=1), showlegend=False), row=1, col=1)
-                        colors = ['red' if data['Close'].iloc[k] >= data['Open'].iloc[k] else 'blue' for k in range(len(data))]
-                        fig.add_trace(go.Bar(x=data.index, y=data['Volume'], marker_color=colors, showlegend=False), row=2, col=1)
-                        fig.update_layout(height=300, margin=dict(l=30, r=10, t=20, b=20), xaxis_rangeslider_visible=False, hovermode='x unified', template='plotly_white', font=dict(size=8))
-                        fig.update_yaxes(title_text="", row=1, col=1)
-                        fig.update_yaxes(title_text="", row=2, col=1)
-                        fig.update_xaxes(showticklabels=False, row=1, col=1)
-                        fig.update_xaxes(showticklabels=False, row=2, col=1)
-                        st.plotly_chart(fig, width='stretch', key=f"chart_grid_{ticker}")
-
-else:
-    # 単一銘柄モード
-    for ticker in selected_tickers:
-        data = fetch_data(ticker)
-        
-        if data is None:
-            st.warning(f"{ticker}: データを取得できませんでした")
-            continue
-        
-        # 区切り線
-        st.markdown("---")
-        
-        # メトリクス表示
-        col1, col2, col3, col4, col5 = st.columns(5)
-        
-        # 単一銘柄モードでも price_map の値を優先する
-        latest_close = price_map.get(str(ticker)) if price_map else None
-        if latest_close is None:
-            latest_close = data['Close'].iloc[-1]
-        latest_volume = data['Volume'].iloc[-1]
-        ma52 = data['Close'].rolling(52).mean().iloc[-1]
-
-        # 優先: 選択中の結果ファイルに検出時のメトリクスが含まれている場合はそれを表示
-        row_from_df = None
-        try:
-            # df は読み込んだ結果ファイルの DataFrame
-            if 'ticker' in df.columns:
-                matches = df[df['ticker'].astype(str) == str(ticker)]
-                if len(matches) > 0:
-                    # 直近の行を優先
-                    row_from_df = matches.iloc[-1]
-        except Exception:
-            row_from_df = None
-
-        # 表示用の change_pct / volume_ratio を決定（ファイル優先、無ければライブ計算）
-        change_pct = None
-        volume_ratio = None
-        if row_from_df is not None:
-            # 多言語・多列名に対応して取得を試みる
-            for k in ('前日比(%)', '前日比', 'price_change_pct', 'change_pct'):
-                if k in row_from_df.index:
-                    try:
-                        change_pct = float(row_from_df[k])
-                        break
-                    except Exception:
-                        pass
-            for k in ('出来高倍率', 'volume_ratio', '出来高比', 'vol_ratio'):
-                if k in row_from_df.index:
-                    try:
-                        volume_ratio = float(row_from_df[k])
-                        break
-                    except Exception:
-                        pass
-            # 本日終値があれば表示用 price を上書き
-            for k in ('本日終値', 'latest_price', 'latest_close', 'price'):
-                if k in row_from_df.index:
-                    try:
-                        latest_close = float(row_from_df[k])
-                        break
-                    except Exception:
-                        pass
-
-        # fallback: ライブデータから算出
-        if change_pct is None:
-            change_pct = ((latest_close - data['Close'].iloc[-2]) / data['Close'].iloc[-2] * 100) if len(data) > 1 else 0
-        if volume_ratio is None:
-            # 平均20日ボリュームを算出（直近を除く）
-            vols = data['Volume'].astype(float)
-            if len(vols) >= 21:
-                avg_vol_20 = float(vols.iloc[-21:-1].mean())
-            else:
-                avg_vol_20 = float(vols.iloc[:-1].mean()) if len(vols) > 1 else 0.0
-            volume_ratio = (float(data['Volume'].iloc[-1]) / avg_vol_20) if avg_vol_20 > 0 else 0.0
-        
-        with col1:
-            st.metric("銘柄", ticker)
-        with col2:
-            st.metric("株価", f"¥{latest_close:,.2f}", f"{change_pct:+.2f}%")
-        with col3:
-            st.metric("出来高", f"{latest_volume:,.0f}")
-        with col4:
-            st.metric("52週MA", f"¥{ma52:,.2f}")
-        with col5:
-            ma_diff_pct = ((latest_close - ma52) / ma52 * 100)
-            st.metric("MA52比", f"{ma_diff_pct:+.2f}%")
-        # キャッシュされたデータの最終日または更新時刻を表示
-        try:
-            cache_path = base_dir.parent / 'data' / f"{ticker}.parquet"
-            cache_info = None
-            if cache_path.exists():
-                try:
-                    cdf = pd.read_parquet(cache_path)
-                    # インデックスに日付がある場合は最終日を表示
-                    if hasattr(cdf.index, 'max'):
-                        idxmax = cdf.index.max()
-                        cache_info = f"キャッシュ最終日: {pd.to_datetime(idxmax).date()}"
-                except Exception:
-                    cache_info = f"キャッシュ最終更新: {datetime.datetime.fromtimestamp(cache_path.stat().st_mtime).strftime('%Y-%m-%d %H:%M:%S')}"
-            if cache_info:
-                st.caption(cache_info)
-        except Exception:
-            pass
-        
-        # チャート作成
-        # 月足ファイルから来ているか判定（ファイル名または CSV に 'cross_month' カラムがあるかで判定）
-        is_month_file = False
-        try:
-            sel_name = Path(str(selected_file)).name
-            if '月足' in sel_name or ('cross_month' in df.columns if isinstance(df, pd.DataFrame) else False):
-                is_month_file = True
-        except Exception:
-            is_month_file = False
-
-        title_main = f'{ticker} 月足チャート' if is_month_file else f'{ticker} 週足チャート'
-        fig = make_subplots(
-            rows=2, cols=1,
-            shared_xaxes=True,
-            vertical_spacing=0.03,
-            row_heights=[0.7, 0.3],
-            subplot_titles=(title_main, '出来高')
-        )
-        
-        # ローソク足
-        fig.add_trace(
-            go.Candlestick(
-                x=data.index,
-                open=data['Open'],
-                high=data['High'],
-                low=data['Low'],
-                close=data['Close'],
-                name='価格',
-                increasing_line_color='red',
-                decreasing_line_color='blue'
-            ),
-            row=1, col=1
-        )
-        
-        # MA52
-        fig.add_trace(
-            go.Scatter(
-                x=data.index,
-                y=data['Close'].rolling(52).mean(),
-                name='MA52',
-                line=dict(color='orange', width=2)
-            ),
-            row=1, col=1
-        )
-        
-        # 出来高
-        colors = ['red' if data['Close'].iloc[i] >= data['Open'].iloc[i] else 'blue' 
-                  for i in range(len(data))]
-        
-        fig.add_trace(
-            go.Bar(
-                x=data.index,
-                y=data['Volume'],
-                name='出来高',
-                marker_color=colors,
-                showlegend=False
-            ),
-            row=2, col=1
-        )
-        
-        # レイアウト調整
-        fig.update_layout(
-            height=600,
-            xaxis_rangeslider_visible=False,
-            hovermode='x unified',
-            template='plotly_white',
-            showlegend=True
-        )
-        
-        fig.update_yaxes(title_text="株価 (¥)", row=1, col=1)
-        fig.update_yaxes(title_text="出来高", row=2, col=1)
-        fig.update_xaxes(title_text="日付", row=2, col=1)
-        
-        if is_month_file:
-            # 月足表示も取得して横並び表示
-            month_data = fetch_month_data(ticker)
-            if month_data is None:
-                # 月足データが無ければ通常の週足チャートを表示
-                st.plotly_chart(fig, width='stretch', key=f"chart_{ticker}")
-            else:
-                # 月足ファイル表示時は月足をメインに表示、週足は補助として右側に表示
-                c1, c2 = st.columns([1, 1])
-                # 月足チャート作成（メイン）
-                mfig = make_subplots(rows=2, cols=1, shared_xaxes=True, vertical_spacing=0.03, row_heights=[0.7, 0.3], subplot_titles=(f'{ticker} 月足チャート', '出来高'))
-                mfig.add_trace(go.Candlestick(x=month_data.index, open=month_data['Open'], high=month_data['High'], low=month_data['Low'], close=month_data['Close'], name='価格', increasing_line_color='red', decreasing_line_color='blue'), row=1, col=1)
-                # 単一表示側の月足も同様に MA9/MA24 を優先表示
-                try:
-                    if 'MA9' in sel_name or 'MA9_MA24' in sel_name or 'GoldenCross' in sel_name:
-                        ma9_mon = month_data['Close'].rolling(window=9).mean()
-                        ma24_mon = month_data['Close'].rolling(window=24).mean()
-                        mfig.add_trace(go.Scatter(x=month_data.index, y=ma9_mon, name='MA9(months)', line=dict(color='green', width=2)), row=1, col=1)
-                        mfig.add_trace(go.Scatter(x=month_data.index, y=ma24_mon, name='MA24(months)', line=dict(color='purple', width=2)), row=1, col=1)
-                    else:
-                        mfig.add_trace(go.Scatter(x=month_data.index, y=month_data['Close'].rolling(12).mean(), name='MA12(months)', line=dict(color='orange', width=2)), row=1, col=1)
-                except Exception:
-                    mfig.add_trace(go.Scatter(x=month_data.index, y=month_data['Close'].rolling(12).mean(), name='MA12(months)', line=dict(color='orange', width=2)), row=1, col=1)
-                mcolors = ['red' if month_data['Close'].iloc[i] >= month_data['Open'].iloc[i] else 'blue' for i in range(len(month_data))]
-                mfig.add_trace(go.Bar(x=month_data.index, y=month_data['Volume'], name='出来高', marker_color=mcolors, showlegend=False), row=2, col=1)
-                mfig.update_layout(height=600, xaxis_rangeslider_visible=False, hovermode='x unified', template='plotly_white', showlegend=True)
-                mfig.update_yaxes(title_text="株価 (¥)", row=1, col=1)
-                mfig.update_yaxes(title_text="出来高", row=2, col=1)
-                mfig.update_xaxes(title_text="日付", row=2, col=1)
-                with c1:
-                    st.plotly_chart(mfig, width='stretch', key=f"chart_month_{ticker}")
-                # 右側に週足（補助）を表示
-                with c2:
-                    st.plotly_chart(fig, width='stretch', key=f"chart_week_{ticker}")
+    admin_choice = st.selectbox('メニュー', ['（選択してください）'] + list(ADMIN_PAGES.keys()), key='admin_page')
+    if admin_choice in ADMIN_PAGES:
+        page = load_page(ADMIN_PAGES[admin_choice])
+        if ADMIN_PAGES[admin_choice] == 'file_management':
+            page.render(all_files)
         else:
-            st.plotly_chart(fig, width='stretch', key=f"chart_{ticker}")
-        
- # test
\ No newline at end of file
+            page.render()
+
+# ジョブ実行中は数秒ごとに進捗を再描画する（st.fragment が無い古い Streamlit では手動更新）
+with st.sidebar.expander('バックグラウンドジョブ', expanded=True):
+    from app_pages.jobs_panel import render_jobs_panel
+    if hasattr(st, 'fragment'):
+        st.fragment(run_every=3)(render_jobs_panel)()
+    else:
+        st.button('進捗を更新')
+        render_jobs_panel()
+
+load_page('viewer').render(selected_file, all_files, results_state)
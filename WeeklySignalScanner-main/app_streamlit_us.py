@@ -3,15 +3,16 @@ import pandas as pd
 import plotly.graph_objects as go
 from plotly.subplots import make_subplots
 import yfinance as yf
-from pathlib import Path
 import math
 
+import results_catalog
+
 st.set_page_config(page_title="米国株週足スクリーナー", layout="wide")
 
 st.title("📈 米国株週足スクリーナー - MA52 & 陽線包み足")
 
-# 結果ファイルを選択
-result_files = sorted(Path('outputs/results').glob('us_ma52_engulfing_*.csv'), reverse=True)
+# 結果ファイルを選択（results_catalog に登録された米国株スキャン結果を新しい順に）
+result_files = results_catalog.list_results(scan_type='us_weekly_ma52_engulfing')
 
 if not result_files:
     st.error("米国株の結果ファイルが見つかりません")
@@ -21,11 +22,11 @@ if not result_files:
 selected_file = st.sidebar.selectbox(
     "結果ファイルを選択",
     result_files,
-    format_func=lambda x: x.name
+    format_func=lambda e: e['name']
 )
 
 # データ読み込み
-df = pd.read_csv(selected_file)
+df = results_catalog.load(selected_file)
 
 st.sidebar.metric("検出銘柄数", len(df))
 
@@ -0,0 +1,280 @@
+"""
+複数のスキャンをデータの 1 回の読み込みでまとめて実行する
+
+週足 MA52 + 陽線包み（scan_all_jp_batch）、MA52 以上（scan_above_ma52_with_cache）、月足 陽線包み、
+月足 MA9/MA24 GC、短期_初動 は、それぞれ data/ の全 parquet を読み直して週足・月足・移動平均を
+作り直していた。ここでは
+
+- rankings.load_panel で価格パネルを 1 回だけ読み（2 回目以降は mtime が変わった銘柄だけ）、
+- screening.Evaluator 1 つで全スキャンの式を評価する（週足・月足の足と sma などの部分式は共有）
+
+ので、全スキャンをまとめても 1 スキャン分に近い時間で終わる。結果は各スキャンの従来の列で
+<prefix>_<as-of>_batch.csv に書き、results_catalog に従来と同じ scan_type・パラメータで登録する。
+
+月足 陽線包みはネット取得の月足ではなくキャッシュの日足から作った月足で判定し、最大上昇率は
+検出月から最新月まで（months_within <= lookahead_months + 1 なら従来と同じ範囲）で計算する。
+
+使い方:
+    python batch_scan.py                          # 既定の全スキャン
+    python batch_scan.py weekly_ma52_engulfing momentum --as-of 2026-05-15
+    python batch_scan.py monthly_gc --params '{"monthly_gc": {"within_months": 3}}'
+"""
+import argparse
+import datetime
+import json
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+import screening
+
+BASE_DIR = Path(__file__).resolve().parent
+RESULTS_DIR = BASE_DIR / 'outputs' / 'results'
+
+
+def _noop_progress(done, total, message=''):
+    pass
+
+
+# ---------------------------------------------------------------------------
+# スキャンごとの式・出力（params -> spec）
+# ---------------------------------------------------------------------------
+
+def _weekly_spec(params):
+    relaxed = bool(params.get('relaxed_engulfing', False))
+    require_ma52 = bool(params.get('require_ma52', True))
+    conds = ['weekly.close >= sma(weekly.close, 52)'] if require_ma52 else []
+    conds.append('bullish_engulf(weekly, relaxed=True)' if relaxed else 'bullish_engulf(weekly)')
+    return {
+        'expr': ' and '.join(conds),
+        'columns': {'ticker': None, 'price': 'weekly.close'},
+        'sort': ('price', True),
+        # scan_all_jp_batch と同じくコード 1300 以上
+        'min_code': 1300,
+        'prefix': '全銘柄_MA52_陽線包み' + ('_緩和' if relaxed else ''),
+        'scan_type': 'weekly_ma52_engulfing',
+        'params': {'relaxed_engulfing': relaxed, 'require_ma52': require_ma52},
+    }
+
+
+def _above_ma52_spec(params):
+    preset = screening.PRESETS['above_ma52']
+    return dict(preset, columns=dict({'ticker': None}, **preset['columns']), prefix='MA52以上', scan_type='above_ma52', params={})
+
+
+def _momentum_spec(params):
+    min_change = float(params.get('min_change_pct', 5.0))
+    min_ratio = float(params.get('min_volume_ratio', 3.0))
+    max_dev = float(params.get('max_ma25_deviation_pct', 20.0))
+    change = 'change_pct(daily.close)'
+    ratio = 'daily.volume / sma(shift(daily.volume, 2), 20)'
+    deviation = '(daily.close / sma(daily.close, 25) - 1) * 100'
+    return {
+        'expr': f"{change} >= {min_change} and {ratio} >= {min_ratio} and {deviation} < {max_dev}",
+        'columns': {'コード': None, '本日終値': 'daily.close', '前日比(%)': change, '出来高倍率': ratio, '25日線乖離率(%)': deviation},
+        'round': {'本日終値': 1},
+        'sort': ('前日比(%)', False),
+        'prefix': '短期_初動',
+        'scan_type': 'momentum',
+        'params': {'min_change_pct': min_change, 'min_volume_ratio': min_ratio, 'max_ma25_deviation_pct': max_dev},
+        'encoding': 'utf-8-sig',
+    }
+
+
+def _monthly_gc_spec(params):
+    within = int(params.get('within_months', 0))
+    cross = 'cross_over(sma(monthly.close, 9), sma(monthly.close, 24))'
+    return {
+        'expr': f"bars_since({cross}) <= {within}" if within > 0 else f"bars_since({cross}) >= 0",
+        'columns': {
+            'ticker': None,
+            'cross_month': f"bars_since({cross})",
+            'ma9': f"when({cross}, sma(monthly.close, 9))",
+            'ma24': f"when({cross}, sma(monthly.close, 24))",
+            'latest_close': 'monthly.close',
+        },
+        'sort': ('latest_close', True),
+        'prefix': '月足_MA9_MA24_GoldenCross' + (f'_within{within}m' if within > 0 else ''),
+        'scan_type': 'monthly_gc',
+        'params': {'within_months': within, 'cache_only': True},
+        # bars_since を クロスした月（YYYY-MM）に直す
+        'finalize': _cross_month,
+    }
+
+
+def _cross_month(df, ev):
+    if df.empty:
+        return df
+    latest = pd.PeriodIndex(pd.to_datetime(df['date']), freq='M')
+    df['cross_month'] = [str(p - int(n)) for p, n in zip(latest, df['cross_month'])]
+    return df
+
+
+def _monthly_engulfing_spec(params):
+    months_within = int(params.get('months_within', 1))
+    lookahead = int(params.get('lookahead_months', 6))
+    rise_filter = bool(params.get('rise_filter_enable', False))
+    min_rise = float(params.get('min_rise_pct', 0.0))
+    max_rise = float(params.get('max_rise_pct', 50.0))
+    engulf = 'bullish_engulf(monthly)'
+    rise = f"(highest_since({engulf}, monthly.close) / when({engulf}, monthly.close) - 1) * 100"
+    expr = f"bars_since({engulf}) < {months_within}"
+    if rise_filter:
+        expr += f" and {min_rise} <= {rise} <= {max_rise}"
+    return {
+        'expr': expr,
+        'columns': {
+            'ticker': None,
+            'pattern': None,
+            'months_ago': f"bars_since({engulf}) + 1",
+            'latest_price': f"when({engulf}, monthly.close)",
+            'prev_open': f"when({engulf}, shift(monthly.open))",
+            'prev_close': f"when({engulf}, shift(monthly.close))",
+            'curr_open': f"when({engulf}, monthly.open)",
+            'curr_close': f"when({engulf}, monthly.close)",
+            'max_rise_pct': rise,
+        },
+        'digits': None,
+        'round': {'max_rise_pct': 2},
+        'constants': {'pattern': 'bullish_engulfing'},
+        'ints': ('months_ago',),
+        'prefix': f'月足_陽線包み_within{months_within}m',
+        'scan_type': 'monthly_engulfing',
+        'params': {'months_within': months_within, 'lookahead_months': lookahead, 'rise_filter_enable': rise_filter,
+                   'min_rise_pct': min_rise, 'max_rise_pct': max_rise},
+    }
+
+
+# スキャン名 -> spec を作る関数（params は各スキャンの既存ジョブと同じキー）
+SCANS = {
+    'weekly_ma52_engulfing': _weekly_spec,
+    'above_ma52': _above_ma52_spec,
+    'monthly_engulfing': _monthly_engulfing_spec,
+    'monthly_gc': _monthly_gc_spec,
+    'momentum': _momentum_spec,
+}
+
+SCAN_LABELS = {
+    'weekly_ma52_engulfing': '週足 MA52 + 陽線包み',
+    'above_ma52': 'MA52 以上',
+    'monthly_engulfing': '月足 陽線包み',
+    'monthly_gc': '月足 MA9/MA24 GC',
+    'momentum': '短期_初動',
+}
+
+
+def build_spec(name, params=None):
+    """スキャン名と params から screening に渡す spec を作る。"""
+    if name not in SCANS:
+        raise ValueError(f"unknown scan: {name}")
+    spec = SCANS[name](params or {})
+    # 出力列のうち式が None のものは ticker（列名だけ変える）か定数
+    spec['output'] = list(spec['columns'])
+    spec['columns'] = {k: v for k, v in spec['columns'].items() if v is not None}
+    spec['name'] = name
+    return screening.resolve(spec)
+
+
+def _frame(spec, df):
+    """screening.evaluate の結果を各スキャンの従来の列にそろえる。"""
+    out = df.copy()
+    for col, digits in spec.get('round', {}).items():
+        if col in out.columns:
+            out[col] = out[col].round(digits)
+    for col in spec.get('ints', ()):
+        out[col] = out[col].astype(int)
+    for col, value in spec.get('constants', {}).items():
+        out[col] = value
+    ticker_cols = [c for c in spec['output'] if c not in spec['columns'] and c not in spec.get('constants', {})]
+    for col in ticker_cols:
+        out[col] = out['ticker']
+    return out[spec['output']]
+
+
+def _code_ok(tickers, min_code):
+    def _ok(t):
+        try:
+            return int(str(t).replace('.T', '')) >= min_code
+        except ValueError:
+            return False
+    return np.fromiter((_ok(t) for t in tickers), dtype=bool, count=len(tickers))
+
+
+def run(scans=None, params=None, data_dir=None, results_dir=None, as_of=None, tickers=None,
+        write=True, verbose=False, progress=_noop_progress):
+    """
+    scans（既定は SCANS 全部）をパネル 1 回の読み込みで評価し、スキャンごとに結果を書く。
+
+    params: {スキャン名: そのスキャンの params}
+    Returns: {'saved_paths': [...], 'scans': {name: {'hits', 'path'}}, 'panel_ms', 'evaluate_ms'}
+    """
+    import rankings
+
+    scans = list(scans or SCANS)
+    params = params or {}
+    # 先に全スキャンの式を作って、誤りはパネルを読む前に返す
+    specs = [build_spec(name, params.get(name)) for name in scans]
+    data_dir = str(data_dir or rankings.default_stores()['jp'])
+    results_dir = Path(results_dir or RESULTS_DIR)
+    as_of_label = as_of or datetime.date.today().isoformat()
+
+    progress(0, len(specs) + 1, 'パネルを読み込み中...')
+    t0 = time.perf_counter()
+    panel = rankings.load_panel(data_dir, verbose=verbose)
+    t1 = time.perf_counter()
+    ev = screening.Evaluator(panel, as_of=as_of)
+
+    summary, saved_paths = {}, []
+    for i, spec in enumerate(specs):
+        name = spec['name']
+        progress(i + 1, len(specs) + 1, f"評価中: {SCAN_LABELS.get(name, name)}")
+        df = screening.evaluate(ev, spec, tickers=tickers, exclude=True, digits=spec.get('digits', 2))
+        if spec.get('min_code'):
+            df = df[_code_ok(df['ticker'].to_numpy(), spec['min_code'])].reset_index(drop=True)
+        if spec.get('finalize'):
+            df = spec['finalize'](df, ev)
+        out = _frame(spec, df)
+        path = None
+        if write:
+            import results_catalog
+            entry = results_catalog.save_result(
+                out, spec['scan_type'], params=spec['params'], as_of=as_of_label,
+                name=f"{spec['prefix']}_{as_of_label}_batch.csv", results_dir=results_dir,
+                encoding=spec.get('encoding', 'utf-8'))
+            path = entry['csv_path']
+            saved_paths.append(str(path))
+        summary[name] = {'hits': len(out), 'path': path, 'frame': out}
+    t2 = time.perf_counter()
+    progress(len(specs) + 1, len(specs) + 1, 'まとめてスキャン完了: ' + ', '.join(
+        f"{SCAN_LABELS.get(n, n)} {s['hits']} 件" for n, s in summary.items()))
+    if verbose:
+        print(f"panel load {1000 * (t1 - t0):.1f} ms ({len(panel.tickers)} tickers), "
+              f"evaluate {1000 * (t2 - t1):.1f} ms ({ev.computed} nodes for {len(specs)} scans)")
+    return {'saved_paths': saved_paths, 'scans': summary,
+            'panel_ms': round(1000 * (t1 - t0), 1), 'evaluate_ms': round(1000 * (t2 - t1), 1)}
+
+
+def parse_args():
+    p = argparse.ArgumentParser(description='Run several scans in a single pass over the price cache')
+    p.add_argument('scans', nargs='*', help=f"Scans to run (default: all of {', '.join(SCANS)})")
+    p.add_argument('--params', type=str, default='{}', help='JSON {scan: params}')
+    p.add_argument('--data-dir', type=str, default=None, help='Price cache directory (default: config.DATA_DIR)')
+    p.add_argument('--results-dir', type=str, default=None)
+    p.add_argument('--as-of', type=str, default=None, help='Evaluate at the latest bar on or before this date (YYYY-MM-DD)')
+    p.add_argument('--no-write', action='store_true', help='Print counts only')
+    p.add_argument('--verbose', action='store_true')
+    return p.parse_args()
+
+
+def main():
+    args = parse_args()
+    res = run(args.scans or None, json.loads(args.params), data_dir=args.data_dir, results_dir=args.results_dir,
+              as_of=args.as_of, write=not args.no_write, verbose=args.verbose)
+    for name, s in res['scans'].items():
+        print(f"{SCAN_LABELS.get(name, name)}: {s['hits']} 件" + (f" -> {s['path']}" if s['path'] else ''))
+
+
+if __name__ == '__main__':
+    main()
@@ -32,6 +32,34 @@ def _ensure_dir(path):
     os.makedirs(path, exist_ok=True)
 
 
+def _note_saved(out_dir, saved_paths, batch=None, frames=None):
+    """保存したファイルをディレクトリ状態マニフェスト（dir_state）に反映する。
+
+    batch を渡すと、保存できなかった銘柄を universe_registry に取得失敗として記録する。
+    frames（{ticker: 保存した日足 DataFrame}）を渡すと、indicator_state の状態を新しい足の分だけ進める。
+    """
+    if not saved_paths:
+        return
+    try:
+        import dir_state
+        dir_state.note_writes(out_dir, saved_paths, suffix='.parquet')
+    except Exception:
+        pass
+    if frames:
+        try:
+            import indicator_state
+            indicator_state.update_from_frames(frames, data_dir=out_dir)
+        except Exception:
+            pass
+    if batch:
+        try:
+            import universe_registry
+            ok = {os.path.splitext(os.path.basename(p))[0] for p in saved_paths}
+            universe_registry.record_fetch_outcomes(ok, [t for t in batch if t not in ok])
+        except Exception:
+            pass
+
+
 def fetch_and_save_tickers(start=1000, end=9999, batch_size=200, period='6mo', interval='1d', out_dir=None, retry_count=2, sleep_between_batches=1.0, allow_excluded=False, verbose=False):
     """
     指定範囲のティッカー（4桁コードに .T を付与）をバッチで取得して、各ティッカーごとに Parquet ファイルとして保存します。
@@ -51,6 +79,8 @@ def fetch_and_save_tickers(start=1000, end=9999, batch_size=200, period='6mo', i
 
     for batch_idx, i in enumerate(range(0, total, batch_size), start=1):
         batch = all_codes[i:i+batch_size]
+        saved = []
+        frames = {}
         if verbose:
             print(f"Fetching batch {batch_idx}/{total_batches} (size={len(batch)})")
 
@@ -91,12 +121,15 @@ def fetch_and_save_tickers(start=1000, end=9999, batch_size=200, period='6mo', i
                         continue
                     path = os.path.join(out_dir, f"{t}.parquet")
                     single[cols].to_parquet(path)
+                    saved.append(path)
+                    frames[t] = single[cols]
                     if verbose:
                         print(f"Saved {t} -> {path}")
                 except Exception as e:
                     if verbose:
                         print(f"{t}: fetch error {e}")
                 time.sleep(sleep_between_batches)
+            _note_saved(out_dir, saved, batch, frames if interval == '1d' else None)
             continue
 
         # Parse batch df and save per-ticker files
@@ -139,11 +172,14 @@ def fetch_and_save_tickers(start=1000, end=9999, batch_size=200, period='6mo', i
                 path = os.path.join(out_dir, f"{t}.parquet")
                 cols = [c for c in ['Open', 'High', 'Low', 'Close', 'Volume'] if c in series_df.columns]
                 series_df[cols].to_parquet(path)
+                saved.append(path)
+                frames[t] = series_df[cols]
                 if verbose:
                     print(f"Saved {t} -> {path}")
             except Exception as e:
                 if verbose:
                     print(f"{t}: error saving - {e}")
+        _note_saved(out_dir, saved, batch, frames if interval == '1d' else None)
         time.sleep(sleep_between_batches)
 
 
@@ -184,6 +220,8 @@ def fetch_and_save_list(tickers, batch_size=200, period='6mo', interval='1d', ou
 
     for batch_idx, i in enumerate(range(0, total, batch_size), start=1):
         batch = all_codes[i:i+batch_size]
+        saved = []
+        frames = {}
         if verbose:
             print(f"Fetching batch {batch_idx}/{total_batches} (size={len(batch)})")
 
@@ -223,12 +261,15 @@ def fetch_and_save_list(tickers, batch_size=200, period='6mo', interval='1d', ou
                         continue
                     path = os.path.join(out_dir, f"{t}.parquet")
                     single[cols].to_parquet(path)
+                    saved.append(path)
+                    frames[t] = single[cols]
                     if verbose:
                         print(f"Saved {t} -> {path}")
                 except Exception as e:
                     if verbose:
                         print(f"{t}: fetch error {e}")
                 time.sleep(sleep_between_batches)
+            _note_saved(out_dir, saved, batch, frames if interval == '1d' else None)
             continue
 
         # Parse batch df and save per-ticker files
@@ -265,9 +306,12 @@ def fetch_and_save_list(tickers, batch_size=200, period='6mo', interval='1d', ou
                 path = os.path.join(out_dir, f"{t}.parquet")
                 cols = [c for c in ['Open', 'High', 'Low', 'Close', 'Volume'] if c in series_df.columns]
                 series_df[cols].to_parquet(path)
+                saved.append(path)
+                frames[t] = series_df[cols]
                 if verbose:
                     print(f"Saved {t} -> {path}")
             except Exception as e:
                 if verbose:
                     print(f"{t}: error saving - {e}")
+        _note_saved(out_dir, saved, batch, frames if interval == '1d' else None)
         time.sleep(sleep_between_batches)
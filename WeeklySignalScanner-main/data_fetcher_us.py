@@ -1,5 +1,7 @@
+import json
 import os
 import time
+import numpy as np
 import yfinance as yf
 import pandas as pd
 
@@ -12,6 +14,27 @@ def _ensure_dir(path):
     os.makedirs(path, exist_ok=True)
 
 
+def _note_saved(out_dir, saved_paths, batch=None):
+    """保存したファイルをディレクトリ状態マニフェスト（dir_state）に反映する。
+
+    batch を渡すと、保存できなかった銘柄を universe_registry に取得失敗として記録する。
+    """
+    if not saved_paths:
+        return
+    try:
+        import dir_state
+        dir_state.note_writes(out_dir, saved_paths, suffix='.parquet')
+    except Exception:
+        pass
+    if batch:
+        try:
+            import universe_registry
+            ok = {os.path.splitext(os.path.basename(p))[0] for p in saved_paths}
+            universe_registry.record_fetch_outcomes(ok, [t for t in batch if t not in ok])
+        except Exception:
+            pass
+
+
 def fetch_and_save_us_tickers(tickers, batch_size=100, period='6mo', interval='1d', out_dir='data_us', retry_count=2, sleep_between_batches=1.0, verbose=False):
     """
     指定された米国株ティッカーリストをバッチで取得して、各ティッカーごとに Parquet ファイルとして保存します。
@@ -35,6 +58,7 @@ def fetch_and_save_us_tickers(tickers, batch_size=100, period='6mo', interval='1
 
     for batch_idx, i in enumerate(range(0, total, batch_size), start=1):
         batch = all_tickers[i:i+batch_size]
+        saved = []
         if verbose:
             print(f"Fetching US batch {batch_idx}/{total_batches} (size={len(batch)})")
 
@@ -74,12 +98,14 @@ def fetch_and_save_us_tickers(tickers, batch_size=100, period='6mo', interval='1
                         continue
                     path = os.path.join(out_dir, f"{t}.parquet")
                     single[cols].to_parquet(path)
+                    saved.append(path)
                     if verbose:
                         print(f"Saved {t} -> {path}")
                 except Exception as e:
                     if verbose:
                         print(f"{t}: fetch error {e}")
                 time.sleep(sleep_between_batches)
+            _note_saved(out_dir, saved, batch)
             continue
 
         # Parse batch df and save per-ticker files
@@ -114,6 +140,7 @@ def fetch_and_save_us_tickers(tickers, batch_size=100, period='6mo', interval='1
                         continue
                     path = os.path.join(out_dir, f"{t}.parquet")
                     single[cols].to_parquet(path)
+                    saved.append(path)
                     if verbose:
                         print(f"Saved {t} (fallback) -> {path}")
                     continue
@@ -152,6 +179,7 @@ def fetch_and_save_us_tickers(tickers, batch_size=100, period='6mo', interval='1
 
                 path = os.path.join(out_dir, f"{t}.parquet")
                 valid[['Open', 'High', 'Low', 'Close', 'Volume']].to_parquet(path)
+                saved.append(path)
                 if verbose:
                     print(f"Saved {t} -> {path}")
             except Exception as e:
@@ -160,6 +188,7 @@ def fetch_and_save_us_tickers(tickers, batch_size=100, period='6mo', interval='1
 
         if verbose:
             print(f"Batch {batch_idx} complete. Sleeping {sleep_between_batches}s...")
+        _note_saved(out_dir, saved, batch)
         time.sleep(sleep_between_batches)
 
     if verbose:
@@ -168,17 +197,11 @@ def fetch_and_save_us_tickers(tickers, batch_size=100, period='6mo', interval='1
 
 def get_sp500_tickers():
     """
-    S&P 500のティッカーリストを取得する（Wikipediaから）
+    S&P 500のティッカーリスト（universe_registry に保存済みのもの。未保存なら Wikipedia から作成）
     """
     try:
-        import pandas as pd
-        url = 'https://en.wikipedia.org/wiki/List_of_S%26P_500_companies'
-        tables = pd.read_html(url)
-        sp500_table = tables[0]
-        tickers = sp500_table['Symbol'].tolist()
-        # Clean up tickers (remove dots, etc.)
-        tickers = [t.replace('.', '-') for t in tickers]
-        return tickers
+        import universe_registry
+        return list(universe_registry.load('sp500'))
     except Exception as e:
         print(f"Failed to fetch S&P 500 tickers: {e}")
         return []
@@ -186,123 +209,207 @@ def get_sp500_tickers():
 
 def get_nasdaq100_tickers():
     """
-    NASDAQ 100の主要ティッカーリスト（手動リスト）
-    完全なリストが必要な場合はAPIやスクレイピングを使用
+    NASDAQ 100の主要ティッカーリスト（universe_registry の nasdaq100）
+    """
+    import universe_registry
+    return list(universe_registry.load('nasdaq100'))
+
+
+# 価格フィルタ用の最新バー表（ティッカー -> 最終バーの日付・終値）。
+# ローカルストア（{out_dir}/*.parquet）から作り、鮮度切れの銘柄だけネットワークで差分更新する。
+LATEST_BARS_NAME = '.latest_bars.json'
+
+
+def _read_latest_bars(cache_dir):
+    try:
+        with open(os.path.join(cache_dir, LATEST_BARS_NAME), 'r', encoding='utf-8') as fh:
+            data = json.load(fh)
+        return data if isinstance(data, dict) else {}
+    except Exception:
+        return {}
+
+
+def _write_latest_bars(cache_dir, table):
+    try:
+        _ensure_dir(cache_dir)
+        path = os.path.join(cache_dir, LATEST_BARS_NAME)
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, 'w', encoding='utf-8') as fh:
+            json.dump(table, fh, ensure_ascii=False)
+        os.replace(tmp, path)
+    except Exception:
+        pass
+
+
+def _last_bar(frame):
+    """OHLCV フレームから (日付文字列, 終値) を返す。有効な終値がなければ None。"""
+    if frame is None or getattr(frame, 'empty', True) or 'Close' not in frame.columns:
+        return None
+    close = pd.to_numeric(frame['Close'], errors='coerce').dropna()
+    if close.empty:
+        return None
+    return pd.Timestamp(close.index[-1]).strftime('%Y-%m-%d'), float(close.iloc[-1])
+
+
+def load_latest_bars(tickers, cache_dir='data_us'):
+    """
+    ローカルストアから各銘柄の最終バー（日付・終値）を読み込む。
+
+    前回の結果を {cache_dir}/.latest_bars.json に保持し、parquet の mtime が変わった銘柄だけ
+    Close 列を読み直す。ストアに無い銘柄は、以前に差分更新で取得した値があればそれを使う。
+
+    Returns:
+        DataFrame (index=ticker, columns=['date', 'close'])。値の無い銘柄は含まない。
+    """
+    table = _read_latest_bars(cache_dir)
+    changed = False
+    rows = {}
+    for t in dict.fromkeys(tickers):
+        entry = table.get(t)
+        path = os.path.join(cache_dir, f"{t}.parquet")
+        try:
+            mtime_ns = os.stat(path).st_mtime_ns
+        except OSError:
+            mtime_ns = None
+        if mtime_ns is not None and (entry is None or entry.get('mtime_ns') != mtime_ns):
+            try:
+                bar = _last_bar(pd.read_parquet(path, columns=['Close']))
+            except Exception:
+                bar = None
+            if bar is not None:
+                entry = {'date': bar[0], 'close': bar[1], 'mtime_ns': mtime_ns, 'source': 'store'}
+                table[t] = entry
+                changed = True
+        if entry is not None:
+            rows[t] = (entry['date'], entry['close'])
+    if changed:
+        _write_latest_bars(cache_dir, table)
+    bars = pd.DataFrame.from_dict(rows, orient='index', columns=['date', 'close'])
+    bars['date'] = pd.to_datetime(bars['date'])
+    return bars
+
+
+def refresh_latest_bars(tickers, cache_dir='data_us', batch_size=200, verbose=False):
     """
-    return [
-        "AAPL", "MSFT", "GOOGL", "GOOG", "AMZN", "NVDA", "META", "TSLA",
-        "AVGO", "COST", "ASML", "PEP", "AZN", "CSCO", "ADBE", "TMUS",
-        "CMCSA", "NFLX", "AMD", "INTC", "INTU", "TXN", "QCOM", "HON",
-        "AMGN", "AMAT", "ISRG", "BKNG", "SBUX", "GILD", "ADI", "VRTX",
-        "ADP", "REGN", "MDLZ", "LRCX", "PANW", "PYPL", "MU", "SNPS",
-        "KLAC", "MELI", "CDNS", "MAR", "CTAS", "NXPI", "ORLY", "CRWD",
-        "MNST", "ADSK", "ABNB", "CSX", "WDAY", "FTNT", "MRVL", "DASH",
-        "TEAM", "DXCM", "AEP", "PCAR", "ODFL", "KDP", "CPRT", "CHTR",
-        "PAYX", "ROST", "MCHP", "FAST", "TTD", "EA", "CTSH", "KHC",
-        "IDXX", "ON", "VRSK", "LULU", "EXC", "CCEP", "DDOG", "ANSS",
-        "XEL", "CSGP", "CDW", "BIIB", "WBD", "ZS", "GEHC", "MDB",
-        "TTWO", "ILMN", "GFS", "FANG", "WBA", "MRNA", "SMCI", "ARM"
-    ]
-
-
-def filter_tickers_by_price(tickers, max_price=2.0, min_price=0.01, batch_size=100, verbose=False):
+    指定銘柄の直近5日を一括ダウンロードし、最新バー表だけを更新する（差分更新）。
+
+    parquet の価格履歴は書き換えない（足の間隔や期間が取得時の設定と混ざるのを避けるため）。
+    Returns:
+        更新できた銘柄数
+    """
+    tickers = list(dict.fromkeys(tickers))
+    if not tickers:
+        return 0
+    table = _read_latest_bars(cache_dir)
+    updated = 0
+    for i in range(0, len(tickers), batch_size):
+        batch = tickers[i:i+batch_size]
+        try:
+            data = yf.download(batch, period='5d', interval='1d', progress=False, group_by='ticker', auto_adjust=False, threads=True)
+        except Exception as e:
+            if verbose:
+                print(f"  price refresh batch error: {e}")
+            continue
+        if data is None or data.empty:
+            continue
+        for t in batch:
+            try:
+                if isinstance(data.columns, pd.MultiIndex):
+                    if t in data.columns.get_level_values(0):
+                        frame = data[t]
+                    elif t in data.columns.get_level_values(1):
+                        frame = data.xs(t, level=1, axis=1)
+                    else:
+                        continue
+                else:
+                    frame = data
+                bar = _last_bar(frame)
+            except Exception:
+                bar = None
+            if bar is None:
+                continue
+            entry = table.get(t) or {}
+            if entry.get('date') and entry['date'] > bar[0]:
+                continue
+            path = os.path.join(cache_dir, f"{t}.parquet")
+            try:
+                mtime_ns = os.stat(path).st_mtime_ns
+            except OSError:
+                mtime_ns = None
+            table[t] = {'date': bar[0], 'close': bar[1], 'mtime_ns': mtime_ns, 'source': 'refresh'}
+            updated += 1
+    _write_latest_bars(cache_dir, table)
+    if verbose:
+        print(f"  price refresh: {updated}/{len(tickers)} tickers updated")
+    return updated
+
+
+def price_bands(tickers, bands, cache_dir='data_us', max_age_days=4, refresh=True, batch_size=200, verbose=False):
+    """
+    複数の価格帯に一度に振り分ける（例: [(0.01, 2), (2, 5), (5, 10)]）。
+
+    価格はローカルストアの最終バーから取り、最終バーが max_age_days より古い銘柄
+    （または未取得の銘柄）だけを refresh_latest_bars でまとめて更新する。
+    更新できなかった銘柄は手元の（古い）終値で判定する。
+    帯の判定は min <= 終値 <= max（帯が重なる場合は両方に入る）。
+
+    Returns:
+        {(min, max): [ticker, ...]}（各リストは tickers の順序を保つ）
+    """
+    tickers = [t for t in dict.fromkeys(tickers) if t not in EXCLUDED_TICKERS]
+    bands = [(float(lo), float(hi)) for lo, hi in bands]
+    bars = load_latest_bars(tickers, cache_dir=cache_dir)
+
+    if refresh:
+        cutoff = pd.Timestamp.now().normalize() - pd.Timedelta(days=max_age_days)
+        fresh = set(bars.index[bars['date'] >= cutoff])
+        stale = [t for t in tickers if t not in fresh]
+        if stale:
+            if verbose:
+                print(f"Refreshing {len(stale)}/{len(tickers)} stale tickers (older than {max_age_days} days)")
+            if refresh_latest_bars(stale, cache_dir=cache_dir, batch_size=batch_size, verbose=verbose):
+                bars = load_latest_bars(tickers, cache_dir=cache_dir)
+
+    closes = bars['close'].reindex(tickers).to_numpy(dtype=float)
+    lo = np.array([b[0] for b in bands])
+    hi = np.array([b[1] for b in bands])
+    # (銘柄数 x 帯の数) の判定行列。NaN（価格不明）はどの帯にも入らない
+    hits = (closes[:, None] >= lo[None, :]) & (closes[:, None] <= hi[None, :])
+    names = np.array(tickers, dtype=object)
+    return {band: names[hits[:, j]].tolist() for j, band in enumerate(bands)}
+
+
+def filter_tickers_by_price(tickers, max_price=2.0, min_price=0.01, batch_size=200, verbose=False,
+                            cache_dir='data_us', max_age_days=4, refresh=True):
     """
     指定された価格範囲内の銘柄のみをフィルタリング
-    
+
+    ローカルストアの最終バーで判定し、鮮度切れの銘柄だけネットワークで更新する（price_bands 参照）。
+
     Args:
         tickers: チェックする銘柄リスト
         max_price: 最大価格（デフォルト: 2.0ドル）
         min_price: 最小価格（デフォルト: 0.01ドル、ペニーストック除外用）
-        batch_size: 一度に取得する銘柄数
+        batch_size: 差分更新で一度に取得する銘柄数
         verbose: 詳細ログ
-    
+        cache_dir: ローカルストア（parquet）のディレクトリ
+        max_age_days: 最終バーがこの日数より古い銘柄を差分更新する
+        refresh: False ならネットワークに出ずキャッシュだけで判定する
+
     Returns:
         価格範囲内の銘柄リスト
     """
-    filtered = []
     total = len(tickers)
-    
     if verbose:
         print(f"Filtering {total} tickers for price range ${min_price} - ${max_price}")
-    
-    for i in range(0, total, batch_size):
-        batch = tickers[i:i+batch_size]
-        
-        try:
-            # バッチでダウンロード
-            data = yf.download(batch, period='5d', progress=False)
-            
-            if data.empty:
-                # フォールバック: 個別取得
-                for ticker in batch:
-                    try:
-                        tick = yf.Ticker(ticker)
-                        hist = tick.history(period='5d')
-                        if not hist.empty:
-                            latest_price = hist['Close'].iloc[-1]
-                            if min_price <= latest_price <= max_price:
-                                filtered.append(ticker)
-                                if verbose:
-                                    print(f"  ✓ {ticker}: ${latest_price:.2f}")
-                    except Exception as e:
-                        if verbose:
-                            print(f"  ✗ {ticker}: エラー {e}")
-                continue
-            
-            # バッチデータを解析
-            for ticker in batch:
-                try:
-                    if len(batch) == 1:
-                        # 単一銘柄
-                        if 'Close' in data.columns:
-                            latest_price = data['Close'].iloc[-1]
-                        else:
-                            continue
-                    else:
-                        # 複数銘柄
-                        if isinstance(data.columns, pd.MultiIndex):
-                            if ('Close', ticker) in data.columns:
-                                latest_price = data[('Close', ticker)].iloc[-1]
-                            elif (ticker, 'Close') in data.columns:
-                                latest_price = data[(ticker, 'Close')].iloc[-1]
-                            else:
-                                continue
-                        else:
-                            continue
-                    
-                    if pd.notna(latest_price) and min_price <= latest_price <= max_price:
-                        filtered.append(ticker)
-                        if verbose:
-                            print(f"  ✓ {ticker}: ${latest_price:.2f}")
-                    elif verbose and pd.notna(latest_price):
-                        print(f"  - {ticker}: ${latest_price:.2f} (範囲外)")
-                        
-                except Exception as e:
-                    if verbose:
-                        print(f"  ✗ {ticker}: エラー {e}")
-        
-        except Exception as e:
-            if verbose:
-                print(f"Batch error: {e}")
-            # フォールバック
-            for ticker in batch:
-                try:
-                    tick = yf.Ticker(ticker)
-                    hist = tick.history(period='5d')
-                    if not hist.empty:
-                        latest_price = hist['Close'].iloc[-1]
-                        if min_price <= latest_price <= max_price:
-                            filtered.append(ticker)
-                            if verbose:
-                                print(f"  ✓ {ticker}: ${latest_price:.2f}")
-                except:
-                    pass
-        
-        time.sleep(0.5)  # レート制限対策
-    
+
+    band = (float(min_price), float(max_price))
+    filtered = price_bands(tickers, [band], cache_dir=cache_dir, max_age_days=max_age_days,
+                           refresh=refresh, batch_size=batch_size, verbose=verbose)[band]
+
     if verbose:
         print(f"\nフィルタ完了: {len(filtered)}/{total} 銘柄が条件を満たしています")
-    
+
     return filtered
 
 
@@ -0,0 +1,166 @@
+"""
+ディレクトリ状態マニフェスト（最終更新時刻・ファイル数・ファイル一覧）
+
+`app_streamlit.py` は再実行のたびに data/ を rglob して全ファイルを stat し、
+outputs/results の CSV も複数回 glob + stat していた。ここでは各ディレクトリに
+`.dir_state.json` を置き、書き込み側（data_fetcher / scan_tasks など）が保存後に
+note_writes() で更新する。UI は read_state() でマニフェストを読むだけで済む。
+
+マニフェストにはディレクトリ自体の mtime を記録しておき、read_state() 時に
+それが変わっていれば（未対応の書き込み元がファイルを追加/削除した場合）
+一度だけ再スキャンして作り直す。既存ファイルの上書きはディレクトリの mtime を
+変えないため、上書きする書き込み側は note_writes() を呼ぶこと。
+
+state の内容:
+    {'max_mtime': float|None, 'file_count': int, 'suffix': '.parquet',
+     'files': {name: mtime} (track_files=True の場合のみ), 'dir_mtime_ns': int, 'updated_at': float}
+"""
+import json
+import os
+import time
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+MANIFEST_NAME = '.dir_state.json'
+
+
+def _manifest_path(path):
+    return os.path.join(str(path), MANIFEST_NAME)
+
+
+def _dir_mtime_ns(path):
+    try:
+        return os.stat(str(path)).st_mtime_ns
+    except OSError:
+        return None
+
+
+def scan_dir(path, suffix=None, track_files=False):
+    """ディレクトリ直下を 1 回だけ走査して state を作る（マニフェストは除外）。"""
+    max_mtime = None
+    count = 0
+    files = {}
+    try:
+        with os.scandir(str(path)) as it:
+            for entry in it:
+                if entry.name == MANIFEST_NAME or entry.name.startswith(MANIFEST_NAME):
+                    continue
+                if suffix and not entry.name.endswith(suffix):
+                    continue
+                try:
+                    if not entry.is_file():
+                        continue
+                    m = entry.stat().st_mtime
+                except OSError:
+                    continue
+                count += 1
+                if max_mtime is None or m > max_mtime:
+                    max_mtime = m
+                if track_files:
+                    files[entry.name] = m
+    except OSError:
+        pass
+    state = {'max_mtime': max_mtime, 'file_count': count, 'suffix': suffix, 'updated_at': time.time()}
+    if track_files:
+        state['files'] = files
+    return state
+
+
+def _load(path):
+    try:
+        with open(_manifest_path(path), 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except Exception:
+        return None
+
+
+def _save(path, state):
+    """マニフェストを書き込む。
+
+    初回は作成（ディレクトリの mtime が変わる）、以降はその場で書き換えるので
+    ディレクトリの mtime は変わらない。記録する dir_mtime_ns は作成後の値。
+    """
+    mpath = _manifest_path(path)
+    try:
+        if not os.path.exists(mpath):
+            open(mpath, 'a', encoding='utf-8').close()
+        state['dir_mtime_ns'] = _dir_mtime_ns(path)
+        with open(mpath, 'r+', encoding='utf-8') as f:
+            if fcntl is not None:
+                fcntl.flock(f, fcntl.LOCK_EX)
+            f.seek(0)
+            f.truncate()
+            json.dump(state, f, ensure_ascii=False)
+            f.flush()
+    except Exception:
+        pass
+
+
+def _usable(state, path, suffix, track_files):
+    if not state or state.get('suffix') != suffix:
+        return False
+    if track_files and 'files' not in state:
+        return False
+    return state.get('dir_mtime_ns') == _dir_mtime_ns(path)
+
+
+def read_state(path, suffix=None, track_files=False):
+    """マニフェストから state を返す。無い・古い場合は再スキャンして保存する。"""
+    if not os.path.isdir(str(path)):
+        return {'max_mtime': None, 'file_count': 0, 'suffix': suffix, 'files': {}}
+    state = _load(path)
+    if _usable(state, path, suffix, track_files):
+        return state
+    state = scan_dir(path, suffix=suffix, track_files=track_files)
+    _save(path, state)
+    return state
+
+
+def note_writes(path, written_paths, suffix=None):
+    """書き込み側から呼ぶ: 保存したファイルの mtime をマニフェストに反映する。
+
+    新規ファイルの追加でディレクトリの mtime が変わっていれば再スキャンする
+    （ファイル数を正しく保つため。書き込み時に 1 回だけ発生する）。
+    """
+    if not written_paths:
+        return None
+    state = _load(path)
+    track_files = bool(state and 'files' in state)
+    if state is not None:
+        suffix = state.get('suffix')
+    if not _usable(state, path, suffix, track_files):
+        state = scan_dir(path, suffix=suffix, track_files=track_files)
+    else:
+        for p in written_paths:
+            name = os.path.basename(str(p))
+            if suffix and not name.endswith(suffix):
+                continue
+            try:
+                m = os.path.getmtime(str(p))
+            except OSError:
+                continue
+            if state.get('max_mtime') is None or m > state['max_mtime']:
+                state['max_mtime'] = m
+            if track_files:
+                state['files'][name] = m
+        state['updated_at'] = time.time()
+    _save(path, state)
+    return state
+
+
+def invalidate(path):
+    """マニフェストを削除して次回 read_state() で作り直させる。"""
+    try:
+        os.remove(_manifest_path(path))
+    except OSError:
+        pass
+
+
+def latest_files(state, limit=None):
+    """track_files=True の state から mtime の新しい順にファイル名を返す。"""
+    names = sorted((state.get('files') or {}).items(), key=lambda kv: kv[1], reverse=True)
+    names = [n for n, _ in names]
+    return names[:limit] if limit else names
@@ -0,0 +1,289 @@
+"""
+horse_backtest.py
+
+horse_model の学習・購入額算出を使ったウォークフォワード（時系列）バックテスト。
+
+期間（既定は月）ごとに、それ以前のレースでモデルを学習（または前回のモデルを再利用）して
+勝率を予測し、generate_bet_strategy と同じケリー計算（compute_kelly_stakes）で購入額を決め、
+実際の着順で精算して資金推移・回収率・最大ドローダウン・的中率を求める。
+
+購入額は「そのレース開始時の資金 x 比率」なので、レースごとの損益率を
+cumprod するだけで資金推移が出る（レース単位のループ不要）。予測はモデル設定ごとに 1 回だけ行い、
+min_ev / ケリー係数などの組み合わせは予測結果の上で配列演算として評価する。
+
+使い方例:
+    python horse_backtest.py --data outputs/netkeiba_2021_2025.parquet \\
+        --min-ev 1.0 1.2 1.5 --kelly 0.25 0.5 --train-window 12 --retrain-every 1 3 --workers 4
+
+    from horse_backtest import load_races, walk_forward_predict, simulate
+    races = load_races('results.parquet')
+    preds = walk_forward_predict(races, freq='M', train_window=12)
+    summary, equity = simulate(preds, min_ev=1.2, kelly_fraction=0.5)
+"""
+import argparse
+import itertools
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional, Dict, Any, List, Tuple, Callable
+
+import numpy as np
+import pandas as pd
+
+from horse_model import HorseDataProcessor, compute_kelly_stakes, train_lgbm_model
+
+RACE_COL = 'race_id'
+DATE_COL = 'race_date'
+# 学習時にターゲットエンコーディングするカテゴリ列（存在するものだけ使う）
+DEFAULT_CAT_COLS = ['father_group', 'damsire_group', 'jockey']
+
+
+def load_races(path: str, race_col: str = 'race_url', date_col: str = 'race_date') -> pd.DataFrame:
+    """netkeiba_scraper.py の Parquet を読み込み、バックテスト用に整形する。
+
+    - race_id / race_date / rank（数値、中止などは NaN）/ odds / is_win / field_size を付与
+    - 日付・レースID 順に並べる
+    """
+    df = pd.read_parquet(path) if str(path).lower().endswith('.parquet') else pd.read_csv(path)
+    df = df.copy()
+    df[RACE_COL] = df[race_col].astype(str)
+    df[DATE_COL] = pd.to_datetime(df[date_col], errors='coerce')
+    df['rank'] = pd.to_numeric(df.get('rank'), errors='coerce')
+    df['odds'] = pd.to_numeric(df.get('odds'), errors='coerce')
+    df = df[df[DATE_COL].notna() & df['rank'].notna()]
+    df['is_win'] = (df['rank'] == 1).astype(int)
+    df['field_size'] = df.groupby(RACE_COL)[RACE_COL].transform('size')
+    return df.sort_values([DATE_COL, RACE_COL], kind='stable').reset_index(drop=True)
+
+
+def _prepare_features(train: pd.DataFrame, test: pd.DataFrame,
+                      cat_cols: List[str]) -> Tuple[pd.DataFrame, pd.DataFrame, List[str]]:
+    """学習期間だけでターゲットエンコーディングを学習し、テスト期間に適用する（リーク防止）。"""
+    proc = HorseDataProcessor()
+    features = []
+    train = train.copy()
+    test = test.copy()
+    cols = [col for col in cat_cols if col in train.columns]
+    for col in cols:
+        train[col] = train[col].fillna('不明').astype(str)
+        test[col] = test[col].fillna('不明').astype(str)
+    if cols:
+        # 学習期間の行は out-of-fold 値（自分の目的変数を含まない集計）で埋める
+        train, _ = proc.fit_target_encode(train, cat_col=cols, target_col='is_win')
+        test = proc.transform_with_target_encoder(test, cat_col=cols)
+        features += [f'{col}_te' for col in cols]
+    for df in (train, test):
+        df['log_odds'] = np.log(df['odds'].clip(lower=1.0))
+    features += ['log_odds', 'field_size']
+    return train, test, features
+
+
+def _fit_lgbm(train: pd.DataFrame, features: List[str]) -> Any:
+    model, _ = train_lgbm_model(train, features=features, target='is_win',
+                                num_boost_round=300, early_stopping_rounds=30)
+    return model
+
+
+def walk_forward_predict(races: pd.DataFrame, freq: str = 'M', train_window: Optional[int] = 12,
+                         retrain_every: int = 1, min_train_races: int = 200,
+                         cat_cols: Optional[List[str]] = None,
+                         fit_fn: Optional[Callable[[pd.DataFrame, List[str]], Any]] = None,
+                         verbose: bool = False) -> pd.DataFrame:
+    """期間ごとに学習→予測を繰り返し、テスト期間の行に win_prob を付けて返す。
+
+    - freq: 期間の単位（pandas の期間文字列。'M'=月、'W'=週、'Q'=四半期）
+    - train_window: 学習に使う直前の期間数（None なら開始からすべて）
+    - retrain_every: 何期間ごとに学習し直すか（間の期間は前回のモデルを再利用）
+    - min_train_races: 学習データのレース数がこれ未満の期間は予測しない
+    - fit_fn(train_df, features) -> model（model.predict(X) が勝率を返すこと）。既定は LightGBM
+
+    win_prob はレース内で合計 1 になるよう正規化する。
+    """
+    cat_cols = DEFAULT_CAT_COLS if cat_cols is None else cat_cols
+    fit_fn = fit_fn or _fit_lgbm
+    periods = races[DATE_COL].dt.to_period(freq)
+    uniq = periods.drop_duplicates().sort_values().tolist()
+
+    out = []
+    model = None
+    features: List[str] = []
+    train_rows = None
+    since_train = retrain_every
+    for i, period in enumerate(uniq):
+        lo = uniq[max(0, i - train_window)] if train_window else uniq[0]
+        train_mask = (periods < period) & (periods >= lo)
+        if races.loc[train_mask, RACE_COL].nunique() < min_train_races:
+            continue
+        test = races[periods == period]
+        if model is None or since_train >= retrain_every:
+            train_rows = races[train_mask]
+            train_df, _, features = _prepare_features(train_rows, test.head(0), cat_cols)
+            try:
+                model = fit_fn(train_df, features)
+            except Exception as e:
+                if verbose:
+                    print(f'{period}: training failed: {e}')
+                model = None
+                continue
+            since_train = 0
+            if verbose:
+                print(f'{period}: trained on {len(train_df)} rows')
+        _, test_df, _ = _prepare_features(train_rows, test, cat_cols)
+        prob = np.asarray(model.predict(test_df[features]), dtype=float)
+        test_df = test_df.assign(win_prob=prob, period=str(period))
+        out.append(test_df)
+        since_train += 1
+
+    if not out:
+        return races.head(0).assign(win_prob=pd.Series(dtype=float), period=pd.Series(dtype=str))
+    pred = pd.concat(out, ignore_index=True)
+    total = pred.groupby(RACE_COL)['win_prob'].transform('sum')
+    pred['win_prob'] = np.where(total > 0, pred['win_prob'] / total, 0.0)
+    return pred
+
+
+def simulate(pred: pd.DataFrame, min_ev: float = 1.2, kelly_fraction: float = 0.5,
+             max_stake_frac: Optional[float] = None, max_race_frac: float = 1.0,
+             initial_bankroll: float = 50000.0, compound: bool = True) -> Tuple[Dict[str, Any], pd.DataFrame]:
+    """予測済みの行から資金推移をシミュレーションする。
+
+    - 期待値 (win_prob * odds) が min_ev 以上の馬にだけ、compute_kelly_stakes の比率で賭ける
+    - compound=True なら購入額はレース開始時の資金に比例（複利）、False なら初期資金に比例
+    返り値: (summary dict, レースごとの資金推移 DataFrame)
+    """
+    races = pd.factorize(pred[RACE_COL])[0]
+    n_races = int(races.max()) + 1 if len(races) else 0
+    p = pred['win_prob'].to_numpy(dtype=float)
+    odds = pred['odds'].to_numpy(dtype=float)
+    win = pred['is_win'].to_numpy(dtype=float)
+    valid = np.isfinite(odds) & np.isfinite(p)
+    odds = np.where(valid, odds, 0.0)
+
+    res = compute_kelly_stakes(p, odds, bankroll=1.0, kelly_fraction=kelly_fraction, race_ids=races,
+                               max_stake_frac=max_stake_frac, max_race_frac=max_race_frac,
+                               mask=valid & (p * odds >= min_ev))
+    frac = res['fraction']
+    # レースごとの損益率（資金に対する比率）
+    race_frac = np.bincount(races, weights=frac, minlength=n_races)
+    race_ret = np.bincount(races, weights=frac * (odds * win - 1.0), minlength=n_races)
+    race_hit = np.bincount(races, weights=(frac > 0) * win, minlength=n_races) > 0
+
+    if compound:
+        equity = initial_bankroll * np.cumprod(1.0 + race_ret)
+        start = np.concatenate([[initial_bankroll], equity[:-1]])
+    else:
+        equity = initial_bankroll * (1.0 + np.cumsum(race_ret))
+        start = np.full(n_races, float(initial_bankroll))
+    staked = race_frac * start
+    payout = (race_ret + race_frac) * start
+
+    peak = np.maximum.accumulate(np.concatenate([[initial_bankroll], equity]))[1:] if n_races else equity
+    drawdown = np.where(peak > 0, 1.0 - equity / peak, 0.0)
+    bet_races = race_frac > 0
+    n_bets = int((frac > 0).sum())
+    total_staked = float(staked.sum())
+
+    summary = {
+        'min_ev': min_ev,
+        'kelly_fraction': kelly_fraction,
+        'max_stake_frac': max_stake_frac,
+        'races': n_races,
+        'bet_races': int(bet_races.sum()),
+        'bets': n_bets,
+        'hits': int((frac > 0).astype(int) @ win.astype(int)) if n_bets else 0,
+        'hit_rate': float(race_hit[bet_races].mean()) if bet_races.any() else 0.0,
+        'total_staked': total_staked,
+        'total_payout': float(payout.sum()),
+        'roi': float(payout.sum() / total_staked - 1.0) if total_staked > 0 else 0.0,
+        'final_bankroll': float(equity[-1]) if n_races else float(initial_bankroll),
+        'max_drawdown': float(drawdown.max()) if n_races else 0.0,
+    }
+    first = pred.drop_duplicates(RACE_COL)
+    curve = pd.DataFrame({
+        RACE_COL: first[RACE_COL].to_numpy(),
+        DATE_COL: first[DATE_COL].to_numpy(),
+        'staked': staked,
+        'payout': payout,
+        'bankroll': equity,
+        'drawdown': drawdown,
+    })
+    return summary, curve
+
+
+def _run_model_config(args: Tuple[pd.DataFrame, Dict[str, Any], List[Dict[str, Any]], float]) -> List[Dict[str, Any]]:
+    races, model_cfg, strategies, initial_bankroll = args
+    pred = walk_forward_predict(races, **model_cfg)
+    rows = []
+    for strat in strategies:
+        summary, _ = simulate(pred, initial_bankroll=initial_bankroll, **strat)
+        summary.update(model_cfg)
+        rows.append(summary)
+    return rows
+
+
+def run_grid(races: pd.DataFrame, model_grid: Dict[str, List[Any]], strategy_grid: Dict[str, List[Any]],
+             initial_bankroll: float = 50000.0, workers: int = 1) -> pd.DataFrame:
+    """モデル設定 x 戦略パラメータの全組み合わせを評価する。
+
+    model_grid: walk_forward_predict の引数（例: {'train_window': [6, 12], 'retrain_every': [1, 3]}）
+    strategy_grid: simulate の引数（例: {'min_ev': [1.0, 1.2], 'kelly_fraction': [0.25, 0.5]}）
+    学習はモデル設定ごとに 1 回。workers > 1 ならモデル設定ごとにプロセスを分けて並列実行する。
+    """
+    def _expand(grid):
+        keys = list(grid)
+        return [dict(zip(keys, vals)) for vals in itertools.product(*[grid[k] for k in keys])] or [{}]
+
+    model_cfgs = _expand(model_grid)
+    strategies = _expand(strategy_grid)
+    jobs = [(races, cfg, strategies, initial_bankroll) for cfg in model_cfgs]
+    rows: List[Dict[str, Any]] = []
+    if workers > 1 and len(jobs) > 1:
+        with ProcessPoolExecutor(max_workers=workers) as ex:
+            for part in ex.map(_run_model_config, jobs):
+                rows.extend(part)
+    else:
+        for job in jobs:
+            rows.extend(_run_model_config(job))
+    return pd.DataFrame(rows).sort_values('roi', ascending=False).reset_index(drop=True)
+
+
+def parse_args():
+    p = argparse.ArgumentParser(description='Walk-forward betting backtest over netkeiba_scraper.py output')
+    p.add_argument('--data', required=True, help='netkeiba_scraper.py の Parquet（または CSV）')
+    p.add_argument('--freq', default='M', help='期間の単位（M=月, W=週, Q=四半期）')
+    p.add_argument('--train-window', type=int, nargs='+', default=[12], help='学習に使う直前の期間数（0=全期間）')
+    p.add_argument('--retrain-every', type=int, nargs='+', default=[1], help='何期間ごとに再学習するか')
+    p.add_argument('--min-train-races', type=int, default=200)
+    p.add_argument('--min-ev', type=float, nargs='+', default=[1.2])
+    p.add_argument('--kelly', type=float, nargs='+', default=[0.5], help='ケリー係数（1.0=フル, 0.5=ハーフ）')
+    p.add_argument('--max-stake-frac', type=float, nargs='+', default=[None])
+    p.add_argument('--bankroll', type=float, default=50000.0)
+    p.add_argument('--workers', type=int, default=1)
+    p.add_argument('--out', default=None, help='結果サマリの CSV 出力先')
+    return p.parse_args()
+
+
+def main():
+    args = parse_args()
+    races = load_races(args.data)
+    print(f'{races[RACE_COL].nunique()} races, {len(races)} rows')
+    model_grid = {
+        'freq': [args.freq],
+        'train_window': [w or None for w in args.train_window],
+        'retrain_every': args.retrain_every,
+        'min_train_races': [args.min_train_races],
+    }
+    strategy_grid = {
+        'min_ev': args.min_ev,
+        'kelly_fraction': args.kelly,
+        'max_stake_frac': args.max_stake_frac,
+    }
+    summary = run_grid(races, model_grid, strategy_grid, initial_bankroll=args.bankroll, workers=args.workers)
+    cols = ['train_window', 'retrain_every', 'min_ev', 'kelly_fraction', 'max_stake_frac',
+            'bet_races', 'bets', 'hit_rate', 'roi', 'final_bankroll', 'max_drawdown']
+    print(summary[[c for c in cols if c in summary.columns]].to_string(index=False))
+    if args.out:
+        summary.to_csv(args.out, index=False)
+        print(f'Saved: {args.out}')
+
+
+if __name__ == '__main__':
+    main()
@@ -8,14 +8,22 @@ horse_model.py
     df = proc.load_and_merge_results_pedigree(results_csv, pedigree_csv)
     df = proc.process_lineage_and_conditions(df, father_col='father_name')
     df, encoder = proc.fit_target_encode(df, cat_col='lineage_group', target_col='is_win')
+    proc.save_target_encoder('models/target_encoder.json')   # 別プロセスで load_target_encoder して再利用
+    proc.update_target_encoder(new_races_df)                  # 新しいレースの sum/count を足し込む
 
     model, feature_names = train_lgbm_model(df, features=[...], target='is_win')
     plot_feature_importance(model, feature_names)
 
     preds = model.predict_proba(X)[:,1]
     bets = generate_bet_strategy(horses_df_with_preds, bankroll=50000)
+    # 複数レースをまとめて: race_id ごとに合計購入額が資金を超えないよう按分
+    bets = generate_bet_strategy(many_races_df, race_col='race_id', kelly_fraction=0.25, max_stake_frac=0.05)
 
 """
+import json
+import os
+import re
+from pathlib import Path
 from typing import Optional, Dict, Any, Tuple, List
 import pandas as pd
 import numpy as np
@@ -30,6 +38,253 @@ except Exception:
 from sklearn.model_selection import train_test_split
 
 
+class LineageMatcher:
+    """父馬名 -> 系統名 の部分一致マッチャ（正規表現 1 本にコンパイル）。
+
+    名前に複数のキーが含まれる場合の優先順位は決定的:
+      1. 長いキーを優先（'サンデーサイレンス' > 'サンデー'）
+      2. 同じ長さなら lineage_map での登録順
+    priority に明示的なキー順を渡すとそれを優先順位とする（含まれないキーは後ろに既定順で並ぶ）。
+
+    名前ごとの結果はメモ化し、列全体は一意な名前だけを判定して割り当てる。
+    """
+
+    def __init__(self, lineage_map: Dict[str, str], priority: Optional[List[str]] = None,
+                 unknown: str = '不明', other: str = 'その他'):
+        self.lineage_map = dict(lineage_map)
+        keys = [k for k in self.lineage_map if k]
+        default = sorted(keys, key=lambda k: (-len(k), keys.index(k)))
+        explicit = [k for k in (priority or []) if k in self.lineage_map]
+        self.priority: List[str] = explicit + [k for k in default if k not in explicit]
+        self._rank = {k: i for i, k in enumerate(self.priority)}
+        self.unknown = unknown
+        self.other = other
+        self._memo: Dict[str, str] = {}
+        # 先読み (?=(...)) で全位置の一致を拾う（重なっている一致も取りこぼさない）。
+        # 各位置では優先順位の順に試す（同じ位置から始まるキーは、順位の高い方が捕まる）
+        alt = '|'.join(re.escape(k) for k in self.priority)
+        self._pattern = re.compile(f'(?=({alt}))') if alt else None
+
+    def match(self, name: Any) -> str:
+        if name is None or (isinstance(name, float) and np.isnan(name)) or name is pd.NA:
+            return self.unknown
+        name = str(name)
+        hit = self._memo.get(name)
+        if hit is not None:
+            return hit
+        best = None
+        if self._pattern is not None:
+            for m in self._pattern.finditer(name):
+                key = m.group(1)
+                if best is None or self._rank[key] < self._rank[best]:
+                    best = key
+        val = self.lineage_map[best] if best is not None else self.other
+        self._memo[name] = val
+        return val
+
+    def map_series(self, names: pd.Series) -> pd.Series:
+        """列をまとめて変換する（一意な名前だけ判定し、factorize のコードで展開）。"""
+        codes, uniques = pd.factorize(names, use_na_sentinel=True)
+        mapped = np.array([self.match(u) for u in uniques] + [self.unknown], dtype=object)
+        return pd.Series(mapped[codes], index=names.index, name=names.name)
+
+
+class TargetEncoder:
+    """複数のカテゴリ列をまとめて扱う平滑化ターゲットエンコーダ。
+
+    カテゴリごとの目的変数の合計と件数（sum/count）だけを保持するので、
+    新しいレースが入ったら update() で足し込むだけでよい（全件の再集計は不要）。
+
+        posterior = (sum_y + prior_weight * global_mean) / (count + prior_weight)
+
+    学習データ自身のエンコードには fit_transform(..., n_splits=K) を使う。各行は
+    自分が属さない fold だけで集計した値になる（目的変数のリーク防止）。
+    集計は列ごとに (fold, カテゴリ) の groupby 1 回で、全体 - fold 分 で求める。
+
+    save() / load() で JSON に保存・復元できる。
+    """
+
+    def __init__(self, prior_weight: float = 10.0):
+        self.prior_weight = float(prior_weight)
+        self.target_col: Optional[str] = None
+        self.total_sum = 0.0
+        self.total_count = 0
+        # 列名 -> DataFrame(index=カテゴリ, columns=['sum', 'count'])
+        self.stats: Dict[str, pd.DataFrame] = {}
+
+    @property
+    def columns(self) -> List[str]:
+        return list(self.stats)
+
+    @property
+    def global_mean(self) -> float:
+        return self.total_sum / self.total_count if self.total_count else 0.0
+
+    @staticmethod
+    def _as_list(cols) -> List[str]:
+        return [cols] if isinstance(cols, str) else list(cols)
+
+    @staticmethod
+    def _group_stats(keys: pd.Series, y: pd.Series) -> pd.DataFrame:
+        return y.groupby(keys, observed=True, sort=False).agg(['sum', 'count'])
+
+    def _check_target(self, target_col: Optional[str]) -> str:
+        target_col = target_col or self.target_col
+        if target_col is None:
+            raise ValueError('target_col is required')
+        if self.target_col is not None and target_col != self.target_col:
+            raise ValueError(f'encoder was fitted on {self.target_col!r}, got {target_col!r}')
+        return target_col
+
+    def fit(self, df: pd.DataFrame, cols, target_col: str) -> 'TargetEncoder':
+        """集計をやり直して学習する。"""
+        self.target_col = None
+        self.total_sum = 0.0
+        self.total_count = 0
+        self.stats = {}
+        return self.update(df, cols, target_col)
+
+    def update(self, df: pd.DataFrame, cols=None, target_col: Optional[str] = None) -> 'TargetEncoder':
+        """新しい行の sum/count を既存の集計に足し込む。cols 省略時は学習済みの列。"""
+        target_col = self._check_target(target_col)
+        cols = self._as_list(cols) if cols is not None else self.columns
+        y = df[target_col].astype(float)
+        mask = y.notna()
+        y = y[mask]
+        for col in cols:
+            new = self._group_stats(df.loc[mask, col], y)
+            old = self.stats.get(col)
+            if old is not None:
+                new = old.add(new, fill_value=0)
+            new['count'] = new['count'].astype(np.int64)
+            self.stats[col] = new
+        self.target_col = target_col
+        self.total_sum += float(y.sum())
+        self.total_count += int(len(y))
+        return self
+
+    def mapping(self, col: str) -> Dict[Any, float]:
+        """カテゴリ -> 平滑化済みの値。"""
+        st = self._stats(col)
+        smooth = (st['sum'] + self.prior_weight * self.global_mean) / (st['count'] + self.prior_weight)
+        return smooth.to_dict()
+
+    def _stats(self, col: str) -> pd.DataFrame:
+        st = self.stats.get(col)
+        if st is None:
+            raise ValueError('encoder for column not fitted: ' + col)
+        return st
+
+    def transform(self, df: pd.DataFrame, cols=None, suffix: str = '_te') -> pd.DataFrame:
+        """学習済みの集計で {col}{suffix} 列を追加した DataFrame を返す。未知カテゴリは全体平均。"""
+        df = df.copy()
+        gm = self.global_mean
+        for col in (self._as_list(cols) if cols is not None else self.columns):
+            mapping = pd.Series(self.mapping(col), dtype=float)
+            df[f'{col}{suffix}'] = df[col].map(mapping).astype(float).fillna(gm)
+        return df
+
+    def fit_transform(self, df: pd.DataFrame, cols, target_col: str, n_splits: int = 5,
+                      random_state: Optional[int] = 0, suffix: str = '_te') -> pd.DataFrame:
+        """学習し、学習データ自身を out-of-fold でエンコードして返す。
+
+        n_splits < 2 のときは全件の集計でそのまま変換する（リークあり・旧挙動）。
+        目的変数が欠損の行は集計に使わず、全体の集計で変換する。
+        """
+        cols = self._as_list(cols)
+        self.fit(df, cols, target_col)
+        if n_splits is None or n_splits < 2:
+            return self.transform(df, cols, suffix=suffix)
+
+        df = df.copy()
+        y = df[target_col].astype(float)
+        labeled = y.notna().to_numpy()
+        rng = np.random.default_rng(random_state)
+        fold = np.full(len(df), -1, dtype=np.int64)
+        fold[labeled] = rng.permutation(int(labeled.sum())) % n_splits
+        fold_s = pd.Series(fold, index=df.index)
+
+        # fold ごとの件数と合計 -> 自分の fold を除いた全体平均
+        yl = y[labeled]
+        fl = fold_s[labeled]
+        f_sum = yl.groupby(fl).sum().reindex(range(n_splits), fill_value=0.0).to_numpy()
+        f_cnt = yl.groupby(fl).count().reindex(range(n_splits), fill_value=0).to_numpy()
+        oof_cnt = self.total_count - f_cnt
+        oof_gm = np.divide(self.total_sum - f_sum, oof_cnt,
+                           out=np.full(n_splits, self.global_mean), where=oof_cnt > 0)
+        pw = self.prior_weight
+
+        for col in cols:
+            st = self.stats[col]
+            # (fold, カテゴリ) ごとの sum/count を 1 回の groupby で求める
+            per_fold = yl.groupby([fl, df.loc[labeled, col]], observed=True, sort=False).agg(['sum', 'count'])
+            keys = pd.MultiIndex.from_arrays([fold_s[labeled], df.loc[labeled, col]])
+            rows = per_fold.reindex(keys)
+            full = st.reindex(df.loc[labeled, col])
+            gm_row = oof_gm[fl.to_numpy()]
+            s = full['sum'].to_numpy() - rows['sum'].to_numpy()
+            c = full['count'].to_numpy() - rows['count'].to_numpy()
+            enc = np.full(len(df), np.nan)
+            enc[labeled] = (s + pw * gm_row) / (c + pw)
+            out = pd.Series(enc, index=df.index)
+            if not labeled.all():
+                mapping = pd.Series(self.mapping(col), dtype=float)
+                out[~labeled] = df.loc[~labeled, col].map(mapping).astype(float).to_numpy()
+            df[f'{col}{suffix}'] = out.fillna(self.global_mean)
+        return df
+
+    def encoder_dict(self, col: str) -> Dict[str, Any]:
+        """旧 fit_target_encode と同じ形式の dict（mapping / global_mean / prior_weight）。"""
+        return {
+            'mapping': self.mapping(col),
+            'global_mean': float(self.global_mean),
+            'prior_weight': float(self.prior_weight),
+        }
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'version': 1,
+            'prior_weight': self.prior_weight,
+            'target_col': self.target_col,
+            'total_sum': self.total_sum,
+            'total_count': self.total_count,
+            'stats': {
+                col: [[_json_key(k), float(r['sum']), int(r['count'])] for k, r in st.iterrows()]
+                for col, st in self.stats.items()
+            },
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'TargetEncoder':
+        enc = cls(prior_weight=data.get('prior_weight', 10.0))
+        enc.target_col = data.get('target_col')
+        enc.total_sum = float(data.get('total_sum', 0.0))
+        enc.total_count = int(data.get('total_count', 0))
+        for col, rows in data.get('stats', {}).items():
+            st = pd.DataFrame(rows, columns=['key', 'sum', 'count']).set_index('key')
+            st.index.name = col
+            st['count'] = st['count'].astype(np.int64)
+            enc.stats[col] = st
+        return enc
+
+    def save(self, path) -> None:
+        """JSON で保存する（一時ファイルに書いてから置き換える）。"""
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(path.name + '.tmp')
+        tmp.write_text(json.dumps(self.to_dict(), ensure_ascii=False), encoding='utf-8')
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path) -> 'TargetEncoder':
+        return cls.from_dict(json.loads(Path(path).read_text(encoding='utf-8')))
+
+
+def _json_key(key: Any) -> Any:
+    # numpy のスカラーは JSON にできないので Python の値にする
+    return key.item() if isinstance(key, np.generic) else key
+
+
 class HorseDataProcessor:
     """馬データの読み込みと前処理を行うユーティリティクラス。
 
@@ -37,7 +292,7 @@ class HorseDataProcessor:
     - レース結果と5代血統（ペディグリー）CSV読み込み・結合
     - 父馬名から大系統にマッピングして `lineage_group` を追加
     - トラック状態を数値化（良=0,稍重=1,重=2,不良=3）
-    - ターゲットエンコーディングの適用（平滑化あり）
+    - ターゲットエンコーディングの適用（平滑化・out-of-fold・追加学習、TargetEncoder を参照）
     """
 
     DEFAULT_TRACK_MAP = {
@@ -47,10 +302,14 @@ class HorseDataProcessor:
         '不良': 3,
     }
 
-    def __init__(self, lineage_map: Optional[Dict[str, str]] = None):
+    def __init__(self, lineage_map: Optional[Dict[str, str]] = None,
+                 lineage_priority: Optional[List[str]] = None):
         # lineage_map: 父馬名の一部/完全一致 -> 系統名
         self.lineage_map = lineage_map or self._default_lineage_map()
-        self._target_encoder: Dict[str, Dict[str, float]] = {}
+        self.lineage_priority = lineage_priority
+        self._matcher: Optional[LineageMatcher] = None
+        self._matcher_key = None
+        self._target_encoder: Optional[TargetEncoder] = None
 
     def _default_lineage_map(self) -> Dict[str, str]:
         # 簡易的なデフォルト辞書（実運用時は拡張推奨）
@@ -121,53 +380,89 @@ class HorseDataProcessor:
         """DataFrame を Parquet で保存するユーティリティ。"""
         df.to_parquet(path, index=False)
 
+    @property
+    def lineage_matcher(self) -> LineageMatcher:
+        """lineage_map から作ったマッチャ（lineage_map / lineage_priority が変わったら作り直す）。"""
+        key = (tuple(self.lineage_map.items()), tuple(self.lineage_priority or ()))
+        if self._matcher is None or self._matcher_key != key:
+            self._matcher = LineageMatcher(self.lineage_map, priority=self.lineage_priority)
+            self._matcher_key = key
+        return self._matcher
+
     def map_lineage(self, father_name: Optional[str]) -> str:
-        if pd.isna(father_name):
-            return '不明'
-        for key, val in self.lineage_map.items():
-            if key in str(father_name):
-                return val
-        return 'その他'
+        """父馬名を系統名に変換する（優先順位は LineageMatcher を参照）。"""
+        return self.lineage_matcher.match(father_name)
+
+    def map_lineage_series(self, names: pd.Series) -> pd.Series:
+        """列全体を系統名に変換する。行ごとの apply より大幅に速い。"""
+        return self.lineage_matcher.map_series(names)
 
     def process_lineage_and_conditions(self, df: pd.DataFrame,
                                        father_col: str = 'father_name',
                                        track_col: str = 'track_condition') -> pd.DataFrame:
         """系統マッピングと馬場状態の数値化を行う。"""
         df = df.copy()
-        df['lineage_group'] = df[father_col].apply(self.map_lineage)
+        df['lineage_group'] = self.map_lineage_series(df[father_col])
         df['track_numeric'] = df[track_col].map(self.DEFAULT_TRACK_MAP)
         df['track_numeric'] = df['track_numeric'].fillna(0).astype(int)
         return df
 
-    def fit_target_encode(self, df: pd.DataFrame, cat_col: str, target_col: str,
-                          prior_weight: float = 10.0) -> Tuple[pd.DataFrame, Dict[str, Any]]:
+    def fit_target_encode(self, df: pd.DataFrame, cat_col, target_col: str,
+                          prior_weight: float = 10.0, n_splits: int = 5,
+                          random_state: Optional[int] = 0) -> Tuple[pd.DataFrame, Dict[str, Any]]:
         """カテゴリ列にターゲットエンコーディングを学習・適用する。
 
         平滑化: posterior = (sum_y + prior*global_mean) / (count + prior)
-        返り値: (df_transformed, encoder_dict)
+        cat_col は列名のリストでもよい（列ごとに groupby 1 回）。
+        学習データ自身は n_splits 分割の out-of-fold 値で埋める（n_splits < 2 で全件集計）。
+        返り値: (df_transformed, encoder_dict)。encoder_dict は全件で集計した値で、
+        cat_col がリストのときは 列名 -> encoder_dict。
         """
-        df = df.copy()
-        global_mean = df[target_col].mean()
-        grp = df.groupby(cat_col)[target_col].agg(['sum', 'count'])
-        # smoothing
-        grp['smooth'] = (grp['sum'] + prior_weight * global_mean) / (grp['count'] + prior_weight)
-        encoder = grp['smooth'].to_dict()
-        # store encoder for later use
-        self._target_encoder[cat_col] = {
-            'mapping': encoder,
-            'global_mean': float(global_mean),
-            'prior_weight': float(prior_weight),
-        }
-        df[f'{cat_col}_te'] = df[cat_col].map(encoder).fillna(global_mean)
-        return df, self._target_encoder[cat_col]
-
-    def transform_with_target_encoder(self, df: pd.DataFrame, cat_col: str) -> pd.DataFrame:
-        df = df.copy()
-        enc = self._target_encoder.get(cat_col)
-        if not enc:
-            raise ValueError('encoder for column not fitted: ' + cat_col)
-        df[f'{cat_col}_te'] = df[cat_col].map(enc['mapping']).fillna(enc['global_mean'])
-        return df
+        enc = TargetEncoder(prior_weight=prior_weight)
+        df = enc.fit_transform(df, cat_col, target_col, n_splits=n_splits, random_state=random_state)
+        self._merge_encoder(enc)
+        if isinstance(cat_col, str):
+            return df, enc.encoder_dict(cat_col)
+        return df, {col: enc.encoder_dict(col) for col in enc.columns}
+
+    @property
+    def target_encoder(self) -> Optional[TargetEncoder]:
+        """最後に学習・読み込みしたエンコーダ（未学習なら None）。"""
+        return self._target_encoder
+
+    def update_target_encoder(self, df: pd.DataFrame, cat_col=None,
+                              target_col: Optional[str] = None) -> TargetEncoder:
+        """新しいレースの行を学習済みのエンコーダに足し込む（全件の再集計はしない）。"""
+        enc = self._target_encoder
+        if enc is None:
+            if cat_col is None or target_col is None:
+                raise ValueError('encoder not fitted; pass cat_col and target_col')
+            enc = self._target_encoder = TargetEncoder()
+        enc.update(df, cat_col, target_col)
+        return enc
+
+    def transform_with_target_encoder(self, df: pd.DataFrame, cat_col) -> pd.DataFrame:
+        if self._target_encoder is None:
+            raise ValueError('encoder for column not fitted: ' + str(cat_col))
+        return self._target_encoder.transform(df, cat_col)
+
+    def save_target_encoder(self, path) -> None:
+        if self._target_encoder is None:
+            raise ValueError('no target encoder fitted')
+        self._target_encoder.save(path)
+
+    def load_target_encoder(self, path) -> TargetEncoder:
+        self._target_encoder = TargetEncoder.load(path)
+        return self._target_encoder
+
+    def _merge_encoder(self, enc: TargetEncoder) -> None:
+        # 同じ目的変数・同じ学習データの列は 1 つのエンコーダにまとめて保存できるようにする
+        cur = self._target_encoder
+        if (cur is None or cur.target_col != enc.target_col or cur.total_count != enc.total_count
+                or cur.total_sum != enc.total_sum or cur.prior_weight != enc.prior_weight):
+            self._target_encoder = enc
+        else:
+            cur.stats.update(enc.stats)
 
 
 def train_lgbm_model(df: pd.DataFrame, features: List[str], target: str,
@@ -197,9 +492,15 @@ def train_lgbm_model(df: pd.DataFrame, features: List[str], target: str,
     train_data = lgb.Dataset(X_train, label=y_train)
     valid_data = lgb.Dataset(X_val, label=y_val, reference=train_data)
 
-    model = lgb.train(params, train_data, num_boost_round=num_boost_round,
-                      valid_sets=[valid_data], early_stopping_rounds=early_stopping_rounds,
-                      verbose_eval=False)
+    if hasattr(lgb, 'early_stopping'):
+        # lightgbm >= 4 では early_stopping_rounds / verbose_eval 引数が廃止されコールバックで指定する
+        model = lgb.train(params, train_data, num_boost_round=num_boost_round,
+                          valid_sets=[valid_data],
+                          callbacks=[lgb.early_stopping(early_stopping_rounds, verbose=False)])
+    else:
+        model = lgb.train(params, train_data, num_boost_round=num_boost_round,
+                          valid_sets=[valid_data], early_stopping_rounds=early_stopping_rounds,
+                          verbose_eval=False)
 
     return model, list(features)
 
@@ -225,8 +526,61 @@ def plot_feature_importance(model: Any, feature_names: List[str], top_n: int = 2
     plt.show()
 
 
+def compute_kelly_stakes(win_prob, odds, bankroll=50000.0, kelly_fraction: float = 0.5,
+                         race_ids=None, max_stake_frac: Optional[float] = None,
+                         max_race_frac: float = 1.0, mask=None) -> Dict[str, np.ndarray]:
+    """単勝のケリー基準による購入額を配列演算でまとめて計算する。
+
+    - win_prob / odds: 馬ごとの予測勝率（0-1）と小数オッズ（同じ長さの配列）
+    - bankroll: 資金。スカラーまたは馬ごとの配列（レースごとに資金が変わるシミュレーション用）
+    - kelly_fraction: ケリー比率に掛ける係数（1.0=フルケリー、0.5=ハーフケリー）
+    - race_ids: レースID。指定するとレース内の合計比率が max_race_frac を超えないよう按分で縮小する
+      （未指定なら全体を 1 レースとして扱う。欠損の馬は 1 頭で 1 レース）
+    - max_stake_frac: 1 頭あたりの上限（資金に対する比率）
+    - mask: False の馬は購入しない（例: 期待値が閾値未満）
+
+    返り値: {'expected_value', 'kelly', 'fraction', 'stake'} の配列 dict
+    """
+    p = np.asarray(win_prob, dtype=float)
+    o = np.asarray(odds, dtype=float)
+    ev = p * o
+    # decimal odds -> b = odds - 1
+    b = o - 1.0
+    with np.errstate(divide='ignore', invalid='ignore'):
+        kelly = np.where(b > 0, (b * p - (1.0 - p)) / b, 0.0)
+    kelly = np.nan_to_num(kelly, nan=0.0, posinf=0.0, neginf=0.0)
+
+    frac = np.clip(kelly, 0.0, 1.0) * float(kelly_fraction)
+    if max_stake_frac is not None:
+        frac = np.minimum(frac, float(max_stake_frac))
+    if mask is not None:
+        frac = np.where(np.asarray(mask, dtype=bool), frac, 0.0)
+    frac = np.clip(frac, 0.0, 1.0)
+
+    # レース内の合計比率を max_race_frac 以下に正規化
+    if len(frac):
+        if race_ids is None:
+            codes = np.zeros(len(frac), dtype=np.int64)
+        else:
+            codes = pd.factorize(np.asarray(race_ids))[0]
+            # レースID が欠けた馬は 1 頭ずつ別レースとして扱う
+            missing = codes < 0
+            if missing.any():
+                codes = codes.copy()
+                codes[missing] = codes.max() + 1 + np.arange(int(missing.sum()))
+        totals = np.bincount(codes, weights=frac)
+        scale = np.where(totals > max_race_frac, max_race_frac / np.where(totals > 0, totals, 1.0), 1.0)
+        frac = frac * scale[codes]
+
+    stake = frac * np.asarray(bankroll, dtype=float)
+    return {'expected_value': ev, 'kelly': kelly, 'fraction': frac, 'stake': stake}
+
+
 def generate_bet_strategy(horses: pd.DataFrame, win_prob_col: str = 'win_prob', odds_col: str = 'odds',
-                          bankroll: float = 50000.0, min_ev: float = 1.2, half_kelly: bool = True) -> pd.DataFrame:
+                          bankroll: float = 50000.0, min_ev: float = 1.2, half_kelly: bool = True,
+                          race_col: Optional[str] = None, kelly_fraction: Optional[float] = None,
+                          max_stake_frac: Optional[float] = None, max_race_frac: float = 1.0,
+                          only_recommended: bool = False) -> pd.DataFrame:
     """勝率とオッズから購入戦略を生成する。
 
     horses: DataFrame に少なくとも次のカラムがあることを期待する:
@@ -236,8 +590,17 @@ def generate_bet_strategy(horses: pd.DataFrame, win_prob_col: str = 'win_prob',
       - win_prob_col (予測勝率、0-1)
       - odds_col (現在のオッズ、小数)
 
+    複数レースをまとめて渡す場合は race_col（例: 'race_id'）を指定する。
+    購入額は compute_kelly_stakes で一括計算し、レースごとの合計が
+    bankroll * max_race_frac を超えないよう按分する。
+
+    - kelly_fraction: 指定時は half_kelly より優先（1.0=フル、0.5=ハーフ、0.25 など）
+    - max_stake_frac: 1 頭あたりの購入上限（bankroll に対する比率）
+    - only_recommended: True なら期待値が min_ev 未満の馬には賭けない
+
     出力DataFrameに以下を付与して返す:
       ['horse_no','horse_name','lineage_group','win_prob','expected_value','recommended','stake']
+      （race_col 指定時は先頭にレースID列）
     """
     df = horses.copy()
     # normalize column names
@@ -246,35 +609,23 @@ def generate_bet_strategy(horses: pd.DataFrame, win_prob_col: str = 'win_prob',
     if 'horse_name' not in df.columns and 'name' in df.columns:
         df = df.rename(columns={'name':'horse_name'})
 
-    p = df[win_prob_col].astype(float)
-    odds = df[odds_col].astype(float)
-    ev = p * odds
+    p = df[win_prob_col].astype(float).to_numpy()
+    odds = df[odds_col].astype(float).to_numpy()
+    if kelly_fraction is None:
+        kelly_fraction = 0.5 if half_kelly else 1.0
+
+    recommended = p * odds >= min_ev
+    res = compute_kelly_stakes(p, odds, bankroll=bankroll, kelly_fraction=kelly_fraction,
+                               race_ids=df[race_col].to_numpy() if race_col else None,
+                               max_stake_frac=max_stake_frac, max_race_frac=max_race_frac,
+                               mask=recommended if only_recommended else None)
     df['win_prob'] = p
     df['odds'] = odds
-    df['expected_value'] = ev
-    df['recommended'] = ev >= min_ev
-
-    stakes = []
-    for pi, oi in zip(p, odds):
-        # decimal odds -> b = odds - 1
-        b = oi - 1.0
-        q = 1.0 - pi
-        if b <= 0:
-            f = 0.0
-        else:
-            f = (b * pi - q) / b  # Kelly fraction
-        if f <= 0:
-            stake = 0.0
-        else:
-            if half_kelly:
-                f = f * 0.5
-            f = max(0.0, min(1.0, f))
-            stake = f * bankroll
-        stakes.append(stake)
-
-    df['stake'] = stakes
+    df['expected_value'] = res['expected_value']
+    df['recommended'] = recommended
+    df['stake'] = res['stake']
 
-    out_cols = []
+    out_cols = [race_col] if race_col else []
     for c in ['horse_no','horse_name','lineage_group','win_prob','expected_value','recommended','stake']:
         if c in df.columns:
             out_cols.append(c)
@@ -286,6 +637,8 @@ def generate_bet_strategy(horses: pd.DataFrame, win_prob_col: str = 'win_prob',
     if 'expected_value' in out.columns:
         out['expected_value'] = out['expected_value'].round(3)
 
+    if race_col:
+        return out.sort_values([race_col, 'expected_value'], ascending=[True, False], kind='stable')
     return out.sort_values('expected_value', ascending=False)
 
 
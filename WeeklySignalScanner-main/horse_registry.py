@@ -0,0 +1,243 @@
+"""
+競馬 LightGBM モデルのローカルレジストリ
+
+学習済みの booster・特徴量リスト・ターゲットエンコーダ・欠損補完値を
+models/horse/v<NNNN>/ にまとめて保存し、別セッション・別プロセスから読み直して使う。
+
+- 各バージョンには学習データのフィンガープリント（特徴量・目的変数・学習パラメータのハッシュ）を記録する。
+  同じフィンガープリントのモデルが既にあれば find() で見つかるので、再学習を省ける
+- load() は booster をテキストから復元するだけで、ディレクトリの mtime が変わらない限りメモリ上の結果を返す
+- RegisteredModel.predict() は学習時の欠損補完値とエンコーダを当てて、まとめて予測する
+
+使い方:
+    python horse_registry.py list
+    python horse_registry.py show 3
+"""
+import argparse
+import datetime
+import hashlib
+import json
+import os
+import sys
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from horse_model import TargetEncoder
+
+try:
+    import lightgbm as lgb
+except Exception:
+    lgb = None
+
+BASE_DIR = Path(__file__).resolve().parent
+REGISTRY_DIR = Path(os.environ.get('HORSE_MODEL_DIR', str(BASE_DIR / 'models' / 'horse')))
+INDEX_NAME = 'index.json'
+MODEL_FILE = 'model.txt'
+META_FILE = 'meta.json'
+ENCODER_FILE = 'encoder.json'
+PREDICT_BATCH = 100_000
+
+_cache = {}
+
+
+def _now():
+    return datetime.datetime.now(datetime.timezone.utc).isoformat()
+
+
+def _read_json(path, default=None):
+    try:
+        with open(path, 'r', encoding='utf-8') as fh:
+            return json.load(fh)
+    except Exception:
+        return default
+
+
+def _write_json(path, data):
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    with open(tmp, 'w', encoding='utf-8') as fh:
+        json.dump(data, fh, ensure_ascii=False, indent=1, default=str)
+    os.replace(tmp, path)
+
+
+def _mtime_ns(path):
+    try:
+        return os.stat(path).st_mtime_ns
+    except OSError:
+        return None
+
+
+def _version_dir(version, root=None):
+    return Path(root or REGISTRY_DIR) / f"v{int(version):04d}"
+
+
+def data_fingerprint(df: pd.DataFrame, features: List[str], target: str,
+                     params: Optional[Dict[str, Any]] = None) -> str:
+    """学習に使う列・値・パラメータから決まるハッシュ。行順が同じなら同じ値になる。"""
+    h = hashlib.sha1()
+    h.update(json.dumps({'features': list(features), 'target': target, 'params': params or {}},
+                        sort_keys=True, default=str).encode('utf-8'))
+    cols = [c for c in list(features) + [target] if c in df.columns]
+    h.update(pd.util.hash_pandas_object(df[cols], index=False).to_numpy().tobytes())
+    return h.hexdigest()
+
+
+def fill_values(df: pd.DataFrame, features: List[str]) -> Dict[str, Any]:
+    """学習時の欠損補完値（数値は中央値、それ以外は 'その他'）。"""
+    out = {}
+    for c in features:
+        s = df[c]
+        if s.dtype.kind in 'biufc':
+            med = s.median()
+            out[c] = None if pd.isna(med) else float(med)
+        else:
+            out[c] = 'その他'
+    return out
+
+
+class RegisteredModel:
+    """レジストリから読み込んだモデル 1 バージョン分。"""
+
+    def __init__(self, booster: Any, meta: Dict[str, Any], encoder: Optional[TargetEncoder] = None):
+        self.booster = booster
+        self.meta = meta
+        self.encoder = encoder
+
+    @property
+    def version(self) -> int:
+        return int(self.meta['version'])
+
+    @property
+    def features(self) -> List[str]:
+        return list(self.meta['features'])
+
+    def prepare(self, df: pd.DataFrame) -> pd.DataFrame:
+        """特徴量行列を作る。*_te 列が無ければ保存済みエンコーダで付け、欠損は学習時の値で埋める。"""
+        if self.encoder is not None:
+            need = [c for c in self.encoder.columns if f'{c}_te' in self.features
+                    and f'{c}_te' not in df.columns and c in df.columns]
+            if need:
+                df = self.encoder.transform(df, need)
+        missing = [c for c in self.features if c not in df.columns]
+        if missing:
+            raise ValueError(f'missing feature columns: {missing}')
+        X = df[self.features].copy()
+        fills = {c: v for c, v in (self.meta.get('fill_values') or {}).items() if v is not None}
+        return X.fillna(fills)
+
+    def predict(self, df: pd.DataFrame, batch_size: int = PREDICT_BATCH) -> np.ndarray:
+        """勝率を予測する。大きな出走表は batch_size 行ずつ予測して連結する。"""
+        X = self.prepare(df)
+        if len(X) <= batch_size:
+            return np.asarray(self.booster.predict(X))
+        return np.concatenate([np.asarray(self.booster.predict(X.iloc[i:i + batch_size]))
+                               for i in range(0, len(X), batch_size)])
+
+
+def read_index(root=None) -> Dict[str, Any]:
+    """{'latest': int|None, 'versions': [{version, fingerprint, created_at, ...}]} を返す。"""
+    return _read_json(Path(root or REGISTRY_DIR) / INDEX_NAME, default=None) or {'latest': None, 'versions': []}
+
+
+def list_versions(root=None) -> List[Dict[str, Any]]:
+    return list(read_index(root).get('versions') or [])
+
+
+def find(fingerprint: str, root=None) -> Optional[int]:
+    """フィンガープリントが一致する最新のバージョン番号。無ければ None。"""
+    hits = [v['version'] for v in list_versions(root) if v.get('fingerprint') == fingerprint]
+    return max(hits) if hits else None
+
+
+def save(model: Any, features: List[str], fingerprint: str, target: str = 'is_win',
+         encoder: Optional[TargetEncoder] = None, fills: Optional[Dict[str, Any]] = None,
+         params: Optional[Dict[str, Any]] = None, metrics: Optional[Dict[str, Any]] = None,
+         note: str = '', root=None) -> int:
+    """モデルを新しいバージョンとして保存し、バージョン番号を返す。"""
+    root = Path(root or REGISTRY_DIR)
+    index = read_index(root)
+    version = max([v['version'] for v in index['versions']] or [0]) + 1
+    vdir = _version_dir(version, root)
+    vdir.mkdir(parents=True, exist_ok=True)
+    booster = getattr(model, 'booster_', model)
+    booster.save_model(str(vdir / MODEL_FILE))
+    if encoder is not None:
+        encoder.save(vdir / ENCODER_FILE)
+    meta = {
+        'version': version,
+        'fingerprint': fingerprint,
+        'created_at': _now(),
+        'features': list(features),
+        'target': target,
+        'fill_values': fills or {},
+        'params': params or {},
+        'metrics': metrics or {},
+        'best_iteration': getattr(booster, 'best_iteration', None),
+        'note': note,
+    }
+    _write_json(vdir / META_FILE, meta)
+    entry = {k: meta[k] for k in ('version', 'fingerprint', 'created_at', 'target', 'note')}
+    entry['n_features'] = len(features)
+    index['versions'].append(entry)
+    index['latest'] = version
+    _write_json(root / INDEX_NAME, index)
+    return version
+
+
+def load(version: Optional[int] = None, root=None) -> RegisteredModel:
+    """バージョンを読み込む（省略時は最新）。同じバージョンはファイルが変わらない限りキャッシュを返す。"""
+    if lgb is None:
+        raise RuntimeError('lightgbm がインストールされていません。')
+    root = Path(root or REGISTRY_DIR)
+    if version is None:
+        version = read_index(root).get('latest')
+        if version is None:
+            raise FileNotFoundError(f'no model registered under {root}')
+    vdir = _version_dir(version, root)
+    key = (str(root), int(version))
+    token = (_mtime_ns(vdir / MODEL_FILE), _mtime_ns(vdir / META_FILE), _mtime_ns(vdir / ENCODER_FILE))
+    hit = _cache.get(key)
+    if hit is not None and hit[0] == token:
+        return hit[1]
+    if token[0] is None:
+        raise FileNotFoundError(f'model v{version} not found under {root}')
+    meta = _read_json(vdir / META_FILE, default={}) or {}
+    meta.setdefault('version', int(version))
+    booster = lgb.Booster(model_file=str(vdir / MODEL_FILE))
+    encoder = TargetEncoder.load(vdir / ENCODER_FILE) if token[2] is not None else None
+    result = RegisteredModel(booster, meta, encoder)
+    _cache[key] = (token, result)
+    return result
+
+
+def parse_args():
+    p = argparse.ArgumentParser(description='Horse LightGBM model registry')
+    p.add_argument('--root', type=str, default=None, help='Registry directory (default: models/horse/)')
+    sub = p.add_subparsers(dest='cmd', required=True)
+    sub.add_parser('list')
+    s = sub.add_parser('show')
+    s.add_argument('version', type=int)
+    return p.parse_args()
+
+
+def main():
+    args = parse_args()
+    if args.cmd == 'list':
+        latest = read_index(args.root).get('latest')
+        for v in list_versions(args.root):
+            mark = '*' if v['version'] == latest else ' '
+            print(f"{mark}v{v['version']:<4} {v['n_features']:>3} features  {v['fingerprint'][:12]}  {v['created_at']}  {v.get('note', '')}")
+    elif args.cmd == 'show':
+        meta = _read_json(_version_dir(args.version, args.root) / META_FILE)
+        if meta is None:
+            print(f"v{args.version}: not found", file=sys.stderr)
+            return
+        print(json.dumps(meta, ensure_ascii=False, indent=1))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,317 @@
+"""
+取得 → スキャンの差分パイプライン（新しい足が入った銘柄だけを再評価する）
+
+取得（run_universe.py --fetch / Streamlit のダウンロード）とスキャン（--scan / scan_all_jp_batch）は
+それぞれ全銘柄を走査していたため、数百銘柄しか更新されていなくてもスキャンは全件を読み直していた。
+ここでは
+
+- data_fetcher → indicator_state が、新しい足が入った銘柄を変更ログに残す
+- run() はスキャンごとのカーソルから先の変更（と、別スクリプトで書かれた parquet）だけを
+  indicator_state の snapshot で再評価し、前回までのヒット集合（<data_dir>/.indicators/scans.sqlite）に反映する
+- 反映後のヒット集合全体を results_catalog に保存する（<prefix>_<日付>_incremental.csv、同じ日の再実行は上書き）
+
+各銘柄の判定はその銘柄のデータだけで決まるため、更新の無い銘柄の前回の判定はそのまま使える。
+初回（カーソルが無い）と full=True のときは全銘柄を評価する。
+
+使い方:
+    python incremental_scan.py run weekly_ma52_engulfing
+    python incremental_scan.py run momentum --full
+    python incremental_scan.py status
+"""
+import argparse
+import datetime
+import json
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+
+import pandas as pd
+
+import indicator_state
+
+SCANS_DB_NAME = 'scans.sqlite'
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS scan_rows (
+    scan_key TEXT NOT NULL,
+    ticker TEXT NOT NULL,
+    bar_date TEXT,
+    row TEXT NOT NULL,
+    evaluated_at REAL NOT NULL,
+    PRIMARY KEY (scan_key, ticker)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS scan_runs (
+    scan_key TEXT PRIMARY KEY,
+    scan_type TEXT NOT NULL,
+    params TEXT,
+    last_run_at REAL,
+    last_evaluated INTEGER,
+    last_full_at REAL,
+    last_path TEXT
+);
+"""
+
+_lock = threading.Lock()
+
+
+def _noop_progress(done, total, message=''):
+    pass
+
+
+# ---------------------------------------------------------------------------
+# スキャンごとの判定（ticker, snapshot, params -> 結果行 or None）
+# ---------------------------------------------------------------------------
+
+def _eval_weekly(ticker, snap, params):
+    import config
+    import screener
+    # scan_all_jp_batch と同じ対象（コード 1300 以上・除外銘柄以外）
+    try:
+        if int(ticker.replace('.T', '')) < 1300:
+            return None
+    except ValueError:
+        return None
+    if ticker in config.EXCLUDE_TICKERS:
+        return None
+    ok = screener.check_signal_from_snapshot(ticker, snap, require_ma52=bool(params.get('require_ma52', True)),
+                                             require_engulfing=bool(params.get('require_engulfing', True)),
+                                             relaxed_engulfing=bool(params.get('relaxed_engulfing', False)))
+    return {'ticker': ticker, 'price': round(float(snap['close']), 2)} if ok else None
+
+
+def _eval_momentum(ticker, snap, params):
+    from scan_tasks import _momentum_hit
+    # momentum_scan と同じく 25 本未満の銘柄は判定しない（差分スキャンではネット取得で補わない）
+    if snap['n_days'] < 25 or not snap['prev_close']:
+        return None
+    return _momentum_hit(ticker, snap['close'], snap['change_pct'], snap['volume_ratio'], snap['ma25'],
+                         min_change_pct=float(params['min_change_pct']),
+                         min_volume_ratio=float(params['min_volume_ratio']),
+                         max_ma25_deviation_pct=float(params['max_ma25_deviation_pct']))
+
+
+def _eval_monthly_gc(ticker, snap, params):
+    from scan_tasks import _gc_hit
+    if snap['n_months'] < 24:
+        return None
+    return _gc_hit(ticker, snap, int(params.get('within_months', 0)))
+
+
+def _weekly_prefix(params):
+    return '全銘柄_MA52_陽線包み' + ('_緩和' if params.get('relaxed_engulfing') else '')
+
+
+def _gc_prefix(params):
+    n = int(params.get('within_months', 0))
+    return '月足_MA9_MA24_GoldenCross' + (f'_within{n}m' if n > 0 else '')
+
+
+# scan_type -> 判定関数・既定パラメータ（フルスキャンが results_catalog に登録するものと同じ）・出力の並び
+SCANS = {
+    'weekly_ma52_engulfing': {
+        'evaluate': _eval_weekly,
+        'defaults': {'relaxed_engulfing': False, 'require_ma52': True},
+        'prefix': _weekly_prefix,
+        'columns': ['ticker', 'price'],
+        'sort': (['price'], [True]),
+        'encoding': 'utf-8',
+    },
+    'momentum': {
+        'evaluate': _eval_momentum,
+        'defaults': {'min_change_pct': 5.0, 'min_volume_ratio': 3.0, 'max_ma25_deviation_pct': 20.0},
+        'prefix': lambda params: '短期_初動',
+        'columns': ['コード', '本日終値', '前日比(%)', '出来高倍率', '25日線乖離率(%)'],
+        'sort': (['前日比(%)'], [False]),
+        'encoding': 'utf-8-sig',
+    },
+    'monthly_gc': {
+        'evaluate': _eval_monthly_gc,
+        'defaults': {'within_months': 0, 'cache_only': True},
+        'prefix': _gc_prefix,
+        'columns': ['ticker', 'cross_month', 'ma9', 'ma24', 'latest_close'],
+        'sort': (['latest_close'], [True]),
+        'encoding': 'utf-8',
+    },
+}
+
+SCAN_LABELS = {
+    'weekly_ma52_engulfing': '週足 MA52 + 陽線包み',
+    'momentum': '短期_初動',
+    'monthly_gc': '月足 MA9/MA24 GC',
+}
+
+
+# ---------------------------------------------------------------------------
+# 前回までのヒット集合
+# ---------------------------------------------------------------------------
+
+def _connect(data_dir):
+    path = indicator_state.state_path(data_dir).parent / SCANS_DB_NAME
+    path.parent.mkdir(parents=True, exist_ok=True)
+    conn = sqlite3.connect(str(path), timeout=30)
+    conn.execute('PRAGMA journal_mode=WAL')
+    conn.executescript(_SCHEMA)
+    return conn
+
+
+def scan_key(scan_type, params):
+    import results_catalog
+    return f"{scan_type}:{results_catalog.params_hash(params)}"
+
+
+def current_rows(scan_type, params=None, data_dir=None):
+    """前回までのヒット集合（DataFrame、スキャンの出力と同じ列）。"""
+    spec = SCANS[scan_type]
+    params = dict(spec['defaults'], **(params or {}))
+    conn = _connect(data_dir or indicator_state._default_dir())
+    try:
+        rows = conn.execute('SELECT row FROM scan_rows WHERE scan_key = ?', (scan_key(scan_type, params),)).fetchall()
+    finally:
+        conn.close()
+    df = pd.DataFrame([json.loads(r) for (r,) in rows], columns=spec['columns'])
+    by, asc = spec['sort']
+    return df.sort_values(by, ascending=asc, na_position='last').reset_index(drop=True) if not df.empty else df
+
+
+def run(scan_type, params=None, data_dir=None, results_dir=None, full=False, write=True, progress=_noop_progress):
+    """
+    変更のあった銘柄だけを再評価してヒット集合を更新し、集合全体を結果ファイルとして保存する。
+
+    戻り値: {'scan_type', 'evaluated', 'hits', 'added', 'removed', 'full', 'path'}。
+    何も変わっておらず今日のファイルが既にあれば書き直さない（path は前回のもの）。
+    """
+    spec = SCANS[scan_type]
+    params = dict(spec['defaults'], **(params or {}))
+    data_dir = str(data_dir or indicator_state._default_dir())
+    key = scan_key(scan_type, params)
+    consumer = f"incremental_scan:{key}"
+
+    # ここまでの変更を処理対象にする（処理中に追記された分は次回に回す）
+    upto = indicator_state.latest_seq(data_dir)
+    cursor = indicator_state.get_cursor(consumer, data_dir)
+    stale, removed = indicator_state.stale_tickers(data_dir)
+    if full or cursor is None:
+        full = True
+        tickers = sorted(t[:-len('.parquet')] for t in os.listdir(data_dir) if t.endswith('.parquet'))
+    else:
+        tickers = sorted(indicator_state.changes_since(cursor, upto, data_dir) | stale)
+
+    progress(0, len(tickers), f"{SCAN_LABELS.get(scan_type, scan_type)}: {len(tickers)} 銘柄を評価")
+    snaps = indicator_state.snapshots(tickers, data_dir) if tickers else {}
+    # snapshots() が古い状態を作り直すと変更ログに追記される。評価済みの銘柄の分はここで消化し、
+    # その間に別の取得が書いた銘柄があれば続けて評価する
+    while True:
+        seq = indicator_state.latest_seq(data_dir)
+        extra = sorted(indicator_state.changes_since(upto, seq, data_dir) - set(tickers)) if seq > upto else []
+        upto = seq
+        if not extra:
+            break
+        snaps.update(indicator_state.snapshots(extra, data_dir))
+        tickers += extra
+    now = time.time()
+    upserts, deletes = [], []
+    for i, t in enumerate(tickers):
+        if i % 500 == 0:
+            progress(i, len(tickers), f"{SCAN_LABELS.get(scan_type, scan_type)}: 評価中 {i}/{len(tickers)}")
+        snap = snaps.get(t)
+        row = spec['evaluate'](t, snap, params) if snap else None
+        if row is None:
+            deletes.append((key, t))
+        else:
+            upserts.append((key, t, snap['date'], json.dumps(row, ensure_ascii=False), now))
+    deletes += [(key, t) for t in removed]
+
+    conn = _connect(data_dir)
+    try:
+        before = {t for (t,) in conn.execute('SELECT ticker FROM scan_rows WHERE scan_key = ?', (key,))}
+        with _lock, conn:
+            if full:
+                conn.execute('DELETE FROM scan_rows WHERE scan_key = ?', (key,))
+            conn.executemany('DELETE FROM scan_rows WHERE scan_key = ? AND ticker = ?', deletes)
+            conn.executemany('INSERT OR REPLACE INTO scan_rows (scan_key, ticker, bar_date, row, evaluated_at) '
+                             'VALUES (?, ?, ?, ?, ?)', upserts)
+        after = {t for (t,) in conn.execute('SELECT ticker FROM scan_rows WHERE scan_key = ?', (key,))}
+        last = conn.execute('SELECT last_path FROM scan_runs WHERE scan_key = ?', (key,)).fetchone()
+    finally:
+        conn.close()
+
+    today = datetime.date.today().isoformat()
+    name = f"{spec['prefix'](params)}_{today}_incremental.csv"
+    path = last[0] if last else None
+    if write and (tickers or removed or not path or Path(path).name != name or not os.path.exists(path)):
+        import results_catalog
+        entry = results_catalog.save_result(current_rows(scan_type, params, data_dir), scan_type,
+                                            params=params, as_of=today, name=name, results_dir=results_dir,
+                                            encoding=spec['encoding'])
+        path = entry['csv_path']
+
+    conn = _connect(data_dir)
+    try:
+        with _lock, conn:
+            conn.execute('INSERT INTO scan_runs (scan_key, scan_type, params, last_run_at, last_evaluated, last_full_at, last_path) '
+                         'VALUES (?, ?, ?, ?, ?, ?, ?) ON CONFLICT(scan_key) DO UPDATE SET '
+                         'last_run_at = excluded.last_run_at, last_evaluated = excluded.last_evaluated, '
+                         'last_full_at = COALESCE(excluded.last_full_at, scan_runs.last_full_at), last_path = excluded.last_path',
+                         (key, scan_type, json.dumps(params, ensure_ascii=False), now, len(tickers),
+                          now if full else None, path))
+    finally:
+        conn.close()
+    indicator_state.set_cursor(consumer, upto, data_dir)
+    indicator_state.prune_changes(data_dir)
+    progress(len(tickers), len(tickers), f"{SCAN_LABELS.get(scan_type, scan_type)}: {len(after)} 件（評価 {len(tickers)} 銘柄）")
+    return {
+        'scan_type': scan_type, 'evaluated': len(tickers), 'hits': len(after),
+        'added': len(after - before), 'removed': len(before - after), 'full': full, 'path': path,
+    }
+
+
+def status(data_dir=None):
+    """スキャンごとの最終実行・未処理の変更数。"""
+    data_dir = str(data_dir or indicator_state._default_dir())
+    conn = _connect(data_dir)
+    try:
+        runs = conn.execute('SELECT scan_key, scan_type, params, last_run_at, last_evaluated, last_full_at, last_path '
+                            'FROM scan_runs ORDER BY scan_key').fetchall()
+    finally:
+        conn.close()
+    out = []
+    for key, scan_type, params, last_run, evaluated, last_full, path in runs:
+        cursor = indicator_state.get_cursor(f"incremental_scan:{key}", data_dir) or 0
+        out.append({
+            'scan_key': key, 'scan_type': scan_type, 'params': params,
+            'last_run_at': datetime.datetime.fromtimestamp(last_run).strftime('%Y-%m-%d %H:%M:%S') if last_run else None,
+            'last_evaluated': evaluated,
+            'last_full_at': datetime.datetime.fromtimestamp(last_full).strftime('%Y-%m-%d %H:%M:%S') if last_full else None,
+            'pending_changes': len(indicator_state.changes_since(cursor, data_dir=data_dir)),
+            'last_path': path,
+        })
+    return out
+
+
+def parse_args():
+    p = argparse.ArgumentParser(description='Incremental fetch -> scan pipeline')
+    p.add_argument('--data-dir', type=str, default=None, help='Price cache directory (default: config.DATA_DIR)')
+    sub = p.add_subparsers(dest='cmd', required=True)
+    r = sub.add_parser('run')
+    r.add_argument('scan_type', choices=sorted(SCANS))
+    r.add_argument('--params', type=str, default='{}', help='JSON params (merged over the scan defaults)')
+    r.add_argument('--full', action='store_true', help='Re-evaluate every cached ticker')
+    r.add_argument('--results-dir', type=str, default=None)
+    sub.add_parser('status')
+    return p.parse_args()
+
+
+def main():
+    args = parse_args()
+    if args.cmd == 'run':
+        res = run(args.scan_type, json.loads(args.params), data_dir=args.data_dir, results_dir=args.results_dir, full=args.full)
+        print(json.dumps(res, ensure_ascii=False))
+    else:
+        for row in status(args.data_dir):
+            print(json.dumps(row, ensure_ascii=False))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,581 @@
+"""
+銘柄ごとのインジケータ状態（移動平均・出来高平均を新しい足の分だけ進める）
+
+各スキャンは 1 本足が増えただけでも全履歴から rolling 平均を計算し直していた
+（screener の MA52、短期_初動の MA25 と 20 日平均出来高、月足 GC の MA9/MA24）。
+ここでは銘柄ごとに
+
+- 日足: 直近 24 本の終値（と合計）、直近 21 本の出来高
+- 週足（W-FRI）: 作成中の週の OHLCV、直前の確定週、確定週の終値 51 本（と合計）
+- 月足: 作成中の月の OHLCV、確定月の終値 24 本（と合計）、直前の確定月の MA9/MA24、最後のゴールデンクロス
+
+を持ち、新しい日足が来たら 1 本ずつ進める（1 本あたり固定の計算量）。最新の 1 本は確定させずに
+pending として持ち、同じ日付の足が再取得されたら置き換える（yfinance の当日足は取引中に変わるため）。
+
+状態は <data_dir>/.indicators/state.sqlite に保存する（データディレクトリ直下の mtime を変えないよう
+サブディレクトリに置く）。data_fetcher が保存のたびに advance し、スキャン側は snapshots() で
+現在値を読む。parquet が状態より新しい（別の取得スクリプトで上書きされた）銘柄は、その場で
+parquet から進め直す。as-of 指定のスキャンは最新の状態を使えないので従来どおり全履歴から計算する。
+
+新しい足が入った（最新足が変わった）銘柄は同じ DB の変更ログ（changes）に追記され、
+incremental_scan が読み手ごとのカーソルから先の分だけを再評価する。
+
+使い方:
+    python indicator_state.py rebuild            # data/*.parquet から全銘柄の状態を作り直す
+    python indicator_state.py show 7203.T
+"""
+import argparse
+import datetime
+import json
+import math
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+
+import pandas as pd
+
+STATE_DIR_NAME = '.indicators'
+STATE_NAME = 'state.sqlite'
+STATE_VERSION = 1
+
+MA_DAILY = 25       # 短期_初動の MA25
+VOL_WINDOW = 20     # 平均出来高（当日と前日を除く 20 本: volumes.iloc[-22:-2]）
+MA_WEEKLY = 52      # 週足 MA52
+MA_MONTHLY_SHORT = 9
+MA_MONTHLY_LONG = 24
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS states (
+    ticker TEXT PRIMARY KEY,
+    last_date TEXT,
+    source_mtime REAL,
+    state TEXT NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS changes (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    ticker TEXT NOT NULL,
+    bar_date TEXT,
+    changed_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS cursors (
+    consumer TEXT PRIMARY KEY,
+    seq INTEGER NOT NULL,
+    updated_at REAL NOT NULL
+);
+"""
+
+_lock = threading.Lock()
+
+
+def _default_dir():
+    try:
+        import config
+        return config.DATA_DIR
+    except Exception:
+        return 'data'
+
+
+def state_path(data_dir=None):
+    return Path(data_dir or _default_dir()) / STATE_DIR_NAME / STATE_NAME
+
+
+def _connect(data_dir=None):
+    path = state_path(data_dir)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    conn = sqlite3.connect(str(path), timeout=30)
+    conn.execute('PRAGMA journal_mode=WAL')
+    conn.executescript(_SCHEMA)
+    return conn
+
+
+# ---------------------------------------------------------------------------
+# 状態の更新
+# ---------------------------------------------------------------------------
+
+def new_state():
+    return {
+        'v': STATE_VERSION,
+        'n_days': 0, 'last_committed': None, 'pending': None,
+        'd_close': [], 'd_close_sum': 0.0, 'd_vol': [],
+        'week': None, 'w_prev': None, 'w_close': [], 'w_close_sum': 0.0, 'n_weeks': 0,
+        'month': None, 'm_close': [], 'm_close_sum': 0.0, 'n_months': 0, 'm_ma': None, 'last_gc': None,
+    }
+
+
+def week_label(date):
+    """日付（'YYYY-MM-DD'）が属する週の金曜日（resample('W-FRI') のラベル）。"""
+    d = datetime.date.fromisoformat(date)
+    return (d + datetime.timedelta(days=(4 - d.weekday()) % 7)).isoformat()
+
+
+def month_label(date):
+    return date[:7]
+
+
+def _push(buf, total, value, maxlen):
+    """固定長バッファに追加して合計を更新する。新しい合計を返す。"""
+    buf.append(value)
+    total += value
+    if len(buf) > maxlen:
+        total -= buf.pop(0)
+    return total
+
+
+def _merge(agg, bar):
+    if agg is None:
+        return {'o': bar['o'], 'h': bar['h'], 'l': bar['l'], 'c': bar['c'], 'v': bar['v']}
+    return {'o': agg['o'], 'h': max(agg['h'], bar['h']), 'l': min(agg['l'], bar['l']), 'c': bar['c'], 'v': agg['v'] + bar['v']}
+
+
+def _mean_tail(buf, total, n, extra):
+    """buf の末尾 (n - len(extra)) 本と extra の平均。本数が足りなければ None。"""
+    need = n - len(extra)
+    if need < 0 or len(buf) < need:
+        return None
+    # バッファは最大でも窓の長さなので、はみ出す先頭分だけ合計から引く
+    s = total - sum(buf[:len(buf) - need]) if need < len(buf) else total
+    return (s + sum(extra)) / n
+
+
+def _monthly_ma(state, extra):
+    return (_mean_tail(state['m_close'], state['m_close_sum'], MA_MONTHLY_SHORT, extra),
+            _mean_tail(state['m_close'], state['m_close_sum'], MA_MONTHLY_LONG, extra))
+
+
+def _is_cross(prev, curr):
+    if prev is None or curr is None or None in prev or None in curr:
+        return False
+    return prev[0] <= prev[1] and curr[0] > curr[1]
+
+
+def _commit(state, bar):
+    """確定した日足 1 本を状態に反映する。"""
+    state['d_close_sum'] = _push(state['d_close'], state['d_close_sum'], bar['c'], MA_DAILY - 1)
+    state['d_vol'].append(bar['v'])
+    if len(state['d_vol']) > VOL_WINDOW + 1:
+        state['d_vol'].pop(0)
+    state['n_days'] += 1
+    state['last_committed'] = bar['date']
+
+    wl = week_label(bar['date'])
+    week = state['week']
+    if week is not None and week['label'] != wl:
+        state['w_prev'] = {k: week[k] for k in 'ohlc'}
+        state['w_close_sum'] = _push(state['w_close'], state['w_close_sum'], week['c'], MA_WEEKLY - 1)
+        state['n_weeks'] += 1
+        week = None
+    week = _merge(week, bar)
+    week['label'] = wl
+    state['week'] = week
+
+    ml = month_label(bar['date'])
+    month = state['month']
+    if month is not None and month['label'] != ml:
+        state['m_close_sum'] = _push(state['m_close'], state['m_close_sum'], month['c'], MA_MONTHLY_LONG)
+        state['n_months'] += 1
+        ma = _monthly_ma(state, [])
+        if _is_cross(state['m_ma'], ma):
+            state['last_gc'] = {'month': month['label'], 'ma9': ma[0], 'ma24': ma[1]}
+        state['m_ma'] = list(ma)
+        month = None
+    month = _merge(month, bar)
+    month['label'] = ml
+    state['month'] = month
+
+
+def _bars(df, after=None):
+    """日足 DataFrame を {'date','o','h','l','c','v'} の list にする（after より後の日付だけ）。"""
+    if df is None or df.empty or 'Close' not in df.columns:
+        return []
+    idx = pd.to_datetime(df.index, errors='coerce')
+    if getattr(idx, 'tz', None) is not None:
+        idx = idx.tz_localize(None)
+    dates = idx.strftime('%Y-%m-%d')
+    close = pd.to_numeric(df['Close'], errors='coerce').to_numpy()
+    cols = {k: (pd.to_numeric(df[c], errors='coerce').to_numpy() if c in df.columns else close)
+            for k, c in (('o', 'Open'), ('h', 'High'), ('l', 'Low'))}
+    vol = pd.to_numeric(df['Volume'], errors='coerce').fillna(0).to_numpy() if 'Volume' in df.columns else [0.0] * len(df)
+    out = {}
+    for i, d in enumerate(dates):
+        c = close[i]
+        if not isinstance(d, str) or c is None or math.isnan(c) or (after and d < after):
+            continue
+        bar = {'date': d, 'c': float(c), 'v': float(vol[i])}
+        for k in 'ohl':
+            x = cols[k][i]
+            bar[k] = float(c) if math.isnan(x) else float(x)
+        out[d] = bar   # 同じ日付が重複していれば後の行を使う
+    return [out[d] for d in sorted(out)]
+
+
+def advance(state, df):
+    """
+    日足 DataFrame のうち状態より新しい足で状態を進める（state は更新して返す。None なら新規作成）。
+
+    pending と同じ日付の足は置き換え、それより新しい足が来たら pending を確定させる。
+    確定済みの日付以前の足は無視する（過去の修正値は rebuild で反映する）。
+    """
+    state = state or new_state()
+    pending = state['pending']
+    after = pending['date'] if pending else state['last_committed']
+    for bar in _bars(df, after=after):
+        if pending is not None and bar['date'] == pending['date']:
+            pending = bar
+            continue
+        if state['last_committed'] and bar['date'] <= state['last_committed']:
+            continue
+        if pending is not None:
+            _commit(state, pending)
+        pending = bar
+    state['pending'] = pending
+    return state
+
+
+def build(df):
+    """全履歴から状態を作る。"""
+    return advance(None, df)
+
+
+# ---------------------------------------------------------------------------
+# 現在値
+# ---------------------------------------------------------------------------
+
+def snapshot(state):
+    """
+    状態から最新の足時点の指標を返す（dict）。計算できない値は None。
+
+    week / prev_week は週足（W-FRI）の OHLC、ma52 は作成中の週を含む 52 週平均（screener と同じ）。
+    gc_month は MA9 が MA24 を上抜けた最後の月（作成中の月を含む。scan_tasks.monthly_gc_scan と同じ）。
+    """
+    p = state.get('pending') if state else None
+    if not p:
+        return None
+    d_close = state['d_close']
+    n_days = state['n_days'] + 1
+    prev_close = d_close[-1] if d_close else None
+    ma25 = (state['d_close_sum'] + p['c']) / MA_DAILY if len(d_close) >= MA_DAILY - 1 else None
+    vols = state['d_vol']
+    if n_days >= VOL_WINDOW + 2:
+        avg_vol = sum(vols[-(VOL_WINDOW + 1):-1]) / VOL_WINDOW
+    else:
+        avg_vol = (sum(vols) / len(vols)) if vols else 0.0
+
+    # 週足: pending が作成中の週に属するか、新しい週を始めるか
+    week = state['week']
+    pl = week_label(p['date'])
+    if week is not None and week['label'] == pl:
+        curr_w = _merge(week, p)
+        prev_w = state['w_prev']
+        ma52 = _mean_tail(state['w_close'], state['w_close_sum'], MA_WEEKLY, [curr_w['c']])
+        n_weeks = state['n_weeks'] + 1
+    else:
+        curr_w = _merge(None, p)
+        prev_w = {k: week[k] for k in 'ohlc'} if week else None
+        extra = ([week['c']] if week else []) + [curr_w['c']]
+        ma52 = _mean_tail(state['w_close'], state['w_close_sum'], MA_WEEKLY, extra)
+        n_weeks = state['n_weeks'] + len(extra)
+
+    # 月足: 同様に作成中の月を含めて MA9/MA24 とクロスを判定する
+    month = state['month']
+    ml = month_label(p['date'])
+    last_gc = state['last_gc']
+    if month is not None and month['label'] == ml:
+        curr_m = _merge(month, p)
+        prev_ma = state['m_ma']
+        ma = _monthly_ma(state, [curr_m['c']])
+        n_months = state['n_months'] + 1
+    else:
+        curr_m = _merge(None, p)
+        prev_ma = state['m_ma']
+        if month is not None:
+            # 作成中だった月を確定したものとして扱う
+            month_ma = _monthly_ma(state, [month['c']])
+            if _is_cross(prev_ma, month_ma):
+                last_gc = {'month': month['label'], 'ma9': month_ma[0], 'ma24': month_ma[1]}
+            prev_ma = month_ma
+            extra = [month['c'], curr_m['c']]
+        else:
+            extra = [curr_m['c']]
+        ma = _monthly_ma(state, extra)
+        n_months = state['n_months'] + len(extra)
+    if _is_cross(prev_ma, ma):
+        last_gc = {'month': ml, 'ma9': ma[0], 'ma24': ma[1]}
+
+    return {
+        'date': p['date'], 'close': p['c'], 'volume': p['v'], 'prev_close': prev_close,
+        'change_pct': ((p['c'] - prev_close) / prev_close * 100.0) if prev_close else None,
+        'ma25': ma25, 'avg_volume_20d': avg_vol,
+        'volume_ratio': (p['v'] / avg_vol) if avg_vol > 0 else 0.0,
+        'n_days': n_days,
+        'week_label': pl, 'week': {k: curr_w[k] for k in 'ohlc'}, 'prev_week': prev_w, 'ma52': ma52, 'n_weeks': n_weeks,
+        'month_label': ml, 'ma9': ma[0], 'ma24': ma[1], 'n_months': n_months,
+        'gc_month': last_gc['month'] if last_gc else None,
+        'gc_ma9': last_gc['ma9'] if last_gc else None,
+        'gc_ma24': last_gc['ma24'] if last_gc else None,
+    }
+
+
+# ---------------------------------------------------------------------------
+# 保存・読み込み
+# ---------------------------------------------------------------------------
+
+def load_states(tickers=None, data_dir=None):
+    """{ticker: (state, source_mtime)}。tickers を省略すると全銘柄。"""
+    if not state_path(data_dir).exists():
+        return {}
+    conn = _connect(data_dir)
+    try:
+        rows = conn.execute('SELECT ticker, source_mtime, state FROM states').fetchall()
+    finally:
+        conn.close()
+    wanted = None if tickers is None else set(tickers)
+    out = {}
+    for t, mtime, raw in rows:
+        if wanted is not None and t not in wanted:
+            continue
+        try:
+            st = json.loads(raw)
+        except Exception:
+            continue
+        if st.get('v') == STATE_VERSION:
+            out[t] = (st, mtime)
+    return out
+
+
+def save_states(states, data_dir=None, changed=()):
+    """
+    states: {ticker: (state, source_mtime)} をまとめて保存する。
+
+    changed に挙げた銘柄（新しい足が入った・最新足が変わった）は同じトランザクションで変更ログに追記する。
+    """
+    if not states:
+        return
+    now = time.time()
+    rows = [(t, (st['pending'] or {}).get('date'), mtime, json.dumps(st, separators=(',', ':')), now)
+            for t, (st, mtime) in states.items()]
+    log = [(t, (states[t][0]['pending'] or {}).get('date'), now) for t in changed if t in states]
+    conn = _connect(data_dir)
+    try:
+        with _lock, conn:
+            conn.executemany('INSERT OR REPLACE INTO states (ticker, last_date, source_mtime, state, updated_at) '
+                             'VALUES (?, ?, ?, ?, ?)', rows)
+            conn.executemany('INSERT INTO changes (ticker, bar_date, changed_at) VALUES (?, ?, ?)', log)
+    finally:
+        conn.close()
+
+
+def _advance_logged(st, df):
+    """状態を進め、(新しい状態, 最新足が変わったか) を返す。"""
+    before = json.dumps(st['pending'], sort_keys=True) if st else None
+    st = advance(st, df)
+    return st, json.dumps(st['pending'], sort_keys=True) != before
+
+
+def update_from_frames(frames, data_dir=None):
+    """
+    取得した日足で状態を進めて保存する（data_fetcher から保存直後に呼ぶ）。
+
+    frames: {ticker: DataFrame}。parquet の mtime を記録し、次のスキャンで最新と見なせるようにする。
+    新しい足が入った（または最新足が変わった）銘柄を変更ログに残し、その list を返す。
+    """
+    if not frames:
+        return []
+    data_dir = data_dir or _default_dir()
+    existing = load_states(frames.keys(), data_dir)
+    out = {}
+    changed = []
+    for t, df in frames.items():
+        st = existing.get(t, (None, None))[0]
+        try:
+            st, moved = _advance_logged(st, df)
+        except Exception:
+            continue
+        out[t] = (st, _parquet_mtime(data_dir, t))
+        if moved:
+            changed.append(t)
+    save_states(out, data_dir, changed)
+    return changed
+
+
+def _parquet_mtime(data_dir, ticker):
+    try:
+        return os.path.getmtime(os.path.join(str(data_dir), f"{ticker}.parquet"))
+    except OSError:
+        return None
+
+
+def snapshots(tickers, data_dir=None, refresh=True):
+    """
+    銘柄ごとの最新指標 {ticker: snapshot}。
+
+    状態が無い・parquet の方が新しい銘柄は、refresh=True なら parquet を読んで状態を進め（初回は全履歴から作り）、
+    保存してから返す。parquet も無い銘柄は含めない。
+    """
+    data_dir = data_dir or _default_dir()
+    states = load_states(tickers, data_dir)
+    refreshed = {}
+    changed = []
+    out = {}
+    for t in tickers:
+        st, mtime = states.get(t, (None, None))
+        current = _parquet_mtime(data_dir, t)
+        if refresh and current is not None and (st is None or mtime is None or current > mtime):
+            try:
+                df = pd.read_parquet(os.path.join(str(data_dir), f"{t}.parquet"))
+                st, moved = _advance_logged(st, df.sort_index())
+                refreshed[t] = (st, current)
+                if moved:
+                    changed.append(t)
+            except Exception:
+                st = None
+        snap = snapshot(st) if st else None
+        if snap is not None:
+            out[t] = snap
+    save_states(refreshed, data_dir, changed)
+    return out
+
+
+def stale_tickers(data_dir=None):
+    """
+    (状態が無いか parquet の方が新しい銘柄の set, 状態はあるが parquet が消えた銘柄の set)。
+
+    別の取得スクリプトで書かれた parquet は変更ログに載らないので、差分スキャンはこれも対象にする。
+    """
+    data_dir = data_dir or _default_dir()
+    known = {}
+    if state_path(data_dir).exists():
+        conn = _connect(data_dir)
+        try:
+            known = dict(conn.execute('SELECT ticker, source_mtime FROM states').fetchall())
+        finally:
+            conn.close()
+    stale, on_disk = set(), set()
+    try:
+        with os.scandir(str(data_dir)) as it:
+            for entry in it:
+                if not entry.name.endswith('.parquet'):
+                    continue
+                t = entry.name[:-len('.parquet')]
+                on_disk.add(t)
+                mtime = known.get(t)
+                if mtime is None or entry.stat().st_mtime > mtime:
+                    stale.add(t)
+    except OSError:
+        pass
+    return stale, set(known) - on_disk
+
+
+def rebuild(data_dir=None, tickers=None):
+    """parquet の全履歴から状態を作り直す。作った銘柄数を返す。"""
+    data_dir = data_dir or _default_dir()
+    if tickers is None:
+        tickers = sorted(fn[:-len('.parquet')] for fn in os.listdir(str(data_dir)) if fn.endswith('.parquet'))
+    out = {}
+    for t in tickers:
+        try:
+            df = pd.read_parquet(os.path.join(str(data_dir), f"{t}.parquet"))
+            out[t] = (build(df.sort_index()), _parquet_mtime(data_dir, t))
+        except Exception:
+            continue
+        if len(out) >= 500:
+            save_states(out, data_dir, list(out))
+            out = {}
+    save_states(out, data_dir, list(out))
+    return len(tickers)
+
+
+# ---------------------------------------------------------------------------
+# 変更ログ（新しい足が入った銘柄）と読み手ごとのカーソル
+# ---------------------------------------------------------------------------
+
+def latest_seq(data_dir=None):
+    if not state_path(data_dir).exists():
+        return 0
+    conn = _connect(data_dir)
+    try:
+        return conn.execute('SELECT COALESCE(MAX(seq), 0) FROM changes').fetchone()[0]
+    finally:
+        conn.close()
+
+
+def changes_since(seq, upto=None, data_dir=None):
+    """seq より後（upto 以下）に変わった銘柄の set。"""
+    if not state_path(data_dir).exists():
+        return set()
+    conn = _connect(data_dir)
+    try:
+        if upto is None:
+            rows = conn.execute('SELECT DISTINCT ticker FROM changes WHERE seq > ?', (int(seq),)).fetchall()
+        else:
+            rows = conn.execute('SELECT DISTINCT ticker FROM changes WHERE seq > ? AND seq <= ?',
+                                (int(seq), int(upto))).fetchall()
+    finally:
+        conn.close()
+    return {t for (t,) in rows}
+
+
+def get_cursor(consumer, data_dir=None):
+    """読み手 consumer が処理済みの seq。まだ一度も読んでいなければ None。"""
+    if not state_path(data_dir).exists():
+        return None
+    conn = _connect(data_dir)
+    try:
+        row = conn.execute('SELECT seq FROM cursors WHERE consumer = ?', (consumer,)).fetchone()
+    finally:
+        conn.close()
+    return row[0] if row else None
+
+
+def set_cursor(consumer, seq, data_dir=None):
+    conn = _connect(data_dir)
+    try:
+        with _lock, conn:
+            conn.execute('INSERT OR REPLACE INTO cursors (consumer, seq, updated_at) VALUES (?, ?, ?)',
+                         (consumer, int(seq), time.time()))
+    finally:
+        conn.close()
+
+
+def prune_changes(data_dir=None, keep_days=14):
+    """全ての読み手が処理済みで、keep_days より古い変更ログを消す。消した件数を返す。"""
+    if not state_path(data_dir).exists():
+        return 0
+    conn = _connect(data_dir)
+    try:
+        row = conn.execute('SELECT MIN(seq) FROM cursors').fetchone()
+        if row[0] is None:
+            return 0
+        with _lock, conn:
+            cur = conn.execute('DELETE FROM changes WHERE seq <= ? AND changed_at < ?',
+                               (int(row[0]), time.time() - keep_days * 86400))
+        return cur.rowcount
+    finally:
+        conn.close()
+
+
+def parse_args():
+    p = argparse.ArgumentParser(description='Per-ticker incremental indicator state')
+    p.add_argument('--data-dir', type=str, default=None, help='Price cache directory (default: config.DATA_DIR)')
+    sub = p.add_subparsers(dest='cmd', required=True)
+    sub.add_parser('rebuild')
+    s = sub.add_parser('show')
+    s.add_argument('tickers', nargs='+')
+    return p.parse_args()
+
+
+def main():
+    args = parse_args()
+    if args.cmd == 'rebuild':
+        start = time.time()
+        n = rebuild(args.data_dir)
+        print(f"rebuilt {n} tickers in {time.time() - start:.1f}s")
+    else:
+        for t, snap in snapshots(args.tickers, args.data_dir).items():
+            print(t, json.dumps(snap, ensure_ascii=False, default=str))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,272 @@
+#!/usr/bin/env python3
+"""
+バックグラウンドジョブ実行（ローカルキュー + ワーカープロセス）
+
+Streamlit のボタンから長時間のスキャン/取得を直接実行すると、スクリプトの再実行や
+別ユーザーの操作でブロック・中断されてしまう。ここではジョブを
+`outputs/jobs/<job_id>.json` に永続化し、別プロセスのワーカーが順に処理する。
+
+- submit(kind, params): ジョブを登録してワーカーを起動（同時実行数は max_workers まで）
+- JobStore.list_jobs(): 状態・進捗の一覧（UI からポーリング）
+- JobStore.request_cancel(job_id): キャンセル要求（タスクの次の progress() 呼び出しで停止）
+
+ワーカーはキューが空になると終了する。タスク本体は scan_tasks.TASKS に登録する。
+
+使い方（CLI）:
+    python jobs.py submit momentum '{"tickers": ["4179.T"]}'
+    python jobs.py list
+    python jobs.py cancel <job_id>
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+import traceback
+import uuid
+from datetime import datetime
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parent
+JOBS_DIR = BASE_DIR / 'outputs' / 'jobs'
+
+# 終了状態
+FINISHED_STATES = {'done', 'failed', 'cancelled'}
+
+
+class JobCancelled(Exception):
+    """キャンセル要求を受けてタスクを中断するための例外。"""
+
+
+def _now():
+    return datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+
+
+def _pid_alive(pid):
+    if not pid:
+        return False
+    try:
+        os.kill(int(pid), 0)
+        return True
+    except (OSError, ValueError):
+        return False
+
+
+class JobStore:
+    """ジョブ状態をディレクトリ内の JSON ファイルとして保持する。"""
+
+    def __init__(self, root=None):
+        self.root = Path(root) if root else JOBS_DIR
+        self.root.mkdir(parents=True, exist_ok=True)
+        (self.root / 'workers').mkdir(exist_ok=True)
+
+    def _path(self, job_id):
+        return self.root / f'{job_id}.json'
+
+    def save(self, job):
+        # 書き込み途中のファイルを読まれないよう一時ファイル経由で置き換える
+        path = self._path(job['id'])
+        tmp = path.with_suffix(f'.json.{os.getpid()}.tmp')
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(job, f, ensure_ascii=False, indent=2)
+        os.replace(tmp, path)
+
+    def load(self, job_id):
+        try:
+            with open(self._path(job_id), 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except Exception:
+            return None
+
+    def update(self, job_id, **fields):
+        job = self.load(job_id)
+        if job is None:
+            return None
+        job.update(fields)
+        job['updated_at'] = _now()
+        self.save(job)
+        return job
+
+    def create(self, kind, params):
+        job = {
+            'id': datetime.now().strftime('%Y%m%d%H%M%S') + '_' + uuid.uuid4().hex[:6],
+            'kind': kind,
+            'params': params,
+            'status': 'queued',
+            'progress': {'done': 0, 'total': 0, 'message': ''},
+            'result': None,
+            'error': None,
+            'cancel_requested': False,
+            'worker_pid': None,
+            'created_at': _now(),
+            'updated_at': _now(),
+            'started_at': None,
+            'finished_at': None,
+        }
+        self.save(job)
+        return job
+
+    def list_jobs(self, limit=20):
+        jobs = []
+        for p in sorted(self.root.glob('*.json'), reverse=True)[:limit]:
+            job = self.load(p.stem)
+            if job is None:
+                continue
+            # ワーカーが落ちたまま running のジョブは失敗扱いにする
+            if job['status'] == 'running' and not _pid_alive(job.get('worker_pid')):
+                job = self.update(job['id'], status='failed', error='worker process exited unexpectedly', finished_at=_now())
+            jobs.append(job)
+        return jobs
+
+    def cancel_requested(self, job_id):
+        return (self.root / f'{job_id}.cancel').exists()
+
+    def request_cancel(self, job_id):
+        job = self.load(job_id)
+        if job is None or job['status'] in FINISHED_STATES:
+            return job
+        # ワーカー側の進捗更新と書き込みが競合しないよう、要求はフラグファイルで伝える
+        (self.root / f'{job_id}.cancel').touch()
+        if job['status'] == 'queued':
+            return self.update(job_id, status='cancelled', cancel_requested=True, finished_at=_now())
+        return self.update(job_id, cancel_requested=True)
+
+    def claim_next(self, pid):
+        """最も古い queued ジョブを排他的に取得して running にする。"""
+        for p in sorted(self.root.glob('*.json')):
+            job = self.load(p.stem)
+            if job is None or job['status'] != 'queued' or self.cancel_requested(job['id']):
+                continue
+            claim = self.root / f"{job['id']}.claim"
+            try:
+                fd = os.open(str(claim), os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+            except FileExistsError:
+                continue
+            os.write(fd, str(pid).encode())
+            os.close(fd)
+            return self.update(job['id'], status='running', worker_pid=pid, started_at=_now())
+        return None
+
+    def alive_workers(self):
+        alive = []
+        for p in (self.root / 'workers').glob('*.pid'):
+            try:
+                pid = int(p.stem)
+            except ValueError:
+                continue
+            if _pid_alive(pid):
+                alive.append(pid)
+            else:
+                p.unlink(missing_ok=True)
+        return alive
+
+
+class _Progress:
+    """タスクに渡す progress コールバック。書き込みは間引き、キャンセルを検知する。"""
+
+    def __init__(self, store, job_id, min_interval=0.5):
+        self.store = store
+        self.job_id = job_id
+        self.min_interval = min_interval
+        self._last = 0.0
+
+    def __call__(self, done, total, message=''):
+        if self.store.cancel_requested(self.job_id):
+            raise JobCancelled(self.job_id)
+        now = time.time()
+        if now - self._last < self.min_interval and done != total:
+            return
+        self._last = now
+        self.store.update(self.job_id, progress={'done': int(done), 'total': int(total), 'message': message})
+
+
+def run_job(store, job):
+    from scan_tasks import TASKS
+
+    job_id = job['id']
+    task = TASKS.get(job['kind'])
+    if task is None:
+        store.update(job_id, status='failed', error=f"unknown job kind: {job['kind']}", finished_at=_now())
+        return
+    try:
+        result = task(job.get('params') or {}, _Progress(store, job_id))
+        store.update(job_id, status='done', result=result, finished_at=_now())
+    except JobCancelled:
+        store.update(job_id, status='cancelled', cancel_requested=True, finished_at=_now())
+    except Exception as e:
+        store.update(job_id, status='failed', error=f'{e}\n{traceback.format_exc()}', finished_at=_now())
+
+
+def worker_loop(store):
+    """キューが空になるまでジョブを処理する。"""
+    pid = os.getpid()
+    pid_file = store.root / 'workers' / f'{pid}.pid'
+    pid_file.write_text(str(pid))
+    try:
+        while True:
+            job = store.claim_next(pid)
+            if job is None:
+                break
+            run_job(store, job)
+    finally:
+        pid_file.unlink(missing_ok=True)
+
+
+def spawn_worker(store):
+    """ワーカーを Streamlit から切り離した別プロセスとして起動する。"""
+    log_path = store.root / 'worker.log'
+    with open(log_path, 'a', encoding='utf-8') as log:
+        proc = subprocess.Popen(
+            [sys.executable, str(Path(__file__).resolve()), '--jobs-dir', str(store.root), 'worker'],
+            cwd=os.getcwd(),
+            stdout=log,
+            stderr=subprocess.STDOUT,
+            stdin=subprocess.DEVNULL,
+            start_new_session=True,
+        )
+    return proc.pid
+
+
+def submit(kind, params, store=None, max_workers=2):
+    """ジョブを登録し、空きがあればワーカーを起動する。job dict を返す。"""
+    store = store or JobStore()
+    job = store.create(kind, params)
+    if len(store.alive_workers()) < max_workers:
+        spawn_worker(store)
+    return job
+
+
+def parse_args():
+    p = argparse.ArgumentParser(description='Background job runner for scans/fetches')
+    p.add_argument('--jobs-dir', type=str, default=None, help='Job state directory (default: outputs/jobs)')
+    sub = p.add_subparsers(dest='cmd', required=True)
+    sub.add_parser('worker', help='Process queued jobs until the queue is empty')
+    sp = sub.add_parser('submit', help='Submit a job')
+    sp.add_argument('kind')
+    sp.add_argument('params', nargs='?', default='{}', help='JSON params')
+    sub.add_parser('list', help='List recent jobs')
+    cp = sub.add_parser('cancel', help='Request cancellation')
+    cp.add_argument('job_id')
+    return p.parse_args()
+
+
+def main():
+    args = parse_args()
+    store = JobStore(args.jobs_dir)
+    if args.cmd == 'worker':
+        worker_loop(store)
+    elif args.cmd == 'submit':
+        job = submit(args.kind, json.loads(args.params), store=store)
+        print(job['id'])
+    elif args.cmd == 'list':
+        for job in store.list_jobs():
+            prog = job.get('progress') or {}
+            print(f"{job['id']}  {job['kind']:<18} {job['status']:<10} {prog.get('done', 0)}/{prog.get('total', 0)} {prog.get('message', '')}")
+    elif args.cmd == 'cancel':
+        job = store.request_cancel(args.job_id)
+        print(job['status'] if job else 'not found')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,180 @@
+"""
+ビューア用のチャートデータ共有キャッシュ（ページ先読み付き）
+
+`app_streamlit.py` の「10銘柄一覧」では、ページ移動のたびに 10 銘柄分の
+週足/月足データを取得していた。このモジュールはセッションをまたいで共有される
+メモリ上限付きの LRU キャッシュと、前後ページをバックグラウンドスレッドで
+温めておく先読み機構を提供する。
+
+使い方例:
+    cache = PageCache(max_bytes=256 * 1024 * 1024)
+    df = cache.get(('weekly', '7203.T'), lambda: load_weekly('7203.T'))
+    cache.prefetch({('weekly', t): (lambda t=t: load_weekly(t)) for t in next_page})
+    print(cache.stats())
+
+ローダ関数はバックグラウンドスレッドから呼ばれるため、Streamlit の API
+（st.*）を呼ばない純粋な取得処理にすること。
+"""
+import sys
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+
+
+def estimate_size(value):
+    """キャッシュ値のおおよそのメモリ使用量（バイト）を返す。"""
+    try:
+        if isinstance(value, pd.DataFrame):
+            return int(value.memory_usage(deep=True).sum())
+        if isinstance(value, pd.Series):
+            return int(value.memory_usage(deep=True))
+        if isinstance(value, dict):
+            return sys.getsizeof(value) + sum(sys.getsizeof(k) + sys.getsizeof(v) for k, v in value.items())
+    except Exception:
+        pass
+    return sys.getsizeof(value)
+
+
+class PageCache:
+    """スレッドセーフな LRU キャッシュ + 先読み用スレッドプール。
+
+    - max_bytes: 保持する値の合計サイズ上限。超えた分は古い順に破棄する
+    - ttl: 秒。経過したエントリは次回アクセス時に再取得する（None で無期限）
+    - max_workers: 先読みに使うスレッド数
+    """
+
+    def __init__(self, max_bytes=256 * 1024 * 1024, ttl=3600, max_workers=4):
+        self.max_bytes = int(max_bytes)
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._items = OrderedDict()  # key -> (value, size, stored_at)
+        self._inflight = {}  # key -> Future
+        self._bytes = 0
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='page-prefetch')
+        self.hits = 0
+        self.misses = 0
+        self.prefetched = 0
+        self.evictions = 0
+
+    def _fresh(self, stored_at):
+        return self.ttl is None or (time.time() - stored_at) < self.ttl
+
+    def _put(self, key, value):
+        size = estimate_size(value)
+        with self._lock:
+            old = self._items.pop(key, None)
+            if old is not None:
+                self._bytes -= old[1]
+            # 単体で上限を超える値は保持しない
+            if size > self.max_bytes:
+                return
+            self._items[key] = (value, size, time.time())
+            self._bytes += size
+            while self._bytes > self.max_bytes and self._items:
+                _, (_, evicted_size, _) = self._items.popitem(last=False)
+                self._bytes -= evicted_size
+                self.evictions += 1
+
+    def get(self, key, loader):
+        """キャッシュにあれば返し、無ければ loader() を呼んで格納する。
+
+        先読み中のキーは、その完了を待って結果を共有する（ヒット扱い）。
+        """
+        with self._lock:
+            item = self._items.get(key)
+            if item is not None and self._fresh(item[2]):
+                self._items.move_to_end(key)
+                self.hits += 1
+                return item[0]
+            fut = self._inflight.get(key)
+        if fut is not None:
+            try:
+                value = fut.result()
+                with self._lock:
+                    self.hits += 1
+                return value
+            except Exception:
+                pass
+        with self._lock:
+            self.misses += 1
+        value = loader()
+        self._put(key, value)
+        return value
+
+    def _run_prefetch(self, key, loader):
+        try:
+            value = loader()
+            self._put(key, value)
+            with self._lock:
+                self.prefetched += 1
+            return value
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+
+    def prefetch(self, loaders):
+        """{key: loader} をバックグラウンドで取得してキャッシュに載せる。
+
+        既にキャッシュ済み・取得中のキーはスキップする。投入した件数を返す。
+        """
+        submitted = 0
+        with self._lock:
+            for key, loader in loaders.items():
+                item = self._items.get(key)
+                if (item is not None and self._fresh(item[2])) or key in self._inflight:
+                    continue
+                self._inflight[key] = self._executor.submit(self._run_prefetch, key, loader)
+                submitted += 1
+        return submitted
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+            self._bytes = 0
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._items),
+                'bytes': self._bytes,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': (self.hits / lookups) if lookups else 0.0,
+                'prefetched': self.prefetched,
+                'evictions': self.evictions,
+                'inflight': len(self._inflight),
+            }
+
+
+def compute_metrics(data):
+    """週足/月足 DataFrame から表示用メトリクスを算出する。
+
+    返り値: latest_close, prev_close, change_pct, latest_volume, volume_ratio, ma52
+    （volume_ratio は直近を除く最大20本の平均出来高に対する倍率）
+    """
+    if data is None or getattr(data, 'empty', True):
+        return None
+    closes = data['Close'].astype(float)
+    vols = data['Volume'].astype(float)
+    latest_close = float(closes.iloc[-1])
+    prev_close = float(closes.iloc[-2]) if len(closes) > 1 else None
+    if prev_close:
+        change_pct = (latest_close - prev_close) / prev_close * 100.0
+    else:
+        change_pct = 0.0
+    avg_vol = float(vols.iloc[:-1].tail(20).mean()) if len(vols) > 1 else 0.0
+    volume_ratio = (float(vols.iloc[-1]) / avg_vol) if avg_vol > 0 else 0.0
+    ma52 = closes.rolling(52).mean().iloc[-1]
+    return {
+        'latest_close': latest_close,
+        'prev_close': prev_close,
+        'change_pct': change_pct,
+        'latest_volume': float(vols.iloc[-1]),
+        'volume_ratio': volume_ratio,
+        'ma52': None if pd.isna(ma52) else float(ma52),
+    }
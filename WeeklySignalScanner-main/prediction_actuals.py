@@ -0,0 +1,254 @@
+"""
+保存済み予想の実値（予測日の終値）をまとめて解決する
+
+app_predict.py の「予想履歴と実値比較」は予想 1 行ごとに yf.Ticker().history() を呼んでいたため、
+予想が数百件あると再実行のたびに数百回ネットワークに出ていた。ここでは
+
+- 確定済みの実値は outputs/predictions/settled_actuals.csv に保存し、二度と取得しない
+- 未確定の行は銘柄ごとにまとめ、予測日の範囲を 1 回で引く（ローカルの価格ストア → 足りない銘柄だけ一括ダウンロード）
+- 予測日が今日より前で終値が取れたものだけを確定扱いにする（当日分は取引中の値の可能性があるため）
+
+予測日の終値が無い（休場など）場合は、旧実装と同じく予測日前日の終値を使う。
+ただしこの代用は、そのソースに予測日以降の足がある（予測日が休場だったと分かる）ときだけ。
+ローカルストアがまだ予測日まで更新されていなければ、その銘柄はダウンロードに回す。
+
+使い方:
+    from prediction_actuals import resolve_actuals
+    preds_df['actual_price'] = resolve_actuals(preds_df)
+"""
+import datetime
+import os
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+BASE_DIR = Path(__file__).resolve().parent
+PRED_DIR = 'outputs/predictions'
+SETTLED_NAME = 'settled_actuals.csv'
+SETTLED_COLUMNS = ['ticker', 'target_date', 'actual_price', 'actual_date', 'source', 'settled_at']
+# 予測日の何日前までの終値を代わりに使うか（旧実装の history(start=td-1, end=td+1) と同じ幅）
+LOOKBACK_DAYS = 1
+DOWNLOAD_BATCH = 100
+# ダウンロードは予測日の数日後まで引き、予測日が休場でも「予測日以降の足がある」ことを確かめられるようにする
+DOWNLOAD_LOOKAHEAD_DAYS = 7
+
+
+def default_stores():
+    """ローカル価格ストアのディレクトリ（日本株 → 米国株の順に探す）。"""
+    try:
+        import config
+        jp = config.DATA_DIR
+    except Exception:
+        jp = str(BASE_DIR.parent / 'data')
+    us = os.environ.get('US_DATA_DIR', str(BASE_DIR / 'data_us'))
+    return [jp, us]
+
+
+def _settled_path(pred_dir=None):
+    return Path(pred_dir or PRED_DIR) / SETTLED_NAME
+
+
+def read_settled(pred_dir=None):
+    """確定済みの実値（ticker, target_date ごとに 1 行）。無ければ空の DataFrame。"""
+    path = _settled_path(pred_dir)
+    try:
+        df = pd.read_csv(path, dtype={'ticker': str, 'target_date': str})
+    except Exception:
+        return pd.DataFrame(columns=SETTLED_COLUMNS)
+    return df.drop_duplicates(['ticker', 'target_date'], keep='last')
+
+
+def _append_settled(rows, pred_dir=None):
+    if not rows:
+        return
+    path = _settled_path(pred_dir)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    write_header = not path.exists()
+    pd.DataFrame(rows, columns=SETTLED_COLUMNS).to_csv(path, mode='a', header=write_header, index=False)
+
+
+def _read_closes(path):
+    """parquet の価格履歴から 日付(正規化) -> 終値 の Series を作る。"""
+    df = pd.read_parquet(path, columns=['Close'])
+    idx = pd.to_datetime(df.index, errors='coerce')
+    if getattr(idx, 'tz', None) is not None:
+        idx = idx.tz_localize(None)
+    s = pd.Series(pd.to_numeric(df['Close'], errors='coerce').to_numpy(), index=idx.normalize())
+    s = s[s.index.notna() & s.notna()]
+    return s[~s.index.duplicated(keep='last')].sort_index()
+
+
+def _closes_from_stores(ticker, start, stores):
+    """start 以降の終値（ストアの最後の足まで。予測日を過ぎた足もカバー範囲の判定に使う）。"""
+    for store in stores:
+        path = os.path.join(store, f"{ticker}.parquet")
+        if not os.path.exists(path):
+            continue
+        try:
+            s = _read_closes(path)
+        except Exception:
+            continue
+        s = s[s.index >= start]
+        if not s.empty:
+            return s
+    return None
+
+
+def _download_closes(tickers, start, end):
+    """銘柄リストの終値を 1 回の yf.download で取得する。{ticker: Series}。"""
+    import yfinance as yf
+    out = {}
+    for i in range(0, len(tickers), DOWNLOAD_BATCH):
+        batch = tickers[i:i + DOWNLOAD_BATCH]
+        try:
+            data = yf.download(batch, start=start.strftime('%Y-%m-%d'),
+                               end=(end + pd.Timedelta(days=1)).strftime('%Y-%m-%d'),
+                               interval='1d', progress=False, group_by='ticker', auto_adjust=False, threads=True)
+        except Exception:
+            continue
+        if data is None or data.empty:
+            continue
+        for t in batch:
+            try:
+                if isinstance(data.columns, pd.MultiIndex):
+                    if t not in data.columns.get_level_values(0):
+                        continue
+                    close = data[t]['Close']
+                else:
+                    close = data['Close']
+            except Exception:
+                continue
+            idx = pd.to_datetime(close.index)
+            if getattr(idx, 'tz', None) is not None:
+                idx = idx.tz_localize(None)
+            s = pd.Series(pd.to_numeric(close, errors='coerce').to_numpy(), index=idx.normalize()).dropna()
+            if not s.empty:
+                out[t] = s[~s.index.duplicated(keep='last')].sort_index()
+    return out
+
+
+def _pick(closes, target):
+    """
+    予測日の終値。無ければ LOOKBACK_DAYS 日前までで最も古い終値（旧実装の挙動）。
+
+    代用はソースが予測日以降の足を持つとき（予測日が休場と分かるとき）だけ。
+    ソースの最後の足が予測日より前なら、まだ取れていないだけなので None。
+    """
+    if closes is None or closes.empty:
+        return None
+    if target in closes.index:
+        return target, float(closes.loc[target])
+    if closes.index[-1] < target:
+        return None
+    window = closes[(closes.index >= target - pd.Timedelta(days=LOOKBACK_DAYS)) & (closes.index <= target)]
+    if window.empty:
+        return None
+    return window.index[0], float(window.iloc[0])
+
+
+def resolve_actuals(preds, pred_dir=None, stores=None, download=True, today=None):
+    """
+    予想 DataFrame（ticker, target_date 列）の各行の実値を返す（preds と同じ index の Series、取れない行は NaN）。
+
+    確定済みファイルにある (ticker, target_date) は読むだけ。残りは銘柄ごとに 1 回だけ引き、
+    予測日が today より前で値が取れたものを確定ファイルに追記する。
+    """
+    if preds is None or preds.empty:
+        return pd.Series(dtype=float)
+    stores = default_stores() if stores is None else list(stores)
+    today = pd.Timestamp(today or datetime.date.today()).normalize()
+    keys = pd.DataFrame({
+        'ticker': preds['ticker'].astype(str),
+        'target': pd.to_datetime(preds['target_date'], errors='coerce').dt.normalize(),
+    }, index=preds.index)
+    keys['target_date'] = keys['target'].dt.strftime('%Y-%m-%d')
+
+    settled = read_settled(pred_dir)
+    known = {(t, d): p for t, d, p in zip(settled['ticker'], settled['target_date'], settled['actual_price'])}
+    result = pd.Series(np.nan, index=preds.index, dtype=float)
+
+    pending = {}
+    for idx, t, target, d in zip(keys.index, keys['ticker'], keys['target'], keys['target_date']):
+        if pd.isna(target):
+            continue
+        if (t, d) in known:
+            result.at[idx] = known[(t, d)]
+        elif target <= today:
+            pending.setdefault(t, set()).add(target)
+
+    if not pending:
+        return result
+
+    resolved = {}   # (ticker, target) -> (bar_date, close, source)
+    gaps = []
+    for t, targets in pending.items():
+        start = min(targets) - pd.Timedelta(days=LOOKBACK_DAYS)
+        closes = _closes_from_stores(t, start, stores)
+        missing = False
+        for target in targets:
+            hit = _pick(closes, target)
+            if hit is None:
+                missing = True
+            else:
+                resolved[(t, target)] = hit + ('store',)
+        if missing:
+            gaps.append(t)
+
+    if gaps and download:
+        targets = [x for t in gaps for x in pending[t]]
+        end = min(max(targets) + pd.Timedelta(days=DOWNLOAD_LOOKAHEAD_DAYS), today)
+        fetched = _download_closes(gaps, min(targets) - pd.Timedelta(days=LOOKBACK_DAYS), end)
+        for t in gaps:
+            for target in pending[t]:
+                if (t, target) in resolved:
+                    continue
+                hit = _pick(fetched.get(t), target)
+                if hit is not None:
+                    resolved[(t, target)] = hit + ('download',)
+
+    now = datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+    new_rows = []
+    for (t, target), (bar_date, price, source) in resolved.items():
+        if target < today:
+            new_rows.append({
+                'ticker': t, 'target_date': target.strftime('%Y-%m-%d'), 'actual_price': price,
+                'actual_date': bar_date.strftime('%Y-%m-%d'), 'source': source, 'settled_at': now,
+            })
+    _append_settled(new_rows, pred_dir)
+
+    for idx, t, target in zip(keys.index, keys['ticker'], keys['target']):
+        hit = resolved.get((t, target))
+        if hit is not None:
+            result.at[idx] = hit[1]
+    return result
+
+
+def weekly_history(tickers, period='1y'):
+    """チャート用の週足を銘柄まとめて 1 回で取得する。{ticker: OHLC DataFrame}。"""
+    import yfinance as yf
+    tickers = list(dict.fromkeys(str(t) for t in tickers))
+    if not tickers:
+        return {}
+    try:
+        data = yf.download(tickers, period=period, interval='1wk', progress=False,
+                           group_by='ticker', auto_adjust=False, threads=True)
+    except Exception:
+        return {}
+    if data is None or data.empty:
+        return {}
+    out = {}
+    for t in tickers:
+        try:
+            if isinstance(data.columns, pd.MultiIndex):
+                if t not in data.columns.get_level_values(0):
+                    continue
+                frame = data[t]
+            else:
+                frame = data
+            frame = frame[['Open', 'High', 'Low', 'Close']].dropna(how='all')
+        except Exception:
+            continue
+        if not frame.empty:
+            out[t] = frame
+    return out
@@ -0,0 +1,222 @@
+"""
+手動予想のストア（SQLite 1 ファイル）
+
+app_predict.py は予想を日ごとの predictions_YYYY-MM-DD.csv と predicted_tickers_index.csv に書いていたため、
+保存のたびに索引 CSV を全件読み直し、履歴ページは再実行のたびに全 CSV を listdir + read_csv していた。
+ここでは outputs/predictions/predictions.sqlite に
+
+- predictions: 予想 1 件 = 1 行（追記のみ。削除は行単位）。(pred_date, ticker) と created_at に索引
+- predicted_tickers: (date, ticker) を主キーにした索引（INSERT OR IGNORE で重複チェックは索引 1 回）
+
+を持つ。既存の CSV は migrate_csvs() で取り込む（open_store() は初回に自動で実行する）。
+
+使い方:
+    python prediction_store.py migrate
+    python prediction_store.py list --start 2026-01-01 --end 2026-01-31
+"""
+import argparse
+import datetime
+import glob
+import os
+import sqlite3
+from pathlib import Path
+
+import pandas as pd
+
+PRED_DIR = 'outputs/predictions'
+DB_NAME = 'predictions.sqlite'
+COLUMNS = ['id', 'created_at', 'pred_date', 'ticker', 'target_date', 'pred_price', 'note', 'source']
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS predictions (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    created_at TEXT NOT NULL,
+    pred_date TEXT NOT NULL,
+    ticker TEXT NOT NULL,
+    target_date TEXT,
+    pred_price REAL,
+    note TEXT,
+    source TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_predictions_date_ticker ON predictions (pred_date, ticker);
+CREATE INDEX IF NOT EXISTS idx_predictions_created_at ON predictions (created_at);
+CREATE TABLE IF NOT EXISTS predicted_tickers (
+    date TEXT NOT NULL,
+    ticker TEXT NOT NULL,
+    PRIMARY KEY (date, ticker)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS migrations (
+    name TEXT PRIMARY KEY,
+    applied_at TEXT NOT NULL
+);
+"""
+
+
+def _now():
+    return datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+
+
+def normalize_created(value):
+    """'2026-01-05T09:30:00.123' などを 'YYYY-MM-DD HH:MM:SS' にそろえる。解釈できなければ None。"""
+    if value is None or (isinstance(value, float) and pd.isna(value)):
+        return None
+    t = str(value).strip().replace('T', ' ')
+    if '.' in t:
+        t = t.split('.')[0]
+    ts = pd.to_datetime(t, errors='coerce')
+    return None if pd.isna(ts) else ts.strftime('%Y-%m-%d %H:%M:%S')
+
+
+class PredictionStore:
+    """予想の追加・期間検索・行削除。"""
+
+    def __init__(self, path):
+        self.path = str(path)
+        Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+        self.conn = sqlite3.connect(self.path, check_same_thread=False)
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.executescript(_SCHEMA)
+
+    def close(self):
+        self.conn.close()
+
+    def add(self, ticker, pred_price, target_date=None, note='', created_at=None, source='app'):
+        """予想を 1 件追加して id を返す。索引 (pred_date, ticker) は重複していれば追加しない。"""
+        created_at = normalize_created(created_at) or _now()
+        pred_date = created_at[:10]
+        with self.conn:
+            cur = self.conn.execute(
+                'INSERT INTO predictions (created_at, pred_date, ticker, target_date, pred_price, note, source) '
+                'VALUES (?, ?, ?, ?, ?, ?, ?)',
+                (created_at, pred_date, str(ticker), target_date or pred_date,
+                 None if pred_price is None else float(pred_price), note or '', source))
+            self.conn.execute('INSERT OR IGNORE INTO predicted_tickers (date, ticker) VALUES (?, ?)',
+                              (pred_date, str(ticker)))
+        return cur.lastrowid
+
+    def has_prediction(self, date, ticker):
+        """(予想日, 銘柄) の予想が既にあるか（主キー索引の 1 回の参照）。"""
+        row = self.conn.execute('SELECT 1 FROM predicted_tickers WHERE date = ? AND ticker = ?',
+                                (str(date), str(ticker))).fetchone()
+        return row is not None
+
+    def query(self, start=None, end=None, ticker=None):
+        """予想日（作成日）が start〜end（両端含む、'YYYY-MM-DD'）の予想を新しい順に返す。"""
+        where, args = [], []
+        if start:
+            where.append('pred_date >= ?')
+            args.append(str(start)[:10])
+        if end:
+            where.append('pred_date <= ?')
+            args.append(str(end)[:10])
+        if ticker:
+            where.append('ticker = ?')
+            args.append(str(ticker))
+        sql = f"SELECT {', '.join(COLUMNS)} FROM predictions"
+        if where:
+            sql += ' WHERE ' + ' AND '.join(where)
+        sql += ' ORDER BY created_at DESC, id DESC'
+        return pd.read_sql_query(sql, self.conn, params=args)
+
+    def delete(self, pred_id):
+        """1 行削除する。その日・銘柄の予想が無くなったら索引からも外す。削除したら True。"""
+        with self.conn:
+            row = self.conn.execute('SELECT pred_date, ticker FROM predictions WHERE id = ?', (int(pred_id),)).fetchone()
+            if row is None:
+                return False
+            self.conn.execute('DELETE FROM predictions WHERE id = ?', (int(pred_id),))
+            left = self.conn.execute('SELECT 1 FROM predictions WHERE pred_date = ? AND ticker = ? LIMIT 1', row).fetchone()
+            if left is None:
+                self.conn.execute('DELETE FROM predicted_tickers WHERE date = ? AND ticker = ?', row)
+        return True
+
+    def count(self):
+        return self.conn.execute('SELECT COUNT(*) FROM predictions').fetchone()[0]
+
+    def migrate_csvs(self, pred_dir=None):
+        """predictions_*.csv と predicted_tickers_index.csv を取り込む。取り込み済みのファイルは飛ばす。"""
+        pred_dir = pred_dir or os.path.dirname(self.path)
+        done = {r[0] for r in self.conn.execute('SELECT name FROM migrations')}
+        imported = 0
+        for path in sorted(glob.glob(os.path.join(pred_dir, 'predictions_*.csv'))):
+            name = os.path.basename(path)
+            if name in done:
+                continue
+            try:
+                df = pd.read_csv(path, dtype={'ticker': str, 'target_date': str, 'note': str})
+            except Exception:
+                continue
+            rows = []
+            fallback = name[len('predictions_'):-len('.csv')] + ' 00:00:00'
+            for r in df.to_dict('records'):
+                if not r.get('ticker') or pd.isna(r.get('ticker')):
+                    continue
+                created = normalize_created(r.get('created_at')) or normalize_created(fallback) or _now()
+                price = pd.to_numeric(r.get('pred_price'), errors='coerce')
+                target = r.get('target_date')
+                note = r.get('note')
+                rows.append((created, created[:10], str(r['ticker']),
+                             created[:10] if target is None or pd.isna(target) else str(target),
+                             None if pd.isna(price) else float(price),
+                             '' if note is None or pd.isna(note) else str(note), name))
+            with self.conn:
+                self.conn.executemany(
+                    'INSERT INTO predictions (created_at, pred_date, ticker, target_date, pred_price, note, source) '
+                    'VALUES (?, ?, ?, ?, ?, ?, ?)', rows)
+                self.conn.executemany('INSERT OR IGNORE INTO predicted_tickers (date, ticker) VALUES (?, ?)',
+                                      [(r[1], r[2]) for r in rows])
+                self.conn.execute('INSERT INTO migrations (name, applied_at) VALUES (?, ?)', (name, _now()))
+            imported += len(rows)
+        index_path = os.path.join(pred_dir, 'predicted_tickers_index.csv')
+        if os.path.exists(index_path) and 'predicted_tickers_index.csv' not in done:
+            try:
+                idx = pd.read_csv(index_path, dtype=str).dropna(subset=['date', 'ticker'])
+                pairs = list(zip(idx['date'], idx['ticker']))
+            except Exception:
+                pairs = []
+            with self.conn:
+                self.conn.executemany('INSERT OR IGNORE INTO predicted_tickers (date, ticker) VALUES (?, ?)', pairs)
+                self.conn.execute('INSERT INTO migrations (name, applied_at) VALUES (?, ?)',
+                                  ('predicted_tickers_index.csv', _now()))
+        return imported
+
+
+def open_store(pred_dir=None, migrate=True):
+    """ストアを開く。migrate=True なら未取り込みの旧 CSV があれば取り込む。"""
+    pred_dir = pred_dir or PRED_DIR
+    store = PredictionStore(os.path.join(pred_dir, DB_NAME))
+    if migrate:
+        store.migrate_csvs(pred_dir)
+    return store
+
+
+def parse_args():
+    p = argparse.ArgumentParser(description='Manual prediction store')
+    p.add_argument('--dir', type=str, default=PRED_DIR, help='Prediction directory (default: outputs/predictions)')
+    sub = p.add_subparsers(dest='cmd', required=True)
+    sub.add_parser('migrate')
+    s = sub.add_parser('list')
+    s.add_argument('--start', type=str, default=None)
+    s.add_argument('--end', type=str, default=None)
+    s.add_argument('--ticker', type=str, default=None)
+    d = sub.add_parser('delete')
+    d.add_argument('ids', nargs='+', type=int)
+    return p.parse_args()
+
+
+def main():
+    args = parse_args()
+    store = open_store(args.dir, migrate=False)
+    if args.cmd == 'migrate':
+        n = store.migrate_csvs(args.dir)
+        print(f"imported {n} rows ({store.count()} predictions total)")
+    elif args.cmd == 'list':
+        print(store.query(args.start, args.end, args.ticker).to_string(index=False))
+    elif args.cmd == 'delete':
+        for i in args.ids:
+            print(f"{i}: {'deleted' if store.delete(i) else 'not found'}")
+    store.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,427 @@
+"""
+ローカル価格ストアから値上がり率・値下がり率・出来高急増のランキングを作る
+
+data/（日本株）と data_us/（米国株）の parquet を銘柄 x 日付の行列（パネル）にまとめて
+outputs/panels/ に保存し、以降は mtime が変わった銘柄だけ読み直す。
+パネルは screening.py（スクリーニング式の一括評価）からも使う。
+ランキングは指定日の行だけをベクトル演算し、上位 N 件は argpartition で部分選択する
+（全件ソートしない）。業種などのメタデータは outputs/panels/metadata.json にキャッシュする。
+
+使い方:
+    python rankings.py gainers --top 60
+    python rankings.py losers --market us --date 2026-05-15
+    python rankings.py volume --market jp --min-volume 100000 --with-meta
+"""
+import argparse
+import datetime
+import json
+import os
+import time
+import warnings
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+BASE_DIR = Path(__file__).resolve().parent
+PANEL_DIR = BASE_DIR / 'outputs' / 'panels'
+METADATA_PATH = PANEL_DIR / 'metadata.json'
+# メタデータ（会社名・業種）の再取得間隔
+METADATA_TTL_DAYS = 30
+# 出来高急増の基準（直近 N 本の平均出来高）
+VOLUME_WINDOW = 20
+
+KINDS = ('gainers', 'losers', 'volume')
+
+
+def default_stores():
+    """市場名 -> ストアディレクトリ。"""
+    try:
+        import config
+        jp = config.DATA_DIR
+    except Exception:
+        jp = str(BASE_DIR.parent / 'data')
+    us = os.environ.get('US_DATA_DIR', str(BASE_DIR / 'data_us'))
+    return {'jp': jp, 'us': us}
+
+
+class PricePanel:
+    """1 つのストア（parquet ディレクトリ）の四本値・出来高を 日付 x 銘柄 の行列で持つ。"""
+
+    def __init__(self, dates, tickers, close, volume, mtimes, open=None, high=None, low=None):
+        self.dates = np.asarray(dates, dtype='datetime64[ns]')
+        self.tickers = np.asarray(tickers, dtype=object)
+        self.close = close
+        self.volume = volume
+        # 始値・高値・安値が無い列は終値で埋めてある（_read_bars）
+        self.open = close if open is None else open
+        self.high = close if high is None else high
+        self.low = close if low is None else low
+        self.mtimes = np.asarray(mtimes, dtype=np.int64)
+        self._derive()
+
+    def _derive(self):
+        # 前日終値は休場・欠損をまたいで直前の有効値を使う
+        prev = pd.DataFrame(self.close).ffill().shift(1).to_numpy()
+        self.prev_close = prev
+        self.index = {t: i for i, t in enumerate(self.tickers)}
+        self.counts = (~np.isnan(self.close)).sum(axis=1) if self.close.size else np.zeros(0, dtype=int)
+
+    @property
+    def empty(self):
+        return self.close.size == 0
+
+    def row_for(self, date=None):
+        """date 以前で最も新しい日付の行番号。date=None なら最終行。"""
+        if len(self.dates) == 0:
+            return None
+        if date is None:
+            # 一部の銘柄だけ先の日付まで取得済みのことがあるので、銘柄数が揃っている最後の行を使う
+            full = np.flatnonzero(self.counts >= 0.5 * self.counts.max())
+            return int(full[-1]) if full.size else len(self.dates) - 1
+        pos = int(np.searchsorted(self.dates, np.datetime64(pd.Timestamp(date).normalize(), 'ns'), side='right')) - 1
+        return pos if pos >= 0 else None
+
+    def metrics(self, row):
+        """指定行の 終値・前日終値・騰落率(%)・出来高・出来高倍率 を銘柄方向のベクトルで返す。"""
+        close = self.close[row]
+        prev = self.prev_close[row]
+        vol = self.volume[row]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            change = (close / prev - 1.0) * 100.0
+            lo = max(0, row - VOLUME_WINDOW)
+            if row > lo:
+                with warnings.catch_warnings():
+                    warnings.simplefilter('ignore', RuntimeWarning)
+                    base = np.nanmean(self.volume[lo:row], axis=0)
+            else:
+                base = np.full(vol.shape, np.nan)
+            ratio = vol / base
+        change[~np.isfinite(change)] = np.nan
+        ratio[~np.isfinite(ratio)] = np.nan
+        return {'price': close, 'prev_close': prev, 'change_pct': change, 'volume': vol, 'volume_ratio': ratio}
+
+    def save(self, path):
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(f"{path.stem}.{os.getpid()}.tmp.npz")
+        np.savez(tmp, dates=self.dates.astype('int64'), tickers=self.tickers.astype(str),
+                 close=self.close, volume=self.volume, mtimes=self.mtimes,
+                 open=self.open, high=self.high, low=self.low)
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path):
+        # 始値などを持たない古い保存形式は KeyError になり、load_panel が作り直す
+        with np.load(path, allow_pickle=False) as z:
+            return cls(z['dates'].astype('datetime64[ns]'), z['tickers'].tolist(), z['close'], z['volume'], z['mtimes'],
+                       open=z['open'], high=z['high'], low=z['low'])
+
+
+def _read_bars(path):
+    df = pd.read_parquet(path)
+    if 'Close' not in df.columns:
+        return None
+    idx = pd.to_datetime(df.index, errors='coerce')
+    if getattr(idx, 'tz', None) is not None:
+        idx = idx.tz_localize(None)
+    close = pd.to_numeric(df['Close'], errors='coerce')
+    volume = pd.to_numeric(df['Volume'], errors='coerce') if 'Volume' in df.columns else pd.Series(np.nan, index=df.index)
+    cols = {'close': close.to_numpy(), 'volume': volume.to_numpy()}
+    for c in ('Open', 'High', 'Low'):
+        cols[c.lower()] = (pd.to_numeric(df[c], errors='coerce') if c in df.columns else close).to_numpy()
+    out = pd.DataFrame(cols, index=idx.normalize())
+    out = out[out.index.notna()]
+    return out[~out.index.duplicated(keep='last')].sort_index()
+
+
+def _panel_path(store_dir):
+    key = ''.join(c if c.isalnum() else '_' for c in os.path.abspath(str(store_dir))).strip('_')
+    return PANEL_DIR / f"{key[-80:]}.npz"
+
+
+def build_panel(store_dir, previous=None, verbose=False):
+    """
+    ストアからパネルを作る。previous を渡すと、mtime が同じ銘柄はその列を再利用し
+    新規・更新された parquet だけを読む。
+    """
+    entries = {}
+    try:
+        with os.scandir(str(store_dir)) as it:
+            for e in it:
+                if e.name.endswith('.parquet') and not e.name.startswith('.') and e.is_file():
+                    entries[e.name[:-len('.parquet')]] = e.stat().st_mtime_ns
+    except OSError:
+        pass
+
+    reuse = {}
+    if previous is not None and not previous.empty:
+        for i, t in enumerate(previous.tickers):
+            if entries.get(t) == previous.mtimes[i]:
+                reuse[t] = i
+    changed = [t for t in entries if t not in reuse]
+    if verbose:
+        print(f"panel {store_dir}: {len(entries)} tickers, reading {len(changed)} changed files")
+    if not changed and previous is not None and len(reuse) == len(previous.tickers):
+        return previous
+
+    def _load(t):
+        try:
+            return t, _read_bars(os.path.join(str(store_dir), f"{t}.parquet"))
+        except Exception:
+            return t, None
+
+    fresh = {}
+    with ThreadPoolExecutor(max_workers=8) as ex:
+        for t, bars in ex.map(_load, changed):
+            if bars is not None and not bars.empty:
+                fresh[t] = bars
+
+    tickers = sorted(set(reuse) | set(fresh))
+    if not tickers:
+        return PricePanel(np.array([], dtype='datetime64[ns]'), [], np.empty((0, 0)), np.empty((0, 0)), [])
+    fields = ('close', 'volume', 'open', 'high', 'low')
+
+    parts = [previous.dates] if reuse else []
+    parts += [bars.index.values.astype('datetime64[ns]') for bars in fresh.values()]
+    dates = np.unique(np.concatenate(parts))
+    arrays = {f: np.full((len(dates), len(tickers)), np.nan) for f in fields}
+    mtimes = np.zeros(len(tickers), dtype=np.int64)
+
+    if reuse:
+        rows = np.searchsorted(dates, previous.dates)
+    for j, t in enumerate(tickers):
+        mtimes[j] = entries[t]
+        if t in reuse:
+            src = reuse[t]
+            for f in fields:
+                arrays[f][rows, j] = getattr(previous, f)[:, src]
+        else:
+            bars = fresh[t]
+            r = np.searchsorted(dates, bars.index.values.astype('datetime64[ns]'))
+            for f in fields:
+                arrays[f][r, j] = bars[f].to_numpy(dtype=float)
+
+    # 再利用した列しか無かった日付の行が全部 NaN になる場合は落とす
+    keep = ~np.all(np.isnan(arrays['close']), axis=1)
+    if not keep.all():
+        dates = dates[keep]
+        arrays = {f: a[keep] for f, a in arrays.items()}
+    return PricePanel(dates, tickers, arrays['close'], arrays['volume'], mtimes,
+                      open=arrays['open'], high=arrays['high'], low=arrays['low'])
+
+
+_panels = {}
+
+
+def load_panel(store_dir, verbose=False):
+    """
+    パネルを返す。プロセス内のもの（無ければ outputs/panels/ の保存分）を基に、
+    parquet の mtime が変わった銘柄だけ読み直す。変化があれば保存し直す。
+    """
+    store_dir = str(store_dir)
+    previous = _panels.get(store_dir)
+    path = _panel_path(store_dir)
+    if previous is None and path.exists():
+        try:
+            previous = PricePanel.load(path)
+        except Exception:
+            previous = None
+    panel = build_panel(store_dir, previous=previous, verbose=verbose)
+    if panel is not previous and panel is not _panels.get(store_dir):
+        try:
+            panel.save(path)
+        except Exception:
+            pass
+    _panels[store_dir] = panel
+    return panel
+
+
+def _top_indices(values, n, largest=True):
+    """NaN を除いた上位 n 件の位置を並び順付きで返す（argpartition で部分選択）。"""
+    valid = np.flatnonzero(~np.isnan(values))
+    if valid.size == 0 or n <= 0:
+        return valid[:0]
+    v = values[valid] if largest else -values[valid]
+    if valid.size > n:
+        part = np.argpartition(-v, n - 1)[:n]
+    else:
+        part = np.arange(valid.size)
+    order = part[np.argsort(-v[part], kind='stable')]
+    return valid[order]
+
+
+def rank(kind='gainers', top_n=60, date=None, markets=('jp', 'us'), stores=None, tickers=None,
+         min_price=None, min_volume=None, verbose=False):
+    """
+    指定日のランキングを返す。
+
+    kind: 'gainers'（騰落率の高い順）/ 'losers'（低い順）/ 'volume'（出来高倍率の高い順）
+    date: この日以前で最も新しい足を使う（市場ごと）。None なら各ストアの最新
+    tickers: 指定した銘柄に限定する
+    Returns:
+        DataFrame(rank, ticker, market, date, price, prev_close, change_pct, volume, volume_ratio)
+    """
+    if kind not in KINDS:
+        raise ValueError(f"unknown ranking kind: {kind}")
+    stores = stores or default_stores()
+    wanted = set(tickers) if tickers is not None else None
+
+    parts = []
+    for market in markets:
+        store = stores.get(market)
+        if not store or not os.path.isdir(str(store)):
+            continue
+        panel = load_panel(store, verbose=verbose)
+        if panel.empty:
+            continue
+        row = panel.row_for(date)
+        if row is None:
+            continue
+        m = panel.metrics(row)
+        key = m['volume_ratio'] if kind == 'volume' else m['change_pct']
+        mask = np.ones(len(panel.tickers), dtype=bool)
+        if wanted is not None:
+            mask &= np.fromiter((t in wanted for t in panel.tickers), dtype=bool, count=len(panel.tickers))
+        if min_price is not None:
+            mask &= m['price'] >= min_price
+        if min_volume is not None:
+            mask &= m['volume'] >= min_volume
+        key = np.where(mask, key, np.nan)
+        # 市場ごとに上位 top_n に絞ってから全体で選び直す
+        idx = _top_indices(key, top_n, largest=(kind != 'losers'))
+        if idx.size == 0:
+            continue
+        parts.append(pd.DataFrame({
+            'ticker': panel.tickers[idx],
+            'market': market,
+            'date': pd.Timestamp(panel.dates[row]).date(),
+            'price': m['price'][idx],
+            'prev_close': m['prev_close'][idx],
+            'change_pct': m['change_pct'][idx],
+            'volume': m['volume'][idx],
+            'volume_ratio': m['volume_ratio'][idx],
+        }))
+
+    if not parts:
+        return pd.DataFrame(columns=['rank', 'ticker', 'market', 'date', 'price', 'prev_close', 'change_pct', 'volume', 'volume_ratio'])
+    out = pd.concat(parts, ignore_index=True)
+    col = 'volume_ratio' if kind == 'volume' else 'change_pct'
+    idx = _top_indices(out[col].to_numpy(dtype=float), top_n, largest=(kind != 'losers'))
+    out = out.iloc[idx].reset_index(drop=True)
+    out.insert(0, 'rank', np.arange(1, len(out) + 1))
+    return out
+
+
+# --- メタデータ（会社名・業種）---
+def _read_metadata():
+    try:
+        with open(METADATA_PATH, 'r', encoding='utf-8') as fh:
+            return json.load(fh)
+    except Exception:
+        return {}
+
+
+def _fetch_info(ticker):
+    import yfinance as yf
+    info = yf.Ticker(ticker).info or {}
+    return {
+        'name': info.get('longName') or info.get('shortName'),
+        'sector': info.get('sector'),
+        'industry': info.get('industry'),
+        'fetched_at': datetime.datetime.now(datetime.timezone.utc).isoformat(),
+    }
+
+
+def get_metadata(tickers, fetch_missing=True, max_workers=8):
+    """
+    銘柄 -> {name, sector, industry} を返す。キャッシュに無い（または古い）銘柄だけ
+    yfinance から並列に取得して metadata.json に追記する。
+    """
+    meta = _read_metadata()
+    cutoff = datetime.datetime.now(datetime.timezone.utc) - datetime.timedelta(days=METADATA_TTL_DAYS)
+    missing = []
+    for t in dict.fromkeys(tickers):
+        entry = meta.get(t)
+        try:
+            stale = entry is None or datetime.datetime.fromisoformat(entry['fetched_at']) < cutoff
+        except Exception:
+            stale = True
+        if stale:
+            missing.append(t)
+
+    if fetch_missing and missing:
+        def _safe(t):
+            try:
+                return t, _fetch_info(t)
+            except Exception:
+                return t, None
+        with ThreadPoolExecutor(max_workers=max_workers) as ex:
+            fetched = dict(ex.map(_safe, missing))
+        updated = {t: v for t, v in fetched.items() if v is not None}
+        if updated:
+            meta = _read_metadata()
+            meta.update(updated)
+            PANEL_DIR.mkdir(parents=True, exist_ok=True)
+            tmp = METADATA_PATH.with_name(f"{METADATA_PATH.name}.{os.getpid()}.tmp")
+            with open(tmp, 'w', encoding='utf-8') as fh:
+                json.dump(meta, fh, ensure_ascii=False)
+            os.replace(tmp, METADATA_PATH)
+
+    return {t: meta[t] for t in tickers if t in meta}
+
+
+def with_metadata(df, fetch_missing=True):
+    """ランキング結果に name / sector / industry 列を付ける。"""
+    if df.empty:
+        return df.assign(name=None, sector=None, industry=None)
+    meta = get_metadata(df['ticker'].tolist(), fetch_missing=fetch_missing)
+    out = df.copy()
+    for col in ('name', 'sector', 'industry'):
+        out[col] = [(meta.get(t) or {}).get(col) for t in out['ticker']]
+    return out
+
+
+def parse_args():
+    p = argparse.ArgumentParser(description='Rank gainers / losers / volume spikes from the local price stores')
+    p.add_argument('kind', choices=KINDS)
+    p.add_argument('--top', type=int, default=60)
+    p.add_argument('--date', type=str, default=None, help='Rank as of this date (YYYY-MM-DD)')
+    p.add_argument('--market', choices=['jp', 'us', 'all'], default='all')
+    p.add_argument('--jp-dir', type=str, default=None)
+    p.add_argument('--us-dir', type=str, default=None)
+    p.add_argument('--min-price', type=float, default=None)
+    p.add_argument('--min-volume', type=float, default=None)
+    p.add_argument('--with-meta', action='store_true', help='Add name/sector/industry (cached in outputs/panels/metadata.json)')
+    p.add_argument('--output-csv', type=str, default=None)
+    p.add_argument('--verbose', action='store_true')
+    return p.parse_args()
+
+
+def main():
+    args = parse_args()
+    stores = default_stores()
+    if args.jp_dir:
+        stores['jp'] = args.jp_dir
+    if args.us_dir:
+        stores['us'] = args.us_dir
+    markets = ('jp', 'us') if args.market == 'all' else (args.market,)
+
+    t0 = time.perf_counter()
+    load = [load_panel(stores[m], verbose=args.verbose) for m in markets if os.path.isdir(str(stores[m]))]
+    t1 = time.perf_counter()
+    df = rank(args.kind, top_n=args.top, date=args.date, markets=markets, stores=stores,
+              min_price=args.min_price, min_volume=args.min_volume)
+    t2 = time.perf_counter()
+    if args.with_meta:
+        df = with_metadata(df)
+    print(df.to_string(index=False))
+    print(f"\npanel load {1000 * (t1 - t0):.1f} ms ({sum(len(p.tickers) for p in load)} tickers), rank {1000 * (t2 - t1):.2f} ms")
+    if args.output_csv:
+        df.to_csv(args.output_csv, index=False)
+        print(f"Saved: {args.output_csv}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,477 @@
+"""
+スキャン結果のカタログ（outputs/results のメタデータ索引）
+
+ビューアやスクリプトは outputs/results/*.csv を glob して mtime で並べ、銘柄列を推測し、
+先頭の retrieved_at メタ行を嗅ぎ分けていた。ここでは結果を書いた時点で
+
+- スキャン種別（scan_type）・パラメータ・基準日（as_of）・行数・列とその型・銘柄列/価格列
+- 保存先（型付きの parquet: outputs/results/parquet/<name>.parquet と、従来どおりの CSV）
+
+を outputs/results/.catalog/catalog.sqlite に記録する（結果ディレクトリ直下の mtime を変えないよう
+サブディレクトリに置く）。表示側は list_results() / latest() で問い合わせ、load() で parquet を読む（無ければ CSV）。
+
+カタログを通さずに CSV を置いた場合（手作業・旧スクリプト）は sync() が取り込み、消えたファイルの行を削除する。
+登録後に CSV がその場で上書きされた場合（mtime が created_ts より新しい）も sync() が読み直し、
+load() は CSV より古い parquet を使わない。
+save_result() / register() で登録したヒットは signal_history にも記録する（日付をまたいだ検索用）。
+
+使い方:
+    from results_catalog import save_result, register, list_results, load
+    save_result(df, 'momentum', params={'min_change_pct': 5})       # parquet + CSV を書いて登録
+    register(csv_path, 'weekly_ma52_engulfing', as_of='2026-01-09') # 書き終えた CSV を登録
+    entries = list_results(scan_type='weekly_ma52_engulfing', limit=5)
+    df = load(entries[0])
+
+    python results_catalog.py sync
+    python results_catalog.py list --type monthly_gc
+"""
+import argparse
+import datetime
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+from pathlib import Path
+
+import pandas as pd
+
+BASE_DIR = Path(__file__).resolve().parent
+RESULTS_DIR = BASE_DIR / 'outputs' / 'results'
+CATALOG_DIR_NAME = '.catalog'
+CATALOG_NAME = 'catalog.sqlite'
+PARQUET_DIR_NAME = 'parquet'
+
+# ファイル名（先頭一致・部分一致）-> scan_type。派生ファイル（価格付き・ソート済み）を先に判定する
+SCAN_TYPE_PATTERNS = [
+    (re.compile(r'sorted'), 'sorted'),
+    (re.compile(r'価格付き|with_prices'), 'with_prices'),
+    (re.compile(r'^(全銘柄_MA52_陽線包み|jp_all_ma52_engulfing)'), 'weekly_ma52_engulfing'),
+    (re.compile(r'^(米国_MA52_陽線包み|us_ma52_engulfing)'), 'us_weekly_ma52_engulfing'),
+    (re.compile(r'^月足_MA9_MA24_GoldenCross'), 'monthly_gc'),
+    (re.compile(r'^月足_陽線包み'), 'monthly_engulfing'),
+    (re.compile(r'^短期_初動'), 'momentum'),
+    (re.compile(r'^日次_値上がり上位'), 'daily_gainers'),
+]
+TICKER_COLUMNS = ['ticker', 'Ticker', 'symbol', 'Symbol', 'code', 'Code', 'コード', '銘柄']
+PRICE_COLUMNS = ['current_price', 'price', 'latest_price', 'latest_close', '本日終値', 'close']
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS results (
+    name TEXT PRIMARY KEY,
+    scan_type TEXT NOT NULL,
+    params TEXT,
+    params_hash TEXT,
+    as_of TEXT,
+    created_at TEXT NOT NULL,
+    created_ts REAL NOT NULL,
+    row_count INTEGER,
+    columns TEXT,
+    ticker_col TEXT,
+    price_col TEXT,
+    csv_path TEXT,
+    data_path TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_results_type_ts ON results (scan_type, created_ts);
+CREATE INDEX IF NOT EXISTS idx_results_ts ON results (created_ts);
+CREATE INDEX IF NOT EXISTS idx_results_as_of ON results (as_of);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+_FIELDS = ['name', 'scan_type', 'params', 'params_hash', 'as_of', 'created_at', 'created_ts', 'row_count',
+           'columns', 'ticker_col', 'price_col', 'csv_path', 'data_path']
+
+_lock = threading.Lock()
+
+
+def _connect(results_dir=None):
+    path = catalog_path(results_dir)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    conn = sqlite3.connect(str(path), timeout=30)
+    conn.executescript(_SCHEMA)
+    return conn
+
+
+def catalog_path(results_dir=None):
+    return Path(results_dir or RESULTS_DIR) / CATALOG_DIR_NAME / CATALOG_NAME
+
+
+def catalog_token(results_dir=None):
+    """カタログの変更検知用トークン（カタログファイルと結果ディレクトリの mtime）。"""
+    out = []
+    for p in (catalog_path(results_dir), Path(results_dir or RESULTS_DIR)):
+        try:
+            out.append(os.stat(str(p)).st_mtime_ns)
+        except OSError:
+            out.append(None)
+    return tuple(out)
+
+
+def params_hash(params):
+    return hashlib.sha1(json.dumps(params or {}, sort_keys=True, ensure_ascii=False, default=str).encode('utf-8')).hexdigest()[:16]
+
+
+def infer_scan_type(name):
+    stem = Path(str(name)).stem
+    for pattern, scan_type in SCAN_TYPE_PATTERNS:
+        if pattern.search(stem):
+            return scan_type
+    return 'other'
+
+
+def infer_as_of(name):
+    """ファイル名中の最初の日付（YYYY-MM-DD または YYYYMMDD_HHMMSS）。"""
+    stem = Path(str(name)).stem
+    m = re.search(r'(\d{4}-\d{2}-\d{2})', stem)
+    if m:
+        return m.group(1)
+    m = re.search(r'(\d{4})(\d{2})(\d{2})_?\d{6}', stem)
+    if m:
+        return f"{m.group(1)}-{m.group(2)}-{m.group(3)}"
+    return None
+
+
+def infer_ticker_column(df):
+    for c in TICKER_COLUMNS:
+        if c in df.columns:
+            return c
+    for col in df.columns:
+        name = str(col).strip()
+        low = name.lower()
+        if 'コード' in name or '銘柄' in name or 'ticker' in low or 'symbol' in low or 'code' in low:
+            return col
+    return df.columns[0] if len(df.columns) else None
+
+
+def infer_price_column(df):
+    for c in PRICE_COLUMNS:
+        if c in df.columns:
+            return c
+    return None
+
+
+def read_csv(path):
+    """結果 CSV を読む（先頭に retrieved_at メタ行がある旧形式にも対応）。"""
+    with open(path, 'r', encoding='utf-8-sig') as fh:
+        first = fh.readline()
+    return pd.read_csv(path, skiprows=1 if first.startswith('retrieved_at,') else 0, encoding='utf-8-sig')
+
+
+def _data_path(results_dir, name):
+    return Path(results_dir) / PARQUET_DIR_NAME / f"{Path(name).stem}.parquet"
+
+
+def _write_parquet(df, path):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    try:
+        df.to_parquet(tmp, index=False)
+        os.replace(tmp, path)
+        return True
+    except Exception:
+        # 型が混在した object 列などで書けない場合は CSV だけで登録する
+        try:
+            os.remove(tmp)
+        except OSError:
+            pass
+        return False
+
+
+def _entry_row(df, name, scan_type, params, as_of, csv_path, data_path, created_ts):
+    ticker_col = infer_ticker_column(df)
+    return {
+        'name': name,
+        'scan_type': scan_type or infer_scan_type(name),
+        'params': json.dumps(params or {}, ensure_ascii=False, default=str),
+        'params_hash': params_hash(params),
+        'as_of': str(as_of)[:10] if as_of else infer_as_of(name),
+        'created_at': datetime.datetime.fromtimestamp(created_ts).strftime('%Y-%m-%d %H:%M:%S'),
+        'created_ts': created_ts,
+        'row_count': int(len(df)),
+        'columns': json.dumps([[str(c), str(t)] for c, t in df.dtypes.items()], ensure_ascii=False),
+        'ticker_col': None if ticker_col is None else str(ticker_col),
+        'price_col': infer_price_column(df),
+        'csv_path': str(csv_path) if csv_path else None,
+        'data_path': str(data_path) if data_path else None,
+    }
+
+
+def _upsert(conn, row):
+    with _lock, conn:
+        conn.execute(f"INSERT OR REPLACE INTO results ({', '.join(_FIELDS)}) VALUES ({', '.join('?' for _ in _FIELDS)})",
+                     [row[f] for f in _FIELDS])
+
+
+def _decode(row):
+    entry = dict(zip(_FIELDS, row))
+    entry['params'] = json.loads(entry['params'] or '{}')
+    entry['columns'] = json.loads(entry['columns'] or '[]')
+    return entry
+
+
+def save_result(df, scan_type, params=None, as_of=None, name=None, results_dir=None, csv=True, encoding='utf-8'):
+    """
+    結果を parquet（型付き）と CSV（export）に書いてカタログに登録する。
+
+    name を省略すると '<scan_type>_<UTC 時刻>.csv'。登録した entry（dict）を返す。
+    """
+    results_dir = Path(results_dir or RESULTS_DIR)
+    if name is None:
+        name = f"{scan_type}_{datetime.datetime.now(datetime.timezone.utc).strftime('%Y%m%d_%H%M%S')}.csv"
+    csv_path = results_dir / name
+    data_path = _data_path(results_dir, name)
+    # CSV を先に書く（load() は CSV 以降に書かれた parquet だけを使う）
+    if csv:
+        results_dir.mkdir(parents=True, exist_ok=True)
+        df.to_csv(csv_path, index=False, encoding=encoding)
+    if not _write_parquet(df, data_path):
+        data_path = None
+    row = _entry_row(df, name, scan_type, params, as_of, csv_path if csv else None, data_path,
+                     os.path.getmtime(csv_path) if csv else datetime.datetime.now().timestamp())
+    conn = _connect(results_dir)
+    try:
+        _upsert(conn, row)
+    finally:
+        conn.close()
+    entry = _decode([row[f] for f in _FIELDS])
+    _record_signals(entry, df)
+    return entry
+
+
+def _record_signals(entry, df):
+    """ヒットをシグナル履歴（signal_history）にも残す。履歴側の失敗で結果の保存は止めない。"""
+    try:
+        import signal_history
+        signal_history.record_entry(entry, df)
+    except Exception as e:
+        print(f"Failed to record signal history for {entry['name']}: {e}")
+
+
+def _forget_signals(names):
+    """削除した結果のヒットをシグナル履歴から消す（repeat_signals / streaks に残らないように）。"""
+    if not names:
+        return
+    try:
+        import signal_history
+        for name in names:
+            signal_history.forget(name)
+    except Exception as e:
+        print(f"Failed to forget signal history for {', '.join(names)}: {e}")
+
+
+def register(csv_path, scan_type=None, params=None, as_of=None, results_dir=None, df=None):
+    """書き終えた CSV をカタログに登録し、同名の parquet を作る。失敗しても例外は出さず None を返す。"""
+    try:
+        csv_path = Path(csv_path)
+        results_dir = Path(results_dir or csv_path.parent)
+        if df is None:
+            df = read_csv(csv_path)
+        data_path = _data_path(results_dir, csv_path.name)
+        if not _write_parquet(df, data_path):
+            data_path = None
+        row = _entry_row(df, csv_path.name, scan_type, params, as_of, csv_path, data_path,
+                         os.path.getmtime(csv_path))
+        conn = _connect(results_dir)
+        try:
+            _upsert(conn, row)
+        finally:
+            conn.close()
+        entry = _decode([row[f] for f in _FIELDS])
+        _record_signals(entry, df)
+        return entry
+    except Exception:
+        return None
+
+
+def remove(names, results_dir=None, delete_files=True):
+    """
+    カタログから削除する（delete_files=True なら CSV と parquet も消す）。削除したパスを返す。
+
+    シグナル履歴に記録したその結果のヒットも消す。
+    """
+    results_dir = Path(results_dir or RESULTS_DIR)
+    names = [names] if isinstance(names, str) else list(names)
+    removed = []
+    conn = _connect(results_dir)
+    try:
+        for name in names:
+            row = conn.execute('SELECT csv_path, data_path FROM results WHERE name = ?', (name,)).fetchone()
+            paths = [results_dir / name, _data_path(results_dir, name)] + [Path(p) for p in (row or ()) if p]
+            if delete_files:
+                for p in dict.fromkeys(paths):
+                    try:
+                        if p.exists():
+                            p.unlink()
+                            removed.append(p)
+                    except OSError:
+                        pass
+            with _lock, conn:
+                conn.execute('DELETE FROM results WHERE name = ?', (name,))
+    finally:
+        conn.close()
+    _forget_signals(names)
+    return removed
+
+
+def sync(results_dir=None, force=False):
+    """
+    カタログ外で追加・削除・上書きされた CSV を反映する。(追加・更新した件数, 削除した件数) を返す。
+
+    ディレクトリを 1 回 scandir し、カタログに無い CSV を取り込み、消えた CSV の行を削除する。
+    CSV の mtime が登録時（created_ts）より新しければ、scan_type・params・as_of はそのままに読み直す。
+    force=True なら全件を読み直す。
+    """
+    results_dir = Path(results_dir or RESULTS_DIR)
+    if not results_dir.is_dir():
+        return 0, 0
+    conn = _connect(results_dir)
+    try:
+        known = {row[0]: _decode(row) for row in conn.execute(f"SELECT {', '.join(_FIELDS)} FROM results")}
+        on_disk = {}
+        with os.scandir(str(results_dir)) as it:
+            for entry in it:
+                if entry.name.endswith('.csv') and entry.is_file():
+                    on_disk[entry.name] = (entry.path, entry.stat().st_mtime)
+        gone = [n for n, e in known.items() if n not in on_disk and (e.get('csv_path') or not e.get('data_path'))]
+        with _lock, conn:
+            conn.executemany('DELETE FROM results WHERE name = ?', [(n,) for n in gone])
+        _forget_signals(gone)
+        changed = 0
+        for name in sorted(on_disk):
+            path, mtime = on_disk[name]
+            prev = known.get(name)
+            if prev is not None and not force and mtime <= prev['created_ts']:
+                continue
+            try:
+                df = read_csv(path)
+            except Exception:
+                df = pd.DataFrame()
+            data_path = _data_path(results_dir, name)
+            if df.empty or not _write_parquet(df, data_path):
+                data_path = None
+            if prev is None:
+                row = _entry_row(df, name, None, None, None, path, data_path, mtime)
+            else:
+                row = _entry_row(df, name, prev['scan_type'], prev['params'], prev['as_of'], path, data_path, mtime)
+            _upsert(conn, row)
+            if prev is not None:
+                # 上書きされた結果はシグナル履歴も新しい内容で置き換える
+                _record_signals(_decode([row[f] for f in _FIELDS]), df)
+            changed += 1
+        return changed, len(gone)
+    finally:
+        conn.close()
+
+
+def list_results(scan_type=None, as_of_from=None, as_of_to=None, has_column=None, exclude_types=None,
+                 limit=None, results_dir=None, auto_sync=True):
+    """条件に合う結果を新しい順に返す（entry の list）。has_column は列名（価格列の有無など）。"""
+    if auto_sync:
+        sync(results_dir)
+    where, args = [], []
+    if scan_type:
+        types = [scan_type] if isinstance(scan_type, str) else list(scan_type)
+        where.append(f"scan_type IN ({', '.join('?' for _ in types)})")
+        args += types
+    if exclude_types:
+        where.append(f"scan_type NOT IN ({', '.join('?' for _ in exclude_types)})")
+        args += list(exclude_types)
+    if as_of_from:
+        where.append('as_of >= ?')
+        args.append(str(as_of_from)[:10])
+    if as_of_to:
+        where.append('as_of <= ?')
+        args.append(str(as_of_to)[:10])
+    sql = f"SELECT {', '.join(_FIELDS)} FROM results"
+    if where:
+        sql += ' WHERE ' + ' AND '.join(where)
+    sql += ' ORDER BY created_ts DESC'
+    conn = _connect(results_dir)
+    try:
+        rows = conn.execute(sql, args).fetchall()
+    finally:
+        conn.close()
+    out = []
+    for row in rows:
+        entry = _decode(row)
+        if has_column and has_column not in [c for c, _ in entry['columns']]:
+            continue
+        out.append(entry)
+        if limit and len(out) >= limit:
+            break
+    return out
+
+
+def get(name, results_dir=None):
+    if not catalog_path(results_dir).exists():
+        return None
+    conn = _connect(results_dir)
+    try:
+        row = conn.execute(f"SELECT {', '.join(_FIELDS)} FROM results WHERE name = ?", (str(name),)).fetchone()
+    finally:
+        conn.close()
+    return _decode(row) if row else None
+
+
+def latest(scan_type=None, has_column=None, exclude_types=None, results_dir=None):
+    hits = list_results(scan_type=scan_type, has_column=has_column, exclude_types=exclude_types,
+                        limit=1, results_dir=results_dir)
+    return hits[0] if hits else None
+
+
+def load(entry, results_dir=None, normalize_ticker=True):
+    """
+    結果を DataFrame で返す（parquet を優先し、無いか CSV より古ければ CSV）。entry は list_results() の要素か名前。
+
+    normalize_ticker=True なら銘柄列を文字列の 'ticker' 列としても持たせる。
+    """
+    if not isinstance(entry, dict):
+        entry = get(Path(str(entry)).name, results_dir) or {'name': Path(str(entry)).name, 'csv_path': str(entry)}
+    df = None
+    csv_path = entry.get('csv_path') or Path(results_dir or RESULTS_DIR) / entry['name']
+    data_path = entry.get('data_path')
+    if data_path and os.path.exists(data_path):
+        # CSV がその場で上書きされていたら、古い parquet ではなく CSV を読む
+        try:
+            fresh = not os.path.exists(csv_path) or os.path.getmtime(data_path) >= os.path.getmtime(csv_path)
+        except OSError:
+            fresh = False
+        if fresh:
+            try:
+                df = pd.read_parquet(data_path)
+            except Exception:
+                df = None
+    if df is None:
+        df = read_csv(csv_path)
+    tcol = entry.get('ticker_col') or infer_ticker_column(df)
+    if normalize_ticker and 'ticker' not in df.columns and tcol in df.columns:
+        df['ticker'] = df[tcol].astype(str)
+    return df
+
+
+def parse_args():
+    p = argparse.ArgumentParser(description='Scan results catalog')
+    p.add_argument('--dir', type=str, default=None, help='Results directory (default: outputs/results)')
+    sub = p.add_subparsers(dest='cmd', required=True)
+    sub.add_parser('sync')
+    s = sub.add_parser('list')
+    s.add_argument('--type', type=str, default=None)
+    s.add_argument('--limit', type=int, default=30)
+    return p.parse_args()
+
+
+def main():
+    args = parse_args()
+    if args.cmd == 'sync':
+        added, gone = sync(args.dir, force=True)
+        print(f"added {added}, removed {gone}")
+    elif args.cmd == 'list':
+        for e in list_results(scan_type=args.type, limit=args.limit, results_dir=args.dir):
+            print(f"{e['created_at']}  {e['scan_type']:<26} as_of={e['as_of'] or '-':<10} {e['row_count']:>6} rows  {e['name']}")
+
+
+if __name__ == '__main__':
+    main()
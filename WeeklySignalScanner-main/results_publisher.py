@@ -0,0 +1,348 @@
+#!/usr/bin/env python3
+"""
+結果ファイルの Git 公開（キュー + まとめてコミット）
+
+以前はスキャンやファイル削除のたびに、その場で git add / bump_version / commit / push
+（push は最大 120 秒待ち）を同期実行していた。ここでは公開したいファイルを
+`outputs/publish/queue/*.json` に積むだけにし、別プロセスのパブリッシャが一定間隔
+（既定 120 秒）ごとにキューをまとめて 1 コミットにして push する。
+
+- enqueue(paths, message, removed=None): キューに積んでパブリッシャを起動（すぐ戻る）
+- read_status(): 最終コミット・push 結果・待ち件数（UI から表示）
+- Publisher.run(): キューが空になるまで interval ごとに公開する（CLI の run）
+
+ローカルの bare リポジトリで動作確認できる:
+    git init --bare /tmp/remote.git && git clone /tmp/remote.git /tmp/work
+    python results_publisher.py --repo /tmp/work enqueue /tmp/work/a.csv -m "test"
+    python results_publisher.py --repo /tmp/work run --interval 0
+    git --git-dir /tmp/remote.git log --stat
+"""
+import argparse
+import datetime
+import json
+import os
+import subprocess
+import sys
+import time
+import uuid
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parent
+REPO_ROOT = BASE_DIR.parent
+PUBLISH_DIR = BASE_DIR / 'outputs' / 'publish'
+DEFAULT_INTERVAL = float(os.environ.get('RESULTS_PUBLISH_INTERVAL', '120'))
+DEFAULT_BRANCH = 'main'
+
+
+def _now():
+    return datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+
+
+def _pid_alive(pid):
+    if not pid:
+        return False
+    try:
+        os.kill(int(pid), 0)
+        return True
+    except (OSError, ValueError):
+        return False
+
+
+def _write_json(path, data):
+    tmp = Path(f'{path}.{os.getpid()}.tmp')
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(data, f, ensure_ascii=False, indent=2)
+    os.replace(tmp, path)
+
+
+def _read_json(path, default=None):
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except Exception:
+        return default
+
+
+class Publisher:
+    """キュー/状態ファイルの置き場所と公開先リポジトリをまとめたもの。"""
+
+    def __init__(self, repo_root=None, publish_dir=None, remote='origin', branch=DEFAULT_BRANCH, push=True):
+        self.repo_root = Path(repo_root) if repo_root else REPO_ROOT
+        self.root = Path(publish_dir) if publish_dir else PUBLISH_DIR
+        self.queue_dir = self.root / 'queue'
+        self.queue_dir.mkdir(parents=True, exist_ok=True)
+        self.status_path = self.root / 'status.json'
+        self.pid_path = self.root / 'publisher.pid'
+        self.remote = remote
+        self.branch = branch
+        self.push = push
+
+    # --- キュー ---
+    def enqueue(self, paths=None, message='', removed=None):
+        entry = {
+            'id': datetime.datetime.now().strftime('%Y%m%d%H%M%S%f') + '_' + uuid.uuid4().hex[:6],
+            'paths': [str(Path(p).resolve()) for p in (paths or [])],
+            'removed': [str(Path(p).resolve()) for p in (removed or [])],
+            'message': message,
+            'queued_at': time.time(),
+        }
+        _write_json(self.queue_dir / f"{entry['id']}.json", entry)
+        return entry
+
+    def pending(self):
+        entries = []
+        for p in sorted(self.queue_dir.glob('*.json')):
+            e = _read_json(p)
+            if e is not None:
+                e['_file'] = str(p)
+                entries.append(e)
+        return entries
+
+    # --- 状態 ---
+    def read_status(self):
+        status = _read_json(self.status_path, default={}) or {}
+        status['pending'] = len(list(self.queue_dir.glob('*.json')))
+        status['running'] = self.is_running()
+        return status
+
+    def _update_status(self, **fields):
+        status = _read_json(self.status_path, default={}) or {}
+        status.update(fields)
+        status['updated_at'] = _now()
+        _write_json(self.status_path, status)
+
+    def is_running(self):
+        try:
+            pid = int(self.pid_path.read_text().strip())
+        except Exception:
+            return False
+        return _pid_alive(pid)
+
+    # --- git ---
+    def _git(self, *args, timeout=None):
+        return subprocess.run(['git', '-C', str(self.repo_root)] + list(args), capture_output=True, text=True, timeout=timeout)
+
+    def _rel(self, p):
+        return os.path.relpath(str(p), start=str(self.repo_root))
+
+    def _push_target(self):
+        token = os.environ.get('GITHUB_TOKEN')
+        if not token:
+            try:
+                import streamlit as st
+                token = st.secrets.get('GITHUB_TOKEN') if 'GITHUB_TOKEN' in st.secrets else None
+            except Exception:
+                token = None
+        if token:
+            # トークン付き URL はログに出さない
+            origin_url = self._git('remote', 'get-url', self.remote).stdout.strip()
+            if origin_url.startswith('https://'):
+                return origin_url.replace('https://', f'https://{token}@')
+        return self.remote
+
+    def publish(self, entries):
+        """キューのエントリをまとめて 1 コミットにし、push する。結果 dict を返す。"""
+        add_paths, rm_paths, messages = [], [], []
+        for e in entries:
+            for p in e.get('paths') or []:
+                if os.path.isfile(p) and not os.path.basename(p).startswith('.dir_state.json') and p not in add_paths:
+                    add_paths.append(p)
+            for p in e.get('removed') or []:
+                if p not in rm_paths:
+                    rm_paths.append(p)
+            if e.get('message') and e['message'] not in messages:
+                messages.append(e['message'])
+
+        result = {'added': len(add_paths), 'removed': len(rm_paths), 'committed': False, 'pushed': False, 'commit': None, 'error': None}
+        if add_paths:
+            proc = self._git('add', '-f', '--', *[self._rel(p) for p in add_paths])
+            if proc.returncode != 0:
+                result['error'] = f'git add failed: {proc.stderr.strip()}'
+                return result
+        if rm_paths:
+            self._git('rm', '-q', '--cached', '--ignore-unmatch', '--', *[self._rel(p) for p in rm_paths])
+
+        if self._git('diff', '--cached', '--quiet').returncode == 0:
+            result['message'] = 'コミットする変更はありませんでした'
+            # 前回 push に失敗したコミットが残っていれば、ここで push し直す
+            if self.push:
+                self._push(result)
+            return result
+
+        # commit 前に VERSION を自動バンプしてステージする
+        version_str = ''
+        try:
+            bump_script = self.repo_root / 'scripts' / 'bump_version.py'
+            if bump_script.exists():
+                subprocess.run([sys.executable, str(bump_script)], check=False, capture_output=True)
+                self._git('add', 'VERSION')
+            vpath = self.repo_root / 'VERSION'
+            if vpath.exists():
+                version_str = vpath.read_text(encoding='utf-8').strip()
+        except Exception:
+            pass
+
+        head = messages[0] if len(messages) == 1 else f'chore(results): publish {len(entries)} result updates'
+        msg = f"{head}{' ver'+version_str if version_str else ''} {datetime.datetime.now(datetime.timezone.utc).isoformat()}"
+        if len(messages) > 1:
+            msg += '\n\n' + '\n'.join(f'- {m}' for m in messages)
+        proc = self._git('-c', 'user.name=StreamlitAutoCommit', '-c', 'user.email=streamlit@example.com', 'commit', '-q', '-m', msg)
+        if proc.returncode != 0:
+            result['error'] = f'git commit failed: {(proc.stdout + proc.stderr).strip()}'
+            return result
+        result['committed'] = True
+        result['commit'] = self._git('rev-parse', '--short', 'HEAD').stdout.strip()
+        if self.push:
+            self._push(result)
+        return result
+
+    def _push(self, result):
+        try:
+            proc = self._git('push', self._push_target(), f'HEAD:{self.branch}', timeout=120)
+            result['pushed'] = (proc.returncode == 0)
+            if proc.returncode != 0:
+                result['error'] = f'git push failed: {proc.stderr.strip()}'
+        except Exception as e:
+            result['error'] = f'git push failed: {e}'
+
+    # --- パブリッシャ本体 ---
+    def _acquire(self):
+        """pid ファイルを排他的に作成する。別のパブリッシャが生きていれば False。"""
+        for _ in range(2):
+            try:
+                fd = os.open(str(self.pid_path), os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+            except FileExistsError:
+                if self.is_running():
+                    return False
+                # 落ちたプロセスの pid ファイルが残っている
+                try:
+                    self.pid_path.unlink()
+                except OSError:
+                    pass
+                continue
+            os.write(fd, str(os.getpid()).encode())
+            os.close(fd)
+            return True
+        return False
+
+    def run(self, interval=DEFAULT_INTERVAL, poll=1.0):
+        """
+        キューが空になるまで、最古のエントリが interval 秒経つごとにまとめて公開する。
+
+        公開に失敗したらエントリをキューに残して終了する（次の enqueue か run で再試行される）。
+        """
+        while self.pending():
+            if not self._acquire():
+                return
+            try:
+                ok = self._drain(interval, poll)
+            finally:
+                try:
+                    self.pid_path.unlink()
+                except OSError:
+                    pass
+            if not ok:
+                return
+            # 終了直前に積まれたエントリは spawn がスキップされるので、ここで拾い直す
+
+    def _drain(self, interval, poll):
+        """キューを空にしたら True、公開に失敗したら False。"""
+        while True:
+            entries = self.pending()
+            if not entries:
+                return True
+            oldest = min(e.get('queued_at', 0) for e in entries)
+            wait = interval - (time.time() - oldest)
+            if wait > 0:
+                self._update_status(state='waiting', next_publish_in=round(wait, 1))
+                time.sleep(min(wait, poll) if poll else wait)
+                continue
+            # 待っている間に積まれた分もまとめて公開する
+            entries = self.pending()
+            self._update_status(state='publishing')
+            try:
+                result = self.publish(entries)
+            except Exception as e:
+                result = {'committed': False, 'pushed': False, 'error': str(e)}
+            if result.get('error'):
+                # コミット（push 有効時は push）まで済んでいないので、試行回数とエラーを記録して残す
+                for e in entries:
+                    path = e.pop('_file')
+                    e['attempts'] = e.get('attempts', 0) + 1
+                    e['last_error'] = result['error']
+                    _write_json(path, e)
+                self._update_status(state='failed', last_result=result, last_failed_at=_now(), next_publish_in=None)
+                return False
+            for e in entries:
+                try:
+                    os.remove(e['_file'])
+                except OSError:
+                    pass
+            self._update_status(state='idle', last_result=result, last_published_at=_now(), next_publish_in=None)
+
+    def spawn(self, interval=DEFAULT_INTERVAL):
+        """パブリッシャを呼び出し元から切り離した別プロセスとして起動する。"""
+        if self.is_running():
+            return None
+        log_path = self.root / 'publisher.log'
+        with open(log_path, 'a', encoding='utf-8') as log:
+            proc = subprocess.Popen(
+                [sys.executable, str(Path(__file__).resolve()), '--repo', str(self.repo_root), '--publish-dir', str(self.root),
+                 '--remote', self.remote, '--branch', self.branch] + ([] if self.push else ['--no-push'])
+                + ['run', '--interval', str(interval)],
+                cwd=os.getcwd(),
+                stdout=log,
+                stderr=subprocess.STDOUT,
+                stdin=subprocess.DEVNULL,
+                start_new_session=True,
+            )
+        return proc.pid
+
+
+def enqueue(paths=None, message='', removed=None, publisher=None, interval=DEFAULT_INTERVAL, start=True):
+    """結果ファイルを公開キューに積み、必要ならパブリッシャを起動する。すぐに戻る。"""
+    publisher = publisher or Publisher()
+    entry = publisher.enqueue(paths, message, removed=removed)
+    if start and os.environ.get('RESULTS_PUBLISH_DISABLE') != '1':
+        publisher.spawn(interval=interval)
+    return entry
+
+
+def read_status(publisher=None):
+    return (publisher or Publisher()).read_status()
+
+
+def parse_args():
+    p = argparse.ArgumentParser(description='Queue result files and publish them to git in batched commits')
+    p.add_argument('--repo', type=str, default=None, help='Repository to commit into (default: this repo)')
+    p.add_argument('--publish-dir', type=str, default=None, help='Queue/status directory (default: outputs/publish)')
+    p.add_argument('--remote', type=str, default='origin')
+    p.add_argument('--branch', type=str, default=DEFAULT_BRANCH)
+    p.add_argument('--no-push', dest='push', action='store_false', help='Commit only; do not push')
+    sub = p.add_subparsers(dest='cmd', required=True)
+    ep = sub.add_parser('enqueue', help='Queue files for publishing')
+    ep.add_argument('paths', nargs='*')
+    ep.add_argument('-m', '--message', default='chore(results): add results')
+    ep.add_argument('--removed', nargs='*', default=[], help='Deleted files whose removal should be committed')
+    ep.add_argument('--no-start', action='store_true', help='Do not start the publisher process')
+    rp = sub.add_parser('run', help='Publish queued entries until the queue is empty')
+    rp.add_argument('--interval', type=float, default=DEFAULT_INTERVAL, help='Coalescing window in seconds')
+    sub.add_parser('status', help='Show publisher status')
+    return p.parse_args()
+
+
+def main():
+    args = parse_args()
+    publisher = Publisher(repo_root=args.repo, publish_dir=args.publish_dir, remote=args.remote, branch=args.branch, push=args.push)
+    if args.cmd == 'enqueue':
+        entry = enqueue(args.paths, args.message, removed=args.removed, publisher=publisher, start=not args.no_start)
+        print(entry['id'])
+    elif args.cmd == 'run':
+        publisher.run(interval=args.interval)
+        print(json.dumps(publisher.read_status(), ensure_ascii=False, indent=2))
+    elif args.cmd == 'status':
+        print(json.dumps(publisher.read_status(), ensure_ascii=False, indent=2))
+
+
+if __name__ == '__main__':
+    main()
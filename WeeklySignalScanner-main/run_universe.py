@@ -17,6 +17,7 @@ def parse_args():
     p.add_argument('--retry', type=int, default=1, help='Retry count for downloads')
     p.add_argument('--cache-dir', type=str, default='data', help='Cache directory')
     p.add_argument('--use-cache', action='store_true', help='When scanning, use cached Parquet files')
+    p.add_argument('--incremental', action='store_true', help='When scanning, re-evaluate only tickers whose cache changed since the last incremental scan')
     p.add_argument('--tickers', nargs='*', help='List of tickers to scan (overrides start/end when provided)')
     p.add_argument('--output-csv', type=str, default='results.csv', help='CSV file to write scan results')
     p.add_argument('--short-window', type=int, default=10)
@@ -62,7 +63,19 @@ def main():
             # if not provided tickers, build from start..end
             tickers = [f"{i:04d}.T" for i in range(args.start, args.end + 1)]
 
-        if args.use_cache:
+        if args.incremental:
+            # 前回の差分スキャン以降に新しい足が入った銘柄だけを評価し、前回までのヒットと合わせる
+            import incremental_scan
+            scan_params = {'require_ma52': args.require_ma52}
+            if not args.require_engulfing:
+                scan_params['require_engulfing'] = False
+            res = incremental_scan.run('weekly_ma52_engulfing', scan_params, data_dir=args.cache_dir)
+            if args.verbose:
+                print(f"Incremental scan: evaluated {res['evaluated']} tickers, {res['hits']} hits (full={res['full']})")
+            wanted = set(tickers)
+            hits = incremental_scan.current_rows('weekly_ma52_engulfing', scan_params, data_dir=args.cache_dir)['ticker']
+            results = [t for t in hits if t in wanted]
+        elif args.use_cache:
             from screener import scan_stocks_with_cache
             results = scan_stocks_with_cache(tickers, cache_dir=args.cache_dir, short_window=args.short_window, long_window=args.long_window, period=args.period, interval=args.interval, threshold=args.threshold, require_ma52=args.require_ma52, require_engulfing=args.require_engulfing)
         else:
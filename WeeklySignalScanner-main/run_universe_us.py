@@ -8,13 +8,17 @@ def parse_args():
     p = argparse.ArgumentParser(description="Fetch/cache US stock tickers and run screener")
     p.add_argument('--fetch', action='store_true', help='Fetch and cache US tickers to local parquet files')
     p.add_argument('--scan', action='store_true', help='Run scan (can use cache)')
-    p.add_argument('--market', type=str, default='custom', choices=['sp500', 'nasdaq100', 'custom'], 
-                   help='Market to scan: sp500, nasdaq100, or custom ticker list')
+    p.add_argument('--market', type=str, default='custom', choices=['sp500', 'nasdaq100', 'comprehensive', 'custom'], 
+                   help='Market to scan: sp500, nasdaq100, comprehensive (universe_registry), or custom ticker list')
     p.add_argument('--max-price', type=float, default=None, dest='max_price',
                    help='Maximum stock price filter (e.g., 2.0 for stocks under $2)')
     p.add_argument('--min-price', type=float, default=0.01, dest='min_price',
                    help='Minimum stock price filter to exclude penny stocks (default: 0.01)')
     p.add_argument('--batch-size', type=int, default=100, dest='batch_size')
+    p.add_argument('--price-max-age', type=int, default=4, dest='price_max_age',
+                   help='Days before a cached latest bar is considered stale for the price filter (default 4)')
+    p.add_argument('--no-price-refresh', dest='price_refresh', action='store_false', default=True,
+                   help='Price filter uses cached latest bars only (no network)')
     p.add_argument('--period', type=str, default='6mo', help='yfinance period for fetch (default 6mo)')
     p.add_argument('--interval', type=str, default='1d', help='yfinance interval')
     p.add_argument('--sleep', type=float, default=1.0, help='Sleep between batches (seconds)')
@@ -44,6 +48,9 @@ def get_tickers_by_market(market, custom_tickers=None):
     elif market == 'nasdaq100':
         from data_fetcher_us import get_nasdaq100_tickers
         return get_nasdaq100_tickers()
+    elif market == 'comprehensive':
+        import universe_registry
+        return list(universe_registry.load('comprehensive'))
     else:
         # デフォルトの主要銘柄リスト
         return [
@@ -77,7 +84,10 @@ def main():
             max_price=args.max_price, 
             min_price=args.min_price,
             batch_size=args.batch_size,
-            verbose=args.verbose
+            verbose=args.verbose,
+            cache_dir=args.cache_dir,
+            max_age_days=args.price_max_age,
+            refresh=args.price_refresh,
         )
         if args.verbose:
             print(f"After price filter: {len(tickers)} tickers")
@@ -141,6 +151,15 @@ def main():
                 writer.writerow(['ticker'])
                 for ticker in results:
                     writer.writerow([ticker])
+            try:
+                import results_catalog
+                results_catalog.register(output_path, 'us_weekly_ma52_engulfing', params={
+                    'market': args.market, 'interval': args.interval, 'period': args.period,
+                    'require_ma52': args.require_ma52, 'require_engulfing': args.require_engulfing,
+                    'min_price': args.min_price, 'max_price': args.max_price,
+                })
+            except Exception as e:
+                print(f"Failed to register results in the catalog: {e}")
 
             print(f"\n=== Results saved to {output_path} ===")
             print(f"Found {len(results)} matching tickers:")
@@ -11,6 +11,7 @@ from datetime import datetime
 import csv
 import os
 import time
+import warnings
 from data_fetcher import load_ticker_from_cache
 import yfinance as yf
 from pathlib import Path
@@ -60,7 +61,13 @@ def scan_range(start, end, output_file, base_dir: Path):
     return len(results)
 
 
-def main(relaxed_engulfing=False, end_date=None, require_ma52=True):
+def main(relaxed_engulfing=False, end_date=None, require_ma52=True, on_progress=None):
+    """
+    data/ の全銘柄を週足 MA52 + 陽線包み足でスキャンして CSV に書き、そのパスを返す。
+
+    on_progress(done, total, message) はバッチごとに呼ばれる（ジョブの進捗・キャンセル確認用）。
+    on_progress が例外（jobs.JobCancelled など）を送出したら、途中の出力ファイルを消して中断する。
+    """
     print("=" * 70)
     print("日本株全銘柄スキャン（1300-9999）")
     print("条件: 週足MA52以上 & 陽線包み足")
@@ -134,6 +141,13 @@ def main(relaxed_engulfing=False, end_date=None, require_ma52=True):
         print(f"処理対象ティッカー数: {total}")
         for idx in range(0, total, batch_size):
             batch = tickers[idx: idx + batch_size]
+            if on_progress is not None:
+                try:
+                    on_progress(idx, total, f'スキャン中... {idx}/{total} 銘柄')
+                except BaseException:
+                    if os.path.exists(output_file):
+                        os.remove(output_file)
+                    raise
             print(f"[{idx+1}-{min(idx+batch_size, total)}] ({len(batch)}銘柄)", end=' ')
             try:
                 # use cache-aware scanner to avoid re-downloading
@@ -211,6 +225,15 @@ def main(relaxed_engulfing=False, end_date=None, require_ma52=True):
             writer.writerow([ticker, '' if price is None else f"{price:.2f}"])
 
     total_found = len(found_results_sorted)
+
+    # 結果カタログに登録（種別・条件・基準日・列情報と parquet）
+    try:
+        import results_catalog
+        results_catalog.register(output_file, 'weekly_ma52_engulfing',
+                                 params={'relaxed_engulfing': bool(relaxed_engulfing), 'require_ma52': bool(require_ma52)},
+                                 as_of=end_date or datetime.now().strftime('%Y-%m-%d'))
+    except Exception as e:
+        print(f"結果カタログへの登録に失敗しました: {e}")
     
     print()
     print("=" * 70)
@@ -234,7 +257,207 @@ def main(relaxed_engulfing=False, end_date=None, require_ma52=True):
             print(f"  {i}. {ticker}")
     else:
         print("条件を満たす銘柄はありませんでした。")
+    return output_file
+
+
+# ---------------------------------------------------------------------------
+# 期間スイープ（as-of 日ごとの結果をまとめて作る）
+# ---------------------------------------------------------------------------
+
+def sweep_dates(panel, date_from, date_to, step='week'):
+    """パネルの営業日のうち [date_from, date_to] の as-of 日。step='week' は各週の最終営業日。"""
+    import numpy as np
+    import pandas as pd
+    dates = pd.DatetimeIndex(panel.dates)
+    sel = dates[(dates >= pd.Timestamp(date_from)) & (dates <= pd.Timestamp(date_to))]
+    if step == 'week' and len(sel):
+        weeks = sel.to_period('W-FRI').asi8
+        sel = sel[np.r_[weeks[1:] != weeks[:-1], True]]
+    return [d.strftime('%Y-%m-%d') for d in sel]
+
+
+class _WeeklySweep:
+    """
+    全期間の週足をパネルから 1 回だけ作り、任意の as-of 日の「直近 2 本の週足 + MA52」を添字で引く。
+
+    as-of 日の最新週足はその日までの途中の週（as-of で切った日足を週足にしたときと同じ）、
+    1 本前と MA52 の残り 51 本は銘柄ごとに詰めた確定済みの週足から取る。
+    """
+
+    def __init__(self, panel):
+        import numpy as np
+        import pandas as pd
+        import screening
+        self.panel = panel
+        rows = len(panel.dates)
+        self.valid = ~np.isnan(panel.close)
+        idx = np.arange(rows)[:, None]
+        # 各日・各銘柄について、その日以前で最後に終値がある日足の行
+        self.last_valid = np.maximum.accumulate(np.where(self.valid, idx, -1), axis=0) if rows else idx
+        codes = pd.DatetimeIndex(panel.dates).to_period('W-FRI').asi8
+        is_start = np.r_[True, codes[1:] != codes[:-1]] if rows else np.zeros(0, dtype=bool)
+        self.week_start = np.flatnonzero(is_start)
+        self.week_of_row = np.cumsum(is_start) - 1
+        fields, has, _ = screening._resample(panel, rows, 'W-FRI')
+        self.weekly = fields
+        # 銘柄ごとに有効な週を先頭から詰めた週足と、各週までの有効な週の数
+        order = np.argsort(~has, axis=0, kind='stable')
+        self.compact = {f: np.take_along_axis(a, order, axis=0) for f, a in fields.items()}
+        self.count = np.cumsum(has, axis=0)
+
+    def evaluate(self, as_of, require_ma52=True, relaxed_engulfing=False):
+        """as-of 日の判定。(ヒットの bool 配列, 終値の配列) を銘柄順（panel.tickers）で返す。"""
+        import numpy as np
+        panel = self.panel
+        n = len(panel.tickers)
+        row = panel.row_for(as_of)
+        if row is None:
+            return np.zeros(n, dtype=bool), np.full(n, np.nan)
+        cols = np.arange(n)
+        lv = self.last_valid[row]
+        ok = lv >= 0
+        lv0 = np.clip(lv, 0, None)
+        wi = self.week_of_row[lv0]
+        k = np.where(ok, self.count[wi, cols], 0)
+
+        # 最新週足: as-of の週に終値があればその週の as-of までの日足、無ければその銘柄の最後の週の確定足
+        ws = self.week_start[self.week_of_row[row]]
+        seg = slice(ws, row + 1)
+        seg_valid = self.valid[seg]
+        in_week = ok & (wi == self.week_of_row[row])
+        with np.errstate(invalid='ignore'), warnings.catch_warnings():
+            warnings.simplefilter('ignore', RuntimeWarning)
+            first = np.argmax(seg_valid, axis=0)
+            part = {
+                'open': panel.open[seg][first, cols],
+                'high': np.nanmax(np.where(seg_valid, panel.high[seg], np.nan), axis=0),
+                'low': np.nanmin(np.where(seg_valid, panel.low[seg], np.nan), axis=0),
+            }
+        curr = {f: np.where(in_week, part[f], self.weekly[f][wi, cols]) for f in ('open', 'high', 'low')}
+        curr['close'] = np.where(ok, panel.close[lv0, cols], np.nan)
+
+        # 1 本前の週足（銘柄ごとに詰めた k-1 本目）
+        has_prev = k >= 2
+        pk = np.clip(k - 2, 0, None)
+        prev = {f: np.where(has_prev, self.compact[f][pk, cols], np.nan) for f in ('open', 'high', 'low', 'close')}
+
+        with np.errstate(invalid='ignore'):
+            prev_bear = prev['close'] < prev['open']
+            curr_bull = curr['close'] > curr['open']
+            engulfs = (curr['open'] <= prev['close']) & (curr['close'] >= prev['open'])
+            wick = (curr['open'] <= prev['low']) & (curr['close'] >= prev['high'])
+            body = engulfs | wick
+            if relaxed_engulfing:
+                body = body | (curr['close'] >= prev['open'])
+            hit = ok & has_prev & prev_bear & curr_bull & body
+            if require_ma52:
+                # 確定済みの直近 51 本 + 最新週の終値の平均
+                has_ma = k >= 52
+                win = np.clip(k[None, :] - 52 + np.arange(51)[:, None], 0, None)
+                closes = np.take_along_axis(self.compact['close'], win, axis=0)
+                ma52 = np.where(has_ma, (closes.sum(axis=0) + curr['close']) / 52.0, np.nan)
+                hit &= curr['close'] >= ma52
+        return hit, curr['close']
+
+
+def sweep(date_from, date_to, step='week', relaxed_engulfing=False, require_ma52=True, workers=4,
+          combined=False, data_dir=None, results_dir=None, register=True):
+    """
+    [date_from, date_to] の as-of 日ごとに main(end_date=...) と同じ判定をまとめて行う。
+
+    価格パネル（rankings.load_panel）を 1 回読み、週足も 1 回だけ作って各日を添字で評価する。
+    日ごとの評価と書き出しは workers 本のスレッドに分ける。
+    combined=False なら日ごとに main(end_date=...) と同じ名前・列の CSV を書いて results_catalog に登録、
+    True なら as_of,ticker,price の縦長の 1 ファイルにする。書いたファイルの list を返す。
+    """
+    import numpy as np
+    import pandas as pd
+    import rankings
+    import screening
+    from concurrent.futures import ThreadPoolExecutor
+
+    base_dir = Path(__file__).resolve().parent
+    results_dir = Path(results_dir or base_dir / 'outputs' / 'results')
+    results_dir.mkdir(parents=True, exist_ok=True)
+    data_dir = str(data_dir or Path(config.DATA_DIR))
+    prefix = '全銘柄_MA52_陽線包み' + ('_緩和' if relaxed_engulfing else '')
+
+    start_time = time.time()
+    panel = rankings.load_panel(data_dir, verbose=True)
+    dates = sweep_dates(panel, date_from, date_to, step)
+    print(f"スイープ: {len(dates)} 日（{date_from} 〜 {date_to}, step={step}）、{len(panel.tickers)} 銘柄")
+    if not dates:
+        return []
+    state = _WeeklySweep(panel)
+
+    # main() と同じ対象: コード 1300 以上、除外銘柄以外
+    skip = screening.excluded_tickers()
+
+    def _target(t):
+        try:
+            return int(t.replace('.T', '')) >= 1300 and t not in skip
+        except ValueError:
+            return False
+    target = np.fromiter((_target(t) for t in panel.tickers), dtype=bool, count=len(panel.tickers))
+    params = {'relaxed_engulfing': bool(relaxed_engulfing), 'require_ma52': bool(require_ma52)}
+
+    def _one(as_of):
+        hit, price = state.evaluate(as_of, require_ma52=require_ma52, relaxed_engulfing=relaxed_engulfing)
+        idx = np.flatnonzero(hit & target)
+        df = pd.DataFrame({'ticker': panel.tickers[idx], 'price': price[idx]})
+        df = df.sort_values('price', kind='stable').reset_index(drop=True)
+        if combined:
+            return as_of, df, None
+        created_ts = datetime.now().strftime('%Y%m%d%H%M%S')
+        out = results_dir / f"{prefix}_{as_of}_{created_ts}.csv"
+        with open(out, 'w', newline='', encoding='utf-8') as f:
+            writer = csv.writer(f)
+            writer.writerow(['ticker', 'price'])
+            for t, p in zip(df['ticker'], df['price']):
+                writer.writerow([t, f"{p:.2f}"])
+        if register:
+            try:
+                import results_catalog
+                results_catalog.register(out, 'weekly_ma52_engulfing', params=params, as_of=as_of)
+            except Exception as e:
+                print(f"結果カタログへの登録に失敗しました: {e}")
+        return as_of, df, str(out)
+
+    with ThreadPoolExecutor(max_workers=max(1, int(workers))) as ex:
+        done = list(ex.map(_one, dates))
+    for as_of, df, out in done:
+        print(f"  {as_of}: {len(df)}件" + (f" -> {out}" if out else ''))
+
+    outputs = [out for _, _, out in done if out]
+    if combined:
+        long_df = pd.concat([df.assign(as_of=as_of) for as_of, df, _ in done], ignore_index=True)
+        long_df = long_df[['as_of', 'ticker', 'price']]
+        out = results_dir / f"{prefix}_sweep_{dates[0]}_{dates[-1]}_{step}.csv"
+        long_df.to_csv(out, index=False, float_format='%.2f', encoding='utf-8')
+        outputs = [str(out)]
+        print(f"結果: {out}（{len(long_df)} 行）")
+    print(f"処理時間: {time.time() - start_time:.1f}秒")
+    return outputs
+
+
+def parse_args():
+    import argparse
+    p = argparse.ArgumentParser(description='Scan cached JP tickers for weekly MA52 + bullish engulfing')
+    p.add_argument('--relaxed', action='store_true', help='Relaxed engulfing check')
+    p.add_argument('--no-require-ma52', dest='require_ma52', action='store_false', help='Disable the MA52 condition')
+    p.add_argument('--end-date', type=str, default=None, help='Single as-of date (YYYY-MM-DD)')
+    p.add_argument('--from', dest='date_from', type=str, default=None, help='Sweep start date (YYYY-MM-DD)')
+    p.add_argument('--to', dest='date_to', type=str, default=None, help='Sweep end date (default: today)')
+    p.add_argument('--step', choices=['week', 'day'], default='week', help='Sweep step (week = last trading day of each week)')
+    p.add_argument('--workers', type=int, default=4, help='Threads used to evaluate/write sweep dates')
+    p.add_argument('--combined', action='store_true', help='Write one long-format table (as_of,ticker,price) instead of one file per date')
+    return p.parse_args()
 
 
 if __name__ == "__main__":
-    main()
+    args = parse_args()
+    if args.date_from:
+        sweep(args.date_from, args.date_to or datetime.now().strftime('%Y-%m-%d'), step=args.step,
+              relaxed_engulfing=args.relaxed, require_ma52=args.require_ma52, workers=args.workers, combined=args.combined)
+    else:
+        main(relaxed_engulfing=args.relaxed, end_date=args.end_date, require_ma52=args.require_ma52)
@@ -2,146 +2,41 @@
 """
 今日の米国株値上がり率上位60銘柄を取得して保存
 """
-import yfinance as yf
-import pandas as pd
-from datetime import datetime, timedelta
 import csv
 import os
 
 def get_sp500_tickers():
-    """S&P 500のティッカーリストを取得"""
+    """S&P 500のティッカーリストを取得（universe_registry に保存済みのもの）"""
     try:
-        url = 'https://en.wikipedia.org/wiki/List_of_S%26P_500_companies'
-        tables = pd.read_html(url)
-        sp500_table = tables[0]
-        tickers = sp500_table['Symbol'].tolist()
-        tickers = [t.replace('.', '-') for t in tickers]
-        return tickers
+        import universe_registry
+        return list(universe_registry.load('sp500'))
     except Exception as e:
         print(f"S&P 500取得エラー: {e}")
         return []
 
 def get_comprehensive_tickers():
-    """包括的な米国株ティッカーリスト"""
-    # S&P 500を基本に
-    tickers = get_sp500_tickers()
-    
-    # 主要な追加銘柄
-    additional = [
-        # Tech
-        "NVDA", "AMD", "INTC", "QCOM", "TXN", "ADI", "MRVL", "AVGO",
-        "SNOW", "DDOG", "CRWD", "ZS", "NET", "OKTA", "MDB", "TEAM",
-        # Finance
-        "SOFI", "HOOD", "AFRM", "UPST", "LC", "SQ", "PYPL",
-        # EV/Auto
-        "TSLA", "RIVN", "LCID", "NIO", "XPEV", "LI", "F", "GM",
-        # Biotech
-        "MRNA", "BNTX", "NVAX", "VRTX", "CRSP", "EDIT", "BEAM",
-        # Cannabis
-        "TLRY", "CGC", "SNDL", "ACB", "CRON", "OGI",
-        # Energy
-        "PLUG", "FCEL", "BE", "BLNK", "CHPT", "ENPH", "SEDG",
-        # Small caps
-        "AMC", "GME", "BBBY", "KOSS", "BB", "NOK",
-        # Airlines
-        "AAL", "UAL", "DAL", "LUV", "JBLU", "ALK",
-        # Retail
-        "ETSY", "W", "CHWY", "RVLV", "SHOP"
-    ]
-    
-    # 重複を削除して結合
-    all_tickers = list(set(tickers + additional))
-    return all_tickers
+    """包括的な米国株ティッカーリスト（universe_registry の comprehensive、重複・上場廃止は除外済み）"""
+    import universe_registry
+    return list(universe_registry.load('comprehensive'))
 
-def get_daily_gainers(tickers, top_n=60, verbose=False):
+def get_daily_gainers(tickers, top_n=60, verbose=False, date=None):
     """
-    今日の値上がり率を計算して上位N銘柄を取得
+    値上がり率の上位N銘柄を取得（ローカルの価格ストア data_us/ から rankings で計算）
+
+    事前に run_universe_us.py --fetch でストアを更新しておくこと。
     """
-    results = []
-    total = len(tickers)
-    
-    print(f"対象銘柄数: {total}")
+    import rankings
+
+    print(f"対象銘柄数: {len(tickers)}")
     print("値上がり率を計算中...")
-    
-    batch_size = 50
-    for i in range(0, total, batch_size):
-        batch = tickers[i:i+batch_size]
-        
-        if verbose and i % 200 == 0:
-            print(f"処理中... {i}/{total}")
-        
-        try:
-            # 過去5日分のデータを取得
-            data = yf.download(batch, period='5d', progress=False)
-            
-            if data.empty:
-                continue
-            
-            # 各銘柄の情報を抽出
-            for ticker in batch:
-                try:
-                    if len(batch) == 1:
-                        # 単一銘柄
-                        if 'Close' not in data.columns:
-                            continue
-                        ticker_data = data
-                    else:
-                        # 複数銘柄
-                        if isinstance(data.columns, pd.MultiIndex):
-                            if ('Close', ticker) in data.columns:
-                                ticker_data = data.xs(ticker, level=1, axis=1)
-                            elif (ticker, 'Close') in data.columns:
-                                ticker_data = data.xs(ticker, level=0, axis=1)
-                            else:
-                                continue
-                        else:
-                            continue
-                    
-                    # 終値を取得
-                    if 'Close' in ticker_data.columns:
-                        closes = ticker_data['Close'].dropna()
-                    else:
-                        closes = ticker_data.dropna()
-                    
-                    if len(closes) < 2:
-                        continue
-                    
-                    # 最新と前日の終値
-                    latest_close = float(closes.iloc[-1])
-                    prev_close = float(closes.iloc[-2])
-                    
-                    # 値上がり率を計算
-                    change_pct = ((latest_close - prev_close) / prev_close) * 100
-                    
-                    # 出来高も取得
-                    volume = 0
-                    if 'Volume' in ticker_data.columns:
-                        volumes = ticker_data['Volume'].dropna()
-                        if len(volumes) > 0:
-                            volume = float(volumes.iloc[-1])
-                    
-                    results.append({
-                        'ticker': ticker,
-                        'price': latest_close,
-                        'change_pct': change_pct,
-                        'volume': volume
-                    })
-                    
-                except Exception as e:
-                    if verbose:
-                        print(f"  {ticker}: エラー - {e}")
-                    continue
-        
-        except Exception as e:
-            if verbose:
-                print(f"Batch error: {e}")
-            continue
-    
-    # 値上がり率でソート
-    results.sort(key=lambda x: x['change_pct'], reverse=True)
-    
-    # 上位N件を返す
-    return results[:top_n]
+
+    df = rankings.rank('gainers', top_n=top_n, date=date, markets=('us',), tickers=tickers, verbose=verbose)
+    if df.empty:
+        print("ローカルストアに価格データがありません。python run_universe_us.py --fetch --market comprehensive で取得してください。")
+    return [
+        {'ticker': r.ticker, 'price': float(r.price), 'change_pct': float(r.change_pct), 'volume': float(r.volume) if r.volume == r.volume else 0}
+        for r in df.itertuples(index=False)
+    ]
 
 def main():
     print("=" * 70)
@@ -192,6 +87,12 @@ def main():
                 'volume': stock['volume']
             })
     
+    try:
+        import results_catalog
+        results_catalog.register(output_path, 'daily_gainers', params={'top_n': 60, 'universe': 'comprehensive'})
+    except Exception as e:
+        print(f"結果カタログへの登録に失敗しました: {e}")
+
     print()
     print("=" * 70)
     print(f"✓ 結果を保存しました: {output_path}")
@@ -202,17 +103,18 @@ def main():
     print("【上位10銘柄の詳細】")
     print()
     
+    # 会社名・業種は outputs/panels/metadata.json にキャッシュ（未取得分だけ並列に取得）
+    import rankings
+    meta = rankings.get_metadata([stock['ticker'] for stock in top_gainers[:10]])
     for i, stock in enumerate(top_gainers[:10], 1):
-        try:
-            ticker_obj = yf.Ticker(stock['ticker'])
-            info = ticker_obj.info
-            
-            print(f"{i}. {stock['ticker']} - {info.get('longName', 'N/A')}")
+        info = meta.get(stock['ticker'])
+        if info:
+            print(f"{i}. {stock['ticker']} - {info.get('name') or 'N/A'}")
             print(f"   価格: ${stock['price']:.2f} (+{stock['change_pct']:.2f}%)")
-            print(f"   業種: {info.get('sector', 'N/A')}")
-            print(f"   産業: {info.get('industry', 'N/A')}")
+            print(f"   業種: {info.get('sector') or 'N/A'}")
+            print(f"   産業: {info.get('industry') or 'N/A'}")
             print()
-        except:
+        else:
             print(f"{i}. {stock['ticker']}")
             print(f"   価格: ${stock['price']:.2f} (+{stock['change_pct']:.2f}%)")
             print()
@@ -56,16 +56,12 @@ def main():
     print("ステップ1: 2ドル以下の銘柄を検索中...")
     print()
     
-    from data_fetcher_us import filter_tickers_by_price
+    from data_fetcher_us import price_bands
     
-    # 2ドル以下の銘柄をフィルタリング
-    low_price_tickers = filter_tickers_by_price(
-        test_tickers,
-        max_price=2.0,
-        min_price=0.10,  # 極端なペニーストックは除外
-        batch_size=20,
-        verbose=True
-    )
+    # 2ドル以下と（見つからなかったときの参考用に）5ドル以下を一度に振り分ける
+    # 極端なペニーストックは除外（0.10ドル未満）
+    bands = price_bands(test_tickers, [(0.10, 2.0), (0.10, 5.0)], verbose=True)
+    low_price_tickers = bands[(0.10, 2.0)]
     
     print()
     print("=" * 60)
@@ -78,13 +74,7 @@ def main():
         
         # 5ドル以下で試してみる
         print("\n参考: 5ドル以下の銘柄を検索してみます...")
-        low_price_tickers = filter_tickers_by_price(
-            test_tickers,
-            max_price=5.0,
-            min_price=0.10,
-            batch_size=20,
-            verbose=False
-        )
+        low_price_tickers = bands[(0.10, 5.0)]
         print(f"\n5ドル以下の銘柄: {len(low_price_tickers)}件")
         if low_price_tickers:
             for ticker in low_price_tickers[:10]:
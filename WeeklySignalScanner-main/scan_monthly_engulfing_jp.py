@@ -58,6 +58,14 @@ def check_monthly_engulfing(ticker, verbose=False):
 def get_japanese_tickers(start=1000, end=9999):
     excluded = {1326, 1543, 1555, 1586, 1593, 1618, 1621, 1672, 1674, 1679,
                 1736, 1795, 1807, 2012, 2013, 1325, 2050, 2250, 1656}
+    excluded_t = {f"{code:04d}.T" for code in excluded}
+    try:
+        # 保存済みの jp_all ユニバース（上場廃止扱いの銘柄を除外済み）を範囲で絞る
+        import universe_registry
+        return [t for t in universe_registry.load('jp_all')
+                if start <= int(t[:4]) <= end and t not in excluded_t]
+    except Exception:
+        pass
     tickers = []
     for code in range(start, end + 1):
         if code not in excluded:
@@ -0,0 +1,691 @@
+"""
+Streamlit の管理ボタンから起動する長時間処理（取得・スキャン）の本体
+
+以前は `app_streamlit.py` のボタン処理内にループが直接書かれていたが、
+バックグラウンドジョブ（jobs.py）のワーカープロセスから呼べるように関数化した。
+
+各タスクは `task(params, progress)` の形で呼ばれる:
+  - params: JSON 化可能な dict（ジョブファイルに保存される）
+  - progress: progress(done, total, message='') を呼ぶと進捗が記録される。
+    キャンセル要求があった場合は progress() 呼び出し時に jobs.JobCancelled が送出される。
+返り値は JSON 化可能な dict（saved_paths などを含む）。
+"""
+import csv
+import datetime
+import os
+import re
+import traceback
+from pathlib import Path
+
+import pandas as pd
+
+BASE_DIR = Path(__file__).resolve().parent
+REPO_ROOT = BASE_DIR.parent
+RESULTS_DIR = BASE_DIR / 'outputs' / 'results'
+DATA_CACHE_DIR = REPO_ROOT / 'data'
+
+
+def _noop_progress(done, total, message=''):
+    pass
+
+
+def _utc_ts():
+    return datetime.datetime.now(datetime.timezone.utc).strftime('%Y%m%d_%H%M%S')
+
+
+def parse_ticker_text(text):
+    """カンマ/改行区切りのティッカー入力を正規化する（数値のみなら 4 桁 + .T）。"""
+    parsed = []
+    for p in [p.strip() for p in re.split('[,\n;]+', text or '') if p.strip()]:
+        token = p
+        if re.fullmatch(r"\d{1,4}", token):
+            token = f"{int(token):04d}.T"
+        else:
+            if not token.upper().endswith('.T'):
+                token = token.upper()
+        parsed.append(token)
+    return parsed
+
+
+def _note_results(results_dir, saved_paths):
+    """結果 CSV の保存を dir_state のマニフェストに反映する（UI のファイル一覧用）。"""
+    try:
+        import dir_state
+        dir_state.note_writes(results_dir, saved_paths, suffix='.csv')
+    except Exception:
+        pass
+
+
+def _register_result(path, scan_type, params=None, as_of=None):
+    """結果ファイルを results_catalog に登録する（スキャン種別・パラメータ・列情報と parquet）。"""
+    try:
+        import results_catalog
+        results_catalog.register(path, scan_type, params=params, as_of=as_of)
+    except Exception:
+        pass
+
+
+def cached_tickers(data_dir=None):
+    data_dir = Path(data_dir) if data_dir else DATA_CACHE_DIR
+    return sorted([p.stem for p in data_dir.glob('*.parquet')]) if data_dir.exists() else []
+
+
+def publish_results(paths, message):
+    """結果ファイルを Git 公開キュー（results_publisher）に積む。コミット/push は別プロセスでまとめて行う。"""
+    if not paths:
+        return None
+    try:
+        import results_publisher
+        entry = results_publisher.enqueue(paths, message)
+        return {'queued': entry['id'], 'files': len(entry['paths'])}
+    except Exception as e:
+        return {'queued': None, 'error': str(e)}
+
+
+# ---------------------------------------------------------------------------
+# データ取得
+# ---------------------------------------------------------------------------
+
+def build_fetch_targets(fetch_mode, start_code, end_code, manual_tickers='', allow_excluded=False, data_dir='data'):
+    """ダウンロード対象の銘柄リストを作る（`データをダウンロード` ボタンと同じ規則）。"""
+    import data_fetcher
+    from data_fetcher import load_ticker_from_cache
+
+    if manual_tickers and manual_tickers.strip():
+        candidates = parse_ticker_text(manual_tickers)
+    elif fetch_mode.startswith('すべての銘柄'):
+        candidates = [f"{i:04d}.T" for i in range(start_code, end_code + 1)]
+        if not allow_excluded:
+            excluded = getattr(data_fetcher, 'EXCLUDED_TICKERS', set())
+            candidates = [t for t in candidates if t not in excluded]
+    else:
+        tickers_from_data = []
+        if os.path.isdir(data_dir):
+            for fn in os.listdir(data_dir):
+                if fn.endswith('.parquet'):
+                    ticker = os.path.splitext(fn)[0]
+                    try:
+                        int(ticker.replace('.T', ''))
+                    except Exception:
+                        continue
+                    tickers_from_data.append(ticker)
+        tickers_from_data = sorted(set(tickers_from_data))
+        candidates = [t for t in tickers_from_data if start_code <= int(t.replace('.T', '')) <= end_code]
+
+    if not fetch_mode.startswith('今日の日付が無い'):
+        return candidates
+
+    targets = []
+    today = pd.Timestamp.today().normalize()
+    for t in candidates:
+        df = load_ticker_from_cache(t, cache_dir=data_dir)
+        if df is None:
+            targets.append(t)
+            continue
+        try:
+            last = pd.to_datetime(df.index.max()).normalize()
+            if last < today:
+                targets.append(t)
+        except Exception:
+            targets.append(t)
+    return targets
+
+
+def fetch_task(params, progress=_noop_progress):
+    from data_fetcher import fetch_and_save_list
+
+    data_dir = params.get('data_dir', 'data')
+    progress(0, 0, '取得対象を計算中...')
+    targets = build_fetch_targets(
+        params.get('fetch_mode', ''),
+        int(params.get('start', 1300)),
+        int(params.get('end', 9999)),
+        manual_tickers=params.get('manual_tickers', ''),
+        allow_excluded=bool(params.get('allow_excluded', False)),
+        data_dir=data_dir,
+    )
+    if not targets:
+        return {'fetched': 0, 'message': '取得対象はありません（すでに最新）'}
+
+    import indicator_state
+    seq_before = indicator_state.latest_seq(data_dir)
+    batch = int(params.get('batch_size', 200))
+    total = len(targets)
+    interval = params.get('interval', '1d')
+    for i in range(0, total, batch):
+        progress(i, total, f'取得中... {i}/{total} 銘柄')
+        fetch_and_save_list(targets[i:i + batch], batch_size=batch, period=params.get('period', '1y'), interval=interval, out_dir=data_dir, retry_count=1, sleep_between_batches=float(params.get('sleep', 1.0)), allow_excluded=bool(params.get('allow_excluded', False)), verbose=True)
+    # 新しい足が入った銘柄数（indicator_state の変更ログ）。日足のときだけ記録される
+    seq_after = indicator_state.latest_seq(data_dir)
+    changed = len(indicator_state.changes_since(seq_before, seq_after, data_dir)) if seq_after > seq_before else 0
+    progress(total, total, f'データダウンロード完了（更新 {changed} 銘柄）')
+
+    # 取得後の差分スキャン: 変わった銘柄だけを再評価するジョブを続けて登録する
+    post_job = None
+    post_scans = [s for s in params.get('post_scans') or [] if s]
+    if post_scans and interval == '1d' and changed > 0:
+        import jobs
+        post_job = jobs.submit('incremental_scan', {
+            'scans': post_scans,
+            'data_dir': data_dir,
+            'auto_commit': bool(params.get('auto_commit', True)),
+        })['id']
+    return {'fetched': total, 'changed': changed, 'post_job': post_job, 'message': 'データダウンロード完了'}
+
+
+# ---------------------------------------------------------------------------
+# 差分スキャン（incremental_scan: 新しい足が入った銘柄だけ再評価）
+# ---------------------------------------------------------------------------
+
+def incremental_scan_task(params, progress=_noop_progress):
+    import incremental_scan
+
+    data_dir = params.get('data_dir', 'data')
+    results_dir = params.get('results_dir', RESULTS_DIR)
+    scans = params.get('scans') or ['weekly_ma52_engulfing']
+    scan_params = params.get('scan_params') or {}
+    summaries, saved_paths = [], []
+    for i, scan_type in enumerate(scans):
+        progress(i, len(scans), f'差分スキャン中... {incremental_scan.SCAN_LABELS.get(scan_type, scan_type)}')
+        res = incremental_scan.run(scan_type, scan_params.get(scan_type), data_dir=data_dir, results_dir=results_dir,
+                                   full=bool(params.get('full', False)))
+        summaries.append(res)
+        if res['path']:
+            saved_paths.append(str(res['path']))
+    progress(len(scans), len(scans), '差分スキャン完了: ' + ', '.join(
+        f"{incremental_scan.SCAN_LABELS.get(r['scan_type'], r['scan_type'])} {r['hits']} 件（評価 {r['evaluated']}）" for r in summaries))
+    _note_results(results_dir, saved_paths)
+    publish_status = None
+    if params.get('auto_commit', True) and saved_paths:
+        publish_status = publish_results(saved_paths, 'chore(scan): update incremental scan results')
+    return {'saved_paths': saved_paths, 'scans': summaries, 'publish': publish_status}
+
+
+# ---------------------------------------------------------------------------
+# 月足 MA9/MA24 ゴールデンクロス
+# ---------------------------------------------------------------------------
+
+def _gc_hit(ticker, snap, gc_within_months=0):
+    """indicator_state の snapshot から、最後のゴールデンクロスが n か月以内なら結果行を返す。"""
+    cross = snap.get('gc_month')
+    if not cross:
+        return None
+    if gc_within_months > 0 and pd.Period(cross, 'M') < pd.Period(snap['month_label'], 'M') - gc_within_months:
+        return None
+    return {
+        'ticker': ticker,
+        'cross_month': cross,
+        'ma9': round(float(snap['gc_ma9']), 2),
+        'ma24': round(float(snap['gc_ma24']), 2),
+        'latest_close': round(float(snap['close']), 2),
+    }
+
+
+def monthly_gc_scan(params, progress=_noop_progress):
+    import config
+    import yfinance as yf
+    from data_fetcher import load_ticker_from_cache
+
+    gc_within_months = int(params.get('within_months', 0))
+    results_dir = Path(params.get('results_dir', RESULTS_DIR))
+    data_cache_dir = Path(params.get('data_dir', DATA_CACHE_DIR))
+    cache_only = bool(params.get('cache_only', True))
+    cached_files = cached_tickers(data_cache_dir)
+    if cache_only and cached_files:
+        tickers = cached_files
+    else:
+        tickers = cached_files if cached_files else [f"{i:04d}.T" for i in range(1300, 10000)]
+
+    # 24 か月以上の履歴がある銘柄は indicator_state の月足 MA9/MA24 と最後のクロスを使う
+    try:
+        import indicator_state
+        snaps = indicator_state.snapshots(tickers, data_dir=str(data_cache_dir))
+    except Exception:
+        snaps = {}
+
+    processed = 0
+    found_count = 0
+    failed_details = []
+    diag_rows = []
+    gc_results = []
+    total = len(tickers)
+    for idx, t in enumerate(tickers):
+        collect_diag = (idx < 200)
+        processed += 1
+        if processed % 50 == 0:
+            progress(processed, total, f'月足GC: 処理中 {processed}/{total}')
+        snap = snaps.get(t)
+        if snap is not None and snap['n_months'] >= 24:
+            cross = snap['gc_month']
+            if collect_diag:
+                row = {'ticker': t, 'mdf_len': snap['n_months'], 'ma9_non_na': None, 'ma24_non_na': None, 'crosses': None}
+                if cross:
+                    row['last_cross'] = cross
+                diag_rows.append(row)
+            hit = _gc_hit(t, snap, gc_within_months)
+            if hit:
+                gc_results.append(hit)
+                found_count += 1
+            continue
+        try:
+            df = None
+            if cache_only:
+                try:
+                    df = load_ticker_from_cache(t, cache_dir=str(data_cache_dir))
+                except Exception:
+                    df = None
+
+            if df is None:
+                mdf = yf.Ticker(t).history(period='5y', interval='1mo')
+            else:
+                if not isinstance(df.index, pd.DatetimeIndex):
+                    df.index = pd.to_datetime(df.index)
+                df = df.sort_index()
+                mdf = df.resample('ME').agg({'Open': 'first', 'High': 'max', 'Low': 'min', 'Close': 'last', 'Volume': 'sum'})
+
+            # MA24 に足りなければ月足の長期履歴を取得
+            try:
+                if mdf is None or len(mdf) < 24:
+                    ext = yf.Ticker(t).history(period='10y', interval='1mo')
+                    if ext is not None and not ext.empty and len(ext) > (len(mdf) if mdf is not None else 0):
+                        mdf = ext
+                        if not isinstance(mdf.index, pd.DatetimeIndex):
+                            mdf.index = pd.to_datetime(mdf.index)
+                        mdf = mdf.sort_index()
+            except Exception:
+                pass
+
+            if mdf is None or mdf.empty or len(mdf) < 2:
+                continue
+            mdf = mdf.dropna(subset=['Close'])
+            if mdf.empty or len(mdf) < 2:
+                continue
+
+            closes = mdf['Close'].astype(float)
+            ma9 = closes.rolling(window=9).mean()
+            ma24 = closes.rolling(window=24).mean()
+            crosses = []
+            for i in range(1, len(mdf)):
+                if pd.isna(ma9.iat[i-1]) or pd.isna(ma24.iat[i-1]) or pd.isna(ma9.iat[i]) or pd.isna(ma24.iat[i]):
+                    continue
+                prev9 = float(ma9.iat[i-1]); prev24 = float(ma24.iat[i-1])
+                curr9 = float(ma9.iat[i]); curr24 = float(ma24.iat[i])
+                if prev9 <= prev24 and curr9 > curr24:
+                    crosses.append(i)
+
+            if not crosses:
+                if collect_diag:
+                    diag_rows.append({'ticker': t, 'mdf_len': len(mdf), 'ma9_non_na': int(ma9.count()), 'ma24_non_na': int(ma24.count()), 'crosses': 0})
+                continue
+
+            last_idx = crosses[-1]
+            last_cross_date = mdf.index[last_idx]
+            if gc_within_months > 0:
+                start_ts = mdf.index.max() - pd.DateOffset(months=gc_within_months)
+                if last_cross_date < start_ts:
+                    continue
+
+            gc_results.append({
+                'ticker': t,
+                'cross_month': last_cross_date.strftime('%Y-%m'),
+                'ma9': round(float(ma9.iat[last_idx]), 2) if not pd.isna(ma9.iat[last_idx]) else None,
+                'ma24': round(float(ma24.iat[last_idx]), 2) if not pd.isna(ma24.iat[last_idx]) else None,
+                'latest_close': round(float(closes.iat[-1]), 2),
+            })
+            found_count += 1
+            if collect_diag:
+                diag_rows.append({'ticker': t, 'mdf_len': len(mdf), 'ma9_non_na': int(ma9.count()), 'ma24_non_na': int(ma24.count()), 'crosses': len(crosses), 'last_cross': last_cross_date.strftime('%Y-%m')})
+        except Exception as e:
+            failed_details.append((t, str(e), traceback.format_exc()))
+            continue
+
+    os.makedirs(results_dir, exist_ok=True)
+    saved_paths = []
+    error_log = None
+    if failed_details:
+        try:
+            err_log = results_dir / f'monthly_gc_errors_{_utc_ts()}.log'
+            with open(err_log, 'w', encoding='utf-8') as ef:
+                for t, msg, tb in failed_details:
+                    ef.write(f'--- {t} ---\n')
+                    ef.write(msg + '\n')
+                    ef.write(tb + '\n')
+            error_log = str(err_log)
+        except Exception:
+            pass
+
+    if gc_results:
+        gc_results = sorted(gc_results, key=lambda r: (r.get('latest_close') is None, r.get('latest_close', 0)))
+        base_name = Path(config.jp_filename('月足_MA9_MA24_GoldenCross')).name
+        stem = Path(base_name).stem
+        ext = Path(base_name).suffix or '.csv'
+        if gc_within_months > 0:
+            stem = f"{stem}_within{gc_within_months}m"
+        out_path = results_dir / f"{stem}_{_utc_ts()}{ext}"
+        with open(out_path, 'w', newline='', encoding='utf-8') as f:
+            writer = csv.DictWriter(f, fieldnames=['ticker', 'cross_month', 'ma9', 'ma24', 'latest_close'])
+            writer.writeheader()
+            writer.writerows(gc_results)
+        saved_paths.append(str(out_path))
+        _register_result(out_path, 'monthly_gc', {'within_months': gc_within_months, 'cache_only': cache_only})
+        _note_results(results_dir, saved_paths)
+
+    diag_path = None
+    try:
+        if diag_rows:
+            diag_dir = results_dir / 'diagnostics'
+            diag_dir.mkdir(parents=True, exist_ok=True)
+            diag_path = diag_dir / f'monthly_gc_diag_{_utc_ts()}.csv'
+            with open(diag_path, 'w', newline='', encoding='utf-8') as dfh:
+                writer = csv.DictWriter(dfh, fieldnames=list(diag_rows[0].keys()))
+                writer.writeheader()
+                writer.writerows(diag_rows)
+            diag_path = str(diag_path)
+    except Exception:
+        diag_path = None
+
+    progress(total, total, f'月足GC: 処理終了 processed={processed} found={found_count} errors={len(failed_details)}')
+    publish_status = None
+    if saved_paths and params.get('auto_commit', True):
+        within = f' within{gc_within_months}m' if gc_within_months else ''
+        publish_status = publish_results(saved_paths, f"chore(monthly_gc): add monthly MA9/MA24 GC{within}")
+    return {
+        'saved_paths': saved_paths,
+        'found': found_count,
+        'processed': processed,
+        'errors': len(failed_details),
+        'error_log': error_log,
+        'diag_path': diag_path,
+        'publish': publish_status,
+    }
+
+
+# ---------------------------------------------------------------------------
+# 短期急騰: 本物の初動
+# ---------------------------------------------------------------------------
+
+def _momentum_hit(ticker, today_close, price_change_pct, volume_ratio, ma25_now,
+                  min_change_pct=5.0, min_volume_ratio=3.0, max_ma25_deviation_pct=20.0):
+    """前日比 +5% 以上・出来高 3 倍以上・25日線乖離 20% 未満（既定）なら結果行を返す。"""
+    deviation_from_ma25 = ((today_close - ma25_now) / ma25_now * 100.0) if ma25_now and ma25_now != 0 else 9999.0
+    if (price_change_pct >= min_change_pct and volume_ratio >= min_volume_ratio
+            and deviation_from_ma25 < max_ma25_deviation_pct):
+        return {
+            'コード': ticker,
+            '本日終値': round(today_close, 1),
+            '前日比(%)': round(price_change_pct, 2),
+            '出来高倍率': round(volume_ratio, 2),
+            '25日線乖離率(%)': round(deviation_from_ma25, 2)
+        }
+    return None
+
+
+def momentum_scan(params, progress=_noop_progress):
+    import yfinance as yf
+    from data_fetcher import load_ticker_from_cache
+
+    results_dir = Path(params.get('results_dir', RESULTS_DIR))
+    data_cache_dir = Path(params.get('data_dir', DATA_CACHE_DIR))
+    if params.get('tickers'):
+        targets = list(params['tickers'])
+    else:
+        targets = cached_tickers(data_cache_dir)
+    if not targets:
+        return {'saved_paths': [], 'found': 0, 'message': '対象銘柄が見つかりません。data/*.parquet がない場合は手動でティッカーを入力してください。'}
+
+    # cache_only（キャッシュ優先）が False なら、キャッシュを使わず全銘柄を yfinance から取り直す
+    cache_only = bool(params.get('cache_only', True))
+
+    # キャッシュのある銘柄は indicator_state の MA25・平均出来高をそのまま使う（全履歴を読み直さない）
+    snaps = {}
+    if cache_only:
+        try:
+            import indicator_state
+            snaps = indicator_state.snapshots(targets, data_dir=str(data_cache_dir))
+        except Exception:
+            snaps = {}
+
+    results = []
+    errors = []
+    total = len(targets)
+    for idx, t in enumerate(targets):
+        if idx % 50 == 0:
+            progress(idx, total, f'短期スクリーニング中... {idx}/{total} 銘柄')
+        snap = snaps.get(t)
+        if snap is not None and snap['n_days'] >= 25 and snap['prev_close']:
+            hit = _momentum_hit(t, snap['close'], snap['change_pct'], snap['volume_ratio'], snap['ma25'])
+            if hit:
+                results.append(hit)
+            continue
+        try:
+            df = None
+            if cache_only:
+                try:
+                    df = load_ticker_from_cache(t, cache_dir=str(data_cache_dir))
+                except Exception:
+                    df = None
+
+            if df is None or len(df) < 25:
+                mdf = yf.Ticker(t).history(period='40d', interval='1d')
+            else:
+                if not isinstance(df.index, pd.DatetimeIndex):
+                    df.index = pd.to_datetime(df.index)
+                df = df.sort_index()
+                mdf = df.tail(40)
+
+            if mdf is None or mdf.empty or len(mdf) < 25:
+                continue
+            mdf = mdf.dropna(subset=['Close', 'Volume'])
+            if mdf.empty or len(mdf) < 25:
+                continue
+
+            closes = mdf['Close'].astype(float)
+            volumes = mdf['Volume'].astype(float)
+            today_close = float(closes.iloc[-1])
+            prev_close = float(closes.iloc[-2])
+            price_change_pct = (today_close - prev_close) / prev_close * 100.0
+
+            # 過去20営業日（当日を除く）の平均出来高
+            if len(volumes) >= 22:
+                avg_volume_20d = float(volumes.iloc[-22:-2].mean())
+            else:
+                avg_volume_20d = float(volumes.iloc[:-1].mean()) if len(volumes) > 1 else 0.0
+            today_volume = float(volumes.iloc[-1])
+            volume_ratio = (today_volume / avg_volume_20d) if avg_volume_20d > 0 else 0.0
+
+            ma25 = closes.rolling(window=25).mean()
+            ma25_now = float(ma25.iloc[-1]) if not pd.isna(ma25.iloc[-1]) else None
+
+            hit = _momentum_hit(t, today_close, price_change_pct, volume_ratio, ma25_now)
+            if hit:
+                results.append(hit)
+        except Exception as e:
+            errors.append((t, str(e)))
+            continue
+
+    progress(total, total, f'短期スクリーニング完了: {len(results)} 件')
+    saved_paths = []
+    if results:
+        os.makedirs(results_dir, exist_ok=True)
+        out_path = results_dir / f"短期_初動_{_utc_ts()}.csv"
+        pd.DataFrame(results).to_csv(out_path, index=False, encoding='utf-8-sig')
+        saved_paths.append(str(out_path))
+        _register_result(out_path, 'momentum', {'min_change_pct': 5.0, 'min_volume_ratio': 3.0, 'max_ma25_deviation_pct': 20.0})
+        _note_results(results_dir, saved_paths)
+    return {'saved_paths': saved_paths, 'found': len(results), 'errors': len(errors)}
+
+
+# ---------------------------------------------------------------------------
+# 週足 MA52 + 陽線包み足（scan_all_jp_batch）
+# ---------------------------------------------------------------------------
+
+def weekly_scan(params, progress=_noop_progress):
+    import scan_all_jp_batch
+
+    results_dir = Path(params.get('results_dir', RESULTS_DIR))
+    progress(0, 1, 'スキャン中... data/ のキャッシュを使って処理します')
+    # 出力 CSV は scan_all_jp_batch.main が results_catalog に登録してパスを返す
+    # バッチごとに progress を呼ぶので、キャンセル要求は次のバッチの前に効く
+    output_file = scan_all_jp_batch.main(relaxed_engulfing=bool(params.get('relaxed_engulfing', False)), end_date=params.get('end_date'), require_ma52=bool(params.get('require_ma52', True)), on_progress=progress)
+    saved_paths = [str(output_file)] if output_file else []
+    _note_results(results_dir, saved_paths)
+    progress(1, 1, 'スキャン完了: outputs/results を確認してください')
+    publish_status = None
+    if params.get('auto_commit', True):
+        publish_status = publish_results(saved_paths, 'chore(scan): add scan results')
+    return {'saved_paths': saved_paths, 'publish': publish_status}
+
+
+# ---------------------------------------------------------------------------
+# 月足 陽線包み足（n か月以内）
+# ---------------------------------------------------------------------------
+
+def monthly_engulfing_scan(params, progress=_noop_progress):
+    import config
+    import yfinance as yf
+    import scan_monthly_engulfing_jp as sm
+
+    months_within = int(params.get('months_within', 1))
+    lookahead_months = int(params.get('lookahead_months', 6))
+    rise_filter_enable = bool(params.get('rise_filter_enable', False))
+    min_allowed_rise_pct = float(params.get('min_rise_pct', 0.0))
+    max_allowed_rise_pct = float(params.get('max_rise_pct', 50.0))
+    results_dir = Path(params.get('results_dir', RESULTS_DIR))
+    data_cache_dir = Path(params.get('data_dir', DATA_CACHE_DIR))
+
+    cached_files = cached_tickers(data_cache_dir)
+    if params.get('cache_only', True) and cached_files:
+        tickers = cached_files
+    else:
+        tickers = sm.get_japanese_tickers(1000, 9999)
+
+    bullish_results = []
+    total = len(tickers)
+    for i, t in enumerate(tickers):
+        if i % 50 == 0:
+            progress(i, total, f'月足スキャン中... {i}/{total} 銘柄、{months_within}か月以内を確認')
+        try:
+            dfm = yf.Ticker(t).history(period='3y', interval='1mo')
+            if dfm is None or dfm.empty or len(dfm) < 2:
+                continue
+            L = len(dfm)
+            # k=1 -> 当月（最新）と前月, k=2 -> 1か月前とその前, ...
+            for k in range(1, months_within + 1):
+                if L - (k + 1) < 0:
+                    break
+                prev = dfm.iloc[-(k+1)]
+                curr = dfm.iloc[-k]
+                prev_open = float(prev['Open'])
+                prev_close = float(prev['Close'])
+                prev_high = float(prev['High']) if 'High' in prev else max(prev_open, prev_close)
+                prev_low = float(prev['Low']) if 'Low' in prev else min(prev_open, prev_close)
+                curr_open = float(curr['Open'])
+                curr_close = float(curr['Close'])
+
+                is_prev_bearish = prev_close < prev_open
+                is_curr_bullish = curr_close > curr_open
+                bullish_engulfs = (curr_open <= prev_close) and (curr_close >= prev_open)
+                wick_engulf = (curr_open <= prev_low) and (curr_close >= prev_high)
+
+                if is_prev_bearish and is_curr_bullish and (bullish_engulfs or wick_engulf):
+                    signal_idx = L - k
+                    end_idx = min(signal_idx + lookahead_months + 1, L)
+                    try:
+                        closes = dfm['Close'].iloc[signal_idx:end_idx].astype(float)
+                        max_close = float(closes.max()) if not closes.empty else float(curr_close)
+                    except Exception:
+                        max_close = float(curr_close)
+                    try:
+                        max_rise_pct = round((max_close - float(curr_close)) / float(curr_close) * 100.0, 2)
+                    except Exception:
+                        max_rise_pct = 0.0
+
+                    if rise_filter_enable and ((max_rise_pct > max_allowed_rise_pct) or (max_rise_pct < min_allowed_rise_pct)):
+                        pass
+                    else:
+                        bullish_results.append({
+                            'ticker': t,
+                            'pattern': 'bullish_engulfing',
+                            'months_ago': k,
+                            'prev_open': prev_open,
+                            'prev_close': prev_close,
+                            'curr_open': curr_open,
+                            'curr_close': curr_close,
+                            'latest_price': curr_close,
+                            'max_rise_pct': max_rise_pct,
+                        })
+                        break
+        except Exception:
+            continue
+
+    progress(total, total, f'月足スキャン完了: {len(bullish_results)} 件')
+    saved_paths = []
+    if bullish_results:
+        # ファイル名に抽出時刻（UTC）を付与して上書きを防ぐ
+        base_fname = Path(config.jp_filename(f'月足_陽線包み_within{months_within}m')).name
+        stem = Path(base_fname).stem
+        ext = Path(base_fname).suffix or '.csv'
+        out_path = results_dir / f"{stem}_{_utc_ts()}{ext}"
+        out_path.parent.mkdir(parents=True, exist_ok=True)
+        with open(out_path, 'w', newline='', encoding='utf-8') as f:
+            writer = csv.DictWriter(f, fieldnames=['ticker', 'pattern', 'months_ago', 'latest_price', 'prev_open', 'prev_close', 'curr_open', 'curr_close', 'max_rise_pct'])
+            writer.writeheader()
+            writer.writerows(bullish_results)
+        saved_paths.append(str(out_path))
+        _register_result(out_path, 'monthly_engulfing', {
+            'months_within': months_within, 'lookahead_months': lookahead_months,
+            'rise_filter_enable': rise_filter_enable, 'min_rise_pct': min_allowed_rise_pct, 'max_rise_pct': max_allowed_rise_pct,
+        })
+        _note_results(results_dir, saved_paths)
+
+    publish_status = None
+    if params.get('auto_commit', True):
+        publish_status = publish_results(saved_paths, f'chore(monthly_scan): add monthly engulfing within {months_within}m')
+    return {'saved_paths': saved_paths, 'found': len(bullish_results), 'publish': publish_status}
+
+
+# ---------------------------------------------------------------------------
+# まとめてスキャン（batch_scan: パネル 1 回の読み込みで複数スキャン）
+# ---------------------------------------------------------------------------
+
+def batch_scan_task(params, progress=_noop_progress):
+    import batch_scan
+
+    results_dir = Path(params.get('results_dir', RESULTS_DIR))
+    res = batch_scan.run(params.get('scans') or None, params.get('scan_params') or {},
+                         data_dir=params.get('data_dir', str(DATA_CACHE_DIR)), results_dir=results_dir,
+                         as_of=params.get('as_of'), progress=progress)
+    saved_paths = res['saved_paths']
+    _note_results(results_dir, saved_paths)
+    publish_status = None
+    if params.get('auto_commit', True) and saved_paths:
+        publish_status = publish_results(saved_paths, 'chore(scan): add batch scan results')
+    return {
+        'saved_paths': saved_paths,
+        'found': {name: s['hits'] for name, s in res['scans'].items()},
+        'panel_ms': res['panel_ms'],
+        'evaluate_ms': res['evaluate_ms'],
+        'publish': publish_status,
+    }
+
+
+# jobs.py から名前で引くためのタスク一覧
+TASKS = {
+    'fetch': fetch_task,
+    'monthly_gc': monthly_gc_scan,
+    'momentum': momentum_scan,
+    'weekly_scan': weekly_scan,
+    'monthly_engulfing': monthly_engulfing_scan,
+    'incremental_scan': incremental_scan_task,
+    'batch_scan': batch_scan_task,
+}
+
+TASK_LABELS = {
+    'fetch': 'データダウンロード',
+    'monthly_gc': '月足 MA9/MA24 GC',
+    'momentum': '短期_初動',
+    'weekly_scan': '週足 MA52 + 陽線包み',
+    'monthly_engulfing': '月足 陽線包み',
+    'incremental_scan': '差分スキャン',
+    'batch_scan': 'まとめてスキャン',
+}
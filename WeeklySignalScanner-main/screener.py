@@ -94,6 +94,13 @@ def check_signal(ticker, short_window=10, long_window=20, period="2y", interval=
         print(f"{ticker}: ローソク足データが不十分")
         return False
 
+    return _judge_weekly(ticker, prev_open, prev_close, prev_high, prev_low, curr_open, curr_close, ma52_latest,
+                         require_ma52=require_ma52, require_engulfing=require_engulfing, relaxed_engulfing=relaxed_engulfing)
+
+
+def _judge_weekly(ticker, prev_open, prev_close, prev_high, prev_low, curr_open, curr_close, ma52_latest,
+                  require_ma52=True, require_engulfing=True, relaxed_engulfing=False):
+    """直近 2 本の週足と MA52 から 陽線包み足 & MA52以上 を判定する（check_signal / check_signal_from_snapshot 共通）。"""
     # bullish engulfing 判定:
     # - 前の足が陰線 (prev_close < prev_open)
     # - 今の足が陽線 (curr_close > curr_open)
@@ -128,6 +135,25 @@ def check_signal(ticker, short_window=10, long_window=20, period="2y", interval=
     return False
 
 
+def check_signal_from_snapshot(ticker, snap, require_ma52=True, require_engulfing=True, relaxed_engulfing=False):
+    """
+    indicator_state.snapshot() の週足 OHLC と MA52 で check_signal と同じ判定をする（全履歴の再計算をしない）。
+    """
+    if ticker in EXCLUDED_TICKERS:
+        print(f"{ticker}: excluded")
+        return False
+    prev, curr = snap.get('prev_week'), snap.get('week')
+    if not prev or not curr:
+        print(f"{ticker}: データが足りません（2週未満）")
+        return False
+    ma52_latest = snap.get('ma52')
+    if require_ma52 and ma52_latest is None:
+        print(f"{ticker}: MA52が計算できません（データ不足）")
+        return False
+    return _judge_weekly(ticker, prev['o'], prev['c'], prev['h'], prev['l'], curr['o'], curr['c'], ma52_latest,
+                         require_ma52=require_ma52, require_engulfing=require_engulfing, relaxed_engulfing=relaxed_engulfing)
+
+
 def scan_stocks(tickers, short_window=10, long_window=20, period="2y", interval="1wk", threshold=0.0, require_ma52=True, require_engulfing=True):
     """指定したティッカー群を順にチェックし、シグナルが出た銘柄のリストを返す。
 
@@ -147,20 +173,34 @@ def scan_stocks(tickers, short_window=10, long_window=20, period="2y", interval=
     return results
 
 
-def scan_stocks_with_cache(tickers, cache_dir='data', short_window=10, long_window=20, period="2y", interval="1wk", threshold=0.0, require_ma52=True, require_engulfing=True, relaxed_engulfing=False, start_date=None, end_date=None):
+def scan_stocks_with_cache(tickers, cache_dir='data', short_window=10, long_window=20, period="2y", interval="1wk", threshold=0.0, require_ma52=True, require_engulfing=True, relaxed_engulfing=False, start_date=None, end_date=None, use_state=True):
     """Scan using locally cached per-ticker Parquet files if available.
     If a ticker has no cache file, it will be skipped.
     Optional `start_date` and `end_date` may be provided (strings or date-like);
     when provided the cached DataFrame will be sliced to the specified range
     before being passed to `check_signal`.
+    Without a date range, tickers that have an incremental indicator state
+    (indicator_state) are judged from that state instead of re-reading the cache.
     """
     from data_fetcher import load_ticker_from_cache
+    snaps = {}
+    if use_state and not start_date and not end_date:
+        try:
+            import indicator_state
+            snaps = indicator_state.snapshots([t for t in tickers if t not in EXCLUDED_TICKERS], data_dir=cache_dir)
+        except Exception as e:
+            print(f"indicator_state unavailable, falling back to full recompute: {e}")
+            snaps = {}
     results = []
     for t in tickers:
         if t in EXCLUDED_TICKERS:
             print(f"{t}: excluded")
             continue
         try:
+            if t in snaps:
+                if check_signal_from_snapshot(t, snaps[t], require_ma52=require_ma52, require_engulfing=require_engulfing, relaxed_engulfing=relaxed_engulfing):
+                    results.append(t)
+                continue
             df = load_ticker_from_cache(t, cache_dir=cache_dir)
             if df is None:
                 print(f"{t}: cache not found, skipping")
@@ -0,0 +1,669 @@
+"""
+スクリーニング式（小さな宣言的言語）を価格パネルのベクトル演算で一括評価する
+
+条件は Python の式の部分集合で書く:
+
+    weekly.close >= sma(weekly.close, 52) and bullish_engulf(weekly)
+    change_pct(daily.close) >= 5 and daily.volume / sma(shift(daily.volume, 2), 20) >= 3
+    bars_since(cross_over(sma(monthly.close, 9), sma(monthly.close, 24))) <= 3
+
+- 足: daily / weekly（W-FRI）/ monthly。各足に open, high, low, close, volume
+- 演算: + - * /、比較（連鎖可）、and / or / not（& | ~ も可）
+- 関数: FUNCTIONS を参照（sma, ema, highest, lowest, shift, change_pct, abs, min, max,
+  cross_over, cross_under, bars_since, when, highest_since, bullish_engulf）
+
+評価は rankings.PricePanel（銘柄 x 日付の行列）全体に対して行う。各銘柄の有効な足を
+行列の下端に詰め直す（右寄せ）ので、最終行が各銘柄の最新足になり、shift / sma などは
+check_signal と同じく「その銘柄の足の並び」で数える。同じ部分式（例えば sma(weekly.close, 52)）は
+1 回だけ計算し、1 つの Evaluator で評価する複数の式の間でも共有する。
+判定は各銘柄の最新足（as_of を指定するとその日以前の最新足）で行う。
+
+既存スキャンと同じ条件は PRESETS に入れてある。
+
+使い方:
+    python screening.py "weekly.close >= sma(weekly.close, 52) and bullish_engulf(weekly)"
+    python screening.py --preset momentum --as-of 2026-05-15 --output-csv out.csv
+    python screening.py --preset weekly_ma52_engulfing --save
+    python screening.py --explain "daily.close > sma(daily.close, 25) and daily.close > sma(daily.close, 75)"
+"""
+import argparse
+import ast
+import datetime
+import time
+import warnings
+
+import numpy as np
+import pandas as pd
+
+FREQS = {'daily': None, 'weekly': 'W-FRI', 'monthly': 'M'}
+FIELDS = ('open', 'high', 'low', 'close', 'volume')
+_CONSTANTS = {'True': True, 'False': False, 'true': True, 'false': False}
+
+# 既存スキャンと同じ条件（columns は結果に付ける値、sort は (列, 昇順か)）
+PRESETS = {
+    'weekly_ma52_engulfing': {
+        'expr': 'weekly.close >= sma(weekly.close, 52) and bullish_engulf(weekly)',
+        'columns': {'price': 'weekly.close'},
+        'sort': ('price', True),
+        'label': '週足 MA52 + 陽線包み',
+    },
+    'weekly_ma52_engulfing_relaxed': {
+        'expr': 'weekly.close >= sma(weekly.close, 52) and bullish_engulf(weekly, relaxed=True)',
+        'columns': {'price': 'weekly.close'},
+        'sort': ('price', True),
+        'label': '週足 MA52 + 陽線包み（緩和）',
+    },
+    'above_ma52': {
+        # scan_above_ma52_with_cache と同じく日足 52 本の平均
+        'expr': 'daily.close >= sma(daily.close, 52)',
+        'columns': {'price': 'daily.close'},
+        'sort': ('price', True),
+        'label': 'MA52 以上',
+    },
+    'momentum': {
+        # scan_tasks._momentum_hit: 前日比 +5% 以上・出来高 3 倍以上（当日・前日を除く 20 日平均）・25日線乖離 20% 未満
+        'expr': ('change_pct(daily.close) >= 5 and daily.volume / sma(shift(daily.volume, 2), 20) >= 3'
+                 ' and (daily.close / sma(daily.close, 25) - 1) * 100 < 20'),
+        'columns': {
+            'close': 'daily.close',
+            'change_pct': 'change_pct(daily.close)',
+            'volume_ratio': 'daily.volume / sma(shift(daily.volume, 2), 20)',
+            'ma25_deviation_pct': '(daily.close / sma(daily.close, 25) - 1) * 100',
+        },
+        'sort': ('change_pct', False),
+        'label': '短期_初動',
+    },
+    'monthly_gc': {
+        'expr': 'bars_since(cross_over(sma(monthly.close, 9), sma(monthly.close, 24))) >= 0',
+        'columns': {
+            'months_since_cross': 'bars_since(cross_over(sma(monthly.close, 9), sma(monthly.close, 24)))',
+            'ma9': 'sma(monthly.close, 9)',
+            'ma24': 'sma(monthly.close, 24)',
+            'latest_close': 'monthly.close',
+        },
+        'sort': ('latest_close', True),
+        'label': '月足 MA9/MA24 GC',
+    },
+}
+
+
+# ---------------------------------------------------------------------------
+# 式のコンパイル（構文チェックだけ。評価は Evaluator）
+# ---------------------------------------------------------------------------
+
+class Screen:
+    """コンパイル済みのスクリーニング式。"""
+
+    def __init__(self, text, tree, nodes):
+        self.text = text
+        self.tree = tree
+        # 部分式の正規形（ast.dump）-> 式の文字列。explain と共有部分の確認に使う
+        self.nodes = nodes
+
+    def __repr__(self):
+        return f"Screen({self.text!r})"
+
+
+# 関数名 -> (必須の引数の数, 省略可能な引数の数, 受け付けるキーワード)
+FUNCTIONS = {
+    'sma': (2, 0, ()),            # sma(x, n): n 本の単純移動平均
+    'ema': (2, 0, ()),            # ema(x, n): 指数移動平均（span=n）
+    'highest': (2, 0, ()),        # highest(x, n): 直近 n 本の最大
+    'lowest': (2, 0, ()),         # lowest(x, n): 直近 n 本の最小
+    'shift': (1, 1, ()),          # shift(x, n=1): n 本前の値
+    'change_pct': (1, 1, ()),     # change_pct(x, n=1): n 本前からの変化率(%)
+    'abs': (1, 0, ()),
+    'min': (2, 0, ()),            # 要素ごとの小さい方
+    'max': (2, 0, ()),
+    'cross_over': (2, 0, ()),     # a が b を下から上に抜けた足
+    'cross_under': (2, 0, ()),
+    'bars_since': (1, 0, ()),     # 条件が最後に成立してからの本数（未成立は NaN）
+    'when': (2, 0, ()),           # when(cond, x): 条件が最後に成立した足の x
+    'highest_since': (2, 0, ()),  # highest_since(cond, x): 条件が最後に成立した足から今までの x の最大
+    'bullish_engulf': (1, 0, ('relaxed',)),  # bullish_engulf(weekly[, relaxed=True]): screener._judge_weekly と同じ判定
+}
+# 第 2 引数が本数（整数の定数）の関数
+_WINDOW_ARGS = {'sma', 'ema', 'highest', 'lowest', 'shift', 'change_pct'}
+
+
+def _check(node, nodes):
+    """使える構文だけで書かれているかを確かめ、部分式を nodes（dict）に集める。"""
+    if isinstance(node, ast.Expression):
+        return _check(node.body, nodes)
+    if isinstance(node, ast.BoolOp):
+        for v in node.values:
+            _check(v, nodes)
+    elif isinstance(node, ast.UnaryOp):
+        if not isinstance(node.op, (ast.Not, ast.USub, ast.UAdd, ast.Invert)):
+            raise ValueError(f"使えない単項演算子です: {type(node.op).__name__}")
+        _check(node.operand, nodes)
+    elif isinstance(node, ast.BinOp):
+        if not isinstance(node.op, (ast.Add, ast.Sub, ast.Mult, ast.Div, ast.BitAnd, ast.BitOr)):
+            raise ValueError(f"使えない演算子です: {type(node.op).__name__}")
+        _check(node.left, nodes)
+        _check(node.right, nodes)
+    elif isinstance(node, ast.Compare):
+        _check(node.left, nodes)
+        for c in node.comparators:
+            _check(c, nodes)
+    elif isinstance(node, ast.Constant):
+        if not isinstance(node.value, (int, float)):
+            raise ValueError(f"数値・True / False 以外の定数は使えません: {node.value!r}")
+        return
+    elif isinstance(node, ast.Name):
+        if node.id not in _CONSTANTS and node.id not in FREQS:
+            raise ValueError(f"不明な名前です: {node.id}（足は {', '.join(FREQS)}）")
+        return
+    elif isinstance(node, ast.Attribute):
+        if not isinstance(node.value, ast.Name) or node.value.id not in FREQS:
+            raise ValueError(f"系列は <足>.<値> で書いてください（例: weekly.close）: {ast.unparse(node)}")
+        if node.attr not in FIELDS:
+            raise ValueError(f"不明な値です: {node.attr}（{', '.join(FIELDS)}）")
+    elif isinstance(node, ast.Call):
+        name = node.func.id if isinstance(node.func, ast.Name) else None
+        if name not in FUNCTIONS:
+            raise ValueError(f"不明な関数です: {ast.unparse(node.func)}")
+        required, optional, keywords = FUNCTIONS[name]
+        if not required <= len(node.args) <= required + optional:
+            raise ValueError(f"{name}() の引数の数が違います: {ast.unparse(node)}")
+        for kw in node.keywords:
+            if kw.arg not in keywords:
+                raise ValueError(f"{name}() に {kw.arg}= は指定できません")
+        if name in _WINDOW_ARGS and len(node.args) > 1:
+            n = node.args[1]
+            if not (isinstance(n, ast.Constant) and isinstance(n.value, int) and not isinstance(n.value, bool) and n.value >= 1):
+                raise ValueError(f"{name}() の本数は 1 以上の整数で指定してください: {ast.unparse(node)}")
+        if name == 'bullish_engulf' and not (isinstance(node.args[0], ast.Name) and node.args[0].id in FREQS):
+            raise ValueError(f"bullish_engulf() には足（daily / weekly / monthly）を渡してください: {ast.unparse(node)}")
+        for a in node.args:
+            _check(a, nodes)
+        for kw in node.keywords:
+            _check(kw.value, nodes)
+    else:
+        raise ValueError(f"使えない構文です: {ast.unparse(node)}")
+    nodes[ast.dump(node)] = ast.unparse(node)
+
+
+def compile_screen(text):
+    """式をコンパイルして Screen を返す。構文・関数名・引数の誤りは ValueError。"""
+    try:
+        tree = ast.parse(text.strip(), mode='eval')
+    except SyntaxError as e:
+        raise ValueError(f"式を解釈できません: {e.msg} ({text!r})") from None
+    nodes = {}
+    _check(tree, nodes)
+    return Screen(text, tree, nodes)
+
+
+# ---------------------------------------------------------------------------
+# パネル -> 足ごとの右寄せ行列
+# ---------------------------------------------------------------------------
+
+class _Bars:
+    """1 つの足の四本値・出来高。各銘柄の有効な足を下端に詰めた (本数, 銘柄) の行列。"""
+
+    def __init__(self, fields, valid, last_row):
+        self.fields = fields
+        self.valid = valid
+        # 各本の最後の日足の行番号（日付の表示用）
+        self.last_row = last_row
+        self.count = valid.sum(axis=0)
+
+
+def _resample(panel, rows, rule):
+    """日足の行列を rule（'W-FRI' / 'M'）の足にまとめる。週・月の中で有効な日だけを使う。"""
+    close = panel.close[:rows]
+    valid = ~np.isnan(close)
+    idx = np.arange(rows)[:, None]
+    if rule is None:
+        fields = {f: getattr(panel, f)[:rows] for f in FIELDS}
+        return fields, valid, np.broadcast_to(idx, close.shape)
+    codes = pd.DatetimeIndex(panel.dates[:rows]).to_period(rule).asi8
+    starts = np.flatnonzero(np.r_[True, codes[1:] != codes[:-1]])
+    first = np.minimum.reduceat(np.where(valid, idx, rows), starts, axis=0)
+    last = np.maximum.reduceat(np.where(valid, idx, -1), starts, axis=0)
+    has = last >= 0
+
+    def _at(a, pos):
+        out = np.take_along_axis(a, np.clip(pos, 0, rows - 1), axis=0)
+        return np.where(has, out, np.nan)
+
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore', RuntimeWarning)
+        fields = {
+            'open': _at(panel.open[:rows], first),
+            'high': np.fmax.reduceat(np.where(valid, panel.high[:rows], np.nan), starts, axis=0),
+            'low': np.fmin.reduceat(np.where(valid, panel.low[:rows], np.nan), starts, axis=0),
+            'close': _at(close, last),
+            'volume': np.add.reduceat(np.where(valid, np.nan_to_num(panel.volume[:rows]), 0.0), starts, axis=0),
+        }
+    return fields, has, np.where(has, last, -1)
+
+
+def _align(fields, valid, last_row):
+    """各銘柄の有効な足を下端に詰める（並びは保つ）。"""
+    order = np.argsort(valid, axis=0, kind='stable')
+    v = np.take_along_axis(valid, order, axis=0)
+    keep = int(valid.sum(axis=0).max()) if valid.size else 0
+    v = v[len(v) - keep:]
+    out = {}
+    for f, a in fields.items():
+        a = np.take_along_axis(a, order, axis=0)[len(order) - keep:]
+        out[f] = np.where(v, a, np.nan)
+    rows = np.where(v, np.take_along_axis(np.asarray(last_row), order, axis=0)[len(order) - keep:], -1)
+    return _Bars(out, v, rows)
+
+
+# ---------------------------------------------------------------------------
+# 評価
+# ---------------------------------------------------------------------------
+
+class _Value:
+    """評価途中の値。freq が足の名前なら (本数, 銘柄) の行列、None なら銘柄ごとの最新値 (銘柄,)。"""
+    __slots__ = ('freq', 'data')
+
+    def __init__(self, freq, data):
+        self.freq = freq
+        self.data = data
+
+    def last(self):
+        return self.data[-1] if self.freq is not None else self.data
+
+
+def _unify(a, b):
+    """足の違う値どうしは各銘柄の最新値にそろえて演算する。"""
+    if not isinstance(a, _Value) or not isinstance(b, _Value) or a.freq == b.freq:
+        return a, b, (a.freq if isinstance(a, _Value) else b.freq if isinstance(b, _Value) else None)
+    return _Value(None, a.last()), _Value(None, b.last()), None
+
+
+def _raw(v):
+    return v.data if isinstance(v, _Value) else v
+
+
+def _shift(a, n):
+    out = np.full_like(a, np.nan, dtype=float)
+    if n < len(a):
+        out[n:] = a[:len(a) - n]
+    return out
+
+
+def _rolling(a, n, how):
+    if len(a) == 0:
+        return a.astype(float)
+    return getattr(pd.DataFrame(a).rolling(n), how)().to_numpy()
+
+
+class Evaluator:
+    """
+    パネル 1 枚（と as_of）に対してスクリーニング式を評価する。
+
+    足の行列と部分式の結果はこのインスタンスにキャッシュされ、同じ Evaluator で評価する
+    式の間で共有される（複数のスクリーニングを 1 回の読み込みで評価できる）。
+    """
+
+    def __init__(self, panel, as_of=None):
+        self.panel = panel
+        if as_of is None:
+            self.rows = len(panel.dates)
+        else:
+            row = panel.row_for(as_of)
+            self.rows = 0 if row is None else row + 1
+        self.tickers = panel.tickers
+        self._bars = {}
+        self._memo = {}
+        self.computed = 0
+
+    def bars(self, freq):
+        if freq not in self._bars:
+            fields, valid, last_row = _resample(self.panel, self.rows, FREQS[freq])
+            self._bars[freq] = _align(fields, valid, last_row)
+        return self._bars[freq]
+
+    def evaluate(self, screen):
+        """式の値を銘柄ごとの最新値（ndarray、銘柄順は self.tickers）で返す。"""
+        if isinstance(screen, str):
+            screen = compile_screen(screen)
+        v = self._eval(screen.tree.body)
+        if isinstance(v, _Value):
+            return v.last()
+        return np.full(len(self.tickers), v, dtype=type(v) if isinstance(v, bool) else float)
+
+    def mask(self, screen):
+        """条件を満たす銘柄の bool 配列。"""
+        v = self.evaluate(screen)
+        if v.dtype != bool:
+            v = np.nan_to_num(v.astype(float)) != 0
+        return v
+
+    def bar_dates(self, freq='daily'):
+        """各銘柄の最新足の日付（最後の日足の日付）。足が無ければ NaT。"""
+        b = self.bars(freq)
+        if len(b.last_row) == 0:
+            return np.full(len(self.tickers), np.datetime64('NaT'), dtype='datetime64[ns]')
+        r = b.last_row[-1]
+        out = self.panel.dates[np.clip(r, 0, None)] if len(self.panel.dates) else np.array([], dtype='datetime64[ns]')
+        return np.where(r >= 0, out, np.datetime64('NaT'))
+
+    def _eval(self, node):
+        key = ast.dump(node)
+        if key in self._memo:
+            return self._memo[key]
+        v = self._compute(node)
+        if isinstance(node, (ast.Call, ast.BinOp, ast.Compare, ast.BoolOp, ast.UnaryOp)):
+            self.computed += 1
+        self._memo[key] = v
+        return v
+
+    def _compute(self, node):
+        if isinstance(node, ast.Constant):
+            return node.value if isinstance(node.value, bool) else float(node.value)
+        if isinstance(node, ast.Name):
+            if node.id in _CONSTANTS:
+                return _CONSTANTS[node.id]
+            return node.id   # 足の名前（bullish_engulf の引数）
+        if isinstance(node, ast.Attribute):
+            return _Value(node.value.id, self.bars(node.value.id).fields[node.attr])
+        if isinstance(node, ast.BoolOp):
+            values = [self._eval(v) for v in node.values]
+            fn = np.logical_and if isinstance(node.op, ast.And) else np.logical_or
+            acc = values[0]
+            for v in values[1:]:
+                acc = self._binary(acc, v, fn)
+            return acc
+        if isinstance(node, ast.UnaryOp):
+            v = self._eval(node.operand)
+            if isinstance(node.op, (ast.Not, ast.Invert)):
+                return self._unary(v, lambda a: ~self._truth(a))
+            if isinstance(node.op, ast.USub):
+                return self._unary(v, np.negative)
+            return v
+        if isinstance(node, ast.BinOp):
+            ops = {ast.Add: np.add, ast.Sub: np.subtract, ast.Mult: np.multiply, ast.Div: np.divide,
+                   ast.BitAnd: np.logical_and, ast.BitOr: np.logical_or}
+            return self._binary(self._eval(node.left), self._eval(node.right), ops[type(node.op)])
+        if isinstance(node, ast.Compare):
+            ops = {ast.Gt: np.greater, ast.GtE: np.greater_equal, ast.Lt: np.less, ast.LtE: np.less_equal,
+                   ast.Eq: np.equal, ast.NotEq: np.not_equal}
+            left, acc = self._eval(node.left), None
+            for op, comp in zip(node.ops, node.comparators):
+                if type(op) not in ops:
+                    raise ValueError(f"使えない比較です: {type(op).__name__}")
+                right = self._eval(comp)
+                part = self._binary(left, right, ops[type(op)])
+                acc = part if acc is None else self._binary(acc, part, np.logical_and)
+                left = right
+            return acc
+        if isinstance(node, ast.Call):
+            return self._call(node.func.id, node)
+        raise ValueError(f"使えない構文です: {ast.unparse(node)}")
+
+    def _truth(self, a):
+        return a if a.dtype == bool else np.nan_to_num(a.astype(float)) != 0
+
+    def _unary(self, v, fn):
+        if isinstance(v, _Value):
+            return _Value(v.freq, fn(v.data))
+        return fn(np.asarray(v)).item()
+
+    def _binary(self, a, b, fn):
+        a, b, freq = _unify(a, b)
+        x, y = _raw(a), _raw(b)
+        if fn in (np.logical_and, np.logical_or):
+            x = self._truth(np.asarray(x))
+            y = self._truth(np.asarray(y))
+        with np.errstate(divide='ignore', invalid='ignore'):
+            out = fn(x, y)
+        if fn is np.divide:
+            # 0 除算は NaN（比較は常に不成立）にする
+            out = np.where(np.isfinite(out), out, np.nan)
+        if freq is None and not isinstance(a, _Value) and not isinstance(b, _Value):
+            return np.asarray(out).item()
+        return _Value(freq, out)
+
+    def _series(self, v, name):
+        if not isinstance(v, _Value) or v.freq is None:
+            raise ValueError(f"{name}() には足の系列を渡してください（例: weekly.close）")
+        return v
+
+    def _call(self, name, node):
+        args = node.args
+        kwargs = {kw.arg: self._eval(kw.value) for kw in node.keywords}
+        if name == 'bullish_engulf':
+            return self._bullish_engulf(self._eval(args[0]), bool(kwargs.get('relaxed', False)))
+        x = self._eval(args[0])
+        if name in _WINDOW_ARGS:
+            n = args[1].value if len(args) > 1 else 1
+            s = self._series(x, name)
+            if name == 'sma':
+                return _Value(s.freq, _rolling(s.data, n, 'mean'))
+            if name == 'highest':
+                return _Value(s.freq, _rolling(s.data, n, 'max'))
+            if name == 'lowest':
+                return _Value(s.freq, _rolling(s.data, n, 'min'))
+            if name == 'ema':
+                data = pd.DataFrame(s.data).ewm(span=n, adjust=False).mean().to_numpy() if len(s.data) else s.data
+                return _Value(s.freq, np.where(np.isnan(s.data), np.nan, data))
+            if name == 'shift':
+                return _Value(s.freq, _shift(s.data, n))
+            with np.errstate(divide='ignore', invalid='ignore'):
+                return _Value(s.freq, (s.data / _shift(s.data, n) - 1.0) * 100.0)
+        if name == 'abs':
+            return self._unary(x, np.abs)
+        if name in ('min', 'max'):
+            return self._binary(x, self._eval(args[1]), np.fmin if name == 'min' else np.fmax)
+        if name in ('cross_over', 'cross_under'):
+            a, b = self._series(x, name), self._series(self._eval(args[1]), name)
+            if a.freq != b.freq:
+                raise ValueError(f"{name}() の 2 つの系列は同じ足にしてください")
+            with np.errstate(invalid='ignore'):
+                if name == 'cross_over':
+                    hit = (a.data > b.data) & (_shift(a.data, 1) <= _shift(b.data, 1))
+                else:
+                    hit = (a.data < b.data) & (_shift(a.data, 1) >= _shift(b.data, 1))
+            return _Value(a.freq, hit)
+        if name == 'bars_since':
+            s = self._series(x, name)
+            pos, last = self._last_true(s.data)
+            return _Value(s.freq, np.where(last >= 0, pos - last, np.nan).astype(float))
+        if name in ('when', 'highest_since'):
+            c, v = self._series(x, name), self._series(self._eval(args[1]), name)
+            if c.freq != v.freq:
+                raise ValueError(f"{name}() の条件と系列は同じ足にしてください")
+            pos, last = self._last_true(c.data)
+            if name == 'when':
+                out = np.take_along_axis(v.data, np.clip(last, 0, None), axis=0) if len(last) else v.data
+                return _Value(c.freq, np.where(last >= 0, out, np.nan))
+            # 条件が成立するたびに区切り直した累積最大（銘柄 x 区間ごとの cummax を 1 回の groupby で）
+            seg = np.cumsum(self._truth(c.data), axis=0)
+            keys = seg + (int(seg.max()) + 1 if seg.size else 1) * np.arange(seg.shape[1])[None, :]
+            out = pd.Series(v.data.ravel()).groupby(keys.ravel()).cummax().to_numpy().reshape(v.data.shape)
+            return _Value(c.freq, np.where(last >= 0, out, np.nan))
+        raise ValueError(f"不明な関数です: {name}")
+
+    def _last_true(self, data):
+        """各足の行番号と、その足までで条件が最後に成立した行番号（未成立は -1）。"""
+        cond = self._truth(data)
+        pos = np.arange(len(cond))[:, None]
+        last = np.maximum.accumulate(np.where(cond, pos, -1), axis=0) if len(cond) else cond.astype(int)
+        return pos, last
+
+    def _bullish_engulf(self, freq, relaxed=False):
+        """screener._judge_weekly と同じ陽線包み足の判定（直近 2 本）。"""
+        f = self.bars(freq).fields
+        po, pc, ph, pl = (_shift(f[k], 1) for k in ('open', 'close', 'high', 'low'))
+        co, cc = f['open'], f['close']
+        with np.errstate(invalid='ignore'):
+            prev_bear = pc < po
+            curr_bull = cc > co
+            engulfs = (co <= pc) & (cc >= po)
+            wick = (co <= pl) & (cc >= ph)
+            body = engulfs | wick
+            if relaxed:
+                body = body | (cc >= po)
+        return _Value(freq, prev_bear & curr_bull & body)
+
+
+# ---------------------------------------------------------------------------
+# 実行
+# ---------------------------------------------------------------------------
+
+def resolve(screen):
+    """プリセット名・式・dict（expr / columns / sort）を dict にそろえる。"""
+    if isinstance(screen, dict):
+        spec = dict(screen)
+    elif screen in PRESETS:
+        spec = dict(PRESETS[screen], name=screen)
+    else:
+        spec = {'expr': screen}
+    spec.setdefault('name', 'screen')
+    spec.setdefault('columns', {})
+    spec['compiled'] = compile_screen(spec['expr'])
+    spec['compiled_columns'] = {k: compile_screen(v) for k, v in spec['columns'].items()}
+    return spec
+
+
+def excluded_tickers():
+    """スキャンの対象外にする銘柄（data_fetcher の除外リストと config.EXCLUDE_TICKERS）。"""
+    out = set()
+    try:
+        import config
+        out |= set(config.EXCLUDE_TICKERS)
+    except Exception:
+        pass
+    try:
+        from data_fetcher import EXCLUDED_TICKERS
+        out |= set(EXCLUDED_TICKERS)
+    except Exception:
+        pass
+    return out
+
+
+def evaluate(evaluator, screen, tickers=None, exclude=True, digits=2):
+    """
+    1 つのスクリーニングを評価して、条件を満たす銘柄の DataFrame（ticker, date, 列...）を返す。
+    screen はプリセット名・式・resolve() 済みの dict のいずれか。digits=None なら列の値を丸めない。
+    """
+    spec = screen if isinstance(screen, dict) and 'compiled' in screen else resolve(screen)
+    mask = evaluator.mask(spec['compiled'])
+    names = evaluator.tickers
+    if tickers is not None:
+        wanted = set(tickers)
+        mask &= np.fromiter((t in wanted for t in names), dtype=bool, count=len(names))
+    if exclude:
+        skip = excluded_tickers()
+        if skip:
+            mask &= np.fromiter((t not in skip for t in names), dtype=bool, count=len(names))
+    idx = np.flatnonzero(mask)
+    out = pd.DataFrame({'ticker': names[idx], 'date': pd.to_datetime(evaluator.bar_dates()[idx]).date})
+    for col, compiled in spec['compiled_columns'].items():
+        values = evaluator.evaluate(compiled)[idx]
+        if values.dtype != bool:
+            values = values.astype(float)
+            if digits is not None:
+                values = np.round(values, digits)
+        out[col] = values
+    if spec.get('sort') and spec['sort'][0] in out.columns:
+        out = out.sort_values(spec['sort'][0], ascending=spec['sort'][1], kind='stable')
+    return out.reset_index(drop=True)
+
+
+def run(screens, store=None, as_of=None, tickers=None, exclude=True, verbose=False):
+    """
+    複数のスクリーニングをパネル 1 回の読み込みでまとめて評価する。
+
+    screens: プリセット名・式・dict の list（1 つなら文字列でもよい）
+    store: parquet ディレクトリ（既定は config.DATA_DIR）
+    Returns: {name: DataFrame}（name はプリセット名、式だけの場合は式そのもの）
+    """
+    import rankings
+
+    if isinstance(screens, (str, dict)):
+        screens = [screens]
+    # 先に全部コンパイルして、式の誤りはパネルを読む前に返す
+    specs = [resolve(s) for s in screens]
+    store = store or rankings.default_stores()['jp']
+    t0 = time.perf_counter()
+    panel = rankings.load_panel(store, verbose=verbose)
+    t1 = time.perf_counter()
+    ev = Evaluator(panel, as_of=as_of)
+    out = {}
+    for spec in specs:
+        key = spec['name'] if spec['name'] != 'screen' else spec['expr']
+        out[key] = evaluate(ev, spec, tickers=tickers, exclude=exclude)
+    if verbose:
+        print(f"panel load {1000 * (t1 - t0):.1f} ms ({len(panel.tickers)} tickers), "
+              f"evaluate {1000 * (time.perf_counter() - t1):.1f} ms ({ev.computed} nodes)")
+    return out
+
+
+def save(name, df, expr, as_of=None, results_dir=None):
+    """結果を results_catalog に登録して CSV のパスを返す（scan_type は screen_<name>）。"""
+    import results_catalog
+    as_of = as_of or datetime.date.today().isoformat()
+    label = name if name in PRESETS else 'custom'
+    entry = results_catalog.save_result(
+        df, f"screen_{label}", params={'expr': expr}, as_of=as_of,
+        name=f"screen_{label}_{as_of}_{datetime.datetime.now().strftime('%H%M%S')}.csv", results_dir=results_dir)
+    return entry['csv_path']
+
+
+def explain(screens):
+    """各式の部分式と、式の間で共有される部分式を文字列で返す。"""
+    specs = [resolve(s) for s in screens]
+    counts, texts = {}, {}
+    for spec in specs:
+        nodes = dict(spec['compiled'].nodes)
+        for c in spec['compiled_columns'].values():
+            nodes.update(c.nodes)
+        texts.update(nodes)
+        for n in nodes:
+            counts[n] = counts.get(n, 0) + 1
+    lines = [f"[{spec['name']}] {spec['expr']}" for spec in specs]
+    shared = [n for n, c in counts.items() if c > 1]
+    lines.append(f"部分式 {len(counts)} 個（うち {len(shared)} 個を式の間で共有）")
+    for n in sorted(shared, key=lambda n: len(texts[n])):
+        lines.append(f"  shared: {texts[n]}")
+    return '\n'.join(lines)
+
+
+def parse_args():
+    p = argparse.ArgumentParser(description='Evaluate screening expressions over the local price panel')
+    p.add_argument('expr', nargs='*', help='Screening expressions (see module docstring)')
+    p.add_argument('--preset', action='append', default=[], choices=sorted(PRESETS), help='Built-in screen (repeatable)')
+    p.add_argument('--data-dir', type=str, default=None, help='Price cache directory (default: config.DATA_DIR)')
+    p.add_argument('--as-of', type=str, default=None, help='Evaluate at the latest bar on or before this date (YYYY-MM-DD)')
+    p.add_argument('--tickers', nargs='*', help='Limit to these tickers')
+    p.add_argument('--no-exclude', action='store_true', help='Keep tickers on the exclusion lists')
+    p.add_argument('--output-csv', type=str, default=None, help='Write the (single) result to this CSV')
+    p.add_argument('--save', action='store_true', help='Register each result in the results catalog')
+    p.add_argument('--explain', action='store_true', help='Show sub-expressions shared between screens and exit')
+    p.add_argument('--verbose', action='store_true')
+    return p.parse_args()
+
+
+def main():
+    args = parse_args()
+    screens = list(args.preset) + list(args.expr)
+    if not screens:
+        raise SystemExit('式か --preset を指定してください')
+    if args.explain:
+        print(explain(screens))
+        return
+    results = run(screens, store=args.data_dir, as_of=args.as_of, tickers=args.tickers,
+                  exclude=not args.no_exclude, verbose=args.verbose)
+    for name, df in results.items():
+        print(f"== {PRESETS[name]['label'] if name in PRESETS else name}: {len(df)} 件")
+        print(df.head(30).to_string(index=False))
+        if args.save:
+            expr = PRESETS[name]['expr'] if name in PRESETS else name
+            print(f"Saved: {save(name, df, expr, as_of=args.as_of)}")
+    if args.output_csv:
+        if len(results) != 1:
+            raise SystemExit('--output-csv は式が 1 つのときだけ使えます')
+        next(iter(results.values())).to_csv(args.output_csv, index=False)
+        print(f"Saved: {args.output_csv}")
+
+
+if __name__ == '__main__':
+    main()
@@ -8,10 +8,16 @@ Output files will be written next to inputs with suffixes:
   *_with_prices_YYYY-MM-DD.csv and *_with_prices_YYYY-MM-DD_sorted.csv
 """
 import sys, os
+from pathlib import Path
 import pandas as pd
 import yfinance as yf
 from datetime import datetime
 
+# ensure project root is on sys.path so results_catalog can be imported when running this script
+project_root = str(Path(__file__).resolve().parents[1])
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
 
 def get_price_from_cache(ticker, data_dir='data'):
     fn = os.path.join(data_dir, f"{ticker}.parquet")
@@ -94,5 +100,12 @@ def main():
     sorted_df.to_csv(sorted_name, index=False)
     print('Wrote sorted:', sorted_name)
 
+    # outputs/results に書いた場合はカタログにも登録する（上書き時も parquet と行数を更新する）
+    import results_catalog
+    if Path(out_dir or '.').resolve() == results_catalog.RESULTS_DIR.resolve():
+        params = {'source': base}
+        results_catalog.register(out_name, 'with_prices', params=params, as_of=date_str, df=out_df)
+        results_catalog.register(sorted_name, 'sorted', params=params, as_of=date_str, df=sorted_df)
+
 if __name__ == '__main__':
     main()
@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+app_streamlit.py の起動時間（初回描画）と再実行時間を計測するベンチマーク
+
+streamlit.testing の AppTest でスクリプトを実行する。各計測は新しいプロセスで行うので
+初回描画の時間には import のコストも含まれる。
+
+使い方:
+    python3 scripts/bench_app_startup.py                    # 現在の app_streamlit.py
+    python3 scripts/bench_app_startup.py --ref HEAD~3       # 指定 git リビジョンの app_streamlit.py と比較
+    python3 scripts/bench_app_startup.py --runs 5 --reruns 10
+
+注意: ビューアはチャート用データを yfinance から取得するため、ネットワーク状況で数値がぶれる。
+比較するときは同じ環境で続けて実行すること。
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+APP_DIR = Path(__file__).resolve().parents[1]
+APP_FILE = APP_DIR / 'app_streamlit.py'
+
+
+def _child(app_path, reruns):
+    """1 プロセス分の計測: 初回 run と、ウィジェット操作なしの再実行を reruns 回。"""
+    os.chdir(str(APP_DIR))
+    if str(APP_DIR) not in sys.path:
+        sys.path.insert(0, str(APP_DIR))
+    t0 = time.perf_counter()
+    from streamlit.testing.v1 import AppTest
+    at = AppTest.from_file(str(app_path), default_timeout=300)
+    at.run()
+    first = time.perf_counter() - t0
+    rerun_times = []
+    for _ in range(reruns):
+        t1 = time.perf_counter()
+        at.run()
+        rerun_times.append(time.perf_counter() - t1)
+    errors = [str(e.value) for e in at.exception]
+    print(json.dumps({'first_run': first, 'reruns': rerun_times, 'errors': errors}))
+
+
+def measure(app_path, runs, reruns):
+    firsts, rerun_all, errors = [], [], []
+    for _ in range(runs):
+        proc = subprocess.run(
+            [sys.executable, str(Path(__file__).resolve()), '--child', str(app_path), '--reruns', str(reruns)],
+            capture_output=True, text=True, cwd=str(APP_DIR),
+        )
+        lines = [l for l in proc.stdout.splitlines() if l.startswith('{')]
+        if not lines:
+            print(proc.stderr[-2000:], file=sys.stderr)
+            continue
+        res = json.loads(lines[-1])
+        firsts.append(res['first_run'])
+        rerun_all.extend(res['reruns'])
+        errors.extend(res['errors'])
+    return {
+        'first_run_median': statistics.median(firsts) if firsts else None,
+        'first_run_min': min(firsts) if firsts else None,
+        'rerun_median': statistics.median(rerun_all) if rerun_all else None,
+        'runs': len(firsts),
+        'errors': errors,
+    }
+
+
+def _report(label, res):
+    def fmt(v):
+        return f'{v * 1000:8.1f} ms' if v is not None else '       -'
+    print(f"{label:<24} first(median) {fmt(res['first_run_median'])}  first(min) {fmt(res['first_run_min'])}  rerun(median) {fmt(res['rerun_median'])}  runs={res['runs']}")
+    for e in res['errors'][:3]:
+        print(f'  error: {e}')
+
+
+def main():
+    p = argparse.ArgumentParser(description='Benchmark app_streamlit.py cold start and rerun time')
+    p.add_argument('--app', type=str, default=str(APP_FILE), help='App script to benchmark')
+    p.add_argument('--ref', type=str, default=None, help='Also benchmark app_streamlit.py from this git revision')
+    p.add_argument('--runs', type=int, default=3, help='Fresh processes per app')
+    p.add_argument('--reruns', type=int, default=5, help='Reruns per process')
+    p.add_argument('--child', type=str, default=None, help=argparse.SUPPRESS)
+    args = p.parse_args()
+
+    if args.child:
+        _child(args.child, args.reruns)
+        return
+
+    targets = [('current', Path(args.app))]
+    ref_file = None
+    if args.ref:
+        # 同じディレクトリに置かないとローカルモジュールの import が解決しない
+        rel = os.path.relpath(str(APP_FILE), start=str(APP_DIR.parent))
+        proc = subprocess.run(['git', '-C', str(APP_DIR.parent), 'show', f'{args.ref}:{rel}'], capture_output=True, text=True)
+        if proc.returncode != 0:
+            print(f'git show failed: {proc.stderr.strip()}', file=sys.stderr)
+            sys.exit(1)
+        ref_file = APP_DIR / '_bench_ref_app_streamlit.py'
+        ref_file.write_text(proc.stdout, encoding='utf-8')
+        targets.append((f'ref {args.ref}', ref_file))
+
+    try:
+        for label, path in targets:
+            _report(label, measure(path, args.runs, args.reruns))
+    finally:
+        if ref_file is not None and ref_file.exists():
+            ref_file.unlink()
+
+
+if __name__ == '__main__':
+    main()
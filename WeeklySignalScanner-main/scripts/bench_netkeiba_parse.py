@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+netkeiba パーサのベンチマーク（lxml の高速パーサ vs 旧 BeautifulSoup 実装）
+
+保存済みの HTML（netkeiba_scraper.py のキャッシュ <out>.cache/http など）を読み、
+レース結果ページと馬ページをそれぞれ両方のパーサで解析して 1 ページあたりの時間を比べる。
+'blood_table' を含むページは馬ページ、それ以外はレース結果ページとして扱う。
+あわせて horse_no / weight など各フィールドが埋まった行数も表示する。
+
+使い方:
+    python3 scripts/bench_netkeiba_parse.py results.parquet.cache/http
+    python3 scripts/bench_netkeiba_parse.py fixtures/ --repeat 5
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+import netkeiba_scraper as nk  # noqa: E402
+
+RACE_FIELDS = ['horse_url', 'rank', 'horse_no', 'jockey', 'odds', 'weight']
+
+
+def _time(fn, pages, repeat):
+    """pages 全体を repeat 回解析した最短時間と、最後の結果を返す。"""
+    best = None
+    out = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        out = [fn(html) for html in pages]
+        elapsed = time.perf_counter() - t0
+        best = elapsed if best is None else min(best, elapsed)
+    return best, out
+
+
+def _filled(rows_per_page, field):
+    return sum(1 for rows in rows_per_page for r in (rows or []) if r.get(field) not in (None, ''))
+
+
+def _report(title, pages, fast, slow, repeat):
+    if not pages:
+        print(f'{title}: 0 pages')
+        return None, None
+    t_fast, r_fast = _time(fast, pages, repeat)
+    t_slow, r_slow = _time(slow, pages, repeat)
+    n = len(pages)
+    print(f'{title}: {n} pages')
+    print(f'  lxml : {t_fast / n * 1000:8.2f} ms/page')
+    print(f'  soup : {t_slow / n * 1000:8.2f} ms/page')
+    print(f'  speedup: x{t_slow / t_fast:.1f}' if t_fast > 0 else '  speedup: -')
+    return r_fast, r_slow
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description='netkeiba パーサのベンチマーク')
+    ap.add_argument('fixtures', help='保存済み HTML のディレクトリ（再帰的に *.html を読む）')
+    ap.add_argument('--repeat', type=int, default=3, help='計測の繰り返し回数（最短時間を採用）')
+    args = ap.parse_args(argv)
+
+    files = sorted(Path(args.fixtures).rglob('*.html'))
+    if not files:
+        print(f'no *.html under {args.fixtures}')
+        return 1
+    race_pages, horse_pages = [], []
+    for f in files:
+        html = f.read_text(encoding='utf-8', errors='replace')
+        (horse_pages if 'blood_table' in html else race_pages).append(html)
+
+    r_fast, r_slow = _report(
+        'race pages', race_pages,
+        lambda h: nk.parse_race_result(h, ''),
+        lambda h: nk.parse_race_result_soup(h, ''),
+        args.repeat,
+    )
+    if r_fast is not None:
+        print('  filled rows      lxml    soup')
+        for field in RACE_FIELDS:
+            print(f'    {field:<12} {_filled(r_fast, field):7d} {_filled(r_slow, field):7d}')
+
+    p_fast, p_slow = _report(
+        'horse pages', horse_pages,
+        nk.parse_horse_page_for_pedigree,
+        nk.parse_horse_page_for_pedigree_soup,
+        args.repeat,
+    )
+    if p_fast is not None:
+        print('  filled pages     lxml    soup')
+        for field in ('father', 'damsire'):
+            print(f'    {field:<12} {_filled([p_fast], field):7d} {_filled([p_slow], field):7d}')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -7,28 +7,60 @@ netkeiba のレース結果ページから過去のレース結果を取得し
 
 使い方例:
   python netkeiba_scraper.py --start-date 2021-01-01 --end-date 2025-12-31 --out results_parquet.parquet
+  python netkeiba_scraper.py --start-date 2021-01-01 --end-date 2025-12-31 --out results.parquet --workers 8 --sleep 0.5
+
+取得の流れ:
+ - ページ取得はスレッドプール（--workers）で並列に行い、ホストごとに --sleep 秒以上の間隔を空ける
+ - 取得した HTML は --cache-dir（既定: <out>.cache/http）に URL 単位で保存し、再実行時は読み直さない
+ - 馬ごとの父・母父は pedigree.jsonl に追記し、同じ馬のページは 1 度しか取得しない
+ - 日付ごとに <out>.parts/part-YYYYMMDD.parquet を書き、完了日を progress.json に記録する。
+   中断後に同じコマンドを実行すると完了済みの日付を飛ばして再開し、最後に parts を結合して --out に保存する
+ - レースページか血統の取得に 1 件でも失敗した日付は完了扱いにせず、失敗した URL を
+   progress.json の failed に記録する（再実行でその日付を取り直す。取得済みのページは HTTP キャッシュから読む）
 
 注意:
  - netkeiba のページ構造は変わる可能性があります。パーサは汎用的に実装していますが
    必要に応じて CSS セレクタを調整してください。
  - 過度なアクセスはサーバに負荷をかけます。`--sleep` で間隔を空けてください。
+ - --list-url / --race-base / --horse-base を変えるとローカルのスタブサーバ等に向けて動かせます。
 """
 
 import argparse
 import datetime
+import hashlib
+import json
+import os
+import sys
+import threading
 import time
 import re
-from typing import List, Dict, Optional
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import List, Dict, Optional, TypedDict
+from urllib.parse import urlsplit
 
+import lxml.html
 import requests
 from bs4 import BeautifulSoup
 import pandas as pd
 
+# スクリプトとして実行したときも親ディレクトリの horse_model を import できるようにする
+repo_root = Path(__file__).resolve().parents[1]
+if str(repo_root) not in sys.path:
+    sys.path.insert(0, str(repo_root))
+
 from horse_model import HorseDataProcessor
 
 
 USER_AGENT = 'Mozilla/5.0 (compatible; NetKeibaScraper/1.0; +https://example.com)'
 
+# netkeiba の日付別レース一覧ページ (汎用推定 URL)。必要に応じて調整してください。
+LIST_URL = 'https://race.netkeiba.com/?pid=race_list&date={date}'
+RACE_BASE = 'https://race.netkeiba.com'
+HORSE_BASE = 'https://db.netkeiba.com'
+COLUMNS = ['race_url', 'race_date', 'horse_name', 'rank', 'frame_no', 'horse_no', 'jockey', 'impost',
+           'odds', 'popularity', 'weight', 'weight_diff', 'father', 'damsire']
+
 
 def daterange(start_date: datetime.date, end_date: datetime.date):
     for n in range(int((end_date - start_date).days) + 1):
@@ -39,17 +71,131 @@ def fetch_url(session: requests.Session, url: str, timeout: int = 20) -> Optiona
     try:
         r = session.get(url, timeout=timeout)
         r.raise_for_status()
+        # Content-Type に charset が無いと requests は ISO-8859-1 とみなすので、
+        # <meta charset> を優先し、無ければ本文から推定する（netkeiba は EUC-JP）
+        if 'charset' not in r.headers.get('Content-Type', '').lower():
+            declared = requests.utils.get_encodings_from_content(r.content[:4096].decode('ascii', 'ignore'))
+            r.encoding = declared[0] if declared else r.apparent_encoding
         return r.text
     except Exception:
         return None
 
 
+class HostRateLimiter:
+    """ホストごとにリクエスト開始間隔を min_interval 秒以上に保つ（スレッドセーフ）。"""
+
+    def __init__(self, min_interval: float):
+        self.min_interval = max(0.0, float(min_interval))
+        self._lock = threading.Lock()
+        self._next: Dict[str, float] = {}
+
+    def wait(self, url: str) -> None:
+        host = urlsplit(url).netloc
+        with self._lock:
+            now = time.monotonic()
+            start = max(now, self._next.get(host, 0.0))
+            self._next[host] = start + self.min_interval
+        if start > now:
+            time.sleep(start - now)
+
+
+class CachedFetcher:
+    """並列取得用のフェッチャ。HTML を URL 単位でディスクにキャッシュする。
+
+    - スレッドごとに requests.Session を持つ
+    - キャッシュ済みの URL はネットワークに出ない（use_cache=False のときを除く）
+    - 失敗時は retries 回まで指数バックオフで再試行し、それでも駄目なら None
+    """
+
+    def __init__(self, cache_dir: Optional[str], min_interval: float = 1.0, timeout: int = 20, retries: int = 2):
+        self.cache_dir = Path(cache_dir) if cache_dir else None
+        if self.cache_dir:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.limiter = HostRateLimiter(min_interval)
+        self.timeout = timeout
+        self.retries = retries
+        self._local = threading.local()
+        self.stats = {'hits': 0, 'fetched': 0, 'failed': 0}
+        self._stats_lock = threading.Lock()
+
+    def _session(self) -> requests.Session:
+        sess = getattr(self._local, 'session', None)
+        if sess is None:
+            sess = requests.Session()
+            sess.headers.update({'User-Agent': USER_AGENT})
+            self._local.session = sess
+        return sess
+
+    def _path(self, url: str) -> Optional[Path]:
+        if not self.cache_dir:
+            return None
+        h = hashlib.sha1(url.encode('utf-8')).hexdigest()
+        return self.cache_dir / h[:2] / f'{h}.html'
+
+    def _count(self, key: str) -> None:
+        with self._stats_lock:
+            self.stats[key] += 1
+
+    def get(self, url: str, use_cache: bool = True) -> Optional[str]:
+        path = self._path(url)
+        if use_cache and path is not None and path.exists():
+            self._count('hits')
+            return path.read_text(encoding='utf-8')
+        for attempt in range(self.retries + 1):
+            self.limiter.wait(url)
+            html = fetch_url(self._session(), url, timeout=self.timeout)
+            if html is not None:
+                if path is not None:
+                    path.parent.mkdir(parents=True, exist_ok=True)
+                    tmp = path.with_name(f'{path.name}.{os.getpid()}.{threading.get_ident()}.tmp')
+                    tmp.write_text(html, encoding='utf-8')
+                    os.replace(tmp, path)
+                self._count('fetched')
+                return html
+            if attempt < self.retries:
+                time.sleep(self.limiter.min_interval * (2 ** attempt))
+        self._count('failed')
+        return None
+
+
+class PedigreeCache:
+    """馬ページ URL -> {'father', 'damsire'} を JSON Lines に追記保存する。"""
+
+    def __init__(self, path: Optional[str]):
+        self.path = Path(path) if path else None
+        self._lock = threading.Lock()
+        self.data: Dict[str, Dict[str, Optional[str]]] = {}
+        if self.path and self.path.exists():
+            with open(self.path, 'r', encoding='utf-8') as fh:
+                for line in fh:
+                    try:
+                        rec = json.loads(line)
+                        self.data[rec['url']] = {'father': rec.get('father'), 'damsire': rec.get('damsire')}
+                    except Exception:
+                        continue
+
+    def get(self, url: str) -> Optional[Dict[str, Optional[str]]]:
+        return self.data.get(url)
+
+    def put(self, url: str, pedigree: Dict[str, Optional[str]]) -> None:
+        with self._lock:
+            self.data[url] = {'father': pedigree.get('father'), 'damsire': pedigree.get('damsire')}
+            if self.path:
+                self.path.parent.mkdir(parents=True, exist_ok=True)
+                with open(self.path, 'a', encoding='utf-8') as fh:
+                    fh.write(json.dumps({'url': url, **self.data[url]}, ensure_ascii=False) + '\n')
+
+
+def _absolute(href: str, base: str) -> str:
+    if href.startswith('http'):
+        return href
+    return base + href if href.startswith('/') else f'{base}/{href}'
+
+
 def find_race_links_on_date(html: str) -> List[str]:
     """日付ページの HTML からレース結果ページへのリンクを抽出する（汎用的）。"""
-    soup = BeautifulSoup(html, 'lxml')
     links = []
-    for a in soup.find_all('a', href=True):
-        href = a['href']
+    for href in _parse_html(html).xpath('//a/@href'):
         # 一般的に race/result や /race/ のパスを含むリンクを拾う
         if ('result' in href or '/race/' in href) and ('horse' not in href):
             # フルURL化は呼び出し側で
@@ -58,9 +204,237 @@ def find_race_links_on_date(html: str) -> List[str]:
     return list(dict.fromkeys(links))
 
 
+# ---------------------------------------------------------------------------
+# 高速パーサ（lxml）
+#
+# ページ全体を BeautifulSoup の木にしてから全 table/td を走査する代わりに、
+# lxml で解析して結果テーブルと血統表だけを XPath で取り出す。
+# 列はヘッダーの文字列で対応付けるので race.netkeiba.com（RaceTable01）と
+# db.netkeiba.com（race_table_01）のどちらのレイアウトでも同じ dict を返す。
+# 対象のテーブルが見つからないページは旧実装（*_soup）にフォールバックする。
+# ---------------------------------------------------------------------------
+
+class RaceEntry(TypedDict, total=False):
+    """parse_race_result が返す 1 頭分の行。取れない値は None。"""
+    horse_name: Optional[str]
+    horse_url: Optional[str]
+    rank: Optional[int]          # 着順（取消・除外・中止は None）
+    frame_no: Optional[int]      # 枠番
+    horse_no: Optional[int]      # 馬番
+    sex_age: Optional[str]       # 性齢（例: 牡4）
+    impost: Optional[float]      # 斤量
+    jockey: Optional[str]
+    finish_time: Optional[str]   # タイム（例: 1:33.5）
+    odds: Optional[float]        # 単勝オッズ
+    popularity: Optional[int]    # 人気
+    weight: Optional[int]        # 馬体重 (kg)
+    weight_diff: Optional[int]   # 馬体重の増減
+
+
+# ヘッダー文字列に含まれる語 -> フィールド名（上から順に判定し、各フィールドは最初の列だけ使う）
+RACE_HEADER_FIELDS = [
+    ('着順', 'rank'),
+    ('枠', 'frame_no'),
+    ('馬番', 'horse_no'),
+    ('馬名', 'horse_name'),
+    ('性齢', 'sex_age'),
+    ('斤量', 'impost'),
+    ('騎手', 'jockey'),
+    ('タイム', 'finish_time'),
+    ('単勝', 'odds'),
+    ('オッズ', 'odds'),
+    ('人気', 'popularity'),
+    ('馬体重', 'weight'),
+]
+
+_RESULT_TABLE_XPATHS = (
+    "//table[@id='All_Result_Table']",
+    "//table[contains(concat(' ', normalize-space(@class), ' '), ' RaceTable01 ')]",
+    "//table[contains(concat(' ', normalize-space(@class), ' '), ' race_table_01 ')]",
+    "//table[.//th[contains(., '着順')]]",
+)
+_BLOOD_TABLE_XPATH = "//table[contains(concat(' ', normalize-space(@class), ' '), ' blood_table ')]"
+_INT_RE = re.compile(r'^\s*(\d+)')
+_FLOAT_RE = re.compile(r'(\d+(?:\.\d+)?)')
+_WEIGHT_RE = re.compile(r'(\d{3})\s*(?:\(\s*([+\-]?\d+)\s*\))?')
+
+
+_parsers = threading.local()
+
+
+def _parse_html(html: str):
+    # lxml のパーサはスレッド間で共有できないのでスレッドごとに作る。
+    # encoding 宣言付きの str は受け付けないため、UTF-8 の bytes にして渡す
+    parser = getattr(_parsers, 'html', None)
+    if parser is None:
+        parser = _parsers.html = lxml.html.HTMLParser(encoding='utf-8', remove_comments=True)
+    if isinstance(html, str):
+        html = html.encode('utf-8')
+    return lxml.html.fromstring(html, parser=parser)
+
+
+def _cell_text(el) -> str:
+    return ' '.join(el.text_content().split())
+
+
+def _to_int(text: str) -> Optional[int]:
+    m = _INT_RE.match(text or '')
+    return int(m.group(1)) if m else None
+
+
+def _to_float(text: str) -> Optional[float]:
+    m = _FLOAT_RE.search(text or '')
+    return float(m.group(1)) if m else None
+
+
+def _parse_weight(text: str):
+    """'480(+2)' -> (480, 2)。'計不' などは (None, None)。"""
+    m = _WEIGHT_RE.search(text or '')
+    if not m:
+        return None, None
+    diff = m.group(2)
+    return int(m.group(1)), (int(diff) if diff is not None else None)
+
+
+def _find_result_table(doc):
+    for xp in _RESULT_TABLE_XPATHS:
+        found = doc.xpath(xp)
+        if found:
+            return found[0]
+    return None
+
+
+def _header_columns(table) -> Dict[str, int]:
+    """ヘッダー行の th から フィールド名 -> 列番号 を作る。"""
+    header = table.xpath('.//tr[th][1]/th')
+    columns: Dict[str, int] = {}
+    for i, th in enumerate(header):
+        text = ''.join(th.text_content().split())
+        for word, field in RACE_HEADER_FIELDS:
+            if field not in columns and word in text:
+                columns[field] = i
+                break
+    return columns
+
+
+def parse_race_result_lxml(html: str, base_url: str = '') -> Optional[List[RaceEntry]]:
+    """結果テーブルだけを lxml で解析して型付きの行を返す。テーブルが無ければ None。"""
+    doc = _parse_html(html)
+    table = _find_result_table(doc)
+    if table is None:
+        return None
+    columns = _header_columns(table)
+    if 'horse_name' not in columns and 'rank' not in columns:
+        return None
+
+    def cell(tds, field):
+        i = columns.get(field)
+        return _cell_text(tds[i]) if i is not None and i < len(tds) else None
+
+    rows: List[RaceEntry] = []
+    for tr in table.xpath('.//tr[td]'):
+        tds = tr.xpath('td')
+        # 馬ページへのリンクは馬名の列を優先し、無ければ行内から探す
+        links = []
+        i = columns.get('horse_name')
+        if i is not None and i < len(tds):
+            links = tds[i].xpath('.//a[@href]')
+        if not links:
+            links = tr.xpath(".//a[contains(@href, 'horse')]")
+        link = links[0] if links else None
+        horse_name = cell(tds, 'horse_name') or (_cell_text(link) if link is not None else None)
+        if not horse_name:
+            continue
+        weight, weight_diff = _parse_weight(cell(tds, 'weight'))
+        rows.append({
+            'horse_name': horse_name,
+            'horse_url': link.get('href') if link is not None else None,
+            'rank': _to_int(cell(tds, 'rank')),
+            'frame_no': _to_int(cell(tds, 'frame_no')),
+            'horse_no': _to_int(cell(tds, 'horse_no')),
+            'sex_age': cell(tds, 'sex_age') or None,
+            'impost': _to_float(cell(tds, 'impost')),
+            'jockey': cell(tds, 'jockey') or None,
+            'finish_time': cell(tds, 'finish_time') or None,
+            'odds': _to_float(cell(tds, 'odds')),
+            'popularity': _to_int(cell(tds, 'popularity')),
+            'weight': weight,
+            'weight_diff': weight_diff,
+        })
+    return rows
+
+
 def parse_race_result(html: str, base_url: str) -> List[Dict]:
     """レース結果ページ HTML を解析して馬ごとの基本情報と馬ページURLを返す。
 
+    返却する dict のキーは RaceEntry を参照。結果テーブルを特定できないページは
+    parse_race_result_soup（旧ヒューリスティック）の結果を返す。
+    """
+    try:
+        rows = parse_race_result_lxml(html, base_url)
+    except Exception:
+        rows = None
+    if rows is None:
+        return parse_race_result_soup(html, base_url)
+    return rows
+
+
+def _pedigree_name(td) -> Optional[str]:
+    a = td.find('.//a')
+    text = _cell_text(a) if a is not None else _cell_text(td)
+    return text.split()[0] if text else None
+
+
+def parse_pedigree_lxml(html: str) -> Optional[Dict[str, Optional[str]]]:
+    """血統表（blood_table）か '父' / '母父' の見出しセルだけを lxml で読む。見つからなければ None。
+
+    blood_table は父系が上半分・母系が下半分に並ぶので、父は先頭行の 1 列目、
+    母父は下半分の先頭行の 2 列目（2 代表・5 代表とも同じ）になる。
+    """
+    doc = _parse_html(html)
+    father = damsire = None
+    tables = doc.xpath(_BLOOD_TABLE_XPATH)
+    if tables:
+        rows = tables[0].xpath('.//tr[td]')
+        if rows:
+            tds = rows[0].xpath('td')
+            father = _pedigree_name(tds[0]) if tds else None
+            tds = rows[len(rows) // 2].xpath('td') if len(rows) >= 2 else []
+            damsire = _pedigree_name(tds[1]) if len(tds) >= 2 else None
+    if not father or not damsire:
+        for th in doc.xpath("//th[normalize-space()='父' or normalize-space()='父:' "
+                            "or normalize-space()='母父' or normalize-space()='母父:']"):
+            td = th.getnext()
+            if td is None or td.tag != 'td':
+                continue
+            name = _pedigree_name(td)
+            if th.text_content().strip().startswith('母父'):
+                damsire = damsire or name
+            else:
+                father = father or name
+    if not father and not damsire:
+        return None
+    return {'father': father, 'damsire': damsire}
+
+
+def parse_horse_page_for_pedigree(html: str) -> Dict[str, Optional[str]]:
+    """馬ページ HTML から '父' と '母父' を抽出する。"""
+    try:
+        ped = parse_pedigree_lxml(html)
+    except Exception:
+        ped = None
+    if ped is None:
+        return parse_horse_page_for_pedigree_soup(html)
+    return ped
+
+
+# ---------------------------------------------------------------------------
+# 旧実装（BeautifulSoup）: 高速パーサで対象を特定できないページ用
+# ---------------------------------------------------------------------------
+
+def parse_race_result_soup(html: str, base_url: str) -> List[Dict]:
+    """レース結果ページを BeautifulSoup とヒューリスティックで解析する（旧実装・フォールバック用）。
+
     返却する dict 要素: horse_name, horse_url, rank, jockey, weight, odds (可能なら), horse_no
     """
     soup = BeautifulSoup(html, 'lxml')
@@ -147,8 +521,8 @@ def parse_race_result(html: str, base_url: str) -> List[Dict]:
     return results
 
 
-def parse_horse_page_for_pedigree(html: str) -> Dict[str, Optional[str]]:
-    """馬ページ HTML から '父' と '母父' を抽出する。"""
+def parse_horse_page_for_pedigree_soup(html: str) -> Dict[str, Optional[str]]:
+    """馬ページ HTML から '父' と '母父' を抽出する（旧実装・フォールバック用）。"""
     soup = BeautifulSoup(html, 'lxml')
     father = None
     damsire = None
@@ -179,84 +553,133 @@ def parse_horse_page_for_pedigree(html: str) -> Dict[str, Optional[str]]:
     return {'father': father, 'damsire': damsire}
 
 
-def scrape_dates(start_date: datetime.date, end_date: datetime.date, out_parquet: str,
-                 sleep: float = 1.0, max_races: Optional[int] = None):
-    sess = requests.Session()
-    sess.headers.update({'User-Agent': USER_AGENT})
-    proc = HorseDataProcessor()
+def _load_progress(path: Path) -> Dict:
+    try:
+        with open(path, 'r', encoding='utf-8') as fh:
+            return json.load(fh)
+    except Exception:
+        return {'done_dates': [], 'race_count': 0, 'failed': {}}
 
-    rows = []
-    race_count = 0
 
-    for d in daterange(start_date, end_date):
-        # netkeiba の日付別レース一覧ページ (汎用推定 URL)。必要に応じて調整してください。
-        date_str = d.strftime('%Y%m%d')
-        list_url = f'https://race.netkeiba.com/?pid=race_list&date={date_str}'
-        html = fetch_url(sess, list_url)
-        if not html:
-            time.sleep(sleep)
-            continue
-        links = find_race_links_on_date(html)
-        # normalize links to absolute
-        full_links = []
-        for href in links:
-            if href.startswith('http'):
-                full_links.append(href)
-            else:
-                full_links.append('https://race.netkeiba.com' + href)
+def _save_progress(path: Path, progress: Dict) -> None:
+    tmp = path.with_name(path.name + '.tmp')
+    with open(tmp, 'w', encoding='utf-8') as fh:
+        json.dump(progress, fh, ensure_ascii=False, indent=1)
+    os.replace(tmp, path)
+
 
-        for race_url in full_links:
-            # limit
+def scrape_dates(start_date: datetime.date, end_date: datetime.date, out_parquet: str,
+                 sleep: float = 1.0, max_races: Optional[int] = None, workers: int = 4,
+                 cache_dir: Optional[str] = None, resume: bool = True,
+                 list_url: str = LIST_URL, race_base: str = RACE_BASE, horse_base: str = HORSE_BASE,
+                 verbose: bool = True) -> pd.DataFrame:
+    """日付範囲のレース結果と血統を取得して Parquet に保存する（並列・キャッシュ・再開対応）。"""
+    out_path = Path(out_parquet)
+    parts_dir = out_path.with_name(out_path.name + '.parts')
+    parts_dir.mkdir(parents=True, exist_ok=True)
+    state_dir = Path(cache_dir) if cache_dir else out_path.with_name(out_path.name + '.cache')
+    progress_path = parts_dir / 'progress.json'
+    progress = _load_progress(progress_path) if resume else {'done_dates': [], 'race_count': 0, 'failed': {}}
+    done = set(progress.get('done_dates') or [])
+    race_count = int(progress.get('race_count') or 0)
+    # 日付 -> 取得に失敗した URL（その日付は done に入れず、次の実行で取り直す）
+    failed: Dict[str, List[str]] = dict(progress.get('failed') or {})
+
+    fetcher = CachedFetcher(str(state_dir / 'http'), min_interval=sleep)
+    pedigrees = PedigreeCache(str(state_dir / 'pedigree.jsonl'))
+    proc = HorseDataProcessor()
+
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        for d in daterange(start_date, end_date):
             if max_races and race_count >= max_races:
                 break
-            race_html = fetch_url(sess, race_url)
-            if not race_html:
-                time.sleep(sleep)
+            date_str = d.strftime('%Y%m%d')
+            if date_str in done:
                 continue
-            race_results = parse_race_result(race_html, race_url)
-            for hr in race_results:
-                horse_page_url = hr.get('horse_url')
-                father = None
-                damsire = None
-                if horse_page_url:
-                    if horse_page_url.startswith('http'):
-                        hp_url = horse_page_url
-                    else:
-                        hp_url = 'https://db.netkeiba.com' + horse_page_url if horse_page_url.startswith('/') else 'https://race.netkeiba.com' + horse_page_url
-                    horse_html = fetch_url(sess, hp_url)
-                    if horse_html:
-                        pedigree = parse_horse_page_for_pedigree(horse_html)
-                        father = pedigree.get('father')
-                        damsire = pedigree.get('damsire')
-                        time.sleep(sleep)
-
-                father_group = proc.map_lineage(father)
-                damsire_group = proc.map_lineage(damsire)
-
-                row = {
+            html = fetcher.get(list_url.format(date=date_str))
+            if not html:
+                # 一覧が取れなかった日は完了扱いにしない（再実行で取り直す）
+                continue
+            race_urls = [_absolute(href, race_base) for href in find_race_links_on_date(html)]
+            if max_races:
+                race_urls = race_urls[:max(0, max_races - race_count)]
+
+            race_pages = list(pool.map(fetcher.get, race_urls))
+            entries = []
+            failed_urls = []
+            races_ok = 0
+            for race_url, race_html in zip(race_urls, race_pages):
+                if not race_html:
+                    failed_urls.append(race_url)
+                    continue
+                races_ok += 1
+                for hr in parse_race_result(race_html, race_url):
+                    hp_url = _absolute(hr['horse_url'], horse_base) if hr.get('horse_url') else None
+                    entries.append((race_url, hr, hp_url))
+
+            # 血統: 未取得の馬だけ並列に取得（同じ馬は 1 回だけ）
+            todo = list(dict.fromkeys(u for _, _, u in entries if u and pedigrees.get(u) is None))
+
+            def _pedigree(url):
+                page = fetcher.get(url)
+                if not page:
+                    return url
+                pedigrees.put(url, parse_horse_page_for_pedigree(page))
+                return None
+
+            failed_urls += [u for u in pool.map(_pedigree, todo) if u]
+
+            rows = []
+            for race_url, hr, hp_url in entries:
+                ped = (pedigrees.get(hp_url) if hp_url else None) or {}
+                rows.append({
                     'race_url': race_url,
                     'race_date': d.isoformat(),
                     'horse_name': hr.get('horse_name'),
                     'rank': hr.get('rank'),
+                    'frame_no': hr.get('frame_no'),
+                    'horse_no': hr.get('horse_no'),
                     'jockey': hr.get('jockey'),
+                    'impost': hr.get('impost'),
                     'odds': hr.get('odds'),
-                    'father': father,
-                    'damsire': damsire,
-                    'father_group': father_group,
-                    'damsire_group': damsire_group,
-                }
-                rows.append(row)
-
-            race_count += 1
-            time.sleep(sleep)
-
-        if max_races and race_count >= max_races:
-            break
-
-    df = pd.DataFrame(rows)
+                    'popularity': hr.get('popularity'),
+                    'weight': hr.get('weight'),
+                    'weight_diff': hr.get('weight_diff'),
+                    'father': ped.get('father'),
+                    'damsire': ped.get('damsire'),
+                })
+            part = pd.DataFrame(rows, columns=COLUMNS)
+            if not part.empty:
+                part.to_parquet(parts_dir / f'part-{date_str}.parquet', engine='pyarrow', index=False)
+            if failed_urls:
+                # 取れた分の part は書いておくが、日付は未完了のまま（再実行で part ごと作り直す）
+                failed[date_str] = failed_urls
+            else:
+                failed.pop(date_str, None)
+                done.add(date_str)
+                race_count += races_ok
+            progress = {'done_dates': sorted(done), 'race_count': race_count, 'failed': failed,
+                        'updated_at': datetime.datetime.now().isoformat(timespec='seconds')}
+            _save_progress(progress_path, progress)
+            if verbose:
+                print(f'{d.isoformat()}: {len(race_urls)} races, {len(rows)} rows, '
+                      f'{len(todo)} new horses (cache hits {fetcher.stats["hits"]}, fetched {fetcher.stats["fetched"]})'
+                      + (f', {len(failed_urls)} failed (will retry)' if failed_urls else ''))
+
+    # parts を結合して最終出力（範囲外の日付の part は含めない）
+    wanted = {d.strftime('%Y%m%d') for d in daterange(start_date, end_date)}
+    frames = [pd.read_parquet(p) for p in sorted(parts_dir.glob('part-*.parquet'))
+              if p.stem[len('part-'):] in wanted]
+    df = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame(columns=COLUMNS)
+    # 系統グループは列ごとにまとめて付与（一意な種牡馬名だけ判定）
+    df['father_group'] = proc.map_lineage_series(df['father'])
+    df['damsire_group'] = proc.map_lineage_series(df['damsire'])
     # 保存
     df.to_parquet(out_parquet, engine='pyarrow', index=False)
     print(f'Saved {len(df)} rows to {out_parquet}')
+    if failed:
+        print(f'{len(failed)} dates have failed pages and will be retried on the next run: {", ".join(sorted(failed))}')
+    return df
 
 
 def parse_args():
@@ -264,8 +687,14 @@ def parse_args():
     p.add_argument('--start-date', required=True, help='開始日 YYYY-MM-DD')
     p.add_argument('--end-date', required=True, help='終了日 YYYY-MM-DD')
     p.add_argument('--out', required=True, help='出力Parquetファイルパス')
-    p.add_argument('--sleep', type=float, default=1.0, help='リクエスト間のsleep秒')
+    p.add_argument('--sleep', type=float, default=1.0, help='同一ホストへのリクエスト間隔（秒）')
     p.add_argument('--max-races', type=int, default=None, help='最大取得レース数（テスト用）')
+    p.add_argument('--workers', type=int, default=4, help='並列取得数')
+    p.add_argument('--cache-dir', default=None, help='HTML/血統キャッシュの保存先（既定: <out>.cache）')
+    p.add_argument('--no-resume', dest='resume', action='store_false', help='progress.json を無視して最初から取得')
+    p.add_argument('--list-url', default=LIST_URL, help='日付別レース一覧の URL テンプレート（{date}=YYYYMMDD）')
+    p.add_argument('--race-base', default=RACE_BASE, help='相対リンクのレースページのベース URL')
+    p.add_argument('--horse-base', default=HORSE_BASE, help='相対リンクの馬ページのベース URL')
     return p.parse_args()
 
 
@@ -273,4 +702,6 @@ if __name__ == '__main__':
     args = parse_args()
     sd = datetime.datetime.strptime(args.start_date, '%Y-%m-%d').date()
     ed = datetime.datetime.strptime(args.end_date, '%Y-%m-%d').date()
-    scrape_dates(sd, ed, args.out, sleep=args.sleep, max_races=args.max_races)
+    scrape_dates(sd, ed, args.out, sleep=args.sleep, max_races=args.max_races, workers=args.workers,
+                 cache_dir=args.cache_dir, resume=args.resume, list_url=args.list_url,
+                 race_base=args.race_base, horse_base=args.horse_base)
@@ -9,7 +9,12 @@ Output: same directory, filename with _sorted appended before .csv
 """
 import argparse
 import os
-import pandas as pd
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+import results_catalog  # noqa: E402
 
 
 def main():
@@ -23,16 +28,17 @@ def main():
         print('File not found:', infile)
         raise SystemExit(1)
 
-    df = pd.read_csv(infile)
-    # try common column names
-    cand = None
-    for name in ['current_price', 'price', 'close', 'current']:
-        if name in df.columns:
-            cand = name
-            break
+    # 結果カタログに登録済みならその列情報（価格列）を使い、parquet から読む
+    entry = results_catalog.get(Path(infile).name, results_dir=str(Path(infile).resolve().parent))
+    if entry is not None:
+        df = results_catalog.load(entry, normalize_ticker=False)
+        cand = entry.get('price_col')
+    else:
+        df = results_catalog.read_csv(infile)
+        cand = results_catalog.infer_price_column(df)
     if cand is None:
         # try to find numeric column
-        numeric_cols = [c for c in df.columns if pd.api.types.is_numeric_dtype(df[c])]
+        numeric_cols = df.select_dtypes('number').columns.tolist()
         if numeric_cols:
             cand = numeric_cols[0]
         else:
@@ -45,6 +51,9 @@ def main():
     base, ext = os.path.splitext(infile)
     out = f"{base}_sorted{ext}"
     df_sorted.to_csv(out, index=False)
+    if entry is not None or Path(out).resolve().parent == results_catalog.RESULTS_DIR.resolve():
+        results_catalog.register(out, 'sorted', params={'source': Path(infile).name, 'by': cand, 'ascending': ascending},
+                                 as_of=entry.get('as_of') if entry else None, df=df_sorted)
     print('Wrote sorted file:', out)
 
 
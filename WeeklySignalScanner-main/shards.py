@@ -0,0 +1,509 @@
+#!/usr/bin/env python3
+"""
+銘柄コード範囲のシャード分割（取得・スキャンを複数マシン/プロセスに分けて後でマージ）
+
+全 JP 銘柄（1300〜9999）の取得とスキャンを 1 台で回す代わりに、コード範囲を N 個に分けて
+各シャードが自分の範囲だけを処理し、`outputs/shards/<run_id>/<start>_<end>/` に部分結果を書く。
+run_id（既定は当日の YYYYMMDD）で 1 回分のシャード群をまとめ、別の回の出力とは混ぜない。
+
+- data/*.parquet: そのシャードで取得した部分キャッシュ
+- result.csv: そのシャードの週足 MA52 + 陽線包み足のヒット（ticker,price）
+- manifest.json: 範囲・件数・スキャン条件。最後に書くので、これがあるシャードだけを完了とみなす
+
+merge は 1 つの回（--run-id、省略時は最新の回）のマニフェストを範囲順に並べて、対象範囲に抜け（どのシャードも担当していないコード）や
+重なり（2 つのシャードが同じコードを担当）が無いかを確かめてから、部分キャッシュを data/ の
+既存 parquet に日付単位でマージし（既存の古い足は残す）、ヒットを 1 つの結果 CSV
+（scan_all_jp_batch と同じ列・並び順）にまとめる。
+同じシャード群からは常に同じ内容の結果になる。
+
+シャードは 1 始まりの `--shard i/N`（範囲を N 等分した i 番目）か `--range 1300-4999` で指定する。
+ローカルで複数プロセスに分けて試せる:
+    python shards.py local --shards 4 --no-fetch --cache-dir data     # 毎回新しい run_id を使う
+    python shards.py run --shard 2/4 --run-id 20261019                # 各マシンで 1 つずつ
+    python shards.py merge --run-id 20261019 --start 1300 --end 9999
+"""
+import argparse
+import csv
+import datetime
+import json
+import os
+import shutil
+import socket
+import subprocess
+import sys
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parent
+SHARD_ROOT = BASE_DIR / 'outputs' / 'shards'
+RESULTS_DIR = BASE_DIR / 'outputs' / 'results'
+DEFAULT_START = 1300
+DEFAULT_END = 9999
+MANIFEST_NAME = 'manifest.json'
+RESULT_NAME = 'result.csv'
+SCAN_TYPE = 'weekly_ma52_engulfing'
+# MA52（週足 52 本）を判定できる取得期間。data/ の既存キャッシュ（1y 以上）より短くしない
+DEFAULT_PERIOD = '2y'
+
+
+def _now():
+    return datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+
+
+def _write_json(path, data):
+    tmp = Path(f'{path}.{os.getpid()}.tmp')
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(data, f, ensure_ascii=False, indent=2)
+    os.replace(tmp, path)
+
+
+def _read_json(path, default=None):
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return default
+
+
+def _code(ticker):
+    try:
+        return int(str(ticker).replace('.T', ''))
+    except ValueError:
+        return None
+
+
+# ---------------------------------------------------------------------------
+# 範囲
+# ---------------------------------------------------------------------------
+
+def parse_shard(spec):
+    """'i/N'（1 始まり）を (i, N) にする。"""
+    try:
+        i, n = (int(x) for x in str(spec).split('/'))
+    except ValueError:
+        raise ValueError(f"shard must be 'i/N' (e.g. 2/4): {spec!r}")
+    if n < 1 or not 1 <= i <= n:
+        raise ValueError(f"shard index out of range: {spec!r}")
+    return i, n
+
+
+def parse_range(spec):
+    """'1300-4999' を (1300, 4999) にする。"""
+    try:
+        start, end = (int(x) for x in str(spec).split('-'))
+    except ValueError:
+        raise ValueError(f"range must be 'START-END' (e.g. 1300-4999): {spec!r}")
+    if start > end:
+        raise ValueError(f"range start is after end: {spec!r}")
+    return start, end
+
+
+def shard_range(i, n, start=DEFAULT_START, end=DEFAULT_END):
+    """[start, end] を N 個の連続した範囲に分けた i 番目（1 始まり）。端数は前のシャードから 1 つずつ配る。"""
+    total = end - start + 1
+    size, extra = divmod(total, n)
+    s = start + (i - 1) * size + min(i - 1, extra)
+    e = s + size + (1 if i <= extra else 0) - 1
+    return s, e
+
+
+def default_run_id():
+    return datetime.date.today().strftime('%Y%m%d')
+
+
+def run_dir(run_id, root=None):
+    return Path(root or SHARD_ROOT) / str(run_id)
+
+
+def shard_dir(start, end, root=None, run_id=None):
+    return run_dir(run_id or default_run_id(), root) / f'{start:04d}_{end:04d}'
+
+
+def list_runs(root=None):
+    """完了したシャードがある回の run_id（最後にシャードが完了した時刻の古い順）。"""
+    runs = {}
+    for path in Path(root or SHARD_ROOT).glob(f'*/*/{MANIFEST_NAME}'):
+        run_id = path.parent.parent.name
+        runs[run_id] = max(runs.get(run_id, 0), path.stat().st_mtime)
+    return sorted(runs, key=lambda r: (runs[r], r))
+
+
+# ---------------------------------------------------------------------------
+# シャードの実行
+# ---------------------------------------------------------------------------
+
+def _last_close(ticker, cache_dir):
+    from data_fetcher import load_ticker_from_cache
+    df = load_ticker_from_cache(ticker, cache_dir=cache_dir)
+    if df is None or 'Close' not in df.columns:
+        return None
+    closes = df['Close'].dropna()
+    return float(closes.iloc[-1]) if len(closes) else None
+
+
+def run_shard(start, end, root=None, fetch=True, scan=True, cache_dir=None, period=DEFAULT_PERIOD, interval='1d',
+              batch_size=200, sleep=1.0, retry=1, relaxed_engulfing=False, require_ma52=True, verbose=False,
+              run_id=None):
+    """
+    1 シャード（コード start〜end）の取得・スキャンを行い、回 run_id の下に部分結果とマニフェストを書く。
+
+    fetch=True なら シャードの data/ に取得する。スキャンは cache_dir（省略時はシャードの data/）を読む。
+    既存のマニフェストは最初に消し、全部書き終えてから新しく書く（途中で落ちたシャードは merge で抜けになる）。
+    """
+    run_id = str(run_id or default_run_id())
+    sdir = shard_dir(start, end, root, run_id)
+    data_dir = sdir / 'data'
+    data_dir.mkdir(parents=True, exist_ok=True)
+    manifest_path = sdir / MANIFEST_NAME
+    if manifest_path.exists():
+        manifest_path.unlink()
+    started = _now()
+
+    if fetch:
+        from data_fetcher import fetch_and_save_tickers
+        fetch_and_save_tickers(start=start, end=end, batch_size=batch_size, period=period, interval=interval,
+                               out_dir=str(data_dir), retry_count=retry, sleep_between_batches=sleep, verbose=verbose)
+    fetched = sorted(p.stem for p in data_dir.glob('*.parquet') if start <= (_code(p.stem) or -1) <= end)
+
+    params = {'relaxed_engulfing': bool(relaxed_engulfing), 'require_ma52': bool(require_ma52)}
+    rows = []
+    scan_dir = str(cache_dir or data_dir)
+    if scan:
+        import screening
+        from screener import scan_stocks_with_cache
+        skip = screening.excluded_tickers()
+        tickers = [f"{c:04d}.T" for c in range(max(start, 1300), end + 1)]
+        tickers = [t for t in tickers if t not in skip and os.path.exists(os.path.join(scan_dir, f"{t}.parquet"))]
+        hits = scan_stocks_with_cache(tickers, cache_dir=scan_dir, relaxed_engulfing=relaxed_engulfing,
+                                      require_ma52=require_ma52)
+        for t in hits:
+            price = _last_close(t, scan_dir)
+            if price is not None:
+                rows.append((t, price))
+        rows.sort(key=lambda r: r[0])
+        with open(sdir / RESULT_NAME, 'w', newline='', encoding='utf-8') as f:
+            writer = csv.writer(f)
+            writer.writerow(['ticker', 'price'])
+            for t, p in rows:
+                writer.writerow([t, repr(p)])
+
+    manifest = {
+        'run_id': run_id,
+        'start': start,
+        'end': end,
+        'fetched': len(fetched),
+        'scanned': bool(scan),
+        'hits': len(rows),
+        'scan_type': SCAN_TYPE,
+        'params': params,
+        'cache_dir': scan_dir if cache_dir else None,
+        'host': socket.gethostname(),
+        'pid': os.getpid(),
+        'started_at': started,
+        'finished_at': _now(),
+    }
+    _write_json(manifest_path, manifest)
+    print(f"shard {run_id}/{start:04d}-{end:04d}: fetched={len(fetched)}, hits={len(rows)} -> {sdir}")
+    return manifest
+
+
+# ---------------------------------------------------------------------------
+# マージ
+# ---------------------------------------------------------------------------
+
+def load_manifests(root=None, run_id=None):
+    """回 run_id（省略時は最新の回）の完了したシャードのマニフェスト（範囲順）。"""
+    if run_id is None:
+        runs = list_runs(root)
+        if not runs:
+            return []
+        run_id = runs[-1]
+    out = []
+    for path in sorted(run_dir(run_id, root).glob(f'*/{MANIFEST_NAME}')):
+        m = _read_json(path)
+        if m and 'start' in m and 'end' in m:
+            m['dir'] = str(path.parent)
+            out.append(m)
+    out.sort(key=lambda m: (m['start'], m['end']))
+    return out
+
+
+def check_coverage(manifests, start=DEFAULT_START, end=DEFAULT_END):
+    """
+    [start, end] に対する抜けと重なり。
+
+    戻り値: {'missing': [(s, e), ...], 'overlaps': [((s1, e1), (s2, e2)), ...]}
+    対象範囲の外だけを担当するシャードは無視する。
+    """
+    ranges = [(m['start'], m['end']) for m in manifests if m['end'] >= start and m['start'] <= end]
+    missing = []
+    overlaps = []
+    covered = start - 1   # ここまでは担当済み
+    owner = None          # covered まで担当しているシャード
+    for s, e in ranges:
+        if s > covered + 1:
+            missing.append((covered + 1, min(s - 1, end)))
+        elif owner is not None and s <= covered:
+            overlaps.append((owner, (s, e)))
+        if e > covered:
+            covered, owner = e, (s, e)
+    if covered < end:
+        missing.append((max(covered + 1, start), end))
+    return {'missing': missing, 'overlaps': overlaps}
+
+
+def _merge_bars(src, dst):
+    """
+    シャードの日足 src を既存キャッシュ dst にマージして書く（tmp + os.replace）。
+
+    同じ日付はシャード側（新しく取得した値）を使い、dst にしか無い古い足は残す。
+    シャードの取得期間が短くても、既存キャッシュの履歴を縮めない。
+    """
+    import pandas as pd
+    new = pd.read_parquet(src)
+    if dst.exists():
+        try:
+            old = pd.read_parquet(dst)
+        except Exception:
+            old = None
+        if old is not None and not old.empty:
+            new_idx = pd.DatetimeIndex(pd.to_datetime(new.index))
+            old_idx = pd.DatetimeIndex(pd.to_datetime(old.index))
+            # タイムゾーンの有無・種類を既存キャッシュに揃える
+            if old_idx.tz is not None:
+                new_idx = new_idx.tz_localize(old_idx.tz) if new_idx.tz is None else new_idx.tz_convert(old_idx.tz)
+            elif new_idx.tz is not None:
+                new_idx = new_idx.tz_localize(None)
+            new.index = new_idx
+            old.index = old_idx
+            new = pd.concat([old[~old.index.isin(new.index)], new]).sort_index()
+    tmp = dst.with_name(f'.{dst.name}.{os.getpid()}.tmp')
+    new.to_parquet(tmp)
+    os.replace(tmp, dst)
+
+
+def _fmt_ranges(ranges):
+    return ', '.join(f"{s:04d}-{e:04d}" for s, e in ranges)
+
+
+def merge(root=None, start=DEFAULT_START, end=DEFAULT_END, data_dir=None, results_dir=None, copy_cache=True,
+          register=True, allow_gaps=False, run_id=None):
+    """
+    回 run_id（省略時は最新の回）の完了したシャードの部分キャッシュと結果をまとめる。
+
+    抜けか重なりがあれば ValueError（allow_gaps=True なら抜けだけは許して続ける。重なりは常にエラー）。
+    シャード間でスキャン条件が違う場合も ValueError。
+    結果は scan_all_jp_batch と同じ名前・列（ticker,price を価格の昇順、同値はティッカー順）で書き、
+    results_catalog に登録する。戻り値はマージの要約 dict。
+    """
+    manifests = [m for m in load_manifests(root, run_id) if m['end'] >= start and m['start'] <= end]
+    run_id = manifests[0].get('run_id') if manifests else run_id
+    coverage = check_coverage(manifests, start, end)
+    if coverage['overlaps']:
+        pairs = '; '.join(f"{_fmt_ranges([a])} / {_fmt_ranges([b])}" for a, b in coverage['overlaps'])
+        raise ValueError(f"overlapping shards: {pairs}")
+    if coverage['missing'] and not allow_gaps:
+        raise ValueError(f"missing ranges: {_fmt_ranges(coverage['missing'])}")
+    params = {json.dumps(m.get('params') or {}, sort_keys=True) for m in manifests if m.get('scanned')}
+    if len(params) > 1:
+        raise ValueError(f"shards were scanned with different params: {sorted(params)}")
+
+    copied = []
+    if copy_cache:
+        import data_fetcher
+        data_dir = Path(data_dir or data_fetcher.config.DATA_DIR)
+        data_dir.mkdir(parents=True, exist_ok=True)
+        for m in manifests:
+            for src in sorted((Path(m['dir']) / 'data').glob('*.parquet')):
+                c = _code(src.stem)
+                if c is None or not (max(m['start'], start) <= c <= min(m['end'], end)):
+                    continue
+                # 書き直して mtime を新しくし、indicator_state が次のスキャンで状態を進めるようにする
+                dst = data_dir / src.name
+                _merge_bars(src, dst)
+                copied.append(str(dst))
+        data_fetcher._note_saved(str(data_dir), copied)
+
+    rows = []
+    for m in manifests:
+        path = Path(m['dir']) / RESULT_NAME
+        if not m.get('scanned') or not path.exists():
+            continue
+        with open(path, newline='', encoding='utf-8') as f:
+            for r in csv.DictReader(f):
+                c = _code(r['ticker'])
+                if c is not None and start <= c <= end:
+                    rows.append((r['ticker'], float(r['price'])))
+    rows.sort(key=lambda r: (r[1], r[0]))
+
+    output_file = None
+    if any(m.get('scanned') for m in manifests):
+        scan_params = json.loads(params.pop()) if params else {}
+        prefix = '全銘柄_MA52_陽線包み' + ('_緩和' if scan_params.get('relaxed_engulfing') else '')
+        results_dir = Path(results_dir or RESULTS_DIR)
+        results_dir.mkdir(parents=True, exist_ok=True)
+        as_of = datetime.date.today().strftime('%Y-%m-%d')
+        output_file = str(results_dir / f"{prefix}_{as_of}_{datetime.datetime.now().strftime('%Y%m%d%H%M%S')}.csv")
+        with open(output_file, 'w', newline='', encoding='utf-8') as f:
+            writer = csv.writer(f)
+            writer.writerow(['ticker', 'price'])
+            for t, p in rows:
+                writer.writerow([t, f"{p:.2f}"])
+        if register:
+            try:
+                import results_catalog
+                results_catalog.register(output_file, SCAN_TYPE, params=scan_params, as_of=as_of)
+            except Exception as e:
+                print(f"結果カタログへの登録に失敗しました: {e}")
+
+    summary = {
+        'run_id': run_id,
+        'shards': len(manifests),
+        'missing': coverage['missing'],
+        'copied': len(copied),
+        'hits': len(rows),
+        'output_file': output_file,
+    }
+    print(f"merge {run_id}: {len(manifests)} shards, copied={len(copied)}, hits={len(rows)}"
+          + (f", missing={_fmt_ranges(coverage['missing'])}" if coverage['missing'] else '')
+          + (f" -> {output_file}" if output_file else ''))
+    return summary
+
+
+# ---------------------------------------------------------------------------
+# CLI
+# ---------------------------------------------------------------------------
+
+def _add_run_args(p):
+    p.add_argument('--start', type=int, default=DEFAULT_START, help='Start code of the whole universe (4-digit)')
+    p.add_argument('--end', type=int, default=DEFAULT_END, help='End code of the whole universe (4-digit)')
+    p.add_argument('--root', type=str, default=None, help='Directory holding shard outputs (default: outputs/shards)')
+    p.add_argument('--run-id', type=str, default=None, help='Group of shards this run belongs to (default: today YYYYMMDD)')
+    p.add_argument('--no-fetch', dest='fetch', action='store_false', help='Skip fetching (scan only)')
+    p.add_argument('--no-scan', dest='scan', action='store_false', help='Skip scanning (fetch only)')
+    p.add_argument('--cache-dir', type=str, default=None, help='Scan this cache instead of the shard partial cache')
+    p.add_argument('--period', type=str, default=DEFAULT_PERIOD, help='yfinance period for fetch (MA52 needs >= 1y)')
+    p.add_argument('--interval', type=str, default='1d', help='yfinance interval')
+    p.add_argument('--batch-size', type=int, default=200, dest='batch_size')
+    p.add_argument('--sleep', type=float, default=1.0, help='Sleep between batches (seconds)')
+    p.add_argument('--retry', type=int, default=1, help='Retry count for downloads')
+    p.add_argument('--relaxed', action='store_true', help='Relaxed engulfing check')
+    p.add_argument('--no-require-ma52', dest='require_ma52', action='store_false', help='Disable the MA52 condition')
+    p.add_argument('--verbose', action='store_true')
+
+
+def _run_kwargs(args):
+    return dict(root=args.root, fetch=args.fetch, scan=args.scan, cache_dir=args.cache_dir, period=args.period,
+                interval=args.interval, batch_size=args.batch_size, sleep=args.sleep, retry=args.retry,
+                relaxed_engulfing=args.relaxed, require_ma52=args.require_ma52, verbose=args.verbose,
+                run_id=args.run_id)
+
+
+def _run_argv(args):
+    """local の取得・スキャン条件を run サブコマンドの引数に戻す。"""
+    out = ['--start', str(args.start), '--end', str(args.end), '--period', args.period, '--interval', args.interval,
+           '--batch-size', str(args.batch_size), '--sleep', str(args.sleep), '--retry', str(args.retry)]
+    for flag, value in (('--root', args.root), ('--cache-dir', args.cache_dir), ('--run-id', args.run_id)):
+        if value:
+            out += [flag, value]
+    for flag, on in (('--no-fetch', not args.fetch), ('--no-scan', not args.scan), ('--relaxed', args.relaxed),
+                     ('--no-require-ma52', not args.require_ma52), ('--verbose', args.verbose)):
+        if on:
+            out.append(flag)
+    return out
+
+
+def parse_args(argv=None):
+    p = argparse.ArgumentParser(description='Shard the JP ticker range for fetch/scan and merge the shard outputs')
+    sub = p.add_subparsers(dest='cmd', required=True)
+
+    r = sub.add_parser('run', help='Fetch/scan one shard')
+    g = r.add_mutually_exclusive_group(required=True)
+    g.add_argument('--shard', type=str, help="Shard 'i/N' (1-based) of --start..--end")
+    g.add_argument('--range', dest='code_range', type=str, help="Explicit code range 'START-END'")
+    _add_run_args(r)
+
+    m = sub.add_parser('merge', help='Check coverage and merge shard caches/results')
+    m.add_argument('--start', type=int, default=DEFAULT_START, help='Start code the shards must cover')
+    m.add_argument('--end', type=int, default=DEFAULT_END, help='End code the shards must cover')
+    m.add_argument('--root', type=str, default=None, help='Directory holding shard outputs (default: outputs/shards)')
+    m.add_argument('--run-id', type=str, default=None, help='Run to merge (default: the most recent run)')
+    m.add_argument('--data-dir', type=str, default=None, help='Merged cache directory (default: config.DATA_DIR)')
+    m.add_argument('--results-dir', type=str, default=None, help='Directory for the merged result CSV')
+    m.add_argument('--no-cache', dest='copy_cache', action='store_false', help='Merge results only')
+    m.add_argument('--no-register', dest='register', action='store_false', help='Do not register in results_catalog')
+    m.add_argument('--allow-gaps', action='store_true', help='Merge even if some ranges are missing')
+
+    c = sub.add_parser('check', help='Report missing/overlapping shard ranges')
+    c.add_argument('--start', type=int, default=DEFAULT_START)
+    c.add_argument('--end', type=int, default=DEFAULT_END)
+    c.add_argument('--root', type=str, default=None)
+    c.add_argument('--run-id', type=str, default=None, help='Run to check (default: the most recent run)')
+
+    lo = sub.add_parser('local', help='Run N shards as local processes, then merge')
+    lo.add_argument('--shards', type=int, default=4, help='Number of shards/processes')
+    _add_run_args(lo)
+    lo.add_argument('--data-dir', type=str, default=None, help='Merged cache directory (default: config.DATA_DIR)')
+    lo.add_argument('--results-dir', type=str, default=None, help='Directory for the merged result CSV')
+    lo.add_argument('--no-register', dest='register', action='store_false', help='Do not register in results_catalog')
+    return p.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.cmd == 'run':
+        if args.shard:
+            start, end = shard_range(*parse_shard(args.shard), args.start, args.end)
+        else:
+            start, end = parse_range(args.code_range)
+        run_shard(start, end, **_run_kwargs(args))
+        return 0
+
+    if args.cmd == 'check':
+        runs = list_runs(args.root)
+        run_id = args.run_id or (runs[-1] if runs else None)
+        print(f"runs: {', '.join(runs) or '-'}  (checking: {run_id or '-'})")
+        manifests = load_manifests(args.root, run_id) if run_id else []
+        coverage = check_coverage(manifests, args.start, args.end)
+        for mf in manifests:
+            print(f"{mf['start']:04d}-{mf['end']:04d}: fetched={mf.get('fetched')}, hits={mf.get('hits')} "
+                  f"({mf.get('host')}, {mf.get('finished_at')})")
+        if coverage['missing']:
+            print(f"missing: {_fmt_ranges(coverage['missing'])}")
+        for a, b in coverage['overlaps']:
+            print(f"overlap: {_fmt_ranges([a])} / {_fmt_ranges([b])}")
+        return 1 if coverage['missing'] or coverage['overlaps'] else 0
+
+    if args.cmd == 'merge':
+        try:
+            merge(args.root, args.start, args.end, data_dir=args.data_dir, results_dir=args.results_dir,
+                  copy_cache=args.copy_cache, register=args.register, allow_gaps=args.allow_gaps, run_id=args.run_id)
+        except ValueError as e:
+            print(f"merge failed: {e}", file=sys.stderr)
+            return 1
+        return 0
+
+    # local: シャードごとに別プロセスで run を起動し、全部終わってからマージする。
+    # 毎回新しい run_id を使い（指定された場合はその回を空にしてから）、前の回のシャードと混ぜない
+    if args.run_id:
+        shutil.rmtree(run_dir(args.run_id, args.root), ignore_errors=True)
+    else:
+        args.run_id = 'local-' + datetime.datetime.now().strftime('%Y%m%d%H%M%S%f')
+    procs = []
+    for i in range(1, args.shards + 1):
+        cmd = [sys.executable, str(Path(__file__).resolve()), 'run', '--shard', f'{i}/{args.shards}']
+        cmd += _run_argv(args)
+        procs.append(subprocess.Popen(cmd, cwd=str(BASE_DIR)))
+    codes = [p.wait() for p in procs]
+    if any(codes):
+        print(f"some shards failed: exit codes {codes}", file=sys.stderr)
+    try:
+        merge(args.root, args.start, args.end, data_dir=args.data_dir, results_dir=args.results_dir,
+              copy_cache=args.fetch, register=args.register, run_id=args.run_id)
+    except ValueError as e:
+        print(f"merge failed: {e}", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
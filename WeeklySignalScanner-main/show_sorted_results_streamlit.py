@@ -1,22 +1,15 @@
 import os
-import glob
 from datetime import datetime
 
 import pandas as pd
 import streamlit as st
 
+import results_catalog
 
-def list_result_csvs():
-    files = sorted(glob.glob('outputs/results/*.csv'), key=os.path.getmtime, reverse=True)
-    return files
 
-
-def get_ticker_column(df: pd.DataFrame) -> str:
-    candidates = ["ticker", "Ticker", "symbol", "Symbol", "code", "Code"]
-    for c in candidates:
-        if c in df.columns:
-            return c
-    return df.columns[0]
+def list_result_entries():
+    # 新しい順（results_catalog が outputs/results と同期した一覧）
+    return results_catalog.list_results()
 
 
 def fetch_price_from_cache(ticker: str):
@@ -40,18 +33,19 @@ def main():
     st.set_page_config(page_title="抽出銘柄一覧 (results)", layout="wide")
     st.title("抽出銘柄一覧 — outputs/results")
 
-    files = list_result_csvs()
-    if not files:
+    entries = list_result_entries()
+    if not entries:
         st.error('outputs/results に CSV ファイルが見つかりません')
         return
 
-    choice = st.sidebar.selectbox('表示するファイルを選択', files, format_func=lambda p: os.path.basename(p))
-    st.sidebar.write(f'最終更新: {datetime.fromtimestamp(os.path.getmtime(choice))}')
+    entry = st.sidebar.selectbox('表示するファイルを選択', entries, format_func=lambda e: e['name'])
+    choice = entry['csv_path'] or entry['name']
+    st.sidebar.write(f"最終更新: {entry['created_at']}")
 
-    df = pd.read_csv(choice)
+    df = results_catalog.load(entry, normalize_ticker=False)
     st.sidebar.write(f'行数: {len(df)}')
 
-    ticker_col = get_ticker_column(df)
+    ticker_col = entry['ticker_col'] if entry['ticker_col'] in df.columns else results_catalog.infer_ticker_column(df)
     st.write(f"読み込みファイル: `{choice}` — 銘柄列: `{ticker_col}`")
 
     # If current_price exists, allow quick sort; otherwise provide cache-based computation
@@ -67,6 +61,8 @@ def main():
         if st.sidebar.button('ソート済みCSVを保存'):
             out_name = os.path.join('outputs', 'results', f"sorted_{os.path.basename(choice)}")
             df_sorted.to_csv(out_name, index=False)
+            results_catalog.register(out_name, 'sorted', params={'source': entry['name'], 'by': sort_by, 'ascending': asc},
+                                     as_of=entry['as_of'], df=df_sorted)
             st.success(f'保存しました: `{out_name}`')
     else:
         st.warning('このファイルに `current_price` 列がありません。ローカルキャッシュから価格を取得できます（ネット非使用）。')
@@ -87,6 +83,8 @@ def main():
             st.download_button('CSV をダウンロード', csv_bytes, file_name=os.path.basename(choice))
             out_name = os.path.join('outputs', 'results', f"{os.path.splitext(os.path.basename(choice))[0]}_with_prices_{datetime.now().date()}.csv")
             df_sorted.to_csv(out_name, index=False)
+            results_catalog.register(out_name, 'with_prices', params={'source': entry['name']},
+                                     as_of=entry['as_of'], df=df_sorted)
             st.success(f'保存しました: `{out_name}`')
 
 
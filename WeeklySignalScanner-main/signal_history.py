@@ -0,0 +1,373 @@
+"""
+シグナル履歴ストア（スキャン結果のヒットを日付をまたいで検索する）
+
+各スキャンはタイムスタンプ付きの CSV を 1 本ずつ書くだけなので、
+「直近 5 週のうち 3 週で週足包み足が出た銘柄」のような問いには何十本もの CSV を開く必要があった。
+ここでは outputs/signals/signals.sqlite に
+
+- runs: スキャン 1 回 = 1 行。(scan_type, params_hash, as_of) を主キーにする（同じ日・同じ条件の再実行は置き換え）
+- signals: ヒット 1 銘柄 = 1 行（数値列は metrics に JSON で保持）。(ticker, as_of) と (scan_type, as_of) に索引
+
+を持つ。記録は results_catalog.register() から呼ばれるので、カタログに登録する各スキャン
+（scan_all_jp_batch / 月足 GC・包み足 / 短期_初動 / scan_daily_gainers / 米国株）で自動的に溜まる。
+価格付き・ソート済みなどの派生ファイルは記録しない。
+
+使い方:
+    python signal_history.py backfill            # カタログにある既存の結果を取り込む
+    python signal_history.py repeat --type weekly_ma52_engulfing --last 5 --min-hits 3 --freq W
+    python signal_history.py streaks --type weekly_ma52_engulfing --freq W
+    python signal_history.py ticker 7203.T
+"""
+import argparse
+import datetime
+import json
+import os
+import sqlite3
+import threading
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+BASE_DIR = Path(__file__).resolve().parent
+DB_PATH = Path(os.environ.get('SIGNAL_DB', str(BASE_DIR / 'outputs' / 'signals' / 'signals.sqlite')))
+# 元の結果を加工しただけのファイル（同じヒットを二重に数えないよう記録しない）
+DERIVED_TYPES = {'sorted', 'with_prices'}
+# 週・月単位に丸めるときの pandas の期間指定
+FREQ_LABELS = {None: '実行ごと', 'W': '週', 'M': '月'}
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    scan_type TEXT NOT NULL,
+    params_hash TEXT NOT NULL,
+    as_of TEXT NOT NULL,
+    params TEXT,
+    source TEXT,
+    hit_count INTEGER,
+    recorded_at TEXT NOT NULL,
+    PRIMARY KEY (scan_type, params_hash, as_of)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_runs_source ON runs (source);
+CREATE TABLE IF NOT EXISTS signals (
+    scan_type TEXT NOT NULL,
+    params_hash TEXT NOT NULL,
+    as_of TEXT NOT NULL,
+    ticker TEXT NOT NULL,
+    metrics TEXT,
+    PRIMARY KEY (scan_type, params_hash, as_of, ticker)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_signals_ticker_as_of ON signals (ticker, as_of);
+CREATE INDEX IF NOT EXISTS idx_signals_type_as_of ON signals (scan_type, as_of);
+"""
+
+_lock = threading.Lock()
+
+
+def _connect(db_path=None):
+    path = Path(db_path or DB_PATH)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    conn = sqlite3.connect(str(path), timeout=30)
+    conn.execute('PRAGMA journal_mode=WAL')
+    conn.executescript(_SCHEMA)
+    return conn
+
+
+def db_token(db_path=None):
+    """変更検知用のトークン（DB と WAL ファイルの mtime）。"""
+    path = str(db_path or DB_PATH)
+    out = []
+    for p in (path, path + '-wal'):
+        try:
+            out.append(os.stat(p).st_mtime_ns)
+        except OSError:
+            out.append(None)
+    return tuple(out)
+
+
+def _metrics(row):
+    out = {}
+    for k, v in row.items():
+        if isinstance(v, (bool, np.bool_)):
+            out[k] = bool(v)
+        elif isinstance(v, (int, float, np.integer, np.floating)) and not pd.isna(v):
+            out[k] = float(v) if isinstance(v, (float, np.floating)) else int(v)
+    return json.dumps(out, ensure_ascii=False) if out else None
+
+
+def record(df, scan_type, params=None, as_of=None, source=None, ticker_col=None, db_path=None):
+    """
+    スキャン 1 回分のヒットを記録する。同じ (scan_type, params, as_of) の記録があれば置き換える。
+
+    as_of を省略すると今日の日付。記録した銘柄数を返す（派生ファイルや銘柄列が無い場合は 0）。
+    """
+    import results_catalog
+    if scan_type in DERIVED_TYPES or df is None:
+        return 0
+    ticker_col = ticker_col if ticker_col in df.columns else results_catalog.infer_ticker_column(df)
+    if ticker_col is None or ticker_col not in df.columns:
+        return 0
+    as_of = str(as_of)[:10] if as_of else datetime.date.today().isoformat()
+    phash = results_catalog.params_hash(params)
+    metric_cols = [c for c in df.columns if c != ticker_col
+                   and (pd.api.types.is_numeric_dtype(df[c]) or pd.api.types.is_bool_dtype(df[c]))]
+    rows = {}
+    records = df[metric_cols].to_dict('records') if metric_cols else [{}] * len(df)
+    for ticker, rec in zip(df[ticker_col].astype(str).str.strip(), records):
+        if ticker and ticker.lower() != 'nan':
+            rows[ticker] = (scan_type, phash, as_of, ticker, _metrics(rec))
+    conn = _connect(db_path)
+    try:
+        with _lock, conn:
+            conn.execute('DELETE FROM signals WHERE scan_type = ? AND params_hash = ? AND as_of = ?',
+                         (scan_type, phash, as_of))
+            conn.executemany('INSERT INTO signals (scan_type, params_hash, as_of, ticker, metrics) VALUES (?, ?, ?, ?, ?)',
+                             list(rows.values()))
+            conn.execute('INSERT OR REPLACE INTO runs (scan_type, params_hash, as_of, params, source, hit_count, recorded_at) '
+                         'VALUES (?, ?, ?, ?, ?, ?, ?)',
+                         (scan_type, phash, as_of, json.dumps(params or {}, ensure_ascii=False, default=str),
+                          source, len(rows), datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')))
+    finally:
+        conn.close()
+    return len(rows)
+
+
+def record_entry(entry, df=None, db_path=None):
+    """results_catalog の entry（と読み込み済みの DataFrame）を記録する。"""
+    if entry is None or entry['scan_type'] in DERIVED_TYPES:
+        return 0
+    if df is None:
+        import results_catalog
+        df = results_catalog.load(entry, normalize_ticker=False)
+    as_of = entry.get('as_of') or (entry.get('created_at') or '')[:10] or None
+    return record(df, entry['scan_type'], entry.get('params'), as_of, source=entry['name'],
+                  ticker_col=entry.get('ticker_col'), db_path=db_path)
+
+
+def forget(source, db_path=None):
+    """元ファイル名 source から記録した実行とヒットを消す。消した実行数を返す。"""
+    conn = _connect(db_path)
+    try:
+        with _lock, conn:
+            keys = conn.execute('SELECT scan_type, params_hash, as_of FROM runs WHERE source = ?', (source,)).fetchall()
+            conn.executemany('DELETE FROM signals WHERE scan_type = ? AND params_hash = ? AND as_of = ?', keys)
+            conn.executemany('DELETE FROM runs WHERE scan_type = ? AND params_hash = ? AND as_of = ?', keys)
+    finally:
+        conn.close()
+    return len(keys)
+
+
+def backfill(results_dir=None, db_path=None):
+    """カタログにあってまだ記録していない結果を取り込む。(取り込んだ実行数, ヒット数) を返す。"""
+    import results_catalog
+    conn = _connect(db_path)
+    try:
+        done = {s for (s,) in conn.execute('SELECT source FROM runs WHERE source IS NOT NULL')}
+    finally:
+        conn.close()
+    n_runs = n_hits = 0
+    # 古い順に取り込み、同じ日・同じ条件の結果は新しいファイルで置き換わるようにする
+    for entry in reversed(results_catalog.list_results(results_dir=results_dir)):
+        if entry['name'] in done or entry['scan_type'] in DERIVED_TYPES:
+            continue
+        try:
+            n_hits += record_entry(entry, db_path=db_path)
+            n_runs += 1
+        except Exception:
+            continue
+    return n_runs, n_hits
+
+
+def _where(scan_type=None, params_hash=None, start=None, end=None, ticker=None):
+    where, args = [], []
+    for col, val in (('scan_type', scan_type), ('params_hash', params_hash), ('ticker', ticker)):
+        if val:
+            vals = [val] if isinstance(val, str) else list(val)
+            where.append(f"{col} IN ({', '.join('?' for _ in vals)})")
+            args += vals
+    if start:
+        where.append('as_of >= ?')
+        args.append(str(start)[:10])
+    if end:
+        where.append('as_of <= ?')
+        args.append(str(end)[:10])
+    return (' WHERE ' + ' AND '.join(where)) if where else '', args
+
+
+def runs(scan_type=None, params_hash=None, start=None, end=None, db_path=None):
+    """記録済みの実行（新しい順）。"""
+    sql, args = _where(scan_type, params_hash, start, end)
+    conn = _connect(db_path)
+    try:
+        return pd.read_sql_query('SELECT scan_type, params_hash, as_of, params, source, hit_count, recorded_at '
+                                 f'FROM runs{sql} ORDER BY as_of DESC, scan_type', conn, params=args)
+    finally:
+        conn.close()
+
+
+def hits(ticker=None, scan_type=None, params_hash=None, start=None, end=None, with_metrics=False, db_path=None):
+    """条件に合うヒット（as_of の新しい順）。with_metrics=True なら metrics を列に展開する。"""
+    sql, args = _where(scan_type, params_hash, start, end, ticker)
+    cols = 'scan_type, params_hash, as_of, ticker' + (', metrics' if with_metrics else '')
+    conn = _connect(db_path)
+    try:
+        df = pd.read_sql_query(f'SELECT {cols} FROM signals{sql} ORDER BY as_of DESC, ticker', conn, params=args)
+    finally:
+        conn.close()
+    if with_metrics and not df.empty:
+        m = pd.DataFrame([json.loads(x) if x else {} for x in df.pop('metrics')], index=df.index)
+        df = df.join(m.drop(columns=[c for c in m.columns if c in df.columns]))
+    return df
+
+
+def _periods(dates, freq):
+    """as_of（'YYYY-MM-DD'）を集計単位のラベルにする。freq=None なら実行日そのもの。"""
+    dates = pd.to_datetime(pd.Series(dates), errors='coerce')
+    if not freq:
+        return dates.dt.strftime('%Y-%m-%d')
+    return dates.dt.to_period(freq).astype(str)
+
+
+def _timeline(scan_type, params_hash, end, freq, db_path):
+    """
+    集計対象の期間ラベル（古い順）と、実行日 -> 期間の通し番号 の dict。
+
+    期間は「実行が記録された期間」だけで数える（スキャンしなかった週はヒット無しとは見なさない）。
+    日付の変換は実行日の種類数（数百）だけ行い、ヒット行には dict で番号を引く。
+    """
+    r = runs(scan_type, params_hash, end=end, db_path=db_path)
+    dates = sorted(r['as_of'].dropna().unique())
+    labels = _periods(dates, freq)
+    periods = sorted(labels.dropna().unique())
+    index = {p: i for i, p in enumerate(periods)}
+    return periods, {d: index[lab] for d, lab in zip(dates, labels) if lab in index}
+
+
+def _hit_positions(scan_type, params_hash, end, date_pos, start=None, db_path=None):
+    """(ticker, as_of, pos) だけを並べ替えずに読む（集計用。表示用の hits() より軽い）。"""
+    sql, args = _where(scan_type, params_hash, start, end)
+    conn = _connect(db_path)
+    try:
+        rows = conn.execute(f'SELECT ticker, as_of FROM signals{sql}', args).fetchall()
+    finally:
+        conn.close()
+    h = pd.DataFrame(rows, columns=['ticker', 'as_of'])
+    h['pos'] = h['as_of'].map(date_pos)
+    h = h.dropna(subset=['pos'])
+    h['pos'] = h['pos'].astype(int)
+    return h
+
+
+def repeat_signals(scan_type, last=5, min_hits=3, params_hash=None, end=None, freq=None, db_path=None):
+    """
+    直近 last 期間（freq=None なら直近 last 回の実行、'W' なら週、'M' なら月）のうち
+    min_hits 期間以上でヒットした銘柄を、ヒット数の多い順に返す。
+    """
+    columns = ['ticker', 'hits', 'periods', 'first_as_of', 'last_as_of', 'hit_periods']
+    periods, date_pos = _timeline(scan_type, params_hash, end, freq, db_path)
+    if not periods:
+        return pd.DataFrame(columns=columns)
+    first_pos = max(len(periods) - int(last), 0)
+    start = min(d for d, i in date_pos.items() if i >= first_pos)
+    h = _hit_positions(scan_type, params_hash, end, date_pos, start=start, db_path=db_path)
+    if h.empty:
+        return pd.DataFrame(columns=columns)
+    # 文字列列の groupby min/max は遅いので日付にして集計する
+    h['date'] = pd.to_datetime(h['as_of'])
+    g = h.groupby('ticker')
+    out = pd.DataFrame({
+        'hits': g['pos'].nunique(),
+        'first_as_of': g['date'].min().dt.strftime('%Y-%m-%d'),
+        'last_as_of': g['date'].max().dt.strftime('%Y-%m-%d'),
+    })
+    out['periods'] = len(periods) - first_pos
+    out = out[out['hits'] >= int(min_hits)]
+    # 該当銘柄だけヒットした期間のラベルを並べる
+    hit_pos = h[h['ticker'].isin(out.index)].drop_duplicates(['ticker', 'pos']).sort_values('pos')
+    out['hit_periods'] = hit_pos.groupby('ticker')['pos'].agg(lambda s: ', '.join(periods[i] for i in s))
+    out = out.reset_index()
+    return out.sort_values(['hits', 'last_as_of', 'ticker'], ascending=[False, False, True])[columns].reset_index(drop=True)
+
+
+def streaks(scan_type, params_hash=None, end=None, freq=None, min_length=2, current_only=False, db_path=None):
+    """
+    銘柄ごとの連続ヒット（期間が途切れずに続いた回数）。
+
+    current_streak は最新の期間まで続いている連続数（途切れていれば 0）、max_streak は全期間での最長。
+    streak_start / last_period は期間ラベル。max_streak が min_length 以上の銘柄を、現在の連続数・最長の順に返す。
+    """
+    columns = ['ticker', 'current_streak', 'max_streak', 'total_hits', 'streak_start', 'last_period']
+    periods, date_pos = _timeline(scan_type, params_hash, end, freq, db_path)
+    if not periods:
+        return pd.DataFrame(columns=columns)
+    h = _hit_positions(scan_type, params_hash, end, date_pos, db_path=db_path)
+    if h.empty:
+        return pd.DataFrame(columns=columns)
+    codes, tickers = pd.factorize(h['ticker'])
+    p = pd.DataFrame({'t': codes, 'pos': h['pos'].to_numpy()}).drop_duplicates().sort_values(['t', 'pos'])
+    t = p['t'].to_numpy()
+    pos = p['pos'].to_numpy()
+    # 銘柄が変わるか期間番号が 1 より飛んだところで区間を切る（以降は整数だけで集計）
+    brk = np.ones(len(p), dtype=bool)
+    brk[1:] = (t[1:] != t[:-1]) | (pos[1:] - pos[:-1] != 1)
+    run_id = np.cumsum(brk)
+    seg = pd.DataFrame({'t': t, 'pos': pos, 'run': run_id}).groupby('run').agg(
+        t=('t', 'first'), length=('pos', 'size'), start=('pos', 'min'), end=('pos', 'max'))
+    g = seg.groupby('t')
+    out = pd.DataFrame({'max_streak': g['length'].max(), 'total_hits': g['length'].sum(), 'last_pos': g['end'].max()})
+    current = seg[seg['end'] == len(periods) - 1].set_index('t')
+    out['current_streak'] = current['length'].reindex(out.index).fillna(0).astype(int)
+    out['start_pos'] = current['start'].reindex(out.index)
+    out = out[out['max_streak'] >= int(min_length)]
+    if current_only:
+        out = out[out['current_streak'] > 0]
+    out['ticker'] = tickers[out.index.to_numpy()]
+    out['streak_start'] = [periods[int(i)] if not pd.isna(i) else None for i in out['start_pos']]
+    out['last_period'] = [periods[int(i)] for i in out['last_pos']]
+    out = out.sort_values(['current_streak', 'max_streak', 'ticker'], ascending=[False, False, True])
+    return out[columns].reset_index(drop=True)
+
+
+def parse_args():
+    p = argparse.ArgumentParser(description='Signal history store')
+    p.add_argument('--db', type=str, default=None, help='SQLite path (default: outputs/signals/signals.sqlite)')
+    sub = p.add_subparsers(dest='cmd', required=True)
+    b = sub.add_parser('backfill')
+    b.add_argument('--results-dir', type=str, default=None)
+    r = sub.add_parser('runs')
+    r.add_argument('--type', type=str, default=None)
+    for name in ('repeat', 'streaks'):
+        s = sub.add_parser(name)
+        s.add_argument('--type', type=str, required=True)
+        s.add_argument('--params-hash', type=str, default=None)
+        s.add_argument('--end', type=str, default=None)
+        s.add_argument('--freq', type=str, default=None, choices=['W', 'M'])
+        if name == 'repeat':
+            s.add_argument('--last', type=int, default=5)
+            s.add_argument('--min-hits', type=int, default=3)
+        else:
+            s.add_argument('--min-length', type=int, default=2)
+            s.add_argument('--current', action='store_true')
+    t = sub.add_parser('ticker')
+    t.add_argument('ticker')
+    return p.parse_args()
+
+
+def main():
+    args = parse_args()
+    if args.cmd == 'backfill':
+        n_runs, n_hits = backfill(args.results_dir, db_path=args.db)
+        print(f"recorded {n_runs} runs ({n_hits} hits)")
+        return
+    if args.cmd == 'runs':
+        df = runs(args.type, db_path=args.db)
+    elif args.cmd == 'repeat':
+        df = repeat_signals(args.type, args.last, args.min_hits, args.params_hash, args.end, args.freq, db_path=args.db)
+    elif args.cmd == 'streaks':
+        df = streaks(args.type, args.params_hash, args.end, args.freq, args.min_length, args.current, db_path=args.db)
+    else:
+        df = hits(ticker=args.ticker, db_path=args.db)
+    print(df.to_string(index=False) if not df.empty else '(no rows)')
+
+
+if __name__ == '__main__':
+    main()
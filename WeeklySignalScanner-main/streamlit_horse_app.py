@@ -7,6 +7,7 @@ import datetime
 from pathlib import Path
 
 from horse_model import HorseDataProcessor, train_lgbm_model, plot_feature_importance, generate_bet_strategy
+import horse_registry
 
 
 st.set_page_config(page_title='競馬 血統分析AI (Streamlit)', layout='wide')
@@ -25,6 +26,8 @@ with st.sidebar:
     odds_col = st.text_input('オッズカラム', value='odds')
     bankroll = st.number_input('軍資金 (円)', value=50000)
     min_ev = st.number_input('期待値閾値 (例:1.2)', value=1.2)
+    encoder_path = st.text_input('ターゲットエンコーダ保存先',
+                                 value=str(Path.cwd() / 'data' / 'netkeiba' / 'target_encoder.json'))
 
 st.markdown('またはネット上のCSVを指定して自動取得できます。')
 url_results = st.text_input('レース結果CSVのURL', value='')
@@ -56,6 +59,12 @@ def fetch_table_to_df(url: str) -> pd.DataFrame:
 
 if 'processor' not in st.session_state:
     st.session_state['processor'] = HorseDataProcessor()
+    # 以前のセッション・別プロセスで学習したエンコーダがあれば読み込む
+    if encoder_path and Path(encoder_path).exists():
+        try:
+            st.session_state['processor'].load_target_encoder(encoder_path)
+        except Exception as e:
+            st.warning(f'ターゲットエンコーダの読み込みに失敗しました: {e}')
 
 proc: HorseDataProcessor = st.session_state['processor']
 
@@ -147,7 +156,11 @@ if 'df_raw' in st.session_state:
                 df_te, enc = proc.fit_target_encode(df_proc, cat_col='lineage_group', target_col='is_win')
                 st.session_state['df_te'] = df_te
                 st.session_state['encoder_lineage'] = enc
-                st.success('ターゲットエンコーディングを適用しました。')
+                try:
+                    proc.save_target_encoder(encoder_path)
+                except Exception as e:
+                    st.warning(f'ターゲットエンコーダの保存に失敗しました: {e}')
+                st.success('ターゲットエンコーディングを適用しました（学習行は out-of-fold 値）。')
                 st.dataframe(df_te[['lineage_group','lineage_group_te']].drop_duplicates().head(200))
 
     if 'df_te' in st.session_state:
@@ -177,37 +190,63 @@ if 'df_raw' in st.session_state:
                         else:
                             Xdf[c] = Xdf[c].fillna('その他')
 
-                try:
-                    model, feature_names = train_lgbm_model(Xdf, features=features, target='is_win')
-                except Exception as e:
-                    st.error('学習中にエラーが発生しました: ' + str(e))
+                fingerprint = horse_registry.data_fingerprint(Xdf, features, 'is_win')
+                version = horse_registry.find(fingerprint)
+                if version is not None:
+                    # 同じ学習データ・特徴量のモデルがあれば再学習しない
+                    reg = horse_registry.load(version)
+                    st.session_state['model'] = reg.booster
+                    st.session_state['model_version'] = version
+                    st.success(f'同じ学習データのモデル v{version} を読み込みました（再学習なし）')
+                    st.write('学習に使用した特徴量:', reg.features)
+                    st.pyplot(plot_feature_importance(reg.booster, reg.features))
                 else:
-                    st.session_state['model'] = model
-                    st.success('学習完了')
-                    st.write('学習に使用した特徴量:', feature_names)
-                    st.pyplot(plot_feature_importance(model, feature_names))
+                    try:
+                        model, feature_names = train_lgbm_model(Xdf, features=features, target='is_win')
+                    except Exception as e:
+                        st.error('学習中にエラーが発生しました: ' + str(e))
+                    else:
+                        st.session_state['model'] = model
+                        try:
+                            version = horse_registry.save(
+                                model, feature_names, fingerprint, target='is_win',
+                                encoder=proc.target_encoder,
+                                fills=horse_registry.fill_values(df_te, feature_names))
+                            st.session_state['model_version'] = version
+                            st.success(f'学習完了（モデル v{version} として登録）')
+                        except Exception as e:
+                            st.session_state.pop('model_version', None)
+                            st.success('学習完了')
+                            st.warning(f'モデルの登録に失敗しました: {e}')
+                        st.write('学習に使用した特徴量:', feature_names)
+                        st.pyplot(plot_feature_importance(model, feature_names))
 
     if 'model' in st.session_state and 'df_te' in st.session_state:
         model = st.session_state['model']
         df_te = st.session_state['df_te']
 
         if st.button('予測・買い目生成'): 
-            # 予測
-            features = [c for c in df_te.columns if c.endswith('_te') or c in [prev_rank_col, weight_col, 'track_numeric']]
-            Xpred = df_te[features].copy()
-            for c in Xpred.columns:
-                if Xpred[c].isnull().any():
-                    if Xpred[c].dtype.kind in 'biufc':
-                        Xpred[c] = Xpred[c].fillna(Xpred[c].median())
-                    else:
-                        Xpred[c] = Xpred[c].fillna('その他')
+            version = st.session_state.get('model_version')
+            if version is not None:
+                # 登録済みモデルは学習時の特徴量・欠損補完値でまとめて予測する
+                win_prob = horse_registry.load(version).predict(df_te)
+            else:
+                # 予測
+                features = [c for c in df_te.columns if c.endswith('_te') or c in [prev_rank_col, weight_col, 'track_numeric']]
+                Xpred = df_te[features].copy()
+                for c in Xpred.columns:
+                    if Xpred[c].isnull().any():
+                        if Xpred[c].dtype.kind in 'biufc':
+                            Xpred[c] = Xpred[c].fillna(Xpred[c].median())
+                        else:
+                            Xpred[c] = Xpred[c].fillna('その他')
 
-            # lightgbm の scikit-learn wrapper では predict_proba があるが、ここでは model.predict を利用
-            try:
-                win_prob = model.predict(Xpred)
-            except Exception:
-                # fallback: if train_lgbm returned native booster
-                win_prob = model.predict(Xpred)
+                # lightgbm の scikit-learn wrapper では predict_proba があるが、ここでは model.predict を利用
+                try:
+                    win_prob = model.predict(Xpred)
+                except Exception:
+                    # fallback: if train_lgbm returned native booster
+                    win_prob = model.predict(Xpred)
 
             df_te['win_prob'] = win_prob
 
@@ -220,3 +259,30 @@ if 'df_raw' in st.session_state:
 
 else:
     st.info('まずは左のサイドバーでカラム設定を確認し、CSVをアップロードしてください。')
+
+st.markdown('---')
+st.subheader('登録済みモデルで予測（再学習なし）')
+versions = horse_registry.list_versions()
+if not versions:
+    st.caption('登録済みモデルはまだありません。上で学習すると自動で登録されます。')
+else:
+    labels = {v['version']: f"v{v['version']}  ({v['created_at'][:19]}, 特徴量 {v['n_features']})" for v in reversed(versions)}
+    reg_version = st.selectbox('モデル', options=list(labels), format_func=labels.get)
+    race_card = st.file_uploader('出走表CSV（特徴量の元になる列とオッズ列）', type=['csv'], key='race_card')
+    if race_card is not None and st.button('登録済みモデルで予測・買い目生成'):
+        try:
+            reg = horse_registry.load(reg_version)
+            card = pd.read_csv(race_card)
+            if father_col in card.columns and track_col in card.columns:
+                card = proc.process_lineage_and_conditions(card, father_col=father_col, track_col=track_col)
+            card['win_prob'] = reg.predict(card)
+        except Exception as e:
+            st.error(f'予測に失敗しました: {e}')
+        else:
+            if odds_col not in card.columns:
+                st.dataframe(card)
+                st.warning(f'オッズカラム {odds_col} が無いため買い目は生成しません。')
+            else:
+                bets = generate_bet_strategy(card.assign(odds=card[odds_col]), win_prob_col='win_prob', odds_col='odds',
+                                             bankroll=bankroll, min_ev=min_ev)
+                st.dataframe(bets)
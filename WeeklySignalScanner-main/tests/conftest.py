@@ -0,0 +1,5 @@
+import sys
+from pathlib import Path
+
+# tests/ から兄弟モジュール（results_publisher など）を import できるようにする
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
@@ -0,0 +1,24 @@
+import incremental_scan
+
+
+def _snap(change_pct, volume_ratio=4.0, close=104.0, ma25=100.0):
+    return {'n_days': 60, 'prev_close': 100.0, 'close': close, 'change_pct': change_pct,
+            'volume_ratio': volume_ratio, 'ma25': ma25}
+
+
+def _params(**kw):
+    return dict(incremental_scan.SCANS['momentum']['defaults'], **kw)
+
+
+def test_momentum_thresholds_follow_params():
+    snap = _snap(4.0)
+    assert incremental_scan._eval_momentum('7203.T', snap, _params()) is None
+    row = incremental_scan._eval_momentum('7203.T', snap, _params(min_change_pct=3))
+    assert row['コード'] == '7203.T' and row['前日比(%)'] == 4.0
+
+    assert incremental_scan._eval_momentum('7203.T', _snap(6.0, volume_ratio=2.5), _params()) is None
+    assert incremental_scan._eval_momentum('7203.T', _snap(6.0, volume_ratio=2.5), _params(min_volume_ratio=2)) is not None
+
+    far = _snap(6.0, close=130.0)
+    assert incremental_scan._eval_momentum('7203.T', far, _params()) is None
+    assert incremental_scan._eval_momentum('7203.T', far, _params(max_ma25_deviation_pct=40)) is not None
@@ -0,0 +1,19 @@
+import numpy as np
+
+from horse_model import compute_kelly_stakes
+
+
+def test_missing_race_id_is_its_own_race():
+    p = [0.6, 0.6, 0.6, 0.6]
+    o = [3.0, 3.0, 3.0, 3.0]
+    out = compute_kelly_stakes(p, o, bankroll=1000.0, kelly_fraction=1.0, race_ids=['a', np.nan, 'a', None],
+                               max_race_frac=0.5)
+    # kelly = (2*0.6 - 0.4) / 2 = 0.4。レース 'a' は 2 頭で 0.8 -> 0.5 に按分、欠損の馬はそれぞれ単独
+    np.testing.assert_allclose(out['fraction'], [0.25, 0.4, 0.25, 0.4])
+    np.testing.assert_allclose(out['stake'], [250.0, 400.0, 250.0, 400.0])
+
+
+def test_all_race_ids_missing():
+    out = compute_kelly_stakes([0.6, 0.6], [3.0, 3.0], bankroll=1000.0, kelly_fraction=1.0,
+                               race_ids=[np.nan, np.nan], max_race_frac=0.5)
+    np.testing.assert_allclose(out['fraction'], [0.4, 0.4])
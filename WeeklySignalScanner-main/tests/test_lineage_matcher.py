@@ -0,0 +1,20 @@
+import pandas as pd
+
+from horse_model import LineageMatcher
+
+
+def test_longest_key_wins_by_default():
+    m = LineageMatcher({'サンデー': 'SS系A', 'サンデーサイレンス': 'SS系B'})
+    assert m.match('サンデーサイレンス') == 'SS系B'
+
+
+def test_priority_key_that_is_a_prefix_of_a_longer_key():
+    m = LineageMatcher({'サンデー': 'SS系A', 'サンデーサイレンス': 'SS系B'}, priority=['サンデー'])
+    assert m.match('サンデーサイレンス') == 'SS系A'
+    assert m.match('ディープ') == 'その他'
+
+
+def test_map_series_uses_priority_and_unknown():
+    m = LineageMatcher({'キング': 'KM系', 'キングカメハメハ': 'KK系'}, priority=['キング'])
+    out = m.map_series(pd.Series(['キングカメハメハ', None, 'ロードカナロア']))
+    assert out.tolist() == ['KM系', '不明', 'その他']
@@ -0,0 +1,130 @@
+import datetime
+import importlib.util
+import json
+import threading
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+import pytest
+
+BASE_DIR = Path(__file__).resolve().parents[1]
+FIXTURES = Path(__file__).resolve().parent / 'fixtures' / 'netkeiba'
+DATE = datetime.date(2024, 1, 6)
+
+
+def _load_scraper():
+    spec = importlib.util.spec_from_file_location('netkeiba_scraper', BASE_DIR / 'scripts' / 'netkeiba_scraper.py')
+    mod = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(mod)
+    return mod
+
+
+scraper = _load_scraper()
+
+
+def _fixture_for(path):
+    """URL パス -> fixtures のファイル名。"""
+    parts = path.strip('/').split('/')
+    if parts[0] == 'list':
+        return f'list_{parts[1]}.html'
+    if parts[:2] == ['race', 'result']:
+        return f'race_{parts[2]}.html'
+    if parts[0] == 'horse':
+        return f'horse_{parts[1]}.html'
+    return None
+
+
+class StubServer:
+    """fixtures の HTML を返すローカルサーバ。fail に入れたパスは 500 を返す。"""
+
+    def __init__(self):
+        self.hits = Counter()
+        self.fail = set()
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                stub.hits[self.path] += 1
+                name = _fixture_for(self.path)
+                if self.path in stub.fail or name is None or not (FIXTURES / name).exists():
+                    self.send_response(500 if self.path in stub.fail else 404)
+                    self.end_headers()
+                    return
+                body = (FIXTURES / name).read_bytes()
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/html; charset=utf-8')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.httpd = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.base = f'http://127.0.0.1:{self.httpd.server_address[1]}'
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+@pytest.fixture
+def server():
+    with StubServer() as s:
+        yield s
+
+
+def _scrape(server, out):
+    return scraper.scrape_dates(DATE, DATE, str(out), sleep=0, workers=4, list_url=server.base + '/list/{date}',
+                                race_base=server.base, horse_base=server.base, verbose=False)
+
+
+def _progress(out):
+    return json.loads((out.parent / (out.name + '.parts') / 'progress.json').read_text(encoding='utf-8'))
+
+
+def test_scrape_from_fixtures(server, tmp_path):
+    out = tmp_path / 'races.parquet'
+    df = _scrape(server, out)
+
+    assert len(df) == 4
+    a = df[df['horse_name'] == 'テストホースA'].iloc[0]
+    assert (a['father'], a['damsire']) == ('ディープインパクト', 'キングカメハメハ')
+    assert a['weight'] == 480 and a['weight_diff'] == 2
+    assert _progress(out)['done_dates'] == ['20240106']
+    # 同じ馬のページは 1 回だけ取得する
+    assert server.hits['/horse/2021100001'] == 1
+
+
+def test_resume_retries_only_failed_pages(server, tmp_path):
+    out = tmp_path / 'races.parquet'
+    server.fail = {'/race/result/202406010102', '/horse/2021100002'}
+    df = _scrape(server, out)
+
+    progress = _progress(out)
+    assert progress['done_dates'] == []
+    assert sorted(progress['failed']['20240106']) == sorted(
+        [server.base + '/race/result/202406010102', server.base + '/horse/2021100002'])
+    assert len(df) == 2 and df['father'].isna().sum() == 1
+
+    # 復旧後の再開では失敗したページだけを取り直し、日付が完了になる
+    server.fail = set()
+    before = server.hits.copy()
+    df = _scrape(server, out)
+    progress = _progress(out)
+    assert progress['done_dates'] == ['20240106'] and progress['failed'] == {}
+    assert progress['race_count'] == 2
+    assert len(df) == 4 and df['father'].notna().all()
+    fetched_again = {p for p in server.hits if server.hits[p] > before[p]}
+    assert fetched_again == {'/race/result/202406010102', '/horse/2021100002', '/horse/2021100003'}
+
+    # 完了した日付は次の実行で取りに行かない
+    before = server.hits.copy()
+    _scrape(server, out)
+    assert server.hits == before
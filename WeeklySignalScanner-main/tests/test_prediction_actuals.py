@@ -0,0 +1,60 @@
+import pandas as pd
+import pytest
+
+import prediction_actuals
+
+
+def _store(tmp_path, ticker, closes):
+    store = tmp_path / 'data'
+    store.mkdir(exist_ok=True)
+    idx = pd.DatetimeIndex(list(closes))
+    pd.DataFrame({'Close': list(closes.values())}, index=idx).to_parquet(store / f'{ticker}.parquet')
+    return str(store)
+
+
+def _preds(ticker, target):
+    return pd.DataFrame({'ticker': [ticker], 'target_date': [target]})
+
+
+def test_stale_store_is_not_settled_with_an_earlier_close(tmp_path, monkeypatch):
+    # ストアは 10/15 まで。10/16 の予想を 10/19 に解決しても 10/15 の終値で確定してはいけない
+    store = _store(tmp_path, '7203.T', {'2026-10-14': 9.0, '2026-10-15': 10.0})
+    calls = []
+
+    def fake_download(tickers, start, end):
+        calls.append((list(tickers), start, end))
+        return {}
+    monkeypatch.setattr(prediction_actuals, '_download_closes', fake_download)
+    pred_dir = tmp_path / 'pred'
+    out = prediction_actuals.resolve_actuals(_preds('7203.T', '2026-10-16'), pred_dir=pred_dir,
+                                             stores=[store], today='2026-10-19')
+
+    assert out.isna().all()
+    assert calls and calls[0][0] == ['7203.T']
+    assert prediction_actuals.read_settled(pred_dir).empty
+
+
+def test_stale_store_falls_back_to_download(tmp_path, monkeypatch):
+    store = _store(tmp_path, '7203.T', {'2026-10-15': 10.0})
+    downloaded = pd.Series([10.0, 12.5, 13.0], index=pd.DatetimeIndex(['2026-10-15', '2026-10-16', '2026-10-19']))
+    monkeypatch.setattr(prediction_actuals, '_download_closes', lambda tickers, start, end: {'7203.T': downloaded})
+    pred_dir = tmp_path / 'pred'
+    out = prediction_actuals.resolve_actuals(_preds('7203.T', '2026-10-16'), pred_dir=pred_dir,
+                                             stores=[store], today='2026-10-19')
+
+    assert out.iloc[0] == 12.5
+    row = prediction_actuals.read_settled(pred_dir).iloc[0]
+    assert (row['actual_price'], row['actual_date'], row['source']) == (12.5, '2026-10-16', 'download')
+
+
+def test_holiday_uses_previous_close_once_store_covers_target(tmp_path, monkeypatch):
+    # 10/12 は休場。ストアに予測日より後（10/13）の足があるので、前日 10/11 の終値で確定してよい
+    store = _store(tmp_path, '6758.T', {'2026-10-09': 20.0, '2026-10-11': 21.0, '2026-10-13': 22.0})
+    monkeypatch.setattr(prediction_actuals, '_download_closes', lambda *a: pytest.fail('should not download'))
+    pred_dir = tmp_path / 'pred'
+    out = prediction_actuals.resolve_actuals(_preds('6758.T', '2026-10-12'), pred_dir=pred_dir,
+                                             stores=[store], today='2026-10-19')
+
+    assert out.iloc[0] == 21.0
+    row = prediction_actuals.read_settled(pred_dir).iloc[0]
+    assert (row['actual_date'], row['source']) == ('2026-10-11', 'store')
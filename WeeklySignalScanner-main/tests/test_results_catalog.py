@@ -0,0 +1,75 @@
+import os
+
+import pandas as pd
+import pytest
+
+import results_catalog
+import signal_history
+
+
+@pytest.fixture(autouse=True)
+def signal_db(tmp_path, monkeypatch):
+    # シグナル履歴は一時ディレクトリに書く（outputs/signals を触らない）
+    monkeypatch.setattr(signal_history, 'DB_PATH', tmp_path / 'signals.sqlite')
+
+
+def _overwrite(path, df):
+    # 同じ秒内の上書きでも mtime が進むようにする
+    df.to_csv(path, index=False)
+    st = os.stat(path)
+    os.utime(path, (st.st_atime, st.st_mtime + 2))
+
+
+def test_in_place_overwrite_is_picked_up(tmp_path):
+    path = tmp_path / '全銘柄_MA52_陽線包み_価格付き_2026-10-16.csv'
+    pd.DataFrame({'ticker': ['7203.T'], 'current_price': [10.0]}).to_csv(path, index=False)
+    results_catalog.register(path, 'with_prices', params={'source': 'a.csv'}, as_of='2026-10-16')
+
+    _overwrite(path, pd.DataFrame({'ticker': ['7203.T', '6758.T'], 'current_price': [11.0, 12.0]}))
+
+    # sync 前でも load は CSV より古い parquet を使わない
+    assert results_catalog.load(results_catalog.get(path.name, tmp_path), tmp_path)['ticker'].tolist() == ['7203.T', '6758.T']
+
+    changed, gone = results_catalog.sync(tmp_path)
+    assert (changed, gone) == (1, 0)
+    entry = results_catalog.get(path.name, tmp_path)
+    assert entry['row_count'] == 2
+    assert entry['scan_type'] == 'with_prices' and entry['params'] == {'source': 'a.csv'}
+    assert entry['as_of'] == '2026-10-16'
+    assert pd.read_parquet(entry['data_path'])['current_price'].tolist() == [11.0, 12.0]
+
+    # 変更が無ければ読み直さない
+    assert results_catalog.sync(tmp_path) == (0, 0)
+
+
+def test_sync_adds_and_removes_unregistered_files(tmp_path):
+    path = tmp_path / '短期_初動_20261019_010203.csv'
+    pd.DataFrame({'ticker': ['9984.T']}).to_csv(path, index=False)
+    assert results_catalog.sync(tmp_path) == (1, 0)
+    assert results_catalog.get(path.name, tmp_path)['scan_type'] == 'momentum'
+    path.unlink()
+    assert results_catalog.sync(tmp_path) == (0, 1)
+    assert results_catalog.get(path.name, tmp_path) is None
+
+
+def test_remove_forgets_signal_history(tmp_path):
+    path = tmp_path / '全銘柄_MA52_陽線包み_2026-10-16_20261016180000.csv'
+    pd.DataFrame({'ticker': ['7203.T', '6758.T'], 'price': [10.0, 12.0]}).to_csv(path, index=False)
+    results_catalog.register(path, 'weekly_ma52_engulfing', params={'require_ma52': True}, as_of='2026-10-16')
+    assert len(signal_history.hits(scan_type='weekly_ma52_engulfing')) == 2
+
+    results_catalog.remove([path.name], results_dir=tmp_path)
+    assert not path.exists()
+    assert len(signal_history.hits(scan_type='weekly_ma52_engulfing')) == 0
+    assert len(signal_history.runs(scan_type='weekly_ma52_engulfing')) == 0
+
+
+def test_load_uses_parquet_after_save_result(tmp_path, monkeypatch):
+    df = pd.DataFrame({'ticker': ['7203.T', '6758.T'], 'price': [10.0, 12.0]})
+    entry = results_catalog.save_result(df, 'momentum', name='短期_初動_20261019_010203.csv', results_dir=tmp_path)
+    assert os.path.getmtime(entry['data_path']) >= os.path.getmtime(entry['csv_path'])
+
+    def no_csv(path, *args, **kwargs):
+        raise AssertionError(f'CSV read: {path}')
+    monkeypatch.setattr(results_catalog, 'read_csv', no_csv)
+    assert results_catalog.load(entry, tmp_path)['price'].tolist() == [10.0, 12.0]
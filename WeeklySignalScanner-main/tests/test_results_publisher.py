@@ -0,0 +1,79 @@
+import subprocess
+
+import pytest
+
+from results_publisher import Publisher
+
+
+def _git(cwd, *args):
+    return subprocess.run(['git', '-C', str(cwd), '-c', 'user.name=t', '-c', 'user.email=t@example.com'] + list(args),
+                          capture_output=True, text=True, check=True).stdout.strip()
+
+
+@pytest.fixture
+def repo(tmp_path, monkeypatch):
+    monkeypatch.delenv('GITHUB_TOKEN', raising=False)
+    remote = tmp_path / 'remote.git'
+    work = tmp_path / 'work'
+    subprocess.run(['git', 'init', '-q', '--bare', str(remote)], check=True)
+    subprocess.run(['git', 'init', '-q', '-b', 'main', str(work)], check=True)
+    (work / 'README').write_text('x\n')
+    _git(work, 'add', 'README')
+    _git(work, 'commit', '-q', '-m', 'init')
+    _git(work, 'remote', 'add', 'origin', str(remote))
+    _git(work, 'push', '-q', 'origin', 'HEAD:main')
+    publisher = Publisher(repo_root=work, publish_dir=tmp_path / 'publish', branch='main')
+    return publisher, work, remote
+
+
+def _remote_log(remote):
+    return subprocess.run(['git', '--git-dir', str(remote), 'log', '--format=%s', 'main'],
+                          capture_output=True, text=True, check=True).stdout.splitlines()
+
+
+def test_publish_success_clears_queue(repo):
+    publisher, work, remote = repo
+    (work / 'a.csv').write_text('ticker\n7203.T\n')
+    publisher.enqueue([work / 'a.csv'], 'add a')
+    publisher.run(interval=0, poll=0)
+
+    assert publisher.pending() == []
+    status = publisher.read_status()
+    assert status['last_result']['committed'] and status['last_result']['pushed']
+    assert _remote_log(remote)[0].startswith('add a')
+
+
+def test_push_failure_keeps_entries_and_retry_pushes(repo):
+    publisher, work, remote = repo
+    _git(work, 'remote', 'set-url', 'origin', str(work.parent / 'missing.git'))
+    (work / 'b.csv').write_text('ticker\n6758.T\n')
+    publisher.enqueue([work / 'b.csv'], 'add b')
+    publisher.run(interval=0, poll=0)
+
+    # コミットはできたが push に失敗したので、エントリは残る
+    pending = publisher.pending()
+    assert len(pending) == 1
+    assert pending[0]['attempts'] == 1 and 'push failed' in pending[0]['last_error']
+    assert publisher.read_status()['state'] == 'failed'
+    assert _git(work, 'log', '-1', '--format=%s').startswith('add b')
+    assert not _remote_log(remote)[0].startswith('add b')
+
+    # リモートが直れば、次の run で残っていたコミットが push されキューが空になる
+    _git(work, 'remote', 'set-url', 'origin', str(remote))
+    publisher.run(interval=0, poll=0)
+    assert publisher.pending() == []
+    assert publisher.read_status()['last_result']['pushed']
+    assert _remote_log(remote)[0].startswith('add b')
+
+
+def test_commit_failure_keeps_entries(repo, monkeypatch):
+    publisher, work, remote = repo
+    (work / 'c.csv').write_text('ticker\n9984.T\n')
+    publisher.enqueue([work / 'c.csv'], 'add c')
+
+    def boom(entries):
+        raise RuntimeError('disk full')
+    monkeypatch.setattr(publisher, 'publish', boom)
+    publisher.run(interval=0, poll=0)
+    assert len(publisher.pending()) == 1
+    assert publisher.pending()[0]['last_error'] == 'disk full'
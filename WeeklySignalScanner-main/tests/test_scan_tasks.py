@@ -0,0 +1,39 @@
+import numpy as np
+import pandas as pd
+
+import scan_tasks
+
+
+def _cache(tmp_path, ticker):
+    # 下落のあと上昇に転じる 3 年分の日足（月足 MA9 が MA24 を上抜ける）
+    idx = pd.bdate_range('2023-10-02', '2026-09-30')
+    n = len(idx)
+    turn = n * 2 // 3
+    close = np.concatenate([np.linspace(200.0, 100.0, turn), np.linspace(100.0, 220.0, n - turn)])
+    df = pd.DataFrame({'Open': close, 'High': close, 'Low': close, 'Close': close, 'Volume': 1000.0}, index=idx)
+    data_dir = tmp_path / 'data'
+    data_dir.mkdir()
+    df.to_parquet(data_dir / f'{ticker}.parquet')
+    return data_dir
+
+
+def test_monthly_gc_scan_without_state_snapshot_reads_cache(tmp_path, monkeypatch):
+    import indicator_state
+    import yfinance
+
+    data_dir = _cache(tmp_path, '7203.T')
+    monkeypatch.setattr(indicator_state, 'snapshots', lambda tickers, data_dir=None: {})
+
+    def no_network(ticker):
+        raise AssertionError(f'unexpected download: {ticker}')
+    monkeypatch.setattr(yfinance, 'Ticker', no_network)
+    monkeypatch.setattr(scan_tasks, '_register_result', lambda *a, **k: None)
+    monkeypatch.setattr(scan_tasks, '_note_results', lambda *a, **k: None)
+
+    out = scan_tasks.monthly_gc_scan({'data_dir': str(data_dir), 'results_dir': str(tmp_path / 'results'),
+                                      'cache_only': True, 'auto_commit': False})
+
+    assert out['errors'] == 0
+    assert out['found'] == 1
+    saved = pd.read_csv(out['saved_paths'][0])
+    assert saved['ticker'].tolist() == ['7203.T']
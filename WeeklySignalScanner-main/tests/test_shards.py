@@ -0,0 +1,98 @@
+import csv
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import shards
+
+CODES = range(7001, 7019)
+
+
+def _bars(seed, engulf):
+    """約 2 年分の日足。engulf=True なら最後の 2 週を陰線 → 陽線包み足にする（MA52 より上）。"""
+    rng = np.random.default_rng(seed)
+    idx = pd.bdate_range(end='2026-10-16', periods=520)
+    close = 100 * np.exp(np.cumsum(rng.normal(0.001, 0.02, len(idx))))
+    open_ = close * (1 + rng.normal(0, 0.005, len(idx)))
+    df = pd.DataFrame({'Open': open_, 'Close': close}, index=idx)
+    if engulf:
+        base = df['Close'].iloc[:-10].max() * 1.2
+        prev = np.linspace(base * 1.05, base, 5)     # 陰線の週: 寄り 1.05 → 引け 1.00
+        curr = np.linspace(base * 0.99, base * 1.1, 5)  # 陽線の週: 寄り 0.99 → 引け 1.10
+        df.iloc[-10:-5, :] = np.c_[prev, prev]
+        df.iloc[-5:, :] = np.c_[curr, curr]
+    df['High'] = df[['Open', 'Close']].max(axis=1) * 1.001
+    df['Low'] = df[['Open', 'Close']].min(axis=1) * 0.999
+    df['Volume'] = 1000.0
+    return df[['Open', 'High', 'Low', 'Close', 'Volume']]
+
+
+@pytest.fixture
+def cache(tmp_path):
+    d = tmp_path / 'data'
+    d.mkdir()
+    for i, c in enumerate(CODES):
+        _bars(i, engulf=(i % 3 == 0)).to_parquet(d / f'{c}.T.parquet')
+    return d
+
+
+def _merged(results_dir):
+    files = sorted(results_dir.glob('*.csv'))
+    assert len(files) == 1
+    with open(files[0], newline='', encoding='utf-8') as f:
+        return [(r['ticker'], r['price']) for r in csv.DictReader(f)]
+
+
+def _expected(cache):
+    import screening
+    from screener import scan_stocks_with_cache
+    skip = screening.excluded_tickers()
+    tickers = [f'{c}.T' for c in CODES if f'{c}.T' not in skip]
+    hits = scan_stocks_with_cache(tickers, cache_dir=str(cache), use_state=False)
+    rows = [(t, float(pd.read_parquet(cache / f'{t}.parquet')['Close'].iloc[-1])) for t in hits]
+    return [(t, f'{p:.2f}') for t, p in sorted(rows, key=lambda r: (r[1], r[0]))]
+
+
+def _local(tmp_path, cache, n, results):
+    return shards.main(['local', '--shards', str(n), '--start', str(CODES[0]), '--end', str(CODES[-1]),
+                        '--no-fetch', '--cache-dir', str(cache), '--root', str(tmp_path / 'shards'),
+                        '--results-dir', str(results), '--no-register'])
+
+
+def test_local_processes_merge_to_single_process_result(tmp_path, cache):
+    expected = _expected(cache)
+    assert len(expected) >= 3
+
+    assert _local(tmp_path, cache, 3, tmp_path / 'res3') == 0
+    assert _merged(tmp_path / 'res3') == expected
+
+    # 前の回のシャード（3 分割）が残っていても、別の分割数でやり直せる
+    assert _local(tmp_path, cache, 2, tmp_path / 'res2') == 0
+    assert _merged(tmp_path / 'res2') == expected
+    assert len(shards.list_runs(tmp_path / 'shards')) == 2
+    assert len(shards.load_manifests(tmp_path / 'shards')) == 2
+
+
+def test_merge_reports_gaps_and_keeps_longer_history(tmp_path, cache):
+    root = tmp_path / 'shards'
+    first, last = CODES[0], CODES[-1]
+    for s, e in [(first, 7008), (7010, last)]:
+        sdata = shards.shard_dir(s, e, root, 'r1') / 'data'
+        sdata.mkdir(parents=True)
+        for c in range(s, e + 1):
+            # シャード側は直近 60 本だけ（短い期間で取得した想定）
+            pd.read_parquet(cache / f'{c}.T.parquet').tail(60).to_parquet(sdata / f'{c}.T.parquet')
+        shards.run_shard(s, e, root=root, fetch=False, scan=False, run_id='r1')
+
+    with pytest.raises(ValueError, match='missing ranges: 7009-7009'):
+        shards.merge(root, first, last, data_dir=tmp_path / 'merged', register=False, run_id='r1')
+
+    data_dir = tmp_path / 'merged'
+    data_dir.mkdir()
+    long = pd.read_parquet(cache / '7001.T.parquet')
+    long.iloc[:-5].to_parquet(data_dir / '7001.T.parquet')
+    shards.merge(root, first, last, data_dir=data_dir, register=False, allow_gaps=True, run_id='r1')
+    merged = pd.read_parquet(data_dir / '7001.T.parquet')
+    assert len(merged) == len(long)
+    assert merged['Close'].tolist() == pytest.approx(long['Close'].tolist())
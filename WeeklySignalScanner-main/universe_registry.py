@@ -0,0 +1,394 @@
+"""
+銘柄ユニバースのレジストリ（sp500 / nasdaq100 / comprehensive / jp_all）
+
+スキャナが毎回 Wikipedia を読んだりハードコードのリストを組み立てたりしないよう、
+名前付きユニバースを universes/<name>.json に保存して使い回す。
+
+- load(name) はネットワークに出ない。ファイルの mtime が変わらない限りメモリ上のタプルを返す
+- refresh(name) は登録済みの取得元（SOURCES）から作り直し、銘柄集合が変わったときだけ version を上げる
+- 取得の成否を record_fetch_outcomes() に渡すと、連続して取得できない銘柄を上場廃止扱いにする
+  （universes/delisted.json、load の結果から除外される）
+
+使い方:
+    python universe_registry.py list
+    python universe_registry.py refresh sp500
+    python universe_registry.py show comprehensive
+    python universe_registry.py delist TWTR SIVB / restore TWTR
+"""
+import argparse
+import datetime
+import json
+import os
+import sys
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parent
+UNIVERSE_DIR = Path(os.environ.get('UNIVERSE_DIR', str(BASE_DIR / 'universes')))
+DELISTED_NAME = 'delisted.json'
+# この回数連続で取得できなかった銘柄を上場廃止扱いにする
+DELIST_AFTER = 3
+HISTORY_LIMIT = 20
+
+# 既知の上場廃止・買収済み銘柄（旧ハードコードリストに残っていたもの）
+KNOWN_DELISTED = ['TWTR', 'SIVB', 'FRC', 'BBBY']
+
+
+_NASDAQ100 = [
+    "AAPL", "MSFT", "GOOGL", "GOOG", "AMZN", "NVDA", "META", "TSLA", "AVGO", "COST",
+    "ASML", "PEP", "AZN", "CSCO", "ADBE", "TMUS", "CMCSA", "NFLX", "AMD", "INTC",
+    "INTU", "TXN", "QCOM", "HON", "AMGN", "AMAT", "ISRG", "BKNG", "SBUX", "GILD",
+    "ADI", "VRTX", "ADP", "REGN", "MDLZ", "LRCX", "PANW", "PYPL", "MU", "SNPS",
+    "KLAC", "MELI", "CDNS", "MAR", "CTAS", "NXPI", "ORLY", "CRWD", "MNST", "ADSK",
+    "ABNB", "CSX", "WDAY", "FTNT", "MRVL", "DASH", "TEAM", "DXCM", "AEP", "PCAR",
+    "ODFL", "KDP", "CPRT", "CHTR", "PAYX", "ROST", "MCHP", "FAST", "TTD", "EA",
+    "CTSH", "KHC", "IDXX", "ON", "VRSK", "LULU", "EXC", "CCEP", "DDOG", "ANSS",
+    "XEL", "CSGP", "CDW", "BIIB", "WBD", "ZS", "GEHC", "MDB", "TTWO", "ILMN",
+    "GFS", "FANG", "WBA", "MRNA", "SMCI", "ARM",
+]
+
+_COMPREHENSIVE_EXTRA = [
+    "AAPL", "MSFT", "GOOGL", "GOOG", "AMZN", "NVDA", "META", "TSLA", "BRK-B", "LLY",
+    "V", "UNH", "XOM", "JPM", "JNJ", "AVGO", "WMT", "MA", "PG", "HD",
+    "ORCL", "COST", "NFLX", "CRM", "BAC", "ABBV", "CVX", "MRK", "KO", "PEP",
+    "TMO", "CSCO", "AMD", "ACN", "LIN", "MCD", "WFC", "ABT", "ADBE", "DHR",
+    "NKE", "TXN", "DIS", "INTU", "VZ", "PM", "IBM", "AMGN", "GE", "QCOM",
+    "BKNG", "ISRG", "AXP", "HON", "CAT", "NOW", "SPGI", "T", "GS", "MS",
+    "UNP", "DE", "BA", "RTX", "PLD", "VRTX", "BLK", "SYK", "GILD", "LRCX",
+    "MMM", "ADI", "TJX", "MDLZ", "REGN", "C", "SBUX", "PYPL", "AMT", "TMUS",
+    "AMAT", "INTC", "LOW", "PFE", "CB", "SO", "SCHW", "BMY", "ELV", "CI",
+    "USB", "PNC", "TFC", "BK", "COF", "AIG", "MET", "PRU", "ALL", "AMP",
+    "FITB", "RF", "KEY", "CFG", "HBAN", "CMA", "ZION", "MTB", "SIVB", "CBSH",
+    "FRC", "WAL", "WTFC", "ONB", "UBSI", "FFIN", "FNB", "SNV", "UMBF", "PB",
+    "ALLY", "SYF", "DFS", "SOFI", "LC", "UPST", "AFRM", "SLB", "HAL", "OXY",
+    "MPC", "VLO", "PSX", "COP", "EOG", "PXD", "DVN", "FANG", "MRO", "APA",
+    "HES", "OVV", "CTRA", "NOG", "PR", "MGY", "SM", "AR", "MTDR", "CLR",
+    "RRC", "SWN", "CNX", "CHK", "RIG", "VAL", "HP", "DO", "NE", "PTEN",
+    "LBRT", "NINE", "NBR", "WHD", "WTTR", "TDW", "PUMP", "TGT", "EBAY", "ETSY",
+    "W", "CHWY", "RVLV", "FTCH", "REAL", "GRPN", "KSS", "M", "JWN", "BBBY",
+    "DKS", "FIVE", "DLTR", "DG", "BURL", "ROST", "GPS", "ANF", "AEO", "URBN",
+    "EXPR", "ZUMZ", "GES", "PLCE", "CATO", "SNAP", "PINS", "TWTR", "SPOT", "HOOD",
+    "RBLX", "U", "DDOG", "SNOW", "NET", "ZS", "CRWD", "OKTA", "MDB", "TEAM",
+    "TWLO", "ZM", "DOCU", "SPLK", "WDAY", "PANW", "FTNT", "CYBR", "TENB", "S",
+    "RPD", "BILL", "SMAR", "AI", "GTLB", "MNDY", "IOT", "FROG", "PATH", "APPN",
+    "ESTC", "COUP", "RNG", "NCNO", "DT", "F", "GM", "STLA", "RIVN", "LCID",
+    "NKLA", "FSR", "GOEV", "RIDE", "WKHS", "NIO", "XPEV", "LI", "BYDDY", "HYMTF",
+    "PTRA", "BLNK", "CHPT", "EVGo", "AAL", "UAL", "DAL", "LUV", "ALK", "JBLU",
+    "SAVE", "HA", "MESA", "SKYW", "UPS", "FDX", "XPO", "JBHT", "KNX", "ODFL",
+    "SAIA", "ARCB", "CVLG", "WERN", "MRNA", "BNTX", "ALNY", "BMRN", "IONS", "RGEN",
+    "TECH", "SRPT", "RARE", "FOLD", "BLUE", "CRSP", "EDIT", "NTLA", "BEAM", "VERV",
+    "ARCT", "MRVI", "AGEN", "DVAX", "NVAX", "INO", "OCGN", "VXRT", "SAVA", "ABUS",
+    "ADMA", "ATNF", "CTIC", "TLRY", "CGC", "SNDL", "ACB", "CRON", "OGI", "HEXO",
+    "CURLF", "GTBIF", "TCNNF", "CRLBF", "TRSSF", "VRNOF", "AYRWF", "GRAMF", "JUSHF", "PLNHF",
+    "HRVSF", "CCHWF", "PLUG", "FCEL", "BE", "BLDP", "RUN", "ENPH", "SEDG", "NOVA",
+    "CSIQ", "JKS", "SPWR", "MAXN", "ARRAY", "VSLR", "NEE", "AES", "DUK", "D",
+    "EXC", "NOK", "ERIC", "LUMN", "CABO", "SHEN", "ATUS", "SATS", "GOGO", "VSAT",
+    "GILT", "IRDM", "ORBC", "CMCSA", "CHTR", "DISH", "LITE", "GOLD", "NEM", "FCX",
+    "AA", "X", "CLF", "STLD", "NUE", "MT", "VALE", "RIO", "BHP", "SCCO",
+    "TECK", "HBM", "CDE", "HL", "AUY", "EGO", "IAG", "KGC", "BTG", "AGI",
+    "PAAS", "WPM", "FNV", "RGLD", "OR", "SAND", "MAG", "CCI", "EQIX", "PSA",
+    "SPG", "O", "WELL", "DLR", "AVB", "EQR", "VTR", "ARE", "INVH", "MAA",
+    "ESS", "UDR", "CPT", "KIM", "REG", "PARA", "WBD", "FOXA", "LYV", "MSG",
+    "MSGS", "IMAX", "CNK", "AMC", "CINE", "RGC", "MARK", "NRDY", "GNUS", "EMAN",
+    "FUNFF", "YVR", "GME", "KOSS", "BB", "NAKD", "CTRM", "SHIP", "TOPS", "GLBS",
+    "VEON", "ATOS", "ZSAN", "JAGX", "IDEX", "XELA", "WTRH", "MRIN", "CARV", "BKSY",
+    "MRVL", "SQ", "SHOP",
+]
+
+
+# --- 取得元 ---
+SOURCES = {}
+
+
+def register_source(name):
+    """ユニバースの取得元を登録するデコレータ。関数は銘柄リストを返す。"""
+    def deco(fn):
+        SOURCES[name] = fn
+        return fn
+    return deco
+
+
+@register_source('sp500')
+def _source_sp500():
+    import pandas as pd
+    url = 'https://en.wikipedia.org/wiki/List_of_S%26P_500_companies'
+    tables = pd.read_html(url)
+    return [str(t).replace('.', '-') for t in tables[0]['Symbol'].tolist()]
+
+
+@register_source('nasdaq100')
+def _source_nasdaq100():
+    return list(_NASDAQ100)
+
+
+@register_source('comprehensive')
+def _source_comprehensive():
+    # S&P 500 は保存済みのものを使う（無ければ取得を試みる）
+    try:
+        sp500 = list(load('sp500'))
+    except Exception:
+        sp500 = []
+    return sp500 + list(_NASDAQ100) + list(_COMPREHENSIVE_EXTRA)
+
+
+@register_source('jp_all')
+def _source_jp_all(start=1000, end=9999):
+    excluded = set()
+    try:
+        import data_fetcher
+        excluded |= set(data_fetcher.EXCLUDED_TICKERS)
+    except Exception:
+        pass
+    try:
+        import config
+        excluded |= set(config.EXCLUDE_TICKERS)
+    except Exception:
+        pass
+    return [f"{code:04d}.T" for code in range(start, end + 1) if f"{code:04d}.T" not in excluded]
+
+
+# --- 保存/読み込み ---
+_cache = {}
+
+
+def _now():
+    return datetime.datetime.now(datetime.timezone.utc).isoformat()
+
+
+def _path(name, root=None):
+    return Path(root or UNIVERSE_DIR) / f"{name}.json"
+
+
+def _read_json(path, default=None):
+    try:
+        with open(path, 'r', encoding='utf-8') as fh:
+            return json.load(fh)
+    except Exception:
+        return default
+
+
+def _write_json(path, data):
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    with open(tmp, 'w', encoding='utf-8') as fh:
+        json.dump(data, fh, ensure_ascii=False, indent=1)
+    os.replace(tmp, path)
+
+
+def _mtime_ns(path):
+    try:
+        return os.stat(path).st_mtime_ns
+    except OSError:
+        return None
+
+
+def _dedupe(tickers):
+    out = []
+    for t in tickers:
+        t = str(t).strip().upper()
+        if t:
+            out.append(t)
+    return list(dict.fromkeys(out))
+
+
+def read_universe(name, root=None):
+    """ユニバースファイルの中身（version, updated_at, source, tickers, history）を返す。無ければ None。"""
+    return _read_json(_path(name, root))
+
+
+def read_delisted(root=None):
+    """{ticker: {failures, last_failed_at, delisted_at, reason}} を返す。"""
+    data = _read_json(Path(root or UNIVERSE_DIR) / DELISTED_NAME, default=None)
+    if data is None:
+        data = {t: {'failures': 0, 'delisted_at': None, 'reason': 'known'} for t in KNOWN_DELISTED}
+    return data
+
+
+def delisted_set(root=None):
+    return {t for t, info in read_delisted(root).items() if info.get('reason') or info.get('delisted_at')}
+
+
+def load(name, include_delisted=False, root=None, refresh_if_missing=True):
+    """
+    ユニバースの銘柄タプルを返す（ネットワークに出ない）。
+
+    ファイルとdelisted.json の mtime が前回と同じならメモリ上の結果をそのまま返す。
+    ファイルが無い場合だけ refresh_if_missing に従って取得元から作成する。
+    """
+    root = Path(root or UNIVERSE_DIR)
+    upath = _path(name, root)
+    dpath = root / DELISTED_NAME
+    key = (str(root), name, include_delisted)
+    token = (_mtime_ns(upath), _mtime_ns(dpath))
+    hit = _cache.get(key)
+    if hit is not None and hit[0] == token and token[0] is not None:
+        return hit[1]
+
+    data = read_universe(name, root)
+    if data is None:
+        if not refresh_if_missing:
+            return ()
+        refresh(name, root=root)
+        data = read_universe(name, root) or {}
+        token = (_mtime_ns(upath), _mtime_ns(dpath))
+    tickers = data.get('tickers') or []
+    if not include_delisted:
+        gone = delisted_set(root)
+        tickers = [t for t in tickers if t not in gone]
+    result = tuple(tickers)
+    _cache[key] = (token, result)
+    return result
+
+
+def refresh(name, source=None, root=None, **kwargs):
+    """
+    取得元から作り直して保存する。銘柄集合が変わったときだけ version を上げ、差分を history に残す。
+
+    source: SOURCES のキーまたは銘柄リストを返す callable（省略時は name と同じ取得元）
+    Returns:
+        保存後のユニバース dict
+    """
+    fn = source if callable(source) else SOURCES.get(source or name)
+    if fn is None:
+        raise KeyError(f"unknown universe source: {source or name}")
+    tickers = _dedupe(fn(**kwargs))
+    if not tickers:
+        raise ValueError(f"universe source returned no tickers: {source or name}")
+
+    path = _path(name, root)
+    current = read_universe(name, root) or {'name': name, 'version': 0, 'tickers': [], 'history': []}
+    old = set(current.get('tickers') or [])
+    new = set(tickers)
+    now = _now()
+    current['refreshed_at'] = now
+    current['source'] = getattr(fn, '__name__', str(source or name))
+    if new != old or not path.exists():
+        current['version'] = int(current.get('version') or 0) + 1
+        current['updated_at'] = now
+        current['tickers'] = tickers
+        history = list(current.get('history') or [])
+        history.append({
+            'version': current['version'],
+            'updated_at': now,
+            'added': sorted(new - old),
+            'removed': sorted(old - new),
+        })
+        current['history'] = history[-HISTORY_LIMIT:]
+    _write_json(path, current)
+    return current
+
+
+def record_fetch_outcomes(succeeded, failed, root=None, delist_after=DELIST_AFTER):
+    """
+    取得結果を反映する。failed の銘柄は連続失敗回数を数え、delist_after 回で上場廃止扱いにする。
+    succeeded の銘柄はカウントをリセットする（自動で付けた廃止マークも外す）。
+
+    ネットワーク障害を廃止と取り違えないよう、成功が 1 件も無い呼び出しは記録しない。
+    Returns:
+        新たに上場廃止扱いにした銘柄のリスト
+    """
+    succeeded = set(succeeded or [])
+    failed = set(failed or []) - succeeded
+    if not succeeded:
+        return []
+    root = Path(root or UNIVERSE_DIR)
+    data = read_delisted(root)
+    changed = False
+    newly = []
+    now = _now()
+    for t in succeeded:
+        info = data.get(t)
+        if info is not None and info.get('reason') in (None, 'fetch_failed'):
+            data.pop(t)
+            changed = True
+    for t in failed:
+        info = data.setdefault(t, {'failures': 0, 'delisted_at': None, 'reason': None})
+        info['failures'] = int(info.get('failures') or 0) + 1
+        info['last_failed_at'] = now
+        if not info.get('delisted_at') and info['failures'] >= delist_after:
+            info['delisted_at'] = now
+            info['reason'] = 'fetch_failed'
+            newly.append(t)
+        changed = True
+    if changed:
+        _write_json(root / DELISTED_NAME, data)
+    return sorted(newly)
+
+
+def mark_delisted(tickers, reason='manual', root=None):
+    root = Path(root or UNIVERSE_DIR)
+    data = read_delisted(root)
+    for t in _dedupe(tickers):
+        info = data.setdefault(t, {'failures': 0})
+        info['delisted_at'] = info.get('delisted_at') or _now()
+        info['reason'] = reason
+    _write_json(root / DELISTED_NAME, data)
+
+
+def restore(tickers, root=None):
+    root = Path(root or UNIVERSE_DIR)
+    data = read_delisted(root)
+    for t in _dedupe(tickers):
+        data.pop(t, None)
+    _write_json(root / DELISTED_NAME, data)
+
+
+def list_universes(root=None):
+    root = Path(root or UNIVERSE_DIR)
+    names = sorted(set(SOURCES) | {p.stem for p in root.glob('*.json') if p.name != DELISTED_NAME})
+    out = []
+    for name in names:
+        data = read_universe(name, root) or {}
+        out.append({
+            'name': name,
+            'version': data.get('version'),
+            'count': len(data.get('tickers') or []),
+            'updated_at': data.get('updated_at'),
+            'refreshed_at': data.get('refreshed_at'),
+        })
+    return out
+
+
+def parse_args():
+    p = argparse.ArgumentParser(description='Named ticker universe registry')
+    p.add_argument('--root', type=str, default=None, help='Registry directory (default: universes/)')
+    sub = p.add_subparsers(dest='cmd', required=True)
+    sub.add_parser('list')
+    s = sub.add_parser('show')
+    s.add_argument('name')
+    s.add_argument('--all', action='store_true', help='Include delisted tickers')
+    r = sub.add_parser('refresh')
+    r.add_argument('names', nargs='+')
+    r.add_argument('--source', type=str, default=None)
+    d = sub.add_parser('delist')
+    d.add_argument('tickers', nargs='+')
+    d = sub.add_parser('restore')
+    d.add_argument('tickers', nargs='+')
+    return p.parse_args()
+
+
+def main():
+    args = parse_args()
+    if args.cmd == 'list':
+        for u in list_universes(args.root):
+            print(f"{u['name']:<16} v{u['version'] or '-':<4} {u['count']:>6} tickers  updated {u['updated_at'] or '-'}")
+        print(f"delisted: {len(delisted_set(args.root))}")
+    elif args.cmd == 'show':
+        tickers = load(args.name, include_delisted=args.all, root=args.root, refresh_if_missing=False)
+        print('\n'.join(tickers))
+    elif args.cmd == 'refresh':
+        for name in args.names:
+            try:
+                u = refresh(name, source=args.source, root=args.root)
+                last = (u.get('history') or [{}])[-1]
+                print(f"{name}: v{u['version']} {len(u['tickers'])} tickers (+{len(last.get('added', []))} -{len(last.get('removed', []))})")
+            except Exception as e:
+                print(f"{name}: refresh failed: {e}", file=sys.stderr)
+    elif args.cmd == 'delist':
+        mark_delisted(args.tickers, root=args.root)
+    elif args.cmd == 'restore':
+        restore(args.tickers, root=args.root)
+
+
+if __name__ == '__main__':
+    main()
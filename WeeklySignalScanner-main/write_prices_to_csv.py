@@ -71,6 +71,10 @@ def main():
     # 日本語ファイル名で保存
     out_path = config.jp_filename('全銘柄_MA52_陽線包み_価格付き')
     df_sorted.to_csv(out_path, index=False)
+    # 同名ファイルを上書きするので、カタログ（と parquet）も登録し直す
+    import results_catalog
+    results_catalog.register(out_path, 'with_prices', params={'source': os.path.basename(csv_path)},
+                             as_of=results_catalog.infer_as_of(csv_path), df=df_sorted)
 
     print(f"保存しました: {out_path} (行数: {len(df_sorted)})")
 
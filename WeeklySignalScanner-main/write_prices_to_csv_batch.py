@@ -1,5 +1,4 @@
 import os
-import glob
 from datetime import datetime
 import time
 
@@ -8,19 +7,12 @@ import yfinance as yf
 
 
 def find_latest_csv():
-    # Prefer the original scan results file (exclude files that already contain prices)
-    pattern = "outputs/results/jp_all_ma52_engulfing_*.csv"
-    files = [f for f in glob.glob(pattern) if 'with_prices' not in os.path.basename(f)]
-    if not files:
-        # fallback: try any matching file
-        files = glob.glob(pattern)
-    if not files:
-        fallback = "outputs/results/jp_all_ma52_engulfing_2025-12-12.csv"
-        if os.path.exists(fallback):
-            return fallback
-        raise FileNotFoundError("No jp_all_ma52_engulfing CSV found in outputs/results/")
-    # Return the most recent base result file
-    return max(files, key=os.path.getmtime)
+    """最新の週足 MA52 + 陽線包み足の結果（価格付き・ソート済みの派生ファイルは除く）を結果カタログから引く。"""
+    import results_catalog
+    entry = results_catalog.latest('weekly_ma52_engulfing')
+    if entry is None:
+        raise FileNotFoundError("No weekly MA52 engulfing result in outputs/results/ (results_catalog)")
+    return entry
 
 
 def batch_fetch_prices(tickers, batch_size=50, pause=1.0):
@@ -69,22 +61,17 @@ def batch_fetch_prices(tickers, batch_size=50, pause=1.0):
 def main():
     import config
 
-    csv_path = find_latest_csv()
-    print(f"読み込み: {csv_path}")
-    df = pd.read_csv(csv_path)
+    import results_catalog
+
+    entry = find_latest_csv()
+    print(f"読み込み: {entry['csv_path'] or entry['name']}")
+    df = results_catalog.load(entry, normalize_ticker=False)
     if df.shape[0] == 0:
         print("CSVに銘柄が見つかりませんでした。終了します。")
         return
 
-    # detect ticker column
-    candidates = ["ticker", "Ticker", "symbol", "Symbol", "code", "Code"]
-    ticker_col = None
-    for c in candidates:
-        if c in df.columns:
-            ticker_col = c
-            break
-    if ticker_col is None:
-        ticker_col = df.columns[0]
+    # 銘柄列は登録時にカタログへ記録済み
+    ticker_col = entry.get('ticker_col') or results_catalog.infer_ticker_column(df)
 
     tickers = df[ticker_col].astype(str).tolist()
     # 除外銘柄をフィルタ
@@ -104,6 +91,7 @@ def main():
     # 日本語ファイル名で保存
     out_path = config.jp_filename('全銘柄_MA52_陽線包み_価格付き', date)
     df_sorted.to_csv(out_path, index=False)
+    results_catalog.register(out_path, 'with_prices', params={'source': entry['name']}, as_of=entry.get('as_of'), df=df_sorted)
 
     print(f"保存しました: {out_path} (行数: {len(df_sorted)})")
 
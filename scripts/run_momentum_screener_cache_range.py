@@ -1,10 +1,10 @@
 #!/usr/bin/env python3
 import os
+import sys
 from pathlib import Path
 import datetime
 import pandas as pd
 import csv
-import subprocess
 
 START = '2026-05-01'
 END = '2026-05-31'
@@ -77,16 +77,14 @@ if results:
         writer.writeheader()
         writer.writerows(results)
     print(f"Saved {len(results)} results to {out}")
-    # add & commit
+    # Git への公開は results_publisher のキューに積み、別プロセスでまとめてコミット/push する
     try:
-        subprocess.run(['git', '-C', str(BASE), 'config', 'user.name', 'AutoCommit'], check=False)
-        subprocess.run(['git', '-C', str(BASE), 'config', 'user.email', 'autocommit@local'], check=False)
-        subprocess.run(['git', '-C', str(BASE), 'add', '-f', str(out)], check=False)
-        commit_msg = f"chore(screener-cache): add results {out.name}"
-        commit_proc = subprocess.run(['git', '-C', str(BASE), 'commit', '-m', commit_msg], capture_output=True, text=True)
-        print('git commit returncode=', commit_proc.returncode)
+        sys.path.insert(0, str(BASE / 'WeeklySignalScanner-main'))
+        import results_publisher
+        entry = results_publisher.enqueue([out], f"chore(screener-cache): add results {out.name}")
+        print('queued for publish:', entry['id'])
     except Exception as e:
-        print('git commit failed:', e)
+        print('publish enqueue failed:', e)
 else:
     print('No results found in cache for given date range.')
 
@@ -1,11 +1,11 @@
 #!/usr/bin/env python3
 import os
+import sys
 from pathlib import Path
 import datetime
 import traceback
 import pandas as pd
 import yfinance as yf
-import subprocess
 
 # params
 START = os.environ.get('SCR_START', '2026-05-01')
@@ -82,16 +82,14 @@ out = RESULTS_DIR / f"短期_初動_{START}_to_{END}_{ts}.csv"
 if results:
     pd.DataFrame(results).to_csv(out, index=False, encoding='utf-8-sig')
     print(f"Saved {len(results)} results to {out}")
-    # add & commit
+    # Git への公開は results_publisher のキューに積み、別プロセスでまとめてコミット/push する
     try:
-        subprocess.run(['git', '-C', str(BASE), 'config', 'user.name', 'AutoCommit'], check=False)
-        subprocess.run(['git', '-C', str(BASE), 'config', 'user.email', 'autocommit@local'], check=False)
-        subprocess.run(['git', '-C', str(BASE), 'add', '-f', str(out)], check=False)
-        commit_msg = f"chore(screener-range): add results {out.name}"
-        commit_proc = subprocess.run(['git', '-C', str(BASE), 'commit', '-m', commit_msg], capture_output=True, text=True)
-        print('git commit returncode=', commit_proc.returncode)
+        sys.path.insert(0, str(BASE / 'WeeklySignalScanner-main'))
+        import results_publisher
+        entry = results_publisher.enqueue([out], f"chore(screener-range): add results {out.name}")
+        print('queued for publish:', entry['id'])
     except Exception as e:
-        print('git commit failed:', e)
+        print('publish enqueue failed:', e)
 else:
     print("No results found for the given date range.")
 